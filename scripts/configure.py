@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Apukone - Configuration Compiler
+
+Reads mysettings.env and .env once, generates any missing secrets in-process
+and renders every derived artifact from that single settings model:
+
+  .env                                                    compose interpolation
+  services/authentik/blueprint.env                        blueprint inputs (!Env)
+  services/openwebui/config/oidc/openid-configuration.json OIDC discovery
+  services/windmill/oauth.json                            Windmill SSO settings
+
+Outputs whose content hash is unchanged are not rewritten. The hashes, plus a
+per-service hash of each container's effective config, are kept in
+.config-state.json so a rerun reports (and with --apply restarts) only the
+services whose configuration actually changed.
+
+Usage: python3 scripts/configure.py [--check] [--apply]
+Only the standard library is used so this runs before any venv exists.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import secrets
+import string
+import subprocess
+import sys
+
+MYSETTINGS_FILE = "mysettings.env"
+ENV_FILE = ".env"
+STATE_FILE = ".config-state.json"
+ROOT_COMPOSE_FILE = "docker-compose.yml"
+OIDC_TEMPLATE = "services/openwebui/config/oidc/openid-configuration.json.template"
+
+PASSWORD_ALPHABET = string.ascii_letters + string.digits
+
+
+def generate_hex(nbytes):
+    return secrets.token_hex(nbytes)
+
+
+def generate_password(length=32):
+    return "".join(secrets.choice(PASSWORD_ALPHABET) for _ in range(length))
+
+
+# Generated when missing; order matches the order they are appended to .env
+SECRETS = [
+    # --- Authentik ---
+    ("AUTHENTIK_SECRET_KEY", lambda: generate_hex(64)),
+    ("AUTHENTIK_POSTGRES_PASSWORD", generate_password),
+    ("AUTHENTIK_BOOTSTRAP_TOKEN", lambda: generate_hex(32)),
+    # --- LiteLLM ---
+    ("LITELLM_MASTER_KEY", generate_password),
+    ("LITELLM_POSTGRES_PASSWORD", generate_password),
+    ("LITELLM_OIDC_CLIENT_ID", lambda: generate_hex(10)),  # 20 chars
+    ("LITELLM_OIDC_CLIENT_SECRET", lambda: generate_hex(16)),  # 32 chars
+    # --- OpenWebUI ---
+    ("OPENWEBUI_OIDC_CLIENT_ID", lambda: generate_hex(10)),
+    ("OPENWEBUI_OIDC_CLIENT_SECRET", lambda: generate_hex(16)),
+    ("WEBUI_SECRET_KEY", lambda: generate_hex(32)),
+    # --- Windmill ---
+    ("WINDMILL_OIDC_CLIENT_ID", lambda: generate_hex(10)),
+    ("WINDMILL_OIDC_CLIENT_SECRET", lambda: generate_hex(16)),
+    ("WINDMILL_POSTGRES_PASSWORD", generate_password),
+    # --- Shared Postgres (shared-db profile) ---
+    ("SHARED_POSTGRES_PASSWORD", generate_password),
+    # --- OpenWebUI Postgres (openwebui-postgres profile) ---
+    ("OPENWEBUI_POSTGRES_PASSWORD", generate_password),
+]
+
+BLUEPRINT_KEYS = [
+    "ADMIN_EMAIL",
+    "BASE_DOMAIN",
+    "OPENWEBUI_OIDC_CLIENT_ID",
+    "OPENWEBUI_OIDC_CLIENT_SECRET",
+    "LITELLM_OIDC_CLIENT_ID",
+    "LITELLM_OIDC_CLIENT_SECRET",
+    "WINDMILL_OIDC_CLIENT_ID",
+    "WINDMILL_OIDC_CLIENT_SECRET",
+]
+
+GREEN = "\033[0;32m"
+YELLOW = "\033[1;33m"
+BLUE = "\033[0;34m"
+NC = "\033[0m"
+
+
+def log_info(message):
+    print(f"{BLUE}[INFO]{NC} {message}")
+
+
+def log_success(message):
+    print(f"{GREEN}[SUCCESS]{NC} {message}")
+
+
+def log_warn(message):
+    print(f"{YELLOW}[WARN]{NC} {message}")
+
+
+def sha256(data):
+    if isinstance(data, str):
+        data = data.encode()
+    return hashlib.sha256(data).hexdigest()
+
+
+def parse_env(text):
+    """
+    Parses KEY=VALUE lines into an ordered dict, skipping blanks and comments.
+    Surrounding quotes are stripped the way compose does.
+    """
+    values = {}
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#") or "=" not in stripped:
+            continue
+        key, value = stripped.split("=", 1)
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+            value = value[1:-1]
+        values[key.strip()] = value
+    return values
+
+
+def read_text(root, path):
+    full = os.path.join(root, path)
+    if not os.path.exists(full):
+        return None
+    with open(full, encoding="utf-8") as f:
+        return f.read()
+
+
+def build_settings(mysettings_text, env_text, generate=True):
+    """
+    The single settings model: existing .env values win, keys only present in
+    mysettings.env are merged in and missing secrets are generated.
+
+    Returns (settings, appended lines for .env, log messages).
+    """
+    env = parse_env(env_text or "")
+    settings = dict(env)
+    appended = []
+    messages = []
+
+    for line in (mysettings_text or "").splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#") or "=" not in stripped:
+            continue
+        key = stripped.split("=", 1)[0].strip()
+        if key not in settings:
+            settings[key] = parse_env(stripped)[key]
+            appended.append(stripped)
+            messages.append(f"Merged {key} from {MYSETTINGS_FILE}")
+
+    if generate:
+        for key, generator in SECRETS:
+            if key not in settings:
+                settings[key] = generator()
+                appended.append(f"{key}={settings[key]}")
+                messages.append(f"Generated {key}")
+
+    if not settings.get("BASE_DOMAIN"):
+        messages.append(f"BASE_DOMAIN not found in {ENV_FILE}. Using 'localhost' for OIDC configuration.")
+        settings["BASE_DOMAIN"] = "localhost"
+    return settings, appended, messages
+
+
+def render_env(env_text, appended):
+    if env_text is None:
+        env_text = "" if not appended else "# Auto-generated secrets\n"
+    if not appended:
+        return env_text
+    if env_text and not env_text.endswith("\n"):
+        env_text += "\n"
+    return env_text + "\n".join(appended) + "\n"
+
+
+def render_blueprint_env(settings):
+    lines = ["# Generated by scripts/configure.py - inputs for services/authentik/setup-blueprint.yaml"]
+    lines += [f"{key}={settings.get(key, '')}" for key in BLUEPRINT_KEYS]
+    return "\n".join(lines) + "\n"
+
+
+def render_oidc_discovery(settings, template_text):
+    return template_text.replace("{{BASE_DOMAIN}}", settings["BASE_DOMAIN"])
+
+
+def render_windmill_oauth(settings):
+    base_domain = settings["BASE_DOMAIN"]
+    oauth_config = {
+        "Authentik": {
+            "id": settings.get("WINDMILL_OIDC_CLIENT_ID"),
+            "secret": settings.get("WINDMILL_OIDC_CLIENT_SECRET"),
+            "login_config": {
+                "auth_url": f"https://sso.{base_domain}/application/o/authorize/",
+                "token_url": "http://apukone-authentik-server:9000/application/o/token/",
+                "userinfo_url": "http://apukone-authentik-server:9000/application/o/userinfo/",
+                "jwks_url": "http://config-server/application/o/windmill/jwks/"
+            },
+            "scopes": ["openid", "email", "profile", "groups"]
+        }
+    }
+    return json.dumps(oauth_config, indent=2) + "\n"
+
+
+def compose_services(text):
+    """
+    Splits a compose file into {service: block text}. Relies on the two-space
+    indentation used by every compose file in this repository.
+    """
+    services = {}
+    current = None
+    in_services = False
+    for line in text.splitlines():
+        if re.match(r"^\S", line):
+            in_services = line.startswith("services:")
+            current = None
+            continue
+        if not in_services:
+            continue
+        match = re.match(r"^  ([A-Za-z0-9_.-]+):\s*$", line)
+        if match:
+            current = match.group(1)
+            services[current] = []
+        elif current:
+            services[current].append(line)
+    return {name: "\n".join(lines) for name, lines in services.items()}
+
+
+def compose_files(root):
+    """The compose files included by the root docker-compose.yml."""
+    text = read_text(root, ROOT_COMPOSE_FILE) or ""
+    return re.findall(r"^\s*-\s*(\S+\.ya?ml)\s*$", text, re.MULTILINE)
+
+
+def env_references(block):
+    """Variables a compose service interpolates, ignoring $$-escaped ones."""
+    return sorted(set(re.findall(r"(?<!\$)\$\{([A-Za-z_][A-Za-z0-9_]*)", block)))
+
+
+def compile_config(root, generate=True):
+    """
+    Renders all artifacts in memory. Returns (artifacts, service_hashes, messages)
+    where artifacts maps path -> {"content", "consumers"}.
+    """
+    mysettings_text = read_text(root, MYSETTINGS_FILE)
+    env_text = read_text(root, ENV_FILE)
+    messages = []
+    if env_text is None:
+        if mysettings_text is None:
+            messages.append(f"{MYSETTINGS_FILE} not found. Creating empty {ENV_FILE}.")
+        else:
+            messages.append(f"Creating {ENV_FILE} from {MYSETTINGS_FILE}...")
+
+    settings, appended, build_messages = build_settings(mysettings_text, env_text, generate)
+    messages += build_messages
+
+    artifacts = {
+        # .env changes are picked up by `docker compose up -d` for the services that reference them
+        ENV_FILE: {"content": render_env(env_text, appended), "consumers": []},
+        # env_file content is part of the container config, compose recreates on change
+        "services/authentik/blueprint.env": {
+            "content": render_blueprint_env(settings),
+            "consumers": [],
+        },
+        # Bind-mounted files: compose cannot see their content, the consumers need a restart
+        "services/windmill/oauth.json": {
+            "content": render_windmill_oauth(settings),
+            "consumers": ["windmill_server"],
+        },
+    }
+    template_text = read_text(root, OIDC_TEMPLATE)
+    if template_text is None:
+        messages.append(f"OIDC template {OIDC_TEMPLATE} not found. Skipping generation.")
+    else:
+        artifacts["services/openwebui/config/oidc/openid-configuration.json"] = {
+            "content": render_oidc_discovery(settings, template_text),
+            "consumers": ["config-server", "openwebui"],
+        }
+
+    service_hashes = {}
+    for compose_file in compose_files(root):
+        text = read_text(root, compose_file) or ""
+        for name, block in compose_services(text).items():
+            effective = {key: settings.get(key, "") for key in env_references(block)}
+            effective["__artifacts__"] = {
+                path: sha256(artifact["content"])
+                for path, artifact in artifacts.items()
+                if name in artifact["consumers"] or (path != ENV_FILE and os.path.basename(path) in block)
+            }
+            service_hashes[name] = sha256(json.dumps(effective, sort_keys=True))
+    return artifacts, service_hashes, messages
+
+
+def load_state(root):
+    text = read_text(root, STATE_FILE)
+    if not text:
+        return {"artifacts": {}, "services": {}}
+    return json.loads(text)
+
+
+def write_outputs(root, artifacts):
+    """
+    Writes artifacts whose content hash differs from what is on disk.
+    Returns the list of paths written.
+    """
+    written = []
+    for path, artifact in artifacts.items():
+        existing = read_text(root, path)
+        if existing is not None and sha256(existing) == sha256(artifact["content"]):
+            continue
+        full = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full) or ".", exist_ok=True)
+        tmp = full + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(artifact["content"])
+        os.replace(tmp, full)
+        written.append(path)
+    return written
+
+
+def plan_restarts(state, artifacts, service_hashes, written):
+    """
+    Services whose effective config hash changed since the last run, and the
+    subset that only changed through bind-mounted files (compose will not
+    recreate those on its own).
+    """
+    previous = state.get("services", {})
+    changed = sorted(name for name, digest in service_hashes.items() if previous.get(name) != digest)
+    mounted = sorted({
+        consumer
+        for path in written
+        for consumer in artifacts[path]["consumers"]
+        if consumer in changed and previous.get(consumer) is not None
+    })
+    return changed, mounted
+
+
+def apply_changes(root, changed, mounted, first_run):
+    compose = ["docker", "compose"]
+    if first_run or changed:
+        log_info("Running: docker compose up -d")
+        subprocess.run(compose + ["up", "-d"], cwd=root, check=True)
+    if mounted and not first_run:
+        log_info(f"Restarting services with changed mounted config: {', '.join(mounted)}")
+        subprocess.run(compose + ["restart"] + mounted, cwd=root, check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile Apukone configuration from mysettings.env.")
+    parser.add_argument("--root", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    parser.add_argument("--check", action="store_true", help="exit 1 if any output would change, write nothing")
+    parser.add_argument("--apply", action="store_true", help="run docker compose for the services that changed")
+    args = parser.parse_args()
+    root = os.path.normpath(args.root)
+
+    artifacts, service_hashes, messages = compile_config(root, generate=not args.check)
+    for message in messages:
+        (log_warn if "not found" in message else log_info)(message)
+
+    if args.check:
+        stale = [
+            path for path, artifact in artifacts.items()
+            if (read_text(root, path) or "") != artifact["content"]
+        ]
+        for path in stale:
+            log_warn(f"Out of date: {path}")
+        return 1 if stale else 0
+
+    state = load_state(root)
+    first_run = not state.get("services")
+    written = write_outputs(root, artifacts)
+    for path in written:
+        log_success(f"Wrote {path}")
+    if not written:
+        log_info("All generated files are up to date.")
+
+    changed, mounted = plan_restarts(state, artifacts, service_hashes, written)
+    new_state = {
+        "artifacts": {path: sha256(artifact["content"]) for path, artifact in artifacts.items()},
+        "services": service_hashes,
+    }
+    if new_state != state:
+        write_outputs(root, {STATE_FILE: {"content": json.dumps(new_state, indent=2, sort_keys=True) + "\n"}})
+
+    if first_run:
+        log_success(f"Configuration is ready in {ENV_FILE}.")
+        log_info("You can now run: docker compose up -d")
+    elif not changed:
+        log_success("No service configuration changed. Nothing to restart.")
+    else:
+        log_info(f"Services with changed configuration: {', '.join(changed)}")
+        if mounted:
+            log_info(f"Mounted config changed (needs restart): {', '.join(mounted)}")
+
+    if args.apply:
+        apply_changes(root, changed, mounted, first_run)
+    elif changed and not first_run:
+        log_info("Apply with: docker compose up -d" + (f" && docker compose restart {' '.join(mounted)}" if mounted else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
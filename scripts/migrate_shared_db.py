@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Apukone - Migrate the per-service databases into shared-db
+
+Streams each service database (authentik, litellm, windmill) from its own
+postgres container into the consolidated cluster of the shared-db profile:
+
+  pg_dump (source container) | owner rewrite | psql, one transaction (shared-db)
+
+Nothing is staged on disk. Objects end up owned by the service's role in
+shared-db (the dump is restored under SET ROLE), default privileges of the
+old owner are carried over to that role, and every table's row count is
+compared between both sides afterwards. A failed restore rolls back, so
+the target database is left empty and the run can be repeated.
+
+The services writing to a database are stopped while it is copied (use
+--no-stop to keep them running, e.g. for a dry rehearsal) and are left
+stopped until they are switched to PgBouncer (see the printed settings).
+
+Usage:
+  docker compose --profile shared-db up -d shared-db
+  python3 scripts/migrate_shared_db.py [--only authentik litellm] [--replace] [--no-stop]
+
+Only the standard library and the docker CLI are used.
+"""
+import argparse
+import subprocess
+import sys
+import threading
+import time
+
+ROOT_COMPOSE = ["docker", "compose"]
+TARGET_CONTAINER = "apukone-shared-db"
+TARGET_SUPERUSER = "postgres"
+
+# name: source container, source login (owner of the dumped objects), target role, services to stop
+DATABASES = {
+    "authentik": {
+        "container": "apukone-authentik-db",
+        "user": "authentik",
+        "role": "authentik",
+        "writers": ["authentik-server", "authentik-worker"],
+    },
+    "litellm": {
+        "container": "apukone-litellm-db",
+        "user": "litellm",
+        "role": "litellm",
+        "writers": ["litellm"],
+    },
+    "windmill": {
+        "container": "apukone-windmill-db",
+        "user": "postgres",
+        "role": "windmill",
+        "writers": ["windmill_server", "windmill_worker", "windmill_worker_llm", "windmill_worker_native"],
+    },
+}
+
+SWITCH_SETTINGS = """\
+COMPOSE_PROFILES=shared-db
+SEPARATE_DB_REPLICAS=0
+AUTHENTIK_DB_HOST=pgbouncer
+AUTHENTIK_DB_PORT=6432
+AUTHENTIK_DB_USE_PGBOUNCER=true
+LITELLM_DB_HOST=pgbouncer
+LITELLM_DB_PORT=6432
+LITELLM_DB_PARAMS=?pgbouncer=true
+WINDMILL_DB_HOST=pgbouncer
+WINDMILL_DB_PORT=6432
+WINDMILL_DB_USER=windmill"""
+
+# One "schema.table|rows" line per table; \\gexec runs the generated counts
+COUNT_TABLES_SQL = r"""
+SELECT format('SELECT %L || ''|'' || count(*) FROM %I.%I', n.nspname || '.' || c.relname, n.nspname, c.relname)
+FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE c.relkind IN ('r', 'p')
+  AND n.nspname NOT IN ('pg_catalog', 'information_schema') AND n.nspname NOT LIKE 'pg_toast%'
+ORDER BY 1
+\gexec
+"""
+
+GREEN = "\033[0;32m"
+YELLOW = "\033[1;33m"
+BLUE = "\033[0;34m"
+RED = "\033[0;31m"
+NC = "\033[0m"
+
+
+def log_info(message):
+    print(f"{BLUE}[INFO]{NC} {message}")
+
+
+def log_success(message):
+    print(f"{GREEN}[SUCCESS]{NC} {message}")
+
+
+def log_warn(message):
+    print(f"{YELLOW}[WARN]{NC} {message}")
+
+
+def log_error(message):
+    print(f"{RED}[ERROR]{NC} {message}")
+
+
+def quote_ident(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def rewrite_dump(lines, source_owner, target_role):
+    """
+    Plain pg_dump output (bytes lines, dumped with --no-owner) -> the same
+    restored as `target_role`: a SET ROLE up front and default privileges
+    of `source_owner` re-targeted. COPY data is passed through untouched.
+    """
+    yield f"SET ROLE {quote_ident(target_role)};\n".encode()
+    # identifiers are always quoted (pg_dump --quote-all-identifiers)
+    old = f"ALTER DEFAULT PRIVILEGES FOR ROLE {quote_ident(source_owner)} ".encode()
+    new = f"ALTER DEFAULT PRIVILEGES FOR ROLE {quote_ident(target_role)} ".encode()
+    in_copy = False
+    for line in lines:
+        if in_copy:
+            in_copy = line.rstrip(b"\n") != b"\\."
+        elif line.startswith(b"COPY ") and line.rstrip().endswith(b"FROM stdin;"):
+            in_copy = True
+        elif line.startswith(old):
+            line = new + line[len(old):]
+        yield line
+
+
+def parse_counts(text):
+    """psql -At output of COUNT_TABLES_SQL -> {table: rows}."""
+    counts = {}
+    for line in text.splitlines():
+        if "|" in line:
+            table, _, rows = line.rpartition("|")
+            counts[table] = int(rows)
+    return counts
+
+
+def compare_counts(source, target):
+    """Tables whose row counts differ (or that exist on one side only): [(table, source, target)]."""
+    return [
+        (table, source.get(table), target.get(table))
+        for table in sorted(set(source) | set(target))
+        if source.get(table) != target.get(table)
+    ]
+
+
+def psql(container, user, database, sql):
+    result = subprocess.run(
+        ["docker", "exec", "-i", container, "psql", "-X", "-q", "-At", "-v", "ON_ERROR_STOP=1", "-U", user, "-d", database],
+        input=sql, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"psql on {container}/{database} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+def table_counts(container, user, database):
+    return parse_counts(psql(container, user, database, COUNT_TABLES_SQL))
+
+
+def prepare_target(name, role, replace):
+    tables = table_counts(TARGET_CONTAINER, TARGET_SUPERUSER, name)
+    if not tables:
+        return
+    if not replace:
+        raise RuntimeError(f"shared-db already has {len(tables)} tables in '{name}' (use --replace to recreate it)")
+    log_warn(f"Recreating database '{name}' in shared-db")
+    psql(TARGET_CONTAINER, TARGET_SUPERUSER, "postgres",
+         f"DROP DATABASE {quote_ident(name)} WITH (FORCE);\nCREATE DATABASE {quote_ident(name)} OWNER {quote_ident(role)};\n")
+
+
+def stream_database(name, spec):
+    """pg_dump | rewrite_dump | psql. Returns (bytes streamed, seconds)."""
+    dump = subprocess.Popen(
+        ["docker", "exec", spec["container"], "pg_dump", "-U", spec["user"], "-d", name, "--no-owner", "--quote-all-identifiers"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    restore = subprocess.Popen(
+        ["docker", "exec", "-i", TARGET_CONTAINER, "psql", "-X", "-q", "-v", "ON_ERROR_STOP=1",
+         "-U", TARGET_SUPERUSER, "-d", name],
+        stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    errors = {}
+    readers = [
+        threading.Thread(target=lambda: errors.setdefault("dump", dump.stderr.read())),
+        threading.Thread(target=lambda: errors.setdefault("restore", restore.stderr.read())),
+    ]
+    for reader in readers:
+        reader.start()
+    started = time.monotonic()
+    streamed = 0
+    # committed only once pg_dump finished cleanly; psql exiting without COMMIT rolls back
+    dump_code = None
+    try:
+        restore.stdin.write(b"BEGIN;\n")
+        for line in rewrite_dump(dump.stdout, spec["user"], spec["role"]):
+            restore.stdin.write(line)
+            streamed += len(line)
+        dump_code = dump.wait()
+        if dump_code == 0:
+            restore.stdin.write(b"COMMIT;\n")
+        restore.stdin.close()
+    except BrokenPipeError:
+        dump.kill()  # psql stopped on an error; reported below
+    if dump_code is None:
+        dump_code = dump.wait()
+    restore_code = restore.wait()
+    for reader in readers:
+        reader.join()
+    if dump_code != 0:
+        raise RuntimeError(f"pg_dump of '{name}' failed: {errors['dump'].decode().strip()}")
+    if restore_code != 0:
+        raise RuntimeError(f"restore of '{name}' failed (rolled back): {errors['restore'].decode().strip()}")
+    return streamed, time.monotonic() - started
+
+
+def migrate(name, spec, replace):
+    prepare_target(name, spec["role"], replace)
+    streamed, seconds = stream_database(name, spec)
+    log_info(f"{name}: streamed {streamed / 1024 / 1024:.1f} MiB in {seconds:.1f}s")
+    source = table_counts(spec["container"], spec["user"], name)
+    target = table_counts(TARGET_CONTAINER, TARGET_SUPERUSER, name)
+    mismatches = compare_counts(source, target)
+    if mismatches:
+        for table, before, after in mismatches:
+            log_error(f"{name}.{table}: {before} rows in the source, {after} in shared-db")
+        raise RuntimeError(f"row counts of '{name}' differ in {len(mismatches)} tables")
+    log_success(f"{name}: {len(source)} tables, {sum(source.values())} rows, counts match")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream the per-service databases into shared-db.")
+    parser.add_argument("--only", nargs="+", choices=sorted(DATABASES), help="databases to migrate (default: all)")
+    parser.add_argument("--replace", action="store_true", help="drop and recreate target databases that already have tables")
+    parser.add_argument("--no-stop", action="store_true", help="leave the writing services running during the copy")
+    args = parser.parse_args()
+
+    names = args.only or list(DATABASES)
+    if not args.no_stop:
+        writers = sorted({service for name in names for service in DATABASES[name]["writers"]})
+        log_info(f"Stopping writers: {', '.join(writers)}")
+        subprocess.run(ROOT_COMPOSE + ["stop"] + writers, check=True)
+
+    failed = []
+    for name in names:
+        try:
+            migrate(name, DATABASES[name], args.replace)
+        except (RuntimeError, OSError) as e:
+            log_error(str(e))
+            failed.append(name)
+    if failed:
+        log_error(f"Not migrated: {', '.join(failed)}")
+        return 1
+
+    print()
+    log_success("All databases are in shared-db. Add these lines to mysettings.env and .env, then run")
+    print("  docker compose up -d --remove-orphans\n")
+    print(SWITCH_SETTINGS)
+    print("\nThe old volumes are kept; remove them once the services run on shared-db.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Apukone - Startup Critical-Path Profiler
+
+Parses the compose files included by docker-compose.yml into a dependency
+DAG and answers "why does a cold `docker compose up` take this long?":
+
+  theoretical  earliest ready time of every service implied by depends_on
+               conditions, healthcheck interval/start_interval/start_period
+               and fixed `sleep`s in one-shot commands, plus the critical path
+  analyze      the same, compared against the actual time-to-healthy of each
+               container taken from a recorded `docker events` log
+  record       runs `docker compose up -d` while recording that event log
+
+Both theoretical and analyze work offline from the compose files (and log).
+
+Usage:
+  python3 scripts/startup_profile.py theoretical
+  python3 scripts/startup_profile.py record --output startup-events.jsonl
+  python3 scripts/startup_profile.py analyze startup-events.jsonl [--json report.json]
+
+Requires PyYAML (pip install -r tests/requirements.txt).
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+import yaml
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Docker defaults when a healthcheck omits a field
+DEFAULT_INTERVAL = 30.0
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_RETRIES = 3
+DEFAULT_START_PERIOD = 0.0
+# Container create + start before the entrypoint runs
+DEFAULT_START_COST = 1.0
+
+
+def parse_duration(value, default=0.0):
+    """
+    Compose duration ("1m30s", "500ms", "5s") in seconds.
+    """
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    total = 0.0
+    for amount, unit in re.findall(r"(\d+(?:\.\d+)?)(ms|us|h|m|s)", str(value)):
+        total += float(amount) * {"h": 3600, "m": 60, "s": 1, "ms": 0.001, "us": 0.000001}[unit]
+    return total
+
+
+def load_services(root=ROOT, compose_file="docker-compose.yml", profiles=()):
+    """
+    Services from every compose file included by the root file, skipping
+    those whose profiles are not enabled.
+    """
+    with open(os.path.join(root, compose_file), encoding="utf-8") as f:
+        main = yaml.safe_load(f) or {}
+    files = [compose_file] + [
+        entry if isinstance(entry, str) else entry["path"] for entry in main.get("include", [])
+    ]
+
+    services = {}
+    for path in files:
+        with open(os.path.join(root, path), encoding="utf-8") as f:
+            document = yaml.safe_load(f) or {}
+        for name, spec in (document.get("services") or {}).items():
+            spec = spec or {}
+            if spec.get("profiles") and not set(spec["profiles"]) & set(profiles):
+                continue
+            spec["_file"] = path
+            services[name] = spec
+    return services
+
+
+def dependencies(spec):
+    """
+    {dependency: condition} from short (list) or long (mapping) depends_on.
+    """
+    depends_on = spec.get("depends_on") or {}
+    if isinstance(depends_on, list):
+        return {name: "service_started" for name in depends_on}
+    return {name: (options or {}).get("condition", "service_started") for name, options in depends_on.items()}
+
+
+def command_sleeps(spec):
+    """
+    (fixed, poll) seconds of `sleep N` in a service's command/entrypoint.
+    Sleeps inside `until`/`while` loops are polling intervals: they add up to
+    one interval of delay after the thing being polled is ready.
+    """
+    fixed = poll = 0.0
+    for part in (spec.get("entrypoint"), spec.get("command")):
+        lines = part if isinstance(part, list) else [part or ""]
+        for line in "\n".join(str(item) for item in lines).splitlines():
+            for value in re.findall(r"\bsleep\s+(\d+(?:\.\d+)?)", line):
+                if re.search(r"\b(until|while)\b", line):
+                    poll = max(poll, float(value))
+                else:
+                    fixed += float(value)
+    return fixed, poll
+
+
+def probe_model(spec):
+    """
+    Healthcheck timing. `floor` is the earliest a healthy status can be
+    reported (the first probe), `ceiling` the latest before docker gives up
+    and marks the container unhealthy.
+    """
+    check = spec.get("healthcheck")
+    if not check or check.get("disable") or check.get("test") in (["NONE"], "NONE"):
+        return None
+    interval = parse_duration(check.get("interval"), DEFAULT_INTERVAL)
+    timeout = parse_duration(check.get("timeout"), DEFAULT_TIMEOUT)
+    retries = int(check.get("retries", DEFAULT_RETRIES))
+    start_period = parse_duration(check.get("start_period"), DEFAULT_START_PERIOD)
+    start_interval = parse_duration(check.get("start_interval"), 0.0)
+    first_probe = start_interval if start_period and start_interval else interval
+    return {
+        "interval": interval,
+        "timeout": timeout,
+        "retries": retries,
+        "start_period": start_period,
+        "start_interval": start_interval,
+        "floor": first_probe,
+        "ceiling": start_period + retries * (interval + timeout),
+        "test": check.get("test"),
+    }
+
+
+def build_graph(services, start_cost=DEFAULT_START_COST):
+    """
+    Nodes with their dependency edges, probe model and one-shot sleeps.
+    """
+    graph = {}
+    for name, spec in services.items():
+        fixed, poll = command_sleeps(spec)
+        graph[name] = {
+            "deps": {dep: cond for dep, cond in dependencies(spec).items() if dep in services},
+            "probe": probe_model(spec),
+            "sleep": fixed,
+            "poll": poll,
+            # no restart policy: a one-shot init container that runs to completion
+            "one_shot": spec.get("restart", "no") in ("no", False),
+            "start_cost": start_cost,
+        }
+    return graph
+
+
+def topological_order(graph):
+    order = []
+    state = {}
+
+    def visit(name, trail):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(f"Dependency cycle: {' -> '.join(trail + [name])}")
+        state[name] = "visiting"
+        for dep in sorted(graph[name]["deps"]):
+            visit(dep, trail + [name])
+        state[name] = "done"
+        order.append(name)
+
+    for name in sorted(graph):
+        visit(name, [])
+    return order
+
+
+def gate_time(times, dep, condition):
+    """When a dependency satisfies `condition`, given its computed times."""
+    if condition == "service_healthy":
+        return times[dep]["healthy"]
+    if condition == "service_completed_successfully":
+        return times[dep]["done"]
+    return times[dep]["started"]
+
+
+def theoretical_times(graph, bound="floor"):
+    """
+    Earliest start/healthy/done time of every service, assuming each probe
+    succeeds at its `bound` ("floor" = first probe, "ceiling" = last chance).
+    Each node also records which dependency gated its start.
+    """
+    times = {}
+    for name in topological_order(graph):
+        node = graph[name]
+        gate, gated_by = 0.0, None
+        for dep, condition in node["deps"].items():
+            at = gate_time(times, dep, condition)
+            if at > gate:
+                gate, gated_by = at, dep
+        started = gate + node["start_cost"]
+        probe = node["probe"]
+        healthy = started + (probe[bound] if probe else 0.0)
+        done = started + node["sleep"] + (node["poll"] if bound == "ceiling" else 0.0)
+        times[name] = {"started": started, "healthy": max(healthy, done if node["one_shot"] else started),
+                       "done": done, "gated_by": gated_by}
+    return times
+
+
+def critical_path(times, key="healthy"):
+    """
+    Chain of services ending at the one that is ready last, following the
+    dependency that gated each start.
+    """
+    end = max(times, key=lambda name: max(times[name][key], times[name]["done"]))
+    path = [end]
+    while times[path[-1]]["gated_by"]:
+        path.append(times[path[-1]]["gated_by"])
+    return list(reversed(path))
+
+
+def parse_events(lines, services):
+    """
+    Per-service timestamps (seconds since the first event) from
+    `docker events --format '{{json .}}'` lines.
+    """
+    container_names = {spec.get("container_name", name): name for name, spec in services.items()}
+    actions = {"create": "created", "start": "started", "health_status: healthy": "healthy", "die": "died"}
+    observed = {}
+    t0 = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        event = json.loads(line)
+        if (event.get("Type") or event.get("type")) != "container":
+            continue
+        action = event.get("Action") or event.get("status", "")
+        field = actions.get(action.strip())
+        if field is None:
+            continue
+        attributes = (event.get("Actor") or {}).get("Attributes") or {}
+        name = attributes.get("com.docker.compose.service") or container_names.get(attributes.get("name"))
+        if name not in services:
+            continue
+        at = int(event["timeNano"]) / 1e9 if "timeNano" in event else float(event["time"])
+        t0 = at if t0 is None else min(t0, at)
+        observed.setdefault(name, {}).setdefault(field, at)
+        if field == "died":
+            exit_code = attributes.get("exitCode")
+            observed[name]["exit_code"] = int(exit_code) if exit_code is not None else None
+    for stamps in observed.values():
+        for field in ("created", "started", "healthy", "died"):
+            if field in stamps:
+                stamps[field] = round(stamps[field] - t0, 3)
+    return observed
+
+
+def analyze(graph, observed):
+    """
+    Actual critical path and the edges/probes that dominate it.
+
+    For every service: when its gate opened (slowest dependency reaching its
+    condition), how long it then waited to start, and how long it took to
+    become healthy compared to its probe interval.
+    """
+    actual = {}
+    for name in topological_order(graph):
+        stamps = observed.get(name, {})
+        started = stamps.get("started")
+        if started is None:
+            continue
+        ready = stamps.get("healthy") if graph[name]["probe"] else None
+        done = stamps.get("died", started) if graph[name]["one_shot"] else started
+        actual[name] = {"started": started, "healthy": ready if ready is not None else done, "done": done, "gated_by": None}
+        gate = 0.0
+        for dep, condition in graph[name]["deps"].items():
+            if dep in actual:
+                at = gate_time(actual, dep, condition)
+                if at >= gate:
+                    gate, actual[name]["gated_by"] = at, dep
+        actual[name]["gate"] = gate
+
+    edges = []
+    probes = []
+    for name, stamps in actual.items():
+        node = graph[name]
+        if stamps["gated_by"]:
+            edges.append({
+                "edge": f"{stamps['gated_by']} -> {name}",
+                "condition": node["deps"][stamps["gated_by"]],
+                "wait": round(stamps["gate"] - observed[name].get("created", 0.0), 3),
+            })
+        probe = node["probe"]
+        if probe and observed[name].get("healthy") is not None:
+            to_healthy = observed[name]["healthy"] - stamps["started"]
+            probes.append({
+                "service": name,
+                "time_to_healthy": round(to_healthy, 3),
+                "interval": probe["interval"],
+                "start_interval": probe["start_interval"],
+                "start_period": probe["start_period"],
+                "probes": max(1, round(to_healthy / (probe["start_interval"] or probe["interval"]))),
+                # the app may have been ready up to one interval before the probe noticed
+                "probe_slack": probe["start_interval"] or probe["interval"],
+            })
+    path = critical_path(actual) if actual else []
+    return {
+        "actual": actual,
+        "critical_path": path,
+        "edges": sorted(edges, key=lambda edge: edge["wait"], reverse=True),
+        "probes": sorted(probes, key=lambda probe: probe["time_to_healthy"], reverse=True),
+    }
+
+
+def record(root, output, timeout):
+    """
+    Runs `docker compose up -d` while capturing container events until every
+    started container is healthy/exited or `timeout` passes.
+    """
+    since = str(int(time.time()))
+    # streamed straight to the file: healthcheck execs alone overflow a pipe
+    # buffer long before the stack is up, and a full pipe blocks docker events
+    with open(output, "w", encoding="utf-8") as f:
+        events = subprocess.Popen(
+            ["docker", "events", "--since", since, "--filter", "type=container", "--format", "{{json .}}"],
+            stdout=f, text=True,
+        )
+        try:
+            subprocess.run(["docker", "compose", "up", "-d"], cwd=root, check=True)
+            subprocess.run(["docker", "compose", "up", "-d", "--wait", "--wait-timeout", str(int(timeout))], cwd=root)
+        finally:
+            time.sleep(1)
+            events.terminate()
+            events.wait()
+    print(f"Recorded container events to {output}")
+
+
+def print_theoretical(graph, floor, ceiling):
+    print(f"{'service':<26}{'gated by':<24}{'start':>8}{'ready (best)':>14}{'ready (worst)':>15}")
+    for name in sorted(floor, key=lambda n: floor[n]["healthy"]):
+        print(f"{name:<26}{floor[name]['gated_by'] or '-':<24}{floor[name]['started']:>7.1f}s"
+              f"{floor[name]['healthy']:>13.1f}s{ceiling[name]['healthy']:>14.1f}s")
+    path = critical_path(floor)
+    print(f"\nCritical path (best case, {floor[path[-1]]['healthy']:.1f}s): {' -> '.join(path)}")
+    for name in path:
+        probe = graph[name]["probe"]
+        detail = []
+        if probe:
+            detail.append(f"interval {probe['interval']:.0f}s, start_period {probe['start_period']:.0f}s, retries {probe['retries']}")
+        if graph[name]["sleep"]:
+            detail.append(f"fixed sleep {graph[name]['sleep']:.0f}s")
+        if graph[name]["poll"]:
+            detail.append(f"polls every {graph[name]['poll']:.0f}s")
+        print(f"  {name}: {'; '.join(detail) or 'no healthcheck'}")
+    waits = [name for name in sorted(graph) if graph[name]["sleep"] or graph[name]["poll"]]
+    if waits:
+        print("\nShell-level waits (invisible to depends_on):")
+        for name in waits:
+            gates = ", ".join(f"{dep} ({cond})" for dep, cond in sorted(graph[name]["deps"].items())) or "nothing"
+            kind = f"sleep {graph[name]['sleep']:.0f}s" if graph[name]["sleep"] else f"poll loop, {graph[name]['poll']:.0f}s interval"
+            print(f"  {name}: {kind} after waiting for {gates}")
+
+
+def print_analysis(report):
+    actual = report["actual"]
+    if not actual:
+        print("No container events for services in the compose files.")
+        return
+    path = report["critical_path"]
+    end = actual[path[-1]]
+    print(f"Actual critical path ({max(end['healthy'], end['done']):.1f}s): {' -> '.join(path)}")
+    print("\nSlowest dependency edges (time a container waited for its gate):")
+    for edge in report["edges"][:8]:
+        print(f"  {edge['edge']:<40} {edge['condition']:<32} {edge['wait']:>7.1f}s")
+    print("\nProbes (time to healthy vs. probe granularity):")
+    for probe in report["probes"][:8]:
+        print(f"  {probe['service']:<26} healthy after {probe['time_to_healthy']:>6.1f}s "
+              f"(~{probe['probes']} probe(s), up to {probe['probe_slack']:.0f}s lost to interval)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the compose startup critical path.")
+    parser.add_argument("--root", default=ROOT)
+    parser.add_argument("--profile", action="append", default=[], help="also include services of this compose profile")
+    parser.add_argument("--start-cost", type=float, default=DEFAULT_START_COST, help="assumed create+start cost per container (s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("theoretical", help="critical path implied by the compose files")
+    analyze_parser = sub.add_parser("analyze", help="compare against a recorded docker events log")
+    analyze_parser.add_argument("events")
+    analyze_parser.add_argument("--json", help="write the full report to this file")
+    record_parser = sub.add_parser("record", help="run docker compose up -d and record the event log")
+    record_parser.add_argument("--output", default="startup-events.jsonl")
+    record_parser.add_argument("--timeout", type=float, default=600)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.root, args.output, args.timeout)
+        return 0
+
+    services = load_services(args.root, profiles=args.profile)
+    graph = build_graph(services, args.start_cost)
+    floor = theoretical_times(graph, "floor")
+    ceiling = theoretical_times(graph, "ceiling")
+    print_theoretical(graph, floor, ceiling)
+
+    if args.command == "analyze":
+        with open(args.events, encoding="utf-8") as f:
+            observed = parse_events(f, services)
+        report = analyze(graph, observed)
+        print()
+        print_analysis(report)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"theoretical": floor, "observed": observed, **report}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Apukone - Per-hop trace report
+
+Reads OTLP JSON trace files (what the `otel-collector` of the `tracing`
+profile writes to traces/, or what `receive` below writes) and breaks every
+request into hops: Traefik, OpenWebUI, LiteLLM and the upstream model. For
+each hop it reports:
+
+  start     offset from the start of the request
+  ttfb      time from the hop's start to the first response byte it saw
+  added     how much of the client-visible TTFB this hop added
+            (its ttfb minus the ttfb of the next hop)
+  tail      how long the hop kept running after the next hop finished
+            (buffering, e.g. a compress middleware holding back a stream)
+
+Hops that record no first-byte marker of their own (Traefik) inherit the
+first byte of the next hop; their ttfb is then a lower bound, shown as ">=".
+
+  receive   in-process OTLP/HTTP receiver writing JSON lines (JSON encoding;
+            protobuf too if opentelemetry-proto is installed)
+  analyze   per-hop breakdown of the slowest requests and percentiles per
+            hop; --baseline compares the percentiles with an earlier file
+
+Usage:
+  python3 scripts/trace_report.py analyze traces/traces.jsonl [--route /api/chat] [--slowest 5]
+  python3 scripts/trace_report.py analyze traces/new.jsonl --baseline traces/old.jsonl
+  python3 scripts/trace_report.py receive --port 4318 --output traces/traces.jsonl
+"""
+import argparse
+import base64
+import gzip
+import json
+import math
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+FIRST_BYTE_EVENTS = ("first_byte", "first_token")
+
+
+def _value(value):
+    """OTLP AnyValue -> Python value."""
+    for key in ("stringValue", "boolValue", "doubleValue"):
+        if key in value:
+            return value[key]
+    if "intValue" in value:
+        return int(value["intValue"])
+    if "arrayValue" in value:
+        return [_value(item) for item in value["arrayValue"].get("values", [])]
+    if "kvlistValue" in value:
+        return _attributes(value["kvlistValue"].get("values", []))
+    return None
+
+
+def _attributes(items):
+    return {item["key"]: _value(item.get("value", {})) for item in items or []}
+
+
+def _hex_id(value):
+    """OTLP/JSON ids are hex; protobuf-to-dict conversion yields base64."""
+    if not value:
+        return ""
+    if len(value) in (16, 32) and all(c in "0123456789abcdefABCDEF" for c in value):
+        return value.lower()
+    return base64.b64decode(value).hex()
+
+
+def parse_export(document):
+    """
+    Flat span dicts from one ExportTraceServiceRequest (OTLP JSON).
+    """
+    spans = []
+    for resource_spans in document.get("resourceSpans", []):
+        resource = _attributes(resource_spans.get("resource", {}).get("attributes"))
+        service = resource.get("service.name", "unknown")
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            for span in scope_spans.get("spans", []):
+                spans.append({
+                    "trace_id": _hex_id(span.get("traceId")),
+                    "span_id": _hex_id(span.get("spanId")),
+                    "parent_id": _hex_id(span.get("parentSpanId")),
+                    "name": span.get("name", ""),
+                    "kind": span.get("kind", 0) if isinstance(span.get("kind"), int) else
+                    {"SPAN_KIND_SERVER": 2, "SPAN_KIND_CLIENT": 3}.get(span.get("kind"), 1),
+                    "service": service,
+                    "start": int(span["startTimeUnixNano"]),
+                    "end": int(span["endTimeUnixNano"]),
+                    "attributes": _attributes(span.get("attributes")),
+                    "events": [
+                        {"name": event.get("name", ""), "time": int(event["timeUnixNano"]),
+                         "attributes": _attributes(event.get("attributes"))}
+                        for event in span.get("events", [])
+                    ],
+                })
+    return spans
+
+
+def load_spans(paths):
+    spans = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    spans += parse_export(json.loads(line))
+                except (ValueError, KeyError):
+                    continue  # torn line from a collector that is still writing
+    return spans
+
+
+def hop_name(span):
+    """
+    The hop a span belongs to: its service, or the remote peer for client
+    spans that name one (LiteLLM's call to the model provider).
+    """
+    if span["kind"] == SPAN_KIND_CLIENT and span["attributes"].get("peer.service"):
+        return span["attributes"]["peer.service"]
+    return span["service"]
+
+
+def first_byte(spans):
+    """
+    Earliest first-byte marker among `spans`: a first_byte/first_token
+    event, or the first response-body send of an ASGI server (OpenWebUI).
+    """
+    times = [event["time"] for span in spans for event in span["events"] if event["name"] in FIRST_BYTE_EVENTS]
+    times += [span["start"] for span in spans if span["attributes"].get("asgi.event.type") == "http.response.body"]
+    return min(times) if times else None
+
+
+def breakdown(trace_spans):
+    """
+    Hops of one trace in the order they start, with ttfb/added/tail in ms.
+    """
+    hops = {}
+    for span in trace_spans:
+        hops.setdefault(hop_name(span), []).append(span)
+    root_start = min(span["start"] for span in trace_spans)
+    root = min(trace_spans, key=lambda span: (span["start"], -span["end"]))
+    ordered = sorted(hops.items(), key=lambda item: (min(s["start"] for s in item[1]), -max(s["end"] for s in item[1])))
+
+    rows = []
+    for name, spans in ordered:
+        rows.append({
+            "hop": name,
+            "start": min(span["start"] for span in spans),
+            "end": max(span["end"] for span in spans),
+            "first_byte": first_byte(spans),
+            "estimated": False,
+        })
+    # hops without a marker see the first byte no earlier than the next hop
+    downstream = None
+    for row in reversed(rows):
+        if row["first_byte"] is None and downstream is not None:
+            row["first_byte"] = downstream
+            row["estimated"] = True
+        downstream = row["first_byte"] if row["first_byte"] is not None else downstream
+
+    result = []
+    for index, row in enumerate(rows):
+        following = rows[index + 1] if index + 1 < len(rows) else None
+        ttfb = (row["first_byte"] - row["start"]) / 1e6 if row["first_byte"] is not None else None
+        next_ttfb = (following["first_byte"] - following["start"]) / 1e6 if following and following["first_byte"] else None
+        result.append({
+            "hop": row["hop"],
+            "start_ms": round((row["start"] - root_start) / 1e6, 3),
+            "duration_ms": round((row["end"] - row["start"]) / 1e6, 3),
+            "ttfb_ms": round(ttfb, 3) if ttfb is not None else None,
+            "estimated": row["estimated"],
+            "added_ms": round(ttfb - next_ttfb, 3) if ttfb is not None and next_ttfb is not None else (
+                round(ttfb, 3) if ttfb is not None and following is None else None),
+            "tail_ms": round((row["end"] - following["end"]) / 1e6, 3) if following else None,
+        })
+    routes = [span["attributes"].get("http.route") or span["attributes"].get("url.path")
+              for span in sorted(trace_spans, key=lambda span: span["start"])]
+    return {
+        "trace_id": root["trace_id"],
+        "name": next((route for route in routes if route), root["name"]),
+        "duration_ms": round((max(span["end"] for span in trace_spans) - root_start) / 1e6, 3),
+        "hops": result,
+    }
+
+
+def group_traces(spans):
+    traces = {}
+    for span in spans:
+        traces.setdefault(span["trace_id"], []).append(span)
+    return traces
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    rank = (len(values) - 1) * q
+    low, high = math.floor(rank), math.ceil(rank)
+    return round(values[low] + (values[high] - values[low]) * (rank - low), 3)
+
+
+def analyze(spans, route=None, min_ms=0.0):
+    """
+    Per-trace breakdowns (slowest first) and per-hop percentiles.
+    """
+    requests = [breakdown(trace) for trace in group_traces(spans).values()]
+    requests = [r for r in requests if (not route or route in r["name"]) and r["duration_ms"] >= min_ms]
+    requests.sort(key=lambda r: r["duration_ms"], reverse=True)
+
+    per_hop = {}
+    for request in requests:
+        for hop in request["hops"]:
+            entry = per_hop.setdefault(hop["hop"], {"ttfb": [], "added": [], "tail": [], "duration": []})
+            for key in ("ttfb", "added", "tail", "duration"):
+                if hop[f"{key}_ms"] is not None:
+                    entry[key].append(hop[f"{key}_ms"])
+    hops = {
+        name: {
+            "count": len(values["duration"]),
+            **{f"{key}_{label}": percentile(values[key], q) for key in ("ttfb", "added", "tail", "duration")
+               for label, q in (("p50", 0.5), ("p95", 0.95))},
+        }
+        for name, values in per_hop.items()
+    }
+    return {"requests": requests, "hops": hops}
+
+
+def compare(current, baseline, keys=("ttfb_p50", "ttfb_p95", "added_p95", "tail_p95")):
+    """Per hop and percentile: baseline, current and the change in ms."""
+    rows = []
+    for hop in sorted(set(current) | set(baseline)):
+        for key in keys:
+            before, after = baseline.get(hop, {}).get(key), current.get(hop, {}).get(key)
+            if before is None and after is None:
+                continue
+            delta = round(after - before, 3) if before is not None and after is not None else None
+            rows.append({"hop": hop, "metric": key, "baseline": before, "current": after, "delta_ms": delta})
+    return rows
+
+
+def _ms(value, estimated=False):
+    if value is None:
+        return "-"
+    return (">=" if estimated else "") + f"{value:.1f}"
+
+
+def print_report(report, slowest=5):
+    for request in report["requests"][:slowest]:
+        print(f"\n{request['name']}  {request['duration_ms']:.1f} ms  trace {request['trace_id']}")
+        print(f"  {'hop':<22}{'start':>10}{'duration':>11}{'ttfb':>11}{'added':>10}{'tail':>10}")
+        for hop in request["hops"]:
+            print(f"  {hop['hop'][:21]:<22}{_ms(hop['start_ms']):>10}{_ms(hop['duration_ms']):>11}"
+                  f"{_ms(hop['ttfb_ms'], hop['estimated']):>11}{_ms(hop['added_ms']):>10}{_ms(hop['tail_ms']):>10}")
+    print(f"\n{len(report['requests'])} requests; per hop (ms):")
+    print(f"  {'hop':<22}{'n':>6}{'ttfb p50':>10}{'ttfb p95':>10}{'added p95':>11}{'tail p95':>10}{'dur p95':>10}")
+    for name, hop in sorted(report["hops"].items(), key=lambda item: -(item[1]["added_p95"] or 0)):
+        print(f"  {name[:21]:<22}{hop['count']:>6}{_ms(hop['ttfb_p50']):>10}{_ms(hop['ttfb_p95']):>10}"
+              f"{_ms(hop['added_p95']):>11}{_ms(hop['tail_p95']):>10}{_ms(hop['duration_p95']):>10}")
+
+
+def print_comparison(rows):
+    print(f"\n  {'hop':<22}{'metric':<12}{'baseline':>10}{'current':>10}{'delta':>10}")
+    for row in rows:
+        delta = "-" if row["delta_ms"] is None else f"{row['delta_ms']:+.1f}"
+        print(f"  {row['hop'][:21]:<22}{row['metric']:<12}{_ms(row['baseline']):>10}{_ms(row['current']):>10}{delta:>10}")
+
+
+def decode_request(body, content_type, content_encoding):
+    """
+    OTLP/HTTP request body -> ExportTraceServiceRequest as OTLP JSON dict.
+    """
+    if content_encoding == "gzip":
+        body = gzip.decompress(body)
+    if content_type.startswith("application/json"):
+        return json.loads(body)
+    from google.protobuf.json_format import MessageToDict  # optional: pip install opentelemetry-proto
+    from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import ExportTraceServiceRequest
+
+    message = ExportTraceServiceRequest()
+    message.ParseFromString(body)
+    return MessageToDict(message)
+
+
+class Receiver(ThreadingHTTPServer):
+    """
+    OTLP/HTTP trace receiver on /v1/traces; every export becomes one JSON
+    line in `output` (the collector file exporter's format).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, output):
+        super().__init__(address, ReceiverHandler)
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        self.output = open(output, "a", encoding="utf-8")
+        self.lock = threading.Lock()
+        self.exports = 0
+
+    def write(self, document):
+        line = json.dumps(document, separators=(",", ":"))
+        with self.lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+            self.exports += 1
+
+    def server_close(self):
+        super().server_close()
+        self.output.close()
+
+
+class ReceiverHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.path.split("?")[0] != "/v1/traces":
+            self._reply(404, {"error": "only /v1/traces is supported"})
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            document = decode_request(body, self.headers.get("Content-Type", ""), self.headers.get("Content-Encoding"))
+        except ImportError:
+            self._reply(415, {"error": "protobuf needs opentelemetry-proto; send application/json"})
+            return
+        except Exception as e:
+            self._reply(400, {"error": str(e)})
+            return
+        self.server.write(document)
+        self._reply(200, {})
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-hop latency and TTFB from OTLP traces.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    analyze_parser = sub.add_parser("analyze", help="per-hop breakdown of recorded traces")
+    analyze_parser.add_argument("files", nargs="+", help="OTLP JSON-lines files")
+    analyze_parser.add_argument("--route", help="only requests whose route/root span name contains this")
+    analyze_parser.add_argument("--min-ms", type=float, default=0.0, help="only requests at least this slow")
+    analyze_parser.add_argument("--slowest", type=int, default=5, help="requests to show hop by hop")
+    analyze_parser.add_argument("--baseline", nargs="+", help="earlier trace files to compare the percentiles with")
+    analyze_parser.add_argument("--json", help="write the full report to this file")
+    receive_parser = sub.add_parser("receive", help="run an OTLP/HTTP receiver")
+    receive_parser.add_argument("--host", default="127.0.0.1")
+    receive_parser.add_argument("--port", type=int, default=4318)
+    receive_parser.add_argument("--output", default="traces/traces.jsonl")
+    args = parser.parse_args()
+
+    if args.command == "receive":
+        server = Receiver((args.host, args.port), args.output)
+        print(f"OTLP/HTTP receiver on http://{args.host}:{args.port}/v1/traces -> {args.output}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return 0
+
+    report = analyze(load_spans(args.files), args.route, args.min_ms)
+    print_report(report, args.slowest)
+    if args.baseline:
+        baseline = analyze(load_spans(args.baseline), args.route, args.min_ms)
+        report["comparison"] = compare(report["hops"], baseline["hops"])
+        print_comparison(report["comparison"])
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""
+Embedding micro-batcher for OpenWebUI RAG ingestion.
+
+OpenWebUI embeds uploaded documents one chunk per request, so a large upload
+turns into thousands of single-input /v1/embeddings calls. This stage
+coalesces concurrent requests for the same model (and API key and
+parameters) into one upstream call:
+
+- a batch is sent when it reaches EMBED_BATCH_MAX_SIZE inputs or
+  EMBED_BATCH_MAX_WAIT_MS after its first input arrived
+- identical inputs waiting in a batch or already in flight share one slot
+- each caller gets back its own inputs, in order, with its share of usage
+- a batch the upstream rejects as invalid (400/413/422) is split in halves
+  and retried, so only the callers of the offending inputs get the error
+- at most EMBED_BATCH_CONCURRENCY batches are in flight per process
+
+Runs as a sidecar (`python embed_batcher.py`, in front of LiteLLM; point
+RAG_OPENAI_API_BASE_URL at it) or inside LiteLLM as the custom provider
+`batched` (`custom_provider_map` in config.yaml, models registered as
+`batched/<upstream model>` with the real api_base).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+
+import aiohttp
+from aiohttp import web
+
+try:
+    from litellm import CustomLLM
+except ImportError:  # sidecar and offline tests run without LiteLLM
+    CustomLLM = object
+
+log = logging.getLogger("embed-batcher")
+
+# upstream statuses that blame the inputs rather than the key or the upstream
+INPUT_ERRORS = (400, 413, 422)
+
+
+class UpstreamError(Exception):
+    def __init__(self, status, body):
+        super().__init__(f"upstream HTTP {status}")
+        self.status = status
+        self.body = body
+
+
+class MicroBatcher:
+    """
+    Coalesces single inputs into batches per key. `send(key, inputs)` makes
+    the upstream call and returns one (embedding, prompt_tokens) per input.
+    """
+
+    def __init__(self, send, max_batch_size=64, max_wait_ms=10.0, max_concurrent_batches=8):
+        self.send = send
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.slots = asyncio.Semaphore(max_concurrent_batches)
+        self.pending = {}
+        self.in_flight = {}
+        self.tasks = set()
+        self.stats = {"requests": 0, "inputs": 0, "deduplicated": 0, "batches": 0, "batched_inputs": 0,
+                      "batch_errors": 0, "batch_splits": 0, "flush_full": 0, "flush_timer": 0}
+
+    async def embed(self, key, inputs):
+        """(embedding, prompt_tokens) for each of `inputs`, in order."""
+        self.stats["requests"] += 1
+        self.stats["inputs"] += len(inputs)
+        # shielded: a caller that disconnects must not cancel a result other callers share
+        return await asyncio.gather(*(asyncio.shield(self._submit(key, item)) for item in inputs))
+
+    def _submit(self, key, item):
+        slot = (key, json.dumps(item))
+        future = self.in_flight.get(slot)
+        if future is not None:
+            self.stats["deduplicated"] += 1
+            return future
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[slot] = future
+        batch = self.pending.get(key)
+        if batch is None:
+            batch = self.pending[key] = {"items": [], "slots": [], "timer": None}
+            batch["timer"] = asyncio.get_running_loop().call_later(self.max_wait, self._flush, key, "flush_timer")
+        batch["items"].append(item)
+        batch["slots"].append(slot)
+        if len(batch["items"]) >= self.max_batch_size:
+            self._flush(key, "flush_full")
+        return future
+
+    def _flush(self, key, reason):
+        batch = self.pending.pop(key, None)
+        if batch is None:
+            return
+        batch["timer"].cancel()
+        self.stats[reason] += 1
+        task = asyncio.get_running_loop().create_task(self._send(key, batch))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _send(self, key, batch):
+        futures = [self.in_flight[slot] for slot in batch["slots"]]
+        try:
+            outcomes = await self._resolve(key, batch["items"])
+            for future, outcome in zip(futures, outcomes):
+                if future.done():
+                    continue
+                if isinstance(outcome, Exception):
+                    future.set_exception(outcome)
+                else:
+                    future.set_result(outcome)
+        finally:
+            for slot in batch["slots"]:
+                self.in_flight.pop(slot, None)
+
+    async def _resolve(self, key, items):
+        """
+        A result or an exception per item. Inputs the upstream rejects are
+        found by bisecting, so they do not fail the rest of their batch.
+        """
+        try:
+            async with self.slots:
+                results = await self.send(key, items)
+        except UpstreamError as e:
+            if len(items) == 1 or e.status not in INPUT_ERRORS:
+                self.stats["batch_errors"] += 1
+                return [e] * len(items)
+            self.stats["batch_splits"] += 1
+            middle = len(items) // 2
+            left, right = await asyncio.gather(self._resolve(key, items[:middle]), self._resolve(key, items[middle:]))
+            return left + right
+        except Exception as e:
+            self.stats["batch_errors"] += 1
+            return [e] * len(items)
+        self.stats["batches"] += 1
+        self.stats["batched_inputs"] += len(items)
+        return results
+
+
+def split_usage(inputs, prompt_tokens):
+    """
+    Upstream usage of a batch shared out per input by length (token arrays
+    count exactly).
+    """
+    sizes = [len(item) if isinstance(item, list) else max(1, len(str(item))) for item in inputs]
+    total = sum(sizes) or 1
+    return [round(prompt_tokens * size / total) for size in sizes]
+
+
+class OpenAIEmbeddings:
+    """`send` for MicroBatcher against an OpenAI-compatible /embeddings endpoint."""
+
+    def __init__(self, session, base_url):
+        self.session = session
+        self.url = f"{base_url.rstrip('/')}/embeddings"
+
+    async def __call__(self, key, inputs):
+        authorization, model, params = key
+        headers = {"Authorization": authorization} if authorization else {}
+        payload = {"model": model, "input": inputs, **json.loads(params)}
+        async with self.session.post(self.url, json=payload, headers=headers) as resp:
+            body = await resp.read()
+            if resp.status != 200:
+                raise UpstreamError(resp.status, body)
+            data = json.loads(body)
+        vectors = [item["embedding"] for item in sorted(data["data"], key=lambda item: item["index"])]
+        if len(vectors) != len(inputs):
+            raise UpstreamError(502, json.dumps({"error": {"message": "upstream returned the wrong number of embeddings"}}).encode())
+        tokens = split_usage(inputs, (data.get("usage") or {}).get("prompt_tokens", 0))
+        return list(zip(vectors, tokens))
+
+
+def normalize_input(value):
+    """OpenAI `input` (string, list of strings, token array or list of token arrays) -> list of items."""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list) and value and isinstance(value[0], int):
+        return [value]
+    if isinstance(value, list):
+        return value
+    raise ValueError("input must be a string, a list of strings or token arrays")
+
+
+def batch_key(authorization, body):
+    params = {key: value for key, value in body.items() if key not in ("model", "input")}
+    return authorization or "", body["model"], json.dumps(params, sort_keys=True)
+
+
+def embedding_response(model, results):
+    prompt_tokens = sum(tokens for _, tokens in results)
+    return {
+        "object": "list",
+        "model": model,
+        "data": [{"object": "embedding", "index": index, "embedding": vector}
+                 for index, (vector, _) in enumerate(results)],
+        "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+    }
+
+
+class Sidecar:
+    def __init__(self, upstream, max_batch_size=64, max_wait_ms=10.0, max_concurrent_batches=8, timeout=120.0):
+        self.upstream = upstream
+        self.options = (max_batch_size, max_wait_ms, max_concurrent_batches)
+        self.timeout = timeout
+        self.session = None
+        self.batcher = None
+        self.started = time.time()
+
+    def app(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/v1/embeddings", self.embeddings)
+        app.router.add_post("/embeddings", self.embeddings)
+        app.router.add_get("/health", self.health)
+        app.cleanup_ctx.append(self._lifecycle)
+        return app
+
+    async def _lifecycle(self, app):
+        connector = aiohttp.TCPConnector(limit=self.options[2] * 2, keepalive_timeout=60)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        self.batcher = MicroBatcher(OpenAIEmbeddings(self.session, self.upstream), *self.options)
+        yield
+        await self.session.close()
+
+    async def embeddings(self, request):
+        try:
+            body = await request.json()
+            inputs = normalize_input(body.get("input"))
+            key = batch_key(request.headers.get("Authorization"), body)
+        except (ValueError, KeyError) as e:
+            return web.json_response({"error": {"message": str(e), "type": "invalid_request_error"}}, status=400)
+        try:
+            results = await self.batcher.embed(key, inputs)
+        except UpstreamError as e:
+            return web.Response(body=e.body, status=e.status, content_type="application/json")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return web.json_response({"error": {"message": f"upstream unavailable: {e}"}}, status=502)
+        return web.json_response(embedding_response(body["model"], results))
+
+    async def health(self, request):
+        stats = dict(self.batcher.stats) if self.batcher else {}
+        if stats.get("batches"):
+            stats["mean_batch_size"] = round(stats["batched_inputs"] / stats["batches"], 2)
+        return web.json_response({"status": "ok", "uptime_s": round(time.time() - self.started), "stats": stats})
+
+
+class BatchedEmbeddingProvider(CustomLLM):
+    """
+    LiteLLM custom provider `batched`: `batched/<model>` embeddings are
+    coalesced and sent to the model's api_base as `<model>`.
+    """
+
+    def __init__(self, env=os.environ):
+        super().__init__()
+        self.options = (int(env.get("EMBED_BATCH_MAX_SIZE", "64")), float(env.get("EMBED_BATCH_MAX_WAIT_MS", "10")),
+                        int(env.get("EMBED_BATCH_CONCURRENCY", "8")))
+        self.batchers = {}
+        self.session = None
+
+    def _batcher(self, api_base):
+        # created lazily: the session and futures belong to the proxy's loop
+        if self.session is None:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=120))
+        if api_base not in self.batchers:
+            self.batchers[api_base] = MicroBatcher(OpenAIEmbeddings(self.session, api_base), *self.options)
+        return self.batchers[api_base]
+
+    async def aembedding(self, model, input, model_response, print_verbose=None, logging_obj=None,
+                         optional_params=None, api_key=None, api_base=None, **kwargs):
+        from litellm.types.utils import Usage
+
+        upstream_model = model.split("/", 1)[1] if model.startswith("batched/") else model
+        params = {key: value for key, value in (optional_params or {}).items() if key in ("dimensions", "encoding_format", "user")}
+        key = (f"Bearer {api_key}" if api_key else "", upstream_model, json.dumps(params, sort_keys=True))
+        results = await self._batcher(api_base or "https://api.openai.com/v1").embed(key, normalize_input(input))
+        response = embedding_response(upstream_model, results)
+        model_response.model = upstream_model
+        model_response.data = response["data"]
+        model_response.usage = Usage(prompt_tokens=response["usage"]["prompt_tokens"], completion_tokens=0,
+                                     total_tokens=response["usage"]["total_tokens"])
+        return model_response
+
+
+if CustomLLM is not object:
+    batched_provider = BatchedEmbeddingProvider()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coalescing /v1/embeddings proxy.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8080")))
+    parser.add_argument("--upstream", default=os.getenv("EMBED_UPSTREAM_URL", "http://litellm:4000/v1"))
+    parser.add_argument("--max-batch-size", type=int, default=int(os.getenv("EMBED_BATCH_MAX_SIZE", "64")))
+    parser.add_argument("--max-wait-ms", type=float, default=float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "10")))
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("EMBED_BATCH_CONCURRENCY", "8")),
+                        help="batches in flight at once")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    sidecar = Sidecar(args.upstream, args.max_batch_size, args.max_wait_ms, args.concurrency)
+    web.run_app(sidecar.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Health aggregator for the Apukone stack.
+
+One asyncio process probes every service over pooled keep-alive connections
+using each service's cheapest endpoint, instead of every container
+spawning an interpreter or fetching a full page for its own healthcheck:
+
+- probes run every HEALTH_INTERVAL seconds, every HEALTH_FAST_INTERVAL while
+  a service is starting or its last probe failed, staggered so they do not
+  fire together
+- a service is ready after one successful probe and failing after
+  HEALTH_FAILURE_THRESHOLD consecutive failures; that hysteresis only
+  applies to /status and /metrics
+- GET /ready/<service> answers from the last probe alone (200/503): one
+  failed probe, e.g. of a restarted container that is not listening yet,
+  is enough for a 503. Compose healthchecks only need wget/curl against a
+  cached state
+- GET /status is the aggregate (rebuilt at most once a second), with the
+  probe latency percentiles of the last 5 minutes and hour and the time each
+  service took to become ready; /history/<service> has the raw samples and
+  /metrics the same in Prometheus text format
+
+Targets are `name=url` pairs separated by `;` in HEALTH_TARGETS (http:// or
+tcp://host:port); the default covers the services on the apukone network.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import aiohttp
+from aiohttp import web
+
+log = logging.getLogger("health")
+
+DEFAULT_TARGETS = (
+    "litellm=http://litellm:4000/health/liveliness;"
+    "openwebui=http://openwebui:8080/health;"
+    "authentik=http://apukone-authentik-server:9000/-/health/live/;"
+    "windmill=http://windmill_server:8000/api/version;"
+    "embed-batcher=http://embed-batcher:8080/health;"
+    "config-server=http://config-server/health"
+)
+
+
+def parse_targets(text):
+    """'name=url;name=url' -> {name: url}."""
+    targets = {}
+    for item in text.split(";"):
+        if "=" in item:
+            name, url = item.split("=", 1)
+            targets[name.strip()] = url.strip()
+    return targets
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Target:
+    def __init__(self, name, url, history, clock):
+        self.name = name
+        self.url = url
+        self.state = "starting"
+        self.since = clock()
+        self.first_probe = None
+        self.ready_after = None
+        self.failures = 0
+        self.last = None
+        self.counts = {"ok": 0, "error": 0}
+        # (at, latency seconds, ok)
+        self.history = deque(maxlen=history)
+
+
+class HealthAggregator:
+    def __init__(self, targets, interval=15.0, fast_interval=2.0, timeout=3.0, failure_threshold=3,
+                 history=720, clock=time.time):
+        self.targets = {name: Target(name, url, history, clock) for name, url in targets.items()}
+        self.interval = interval
+        self.fast_interval = fast_interval
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.clock = clock
+        self.session = None
+        self.tasks = []
+        self.status_cache = (0.0, None)
+
+    async def probe(self, target):
+        """(ok, detail) of one probe; detail is the HTTP status or the error."""
+        parts = urlsplit(target.url)
+        if parts.scheme == "tcp":
+            _, writer = await asyncio.wait_for(asyncio.open_connection(parts.hostname, parts.port), self.timeout)
+            writer.close()
+            return True, "connected"
+        async with self.session.get(target.url, allow_redirects=False) as resp:
+            await resp.read()  # drained so the connection goes back to the pool
+            return resp.status < 400, resp.status
+
+    def record(self, target, ok, latency, detail):
+        now = self.clock()
+        if target.first_probe is None:
+            target.first_probe = now
+        target.history.append((now, latency, ok))
+        target.last = {"at": now, "ok": ok, "latency_ms": round(latency * 1000, 2), "detail": detail}
+        target.counts["ok" if ok else "error"] += 1
+        if ok:
+            target.failures = 0
+            if target.state != "ready":
+                if target.ready_after is None:
+                    target.ready_after = now - target.first_probe
+                log.info("%s ready (%s)", target.name, detail)
+                target.state, target.since = "ready", now
+            return
+        target.failures += 1
+        if target.state == "ready" and target.failures >= self.failure_threshold:
+            log.warning("%s failing after %d probes: %s", target.name, target.failures, detail)
+            target.state, target.since = "failing", now
+
+    async def check(self, target):
+        started = time.perf_counter()
+        try:
+            ok, detail = await self.probe(target)
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            ok, detail = False, str(e) or type(e).__name__
+        self.record(target, ok, time.perf_counter() - started, detail)
+
+    async def run_target(self, target, offset):
+        await asyncio.sleep(offset)
+        while True:
+            await self.check(target)
+            healthy = target.state == "ready" and not target.failures
+            await asyncio.sleep(self.interval if healthy else self.fast_interval)
+
+    def is_ready(self, target):
+        """Ready and probed recently enough that the answer still means something."""
+        return (target.state == "ready" and target.last is not None
+                and self.clock() - target.last["at"] <= self.interval * 3)
+
+    def last_probe_ok(self, target):
+        """What /ready answers: the last probe succeeded and is recent, without the failure threshold."""
+        return (target.last is not None and target.last["ok"]
+                and self.clock() - target.last["at"] <= self.interval * 3)
+
+    def summary(self, target):
+        now = self.clock()
+        recent = [latency * 1000 for at, latency, ok in target.history if ok and now - at <= 300]
+        hour = [latency * 1000 for at, latency, ok in target.history if ok and now - at <= 3600]
+
+        def ms(value):
+            return None if value is None else round(value, 2)
+
+        return {
+            "ready": self.is_ready(target),
+            "state": target.state,
+            "since": target.since,
+            "consecutive_failures": target.failures,
+            "ready_after_s": None if target.ready_after is None else round(target.ready_after, 1),
+            "last": target.last,
+            "latency_ms": {
+                "p50_5m": ms(percentile(recent, 50)),
+                "p95_5m": ms(percentile(recent, 95)),
+                "p50_1h": ms(percentile(hour, 50)),
+                "p95_1h": ms(percentile(hour, 95)),
+            },
+            "probes": dict(target.counts),
+        }
+
+    def status(self):
+        """Aggregate status document, rebuilt at most once a second."""
+        built, body = self.status_cache
+        now = self.clock()
+        if body is None or now - built >= 1.0:
+            services = {name: self.summary(target) for name, target in self.targets.items()}
+            body = json.dumps({
+                "status": "ok" if all(item["ready"] for item in services.values()) else "degraded",
+                "generated_at": now,
+                "services": services,
+            }).encode()
+            self.status_cache = (now, body)
+        return body
+
+    def metrics(self):
+        lines = [
+            "# TYPE health_service_ready gauge",
+            "# TYPE health_probe_latency_seconds gauge",
+            "# TYPE health_probes_total counter",
+        ]
+        for name, target in self.targets.items():
+            summary = self.summary(target)
+            lines.append(f'health_service_ready{{service="{name}"}} {int(summary["ready"])}')
+            for key, quantile in (("p50_5m", "0.5"), ("p95_5m", "0.95")):
+                if summary["latency_ms"][key] is not None:
+                    lines.append(f'health_probe_latency_seconds{{service="{name}",quantile="{quantile}"}} '
+                                 f'{summary["latency_ms"][key] / 1000:.6f}')
+            for result, count in target.counts.items():
+                lines.append(f'health_probes_total{{service="{name}",result="{result}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/status", self.handle_status)
+        app.router.add_get("/ready/{name}", self.handle_ready)
+        app.router.add_get("/history/{name}", self.handle_history)
+        app.router.add_get("/metrics", self.handle_metrics)
+        app.router.add_get("/health", self.handle_health)
+        app.cleanup_ctx.append(self._lifecycle)
+        return app
+
+    async def _lifecycle(self, app):
+        # few connections per service, kept open across probe intervals
+        connector = aiohttp.TCPConnector(limit_per_host=2, keepalive_timeout=self.interval * 4)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        spread = self.fast_interval / max(1, len(self.targets))
+        self.tasks = [asyncio.create_task(self.run_target(target, index * spread))
+                      for index, target in enumerate(self.targets.values())]
+        yield
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        await self.session.close()
+
+    async def handle_status(self, request):
+        return web.Response(body=self.status(), content_type="application/json")
+
+    async def handle_ready(self, request):
+        target = self.targets.get(request.match_info["name"])
+        if target is None:
+            return web.Response(status=404, text="unknown service\n")
+        if self.last_probe_ok(target):
+            return web.Response(text="ok\n")
+        return web.Response(status=503, text=f"{target.state}\n")
+
+    async def handle_history(self, request):
+        target = self.targets.get(request.match_info["name"])
+        if target is None:
+            return web.json_response({"error": "unknown service"}, status=404)
+        since = float(request.query.get("since", 0))
+        samples = [{"at": at, "latency_ms": round(latency * 1000, 2), "ok": ok}
+                   for at, latency, ok in target.history if at >= since]
+        return web.json_response({"service": target.name, "url": target.url, "samples": samples})
+
+    async def handle_metrics(self, request):
+        return web.Response(text=self.metrics(), content_type="text/plain")
+
+    async def handle_health(self, request):
+        return web.Response(text="ok\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregated health and readiness of the stack's services.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8080")))
+    parser.add_argument("--targets", default=os.getenv("HEALTH_TARGETS") or DEFAULT_TARGETS)
+    parser.add_argument("--interval", type=float, default=float(os.getenv("HEALTH_INTERVAL", "15")))
+    parser.add_argument("--fast-interval", type=float, default=float(os.getenv("HEALTH_FAST_INTERVAL", "2")))
+    parser.add_argument("--timeout", type=float, default=float(os.getenv("HEALTH_TIMEOUT", "3")))
+    parser.add_argument("--failure-threshold", type=int, default=int(os.getenv("HEALTH_FAILURE_THRESHOLD", "3")))
+    parser.add_argument("--history", type=int, default=int(os.getenv("HEALTH_HISTORY", "720")),
+                        help="probe samples kept per service")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    aggregator = HealthAggregator(parse_targets(args.targets), args.interval, args.fast_interval, args.timeout,
+                                  args.failure_threshold, args.history)
+    web.run_app(aggregator.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+"""
+Authentik -> LiteLLM user and team sync for the Apukone stack.
+
+Replaces the `litellm-init` curl container, which recreated a single admin
+user on every start while everyone else only appeared in LiteLLM at their
+first SSO login. Each run:
+
+- pages through Authentik users and groups (pages fetched concurrently)
+- maps groups to LiteLLM teams (budget/models from the group attributes
+  `litellm_max_budget`, `litellm_budget_duration`, `litellm_models`) and
+  members of the admin group (`Admins`) to `proxy_admin`
+- compares a digest of that desired state with the one stored after the
+  last successful run; if nothing changed in Authentik, LiteLLM is not
+  touched at all (every `--full-every` runs it is re-read anyway to repair
+  drift)
+- otherwise reads LiteLLM's users and teams, plans the difference and
+  applies only that, with bounded concurrency and batched member/delete
+  calls
+
+Only users and teams carrying `metadata.managed_by = authentik-sync` are
+ever deleted, so keys and users created by hand are left alone.
+
+API keys are deliberately not provisioned (users are created with
+`auto_create_key: False`): OpenWebUI and Windmill reach LiteLLM with the
+master key, and people who want a personal key create it after SSO
+login in the LiteLLM UI, where it is shown once. A key generated here
+would sit unused in LiteLLM's database with nobody to hand it to.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+
+import aiohttp
+
+log = logging.getLogger("identity-sync")
+
+MANAGED_BY = "authentik-sync"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def team_id(group_name):
+    return "ak-" + re.sub(r"[^a-z0-9]+", "-", group_name.lower()).strip("-")
+
+
+def digest(desired):
+    return hashlib.sha256(json.dumps(desired, sort_keys=True).encode()).hexdigest()
+
+
+def chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class ApiClient:
+    """
+    Small JSON client with retries on 429/5xx and connection errors; counts
+    calls per endpoint for the run metrics.
+    """
+
+    def __init__(self, session, base_url, token, retries=4, backoff=0.5):
+        self.session = session
+        self.base_url = base_url.rstrip("/")
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.retries = retries
+        self.backoff = backoff
+        self.calls = {}
+
+    async def request(self, method, path, params=None, payload=None):
+        self.calls[path] = self.calls.get(path, 0) + 1
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.session.request(method, self.base_url + path, params=params, json=payload,
+                                                headers=self.headers) as resp:
+                    if resp.status < 300:
+                        return await resp.json(content_type=None)
+                    text = await resp.text()
+                    if resp.status not in RETRY_STATUSES or attempt == self.retries:
+                        raise RuntimeError(f"{method} {path}: HTTP {resp.status} {text[:200]}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.retries:
+                    raise RuntimeError(f"{method} {path}: {type(e).__name__} {e}")
+            await asyncio.sleep(self.backoff * 2**attempt)
+
+
+class AuthentikSource:
+    def __init__(self, client, page_size=100, concurrency=4):
+        self.client = client
+        self.page_size = page_size
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    async def _page(self, path, params, page):
+        async with self.semaphore:
+            return await self.client.request("GET", path, params={**params, "page": page, "page_size": self.page_size})
+
+    async def _all(self, path, params):
+        """
+        First page for the page count, the rest concurrently.
+        """
+        first = await self._page(path, params, 1)
+        total_pages = first.get("pagination", {}).get("total_pages", 1)
+        rest = await asyncio.gather(*(self._page(path, params, page) for page in range(2, total_pages + 1)))
+        return [item for body in [first, *rest] for item in body["results"]]
+
+    async def users(self):
+        return await self._all("/api/v3/core/users/", {"include_groups": "false", "ordering": "pk"})
+
+    async def groups(self):
+        return await self._all("/api/v3/core/groups/", {"include_users": "false", "ordering": "name"})
+
+
+def desired_state(users, groups, admin_group="Admins", team_groups=None, default_role="internal_user"):
+    """
+    LiteLLM users and teams implied by Authentik. `team_groups` limits which
+    groups become teams (default: all). Inactive users, users without an
+    email and service accounts are left out.
+    """
+    groups_by_pk = {group["pk"]: group for group in groups}
+    teams = {}
+    for group in groups:
+        if team_groups is not None and group["name"] not in team_groups:
+            continue
+        attributes = group.get("attributes") or {}
+        teams[team_id(group["name"])] = {
+            "team_alias": group["name"],
+            "max_budget": attributes.get("litellm_max_budget"),
+            "budget_duration": attributes.get("litellm_budget_duration"),
+            "models": sorted(attributes.get("litellm_models") or []),
+            "members": [],
+        }
+
+    desired_users = {}
+    for user in users:
+        email = (user.get("email") or "").strip()
+        if not email or not user.get("is_active", True) or "service_account" in (user.get("type") or ""):
+            continue
+        names = [groups_by_pk[pk]["name"] for pk in user.get("groups", []) if pk in groups_by_pk]
+        desired_users[email] = {
+            "user_email": email,
+            "user_role": "proxy_admin" if admin_group in names else default_role,
+        }
+        for name in names:
+            if team_id(name) in teams:
+                teams[team_id(name)]["members"].append(email)
+    for team in teams.values():
+        team["members"].sort()
+    return {"users": desired_users, "teams": teams}
+
+
+def current_state(users, teams):
+    """LiteLLM /user/list and /team/list responses in the desired_state shape."""
+    current_users = {
+        user["user_id"]: {
+            "user_email": user.get("user_email"),
+            "user_role": user.get("user_role"),
+            "managed": (user.get("metadata") or {}).get("managed_by") == MANAGED_BY,
+        }
+        for user in users
+    }
+    current_teams = {
+        team["team_id"]: {
+            "team_alias": team.get("team_alias"),
+            "max_budget": team.get("max_budget"),
+            "budget_duration": team.get("budget_duration"),
+            "models": sorted(team.get("models") or []),
+            "members": sorted(member["user_id"] for member in team.get("members_with_roles") or [] if member.get("user_id")),
+            "managed": (team.get("metadata") or {}).get("managed_by") == MANAGED_BY,
+        }
+        for team in teams
+    }
+    return {"users": current_users, "teams": current_teams}
+
+
+def plan(desired, current, prune_user_ids=()):
+    """
+    Changes that turn `current` into `desired`. Unmanaged users are adopted
+    (updated and marked managed) rather than recreated; only managed users
+    and teams, plus `prune_user_ids`, are deleted.
+    """
+    fields = ("team_alias", "max_budget", "budget_duration", "models")
+    ops = {"teams_create": [], "teams_update": [], "teams_delete": [], "users_create": [], "users_update": [],
+           "users_delete": [], "members_add": {}, "members_remove": []}
+
+    for tid, team in desired["teams"].items():
+        existing = current["teams"].get(tid)
+        if existing is None:
+            ops["teams_create"].append(tid)
+        elif not existing["managed"] or any(existing[field] != team[field] for field in fields):
+            ops["teams_update"].append(tid)
+        before = set(existing["members"]) if existing else set()
+        added = sorted(set(team["members"]) - before)
+        if added:
+            ops["members_add"][tid] = added
+        ops["members_remove"] += [(tid, user_id) for user_id in sorted(before - set(team["members"]))]
+    ops["teams_delete"] = sorted(tid for tid, team in current["teams"].items()
+                                 if team["managed"] and tid not in desired["teams"])
+
+    for user_id, user in desired["users"].items():
+        existing = current["users"].get(user_id)
+        if existing is None:
+            ops["users_create"].append(user_id)
+        elif (not existing["managed"] or existing["user_email"] != user["user_email"]
+              or existing["user_role"] != user["user_role"]):
+            ops["users_update"].append(user_id)
+    ops["users_delete"] = sorted(
+        user_id for user_id, user in current["users"].items()
+        if user_id not in desired["users"] and (user["managed"] or user_id in prune_user_ids)
+    )
+    # members of deleted teams and deleted users go with them
+    deleted = set(ops["teams_delete"]) | set(ops["users_delete"])
+    ops["members_remove"] = [(tid, uid) for tid, uid in ops["members_remove"] if tid not in deleted and uid not in deleted]
+    return ops
+
+
+def count_ops(ops):
+    return {
+        name: sum(len(members) for members in value.values()) if isinstance(value, dict) else len(value)
+        for name, value in ops.items()
+    }
+
+
+class LiteLLMTarget:
+    def __init__(self, client, page_size=100, concurrency=8, batch_size=50):
+        self.client = client
+        self.page_size = page_size
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.batch_size = batch_size
+        self.errors = []
+
+    async def users(self):
+        """All users; /user/list is paged on current LiteLLM, a plain list on older ones."""
+        first = await self.client.request("GET", "/user/list", params={"page": 1, "page_size": self.page_size})
+        if isinstance(first, list):
+            return first
+        rest = await asyncio.gather(*(
+            self.client.request("GET", "/user/list", params={"page": page, "page_size": self.page_size})
+            for page in range(2, (first.get("total_pages") or 1) + 1)
+        ))
+        return [user for body in [first, *rest] for user in body["users"]]
+
+    async def teams(self):
+        return await self.client.request("GET", "/team/list")
+
+    async def _post(self, path, payload):
+        async with self.semaphore:
+            try:
+                await self.client.request("POST", path, payload=payload)
+            except RuntimeError as e:
+                self.errors.append(str(e))
+                log.warning("%s", e)
+
+    async def apply(self, ops, desired):
+        """
+        Teams first (members need them), then users, then memberships, then
+        deletions. Calls within a phase run concurrently.
+        """
+        def team_payload(tid):
+            team = desired["teams"][tid]
+            payload = {"team_id": tid, "team_alias": team["team_alias"], "models": team["models"],
+                       "metadata": {"managed_by": MANAGED_BY, "authentik_group": team["team_alias"]}}
+            for field in ("max_budget", "budget_duration"):
+                if team[field] is not None:
+                    payload[field] = team[field]
+            return payload
+
+        def user_payload(user_id):
+            user = desired["users"][user_id]
+            return {"user_id": user_id, "user_email": user["user_email"], "user_role": user["user_role"],
+                    "metadata": {"managed_by": MANAGED_BY}}
+
+        await asyncio.gather(
+            *(self._post("/team/new", team_payload(tid)) for tid in ops["teams_create"]),
+            *(self._post("/team/update", team_payload(tid)) for tid in ops["teams_update"]),
+        )
+        await asyncio.gather(
+            *(self._post("/user/new", {**user_payload(uid), "auto_create_key": False}) for uid in ops["users_create"]),
+            *(self._post("/user/update", user_payload(uid)) for uid in ops["users_update"]),
+        )
+        await asyncio.gather(
+            *(self._post("/team/member_add", {"team_id": tid, "member": [{"role": "user", "user_id": uid} for uid in batch]})
+              for tid, members in ops["members_add"].items() for batch in chunks(members, self.batch_size)),
+            *(self._post("/team/member_delete", {"team_id": tid, "user_id": uid}) for tid, uid in ops["members_remove"]),
+        )
+        await asyncio.gather(
+            *(self._post("/user/delete", {"user_ids": batch}) for batch in chunks(ops["users_delete"], self.batch_size)),
+            *(self._post("/team/delete", {"team_ids": batch}) for batch in chunks(ops["teams_delete"], self.batch_size)),
+        )
+
+
+def load_state(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(path, state):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+async def sync_once(source, target, state, admin_group="Admins", team_groups=None, prune_user_ids=(),
+                    full_every=24, force=False, dry_run=False):
+    """
+    One sync run. Updates `state` in place and returns the run metrics.
+    """
+    started = time.monotonic()
+    metrics = {"result": "applied", "timings": {}}
+
+    users, groups = await asyncio.gather(source.users(), source.groups())
+    desired = desired_state(users, groups, admin_group, team_groups)
+    metrics["timings"]["authentik_s"] = round(time.monotonic() - started, 3)
+    metrics["authentik"] = {"users": len(users), "groups": len(groups)}
+    metrics["desired"] = {"users": len(desired["users"]), "teams": len(desired["teams"])}
+
+    desired_digest = digest(desired)
+    runs_since_full = state.get("runs_since_full", 0) + 1
+    full_due = bool(full_every) and runs_since_full >= full_every
+    if not force and not full_due and state.get("digest") == desired_digest:
+        metrics["result"] = "unchanged"
+        state["runs_since_full"] = runs_since_full
+    else:
+        phase = time.monotonic()
+        current_users, current_teams = await asyncio.gather(target.users(), target.teams())
+        current = current_state(current_users, current_teams)
+        metrics["timings"]["litellm_read_s"] = round(time.monotonic() - phase, 3)
+        ops = plan(desired, current, prune_user_ids)
+        metrics["changes"] = count_ops(ops)
+
+        phase = time.monotonic()
+        if dry_run:
+            metrics["result"] = "dry-run"
+            metrics["plan"] = ops
+        else:
+            await target.apply(ops, desired)
+            if target.errors:
+                # keep the old digest so the next run retries
+                metrics["result"] = "partial"
+                metrics["errors"] = target.errors[:20]
+            else:
+                state.update({"digest": desired_digest, "runs_since_full": 0, "synced_at": time.time()})
+        metrics["timings"]["apply_s"] = round(time.monotonic() - phase, 3)
+
+    metrics["api_calls"] = {"authentik": sum(source.client.calls.values()), "litellm": sum(target.client.calls.values())}
+    metrics["timings"]["total_s"] = round(time.monotonic() - started, 3)
+    state["last_run"] = {"at": time.time(), **{key: value for key, value in metrics.items() if key != "plan"}}
+    return metrics
+
+
+async def run(args):
+    state = load_state(args.state)
+    team_groups = set(name.strip() for name in args.team_groups.split(",") if name.strip()) if args.team_groups else None
+    prune = tuple(uid.strip() for uid in args.prune_user_ids.split(",") if uid.strip())
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        while True:
+            source = AuthentikSource(ApiClient(session, args.authentik_url, args.authentik_token, retries=args.retries),
+                                     page_size=args.page_size)
+            target = LiteLLMTarget(ApiClient(session, args.litellm_url, args.litellm_key, retries=args.retries),
+                                   page_size=args.page_size, concurrency=args.concurrency, batch_size=args.batch_size)
+            try:
+                metrics = await sync_once(source, target, state, args.admin_group, team_groups, prune,
+                                          args.full_every, args.force, args.dry_run)
+                print(json.dumps(metrics, default=str), flush=True)
+            except RuntimeError as e:
+                metrics = {"result": "failed", "error": str(e)}
+                log.error("Sync failed: %s", e)
+            except Exception as e:
+                # e.g. an API body of an unexpected shape; the next run starts over
+                metrics = {"result": "failed", "error": f"{type(e).__name__}: {e}"}
+                log.exception("Sync failed")
+            if not args.dry_run:
+                save_state(args.state, state)
+            if not args.interval:
+                return 0 if metrics["result"] in ("applied", "unchanged", "dry-run") else 1
+            args.force = False
+            await asyncio.sleep(args.interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync Authentik users and groups into LiteLLM users and teams.")
+    parser.add_argument("--authentik-url", default=os.getenv("AUTHENTIK_INTERNAL_URL", "http://apukone-authentik-server:9000"))
+    parser.add_argument("--authentik-token", default=os.getenv("AUTHENTIK_TOKEN"))
+    parser.add_argument("--litellm-url", default=os.getenv("LITELLM_URL", "http://apukone-litellm:4000"))
+    parser.add_argument("--litellm-key", default=os.getenv("LITELLM_MASTER_KEY"))
+    parser.add_argument("--state", default=os.getenv("SYNC_STATE_PATH", "/data/state.json"))
+    parser.add_argument("--admin-group", default=os.getenv("SYNC_ADMIN_GROUP", "Admins"))
+    parser.add_argument("--team-groups", default=os.getenv("SYNC_TEAM_GROUPS", ""),
+                        help="comma-separated Authentik groups that become teams (default: all)")
+    parser.add_argument("--prune-user-ids", default=os.getenv("SYNC_PRUNE_USER_IDS", "akadmin"),
+                        help="unmanaged LiteLLM user ids to delete if not in Authentik")
+    parser.add_argument("--interval", type=float, default=float(os.getenv("SYNC_INTERVAL", "0")),
+                        help="seconds between runs; 0 runs once and exits")
+    parser.add_argument("--full-every", type=int, default=int(os.getenv("SYNC_FULL_EVERY", "24")),
+                        help="re-read LiteLLM every N runs even if Authentik is unchanged (0: never)")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("SYNC_CONCURRENCY", "8")))
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--retries", type=int, default=6)
+    parser.add_argument("--force", action="store_true", help="ignore the stored digest for the first run")
+    parser.add_argument("--dry-run", action="store_true", help="print the plan without applying it")
+    args = parser.parse_args()
+    if not args.authentik_token or not args.litellm_key:
+        parser.error("AUTHENTIK_TOKEN and LITELLM_MASTER_KEY are required")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,457 @@
+"""
+Priority admission control for LiteLLM.
+
+OpenWebUI chat and Windmill batch jobs reach the gateway with the same
+master key, so a large batch run used to queue in front of interactive
+requests upstream. Loaded as `admission.proxy_handler_instance` from
+config.yaml, this callback admits every request in its pre-call hook when
+ADMISSION_ENABLED=true (off by default: it limits every key and adds a
+Redis round trip per call):
+
+- requests are classified into priority classes (ADMISSION_CLASSES, highest
+  first) by key alias, team, user or tag (ADMISSION_RULES); anything else
+  goes to ADMISSION_DEFAULT_CLASS. An `X-Priority: <class>` header can move
+  a request to a lower class, never to a higher one
+- each class has a token bucket (`rate` per second, `burst`) and optionally
+  a cap on its in-flight requests; ADMISSION_MAX_CONCURRENCY caps all of
+  them together. Buckets and leases live in the router_settings Redis, so
+  every worker and replica enforces the same limits
+- a request over its limits waits in its class's bounded queue (`max_queue`
+  waiters, `max_wait` seconds). While a class is blocked on the global cap,
+  lower classes do not take the slots it is waiting for
+- a full queue or an expired wait is answered with 429 and Retry-After
+  instead of passing the request (and its retries) upstream
+- queue depth, wait time and admissions/rejections per class are exported
+  as Prometheus metrics and by `AdmissionController.stats()`
+
+Leases are released when the request succeeds or fails and expire after
+ADMISSION_LEASE_TTL seconds if a worker dies holding them.
+"""
+import asyncio
+import fnmatch
+import logging
+import math
+import os
+import time
+import uuid
+
+try:
+    from litellm.integrations.custom_logger import CustomLogger
+except ImportError:  # offline tests and benchmarks import the controller without LiteLLM
+    CustomLogger = object
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram
+except ImportError:
+    Counter = Gauge = Histogram = None
+
+log = logging.getLogger("admission")
+
+DEFAULT_CLASSES = (
+    "interactive:rate=50,burst=100,max_queue=200,max_wait=10;"
+    "batch:rate=5,burst=10,max_concurrency=16,max_queue=100,max_wait=30"
+)
+RULE_FIELDS = ("key_alias", "team_alias", "team_id", "user_id", "tag")
+
+if Counter is not None:
+    ADMITTED = Counter("litellm_admission_admitted", "Requests admitted per priority class", ["priority"])
+    REJECTED = Counter("litellm_admission_rejected", "Requests rejected with 429 per class and reason",
+                       ["priority", "reason"])
+    QUEUE_DEPTH = Gauge("litellm_admission_queue_depth", "Requests waiting for admission", ["priority"],
+                        multiprocess_mode="livesum")
+    IN_FLIGHT = Gauge("litellm_admission_in_flight", "Admitted requests not finished yet", ["priority"],
+                      multiprocess_mode="livesum")
+    WAIT_SECONDS = Histogram(
+        "litellm_admission_wait_seconds", "Time from arrival to admission", ["priority"],
+        buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    )
+
+
+class PriorityClass:
+    def __init__(self, name, rank, rate=0.0, burst=0.0, max_concurrency=0, max_queue=100, max_wait=10.0):
+        self.name = name
+        self.rank = rank
+        self.rate = rate  # tokens per second; 0 = no rate limit
+        self.burst = burst or max(1.0, rate)
+        self.max_concurrency = max_concurrency  # 0 = only the global cap applies
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+
+
+def parse_classes(text):
+    """
+    'name:rate=5,burst=10,max_concurrency=16,max_queue=100,max_wait=30;name:...'
+    -> {name: PriorityClass}, in priority order (first = highest).
+    """
+    classes = {}
+    for item in text.split(";"):
+        name, _, options = item.strip().partition(":")
+        if not name:
+            continue
+        values = {}
+        for option in options.split(","):
+            if "=" in option:
+                key, value = option.split("=", 1)
+                values[key.strip()] = float(value)
+        for key in ("max_concurrency", "max_queue"):
+            if key in values:
+                values[key] = int(values[key])
+        classes[name.strip()] = PriorityClass(name.strip(), len(classes), **values)
+    return classes
+
+
+def parse_rules(text):
+    """'field=pattern:class;...' -> [(field, pattern, class)], matched in order."""
+    rules = []
+    for item in text.split(";"):
+        match, _, name = item.strip().rpartition(":")
+        field, _, pattern = match.partition("=")
+        if field.strip() in RULE_FIELDS and pattern and name:
+            rules.append((field.strip(), pattern.strip(), name.strip()))
+    return rules
+
+
+def request_headers(data):
+    for headers in (
+        (data.get("metadata") or {}).get("headers"),
+        (data.get("litellm_metadata") or {}).get("headers"),
+        (data.get("proxy_server_request") or {}).get("headers"),
+    ):
+        if headers:
+            return {key.lower(): value for key, value in headers.items()}
+    return {}
+
+
+def request_attributes(user_api_key_dict, data):
+    """Values the rules match against; tags are a list."""
+    attributes = {field: getattr(user_api_key_dict, field, None) or "" for field in RULE_FIELDS if field != "tag"}
+    tags = data.get("tags") or (data.get("metadata") or {}).get("tags") or []
+    attributes["tag"] = [str(tag) for tag in tags] if isinstance(tags, list) else [str(tags)]
+    return attributes
+
+
+def classify(classes, rules, default, attributes, headers):
+    """Class of a request: the first matching rule, lowered (never raised) by X-Priority."""
+    name = default
+    for field, pattern, target in rules:
+        values = attributes.get(field) or []
+        if isinstance(values, str):
+            values = [values]
+        if target in classes and any(fnmatch.fnmatchcase(value, pattern) for value in values):
+            name = target
+            break
+    requested = (headers.get("x-priority") or "").strip().lower()
+    if requested in classes and classes[requested].rank > classes[name].rank:
+        name = requested
+    return name
+
+
+class Rejected(Exception):
+    def __init__(self, priority, reason, retry_after):
+        super().__init__(f"{priority} request rejected ({reason}), retry after {retry_after}s")
+        self.priority = priority
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class LocalLimiter:
+    """
+    In-process version of the Redis script below, for a single worker,
+    tests and benchmarks. acquire() -> (admitted, reason, seconds until a
+    token is available).
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.buckets = {}
+        self.leases = {}
+        self.hold = None  # (rank, until)
+
+    def _live(self, name):
+        now = self.clock()
+        leases = self.leases.setdefault(name, {})
+        for lease, expires in list(leases.items()):
+            if expires <= now:
+                del leases[lease]
+        return leases
+
+    async def acquire(self, spec, max_concurrency, lease, lease_ttl, hold_ttl):
+        now = self.clock()
+        tokens = spec.burst
+        if spec.rate > 0:
+            level, at = self.buckets.get(spec.name, (spec.burst, now))
+            tokens = min(spec.burst, level + (now - at) * spec.rate)
+            if tokens < 1:
+                return False, "rate", (1 - tokens) / spec.rate
+        if spec.max_concurrency and len(self._live(spec.name)) >= spec.max_concurrency:
+            return False, "class_concurrency", 0.0
+        if self.hold is not None and self.hold[1] > now and self.hold[0] < spec.rank:
+            return False, "priority", 0.0
+        if max_concurrency and len(self._live("*")) >= max_concurrency:
+            self.hold = (spec.rank, now + hold_ttl)
+            return False, "global_concurrency", 0.0
+        if spec.rate > 0:
+            self.buckets[spec.name] = (tokens - 1, now)
+        self._live(spec.name)[lease] = now + lease_ttl
+        self._live("*")[lease] = now + lease_ttl
+        return True, "", 0.0
+
+    async def release(self, spec, lease):
+        self.leases.get(spec.name, {}).pop(lease, None)
+        self.leases.get("*", {}).pop(lease, None)
+
+    async def in_flight(self, spec):
+        return len(self._live(spec.name))
+
+
+ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local class_limit, global_limit = tonumber(ARGV[3]), tonumber(ARGV[4])
+local lease, lease_ttl = ARGV[5], tonumber(ARGV[6])
+local rank, hold_ms = tonumber(ARGV[7]), tonumber(ARGV[8])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', now)
+local tokens = burst
+if rate > 0 then
+  local state = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+  if state[1] then
+    tokens = math.min(burst, tonumber(state[1]) + (now - tonumber(state[2])) * rate)
+  end
+  if tokens < 1 then
+    return {0, 'rate', tostring((1 - tokens) / rate)}
+  end
+end
+if class_limit > 0 and redis.call('ZCARD', KEYS[2]) >= class_limit then
+  return {0, 'class_concurrency', '0'}
+end
+local hold = tonumber(redis.call('GET', KEYS[4]) or '')
+if hold and hold < rank then
+  return {0, 'priority', '0'}
+end
+if global_limit > 0 and redis.call('ZCARD', KEYS[3]) >= global_limit then
+  redis.call('SET', KEYS[4], rank, 'PX', hold_ms)
+  return {0, 'global_concurrency', '0'}
+end
+if rate > 0 then
+  redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - 1), 'at', tostring(now))
+  redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+end
+redis.call('ZADD', KEYS[2], now + lease_ttl, lease)
+redis.call('ZADD', KEYS[3], now + lease_ttl, lease)
+redis.call('EXPIRE', KEYS[2], math.ceil(lease_ttl))
+redis.call('EXPIRE', KEYS[3], math.ceil(lease_ttl))
+return {1, '', '0'}
+"""
+
+
+class RedisLimiter:
+    """
+    Buckets and leases shared through Redis: `<namespace>:bucket:<class>`
+    (tokens, last refill), `<namespace>:leases:<class>` and
+    `<namespace>:leases:*` (sorted by expiry), and `<namespace>:hold`, the
+    rank of the highest class blocked on the global cap.
+    """
+
+    def __init__(self, redis, namespace="admission"):
+        self.redis = redis
+        self.namespace = namespace
+        self.script = redis.register_script(ACQUIRE_SCRIPT)
+
+    def _keys(self, name):
+        prefix = self.namespace
+        return [f"{prefix}:bucket:{name}", f"{prefix}:leases:{name}", f"{prefix}:leases:*", f"{prefix}:hold"]
+
+    async def acquire(self, spec, max_concurrency, lease, lease_ttl, hold_ttl):
+        admitted, reason, wait = await self.script(keys=self._keys(spec.name), args=[
+            spec.rate, spec.burst, spec.max_concurrency, max_concurrency, lease, lease_ttl, spec.rank,
+            max(1, int(hold_ttl * 1000)),
+        ])
+        reason = reason.decode() if isinstance(reason, bytes) else reason
+        return bool(admitted), reason, float(wait)
+
+    async def release(self, spec, lease):
+        keys = self._keys(spec.name)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zrem(keys[1], lease)
+        pipe.zrem(keys[2], lease)
+        await pipe.execute()
+
+    async def in_flight(self, spec):
+        return await self.redis.zcard(self._keys(spec.name)[1])
+
+
+class AdmissionController:
+    """
+    Queues and admits requests per class on top of a limiter. Waiters retry
+    when a lease is released in this process, and otherwise every
+    `poll_interval` (or when the next token is due) to see releases made by
+    other workers.
+    """
+
+    def __init__(self, classes, limiter, max_concurrency=0, lease_ttl=600.0, poll_interval=0.1, clock=time.monotonic):
+        self.classes = classes
+        self.limiter = limiter
+        self.max_concurrency = max_concurrency
+        self.lease_ttl = lease_ttl
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.released = asyncio.Event()
+        self.waiting = {name: 0 for name in classes}
+        self.in_flight = {name: 0 for name in classes}
+        self.leases = {}  # lease -> class, admitted by this process
+        self.counts = {name: {"admitted": 0, "queued": 0, "rejected": 0, "wait_seconds": 0.0} for name in classes}
+
+    async def _try(self, spec, lease):
+        return await self.limiter.acquire(spec, self.max_concurrency, lease, self.lease_ttl, self.poll_interval * 3)
+
+    def _reject(self, spec, reason, wait):
+        retry_after = max(1, math.ceil(wait))
+        self.counts[spec.name]["rejected"] += 1
+        if Counter is not None:
+            REJECTED.labels(spec.name, reason).inc()
+        raise Rejected(spec.name, reason, retry_after)
+
+    def _admitted(self, spec, lease, waited):
+        self.leases[lease] = spec.name
+        self.in_flight[spec.name] += 1
+        counts = self.counts[spec.name]
+        counts["admitted"] += 1
+        counts["wait_seconds"] += waited
+        if Counter is not None:
+            ADMITTED.labels(spec.name).inc()
+            IN_FLIGHT.labels(spec.name).inc()
+            WAIT_SECONDS.labels(spec.name).observe(waited)
+
+    async def admit(self, name, lease=None):
+        """Waits for a slot of class `name`; returns the lease to release, raises Rejected."""
+        spec = self.classes[name]
+        lease = lease or uuid.uuid4().hex
+        started = self.clock()
+        admitted, reason, wait = await self._try(spec, lease)
+        if admitted:
+            self._admitted(spec, lease, 0.0)
+            return lease
+        if wait > spec.max_wait:
+            self._reject(spec, "rate", wait)
+        if self.waiting[name] >= spec.max_queue:
+            self._reject(spec, "queue_full", max(wait, spec.max_wait))
+
+        deadline = started + spec.max_wait
+        self.waiting[name] += 1
+        self.counts[name]["queued"] += 1
+        if Gauge is not None:
+            QUEUE_DEPTH.labels(name).inc()
+        try:
+            while True:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    self._reject(spec, "timeout", wait or self.poll_interval)
+                released = self.released
+                try:
+                    await asyncio.wait_for(released.wait(), min(remaining, max(wait, self.poll_interval)))
+                except asyncio.TimeoutError:
+                    pass
+                admitted, reason, wait = await self._try(spec, lease)
+                if admitted:
+                    self._admitted(spec, lease, self.clock() - started)
+                    return lease
+        finally:
+            self.waiting[name] -= 1
+            if Gauge is not None:
+                QUEUE_DEPTH.labels(name).dec()
+
+    async def release(self, lease):
+        """Idempotent: success and failure callbacks may both report the same request."""
+        name = self.leases.pop(lease, None)
+        if name is None:
+            return
+        await self.limiter.release(self.classes[name], lease)
+        self.in_flight[name] -= 1
+        if Gauge is not None:
+            IN_FLIGHT.labels(name).dec()
+        # wake every local waiter; the limiter decides which of them gets the slot
+        released, self.released = self.released, asyncio.Event()
+        released.set()
+
+    def stats(self):
+        result = {}
+        for name, counts in self.counts.items():
+            admitted = counts["admitted"]
+            result[name] = {
+                "queue_depth": self.waiting[name],
+                "in_flight": self.in_flight[name],
+                "admitted": admitted,
+                "queued": counts["queued"],
+                "rejected": counts["rejected"],
+                "mean_wait_ms": round(counts["wait_seconds"] / admitted * 1000, 2) if admitted else 0.0,
+            }
+        return result
+
+
+def controller_from_env(env=os.environ, redis=None):
+    classes = parse_classes(env.get("ADMISSION_CLASSES") or DEFAULT_CLASSES)
+    if redis is None and env.get("ADMISSION_BACKEND", "redis") == "redis":
+        import redis.asyncio as aioredis
+
+        redis = aioredis.Redis(host=env.get("REDIS_HOST", "litellm-redis"), port=int(env.get("REDIS_PORT", "6379")))
+    limiter = RedisLimiter(redis, env.get("ADMISSION_NAMESPACE", "admission")) if redis is not None else LocalLimiter()
+    return AdmissionController(
+        classes, limiter,
+        max_concurrency=int(env.get("ADMISSION_MAX_CONCURRENCY", "0")),
+        lease_ttl=float(env.get("ADMISSION_LEASE_TTL", "600")),
+        poll_interval=float(env.get("ADMISSION_POLL_INTERVAL", "0.1")),
+    )
+
+
+class AdmissionHandler(CustomLogger):
+    def __init__(self, controller=None, rules=None, default=None, enabled=True):
+        super().__init__()
+        self.controller = controller
+        self.rules = parse_rules(os.getenv("ADMISSION_RULES", "")) if rules is None else rules
+        self.default = default or os.getenv("ADMISSION_DEFAULT_CLASS", "interactive")
+        self.enabled = enabled
+
+    def _controller(self):
+        # created lazily: the Redis client and events belong to the proxy's loop
+        if self.controller is None:
+            self.controller = controller_from_env()
+        return self.controller
+
+    async def async_pre_call_hook(self, user_api_key_dict, cache, data, call_type):
+        if not self.enabled:
+            return data
+        controller = self._controller()
+        name = classify(controller.classes, self.rules, self.default, request_attributes(user_api_key_dict, data),
+                        request_headers(data))
+        try:
+            lease = await controller.admit(name, data.get("litellm_call_id"))
+        except Rejected as e:
+            from fastapi import HTTPException
+
+            raise HTTPException(status_code=429, detail=str(e), headers={"retry-after": str(e.retry_after)})
+        data.setdefault("metadata", {})["admission"] = {"priority": name, "lease": lease}
+        return data
+
+    async def _release(self, metadata):
+        admission = (metadata or {}).get("admission")
+        if admission and self.controller is not None:
+            try:
+                await self.controller.release(admission["lease"])
+            except Exception as e:  # the lease expires on its own
+                log.warning("Releasing admission lease failed: %s", e)
+
+    async def async_log_success_event(self, kwargs, response_obj, start_time, end_time):
+        await self._release((kwargs.get("litellm_params") or {}).get("metadata"))
+
+    async def async_log_failure_event(self, kwargs, response_obj, start_time, end_time):
+        await self._release((kwargs.get("litellm_params") or {}).get("metadata"))
+
+    async def async_post_call_failure_hook(self, request_data, original_exception, user_api_key_dict, *args, **kwargs):
+        # failures before the upstream call (other hooks, auth) never reach the logging callbacks
+        await self._release(request_data.get("metadata"))
+
+
+if CustomLogger is not object:
+    proxy_handler_instance = AdmissionHandler(enabled=os.getenv("ADMISSION_ENABLED", "false").lower() == "true")
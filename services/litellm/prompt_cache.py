@@ -0,0 +1,655 @@
+"""
+Normalized-prompt response cache for LiteLLM.
+
+Loaded from config.yaml (`callbacks: prompt_cache.proxy_handler_instance`)
+and replaces the backend and key function of LiteLLM's response cache:
+
+- requests are canonicalized before hashing: only parameters that change
+  the completion are kept, keys are sorted, whitespace in message text is
+  collapsed and per-message metadata (ids, timestamps) is dropped, so
+  prompts that differ only in formatting share an entry
+- bodies are stored zlib-compressed
+- `stream` is not part of the key: a streamed response populates the entry
+  and LiteLLM replays cached entries as a chunk stream for stream=true
+- TTLs can be set per model (PROMPT_CACHE_MODEL_TTLS)
+- cached bytes are kept under PROMPT_CACHE_MAX_MB by evicting the least
+  frequently (lfu) or least recently (lru) used entries
+- hits, misses and bytes are exported on LiteLLM's Prometheus /metrics
+- optionally (PROMPT_CACHE_L1_MB > 0) an in-process L1 with its own byte
+  budget and TTL sits in front of Redis, caches misses briefly and is
+  invalidated across replicas over Redis pub/sub (TieredCache)
+"""
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+
+try:
+    import litellm
+    from litellm.caching.base_cache import BaseCache
+    from litellm.caching.caching import Cache
+    from litellm.integrations.custom_logger import CustomLogger
+except ImportError:  # offline tests and benchmarks import the cache without LiteLLM
+    litellm = None
+    BaseCache = object
+    CustomLogger = object
+
+try:
+    from prometheus_client import Counter, Histogram
+except ImportError:
+    Counter = Histogram = None
+
+log = logging.getLogger("prompt_cache")
+
+# Request parameters that change the response; everything else (user,
+# metadata, stream, timeouts, LiteLLM internals) is left out of the key.
+KEY_PARAMS = [
+    "model", "messages", "input", "prompt", "temperature", "top_p", "n", "max_tokens", "max_completion_tokens",
+    "stop", "presence_penalty", "frequency_penalty", "logit_bias", "seed", "response_format", "tools",
+    "tool_choice", "functions", "function_call", "dimensions", "encoding_format", "reasoning_effort",
+]
+MESSAGE_FIELDS = ["role", "content", "name", "tool_calls", "tool_call_id", "function_call"]
+
+RAW = b"j"
+COMPRESSED = b"z"
+
+if Counter is not None:
+    REQUESTS = Counter("litellm_prompt_cache_requests", "Prompt cache lookups", ["model", "result"])
+    BYTES = Counter("litellm_prompt_cache_bytes", "Prompt cache bytes (raw/stored on write, served on hit)", ["direction"])
+    EVICTIONS = Counter("litellm_prompt_cache_evictions", "Entries evicted to stay under the memory budget")
+    TIER_REQUESTS = Counter("litellm_prompt_cache_tier_requests", "Lookups per cache tier and result", ["tier", "result"])
+    INVALIDATIONS = Counter("litellm_prompt_cache_l1_invalidations", "L1 entries dropped on another replica's write")
+    LOOKUP_SECONDS = Histogram(
+        "litellm_prompt_cache_lookup_seconds", "Cache lookup latency by the tier that answered", ["tier"],
+        buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+    )
+
+
+def normalize_text(text, ignore_patterns=()):
+    for pattern in ignore_patterns:
+        text = pattern.sub("<volatile>", text)
+    return " ".join(text.split())
+
+
+def normalize_message(message, ignore_patterns=()):
+    normalized = {}
+    for field in MESSAGE_FIELDS:
+        value = message.get(field)
+        if value in (None, "", []):
+            continue
+        if field == "content" and isinstance(value, str):
+            value = normalize_text(value, ignore_patterns)
+        elif field == "content" and isinstance(value, list):
+            value = [
+                {"type": "text", "text": normalize_text(part.get("text", ""), ignore_patterns)}
+                if isinstance(part, dict) and part.get("type") == "text" else part
+                for part in value
+            ]
+        normalized[field] = value
+    return normalized
+
+
+def canonical_payload(kwargs, ignore_patterns=()):
+    """
+    The parts of a request that determine its response, in a stable form.
+    """
+    payload = {}
+    for param in KEY_PARAMS:
+        value = kwargs.get(param)
+        if value is None:
+            continue
+        if param == "messages":
+            value = [normalize_message(message, ignore_patterns) for message in value]
+        elif param in ("input", "prompt"):
+            if isinstance(value, str):
+                value = normalize_text(value, ignore_patterns)
+            elif isinstance(value, list):
+                value = [normalize_text(item, ignore_patterns) if isinstance(item, str) else item for item in value]
+        payload[param] = value
+    return payload
+
+
+def parse_model_ttls(text):
+    """`model=seconds,model=seconds` -> {model: seconds}."""
+    ttls = {}
+    for item in text.split(","):
+        if "=" in item:
+            model, seconds = item.rsplit("=", 1)
+            ttls[model.strip()] = int(seconds)
+    return ttls
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class MemoryStore:
+    """
+    In-process stand-in for the subset of redis.asyncio.Redis the cache uses
+    (single worker without Redis, tests and benchmarks).
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.values = {}
+        self.expires = {}
+        self.hashes = {}
+        self.sorted_sets = {}
+        self.channels = {}
+
+    def _live(self, key):
+        expires = self.expires.get(key)
+        if expires is not None and self.clock() >= expires:
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.values
+
+    async def get(self, key):
+        return self.values[key] if self._live(key) else None
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value if isinstance(value, bytes) else str(value).encode()
+        if ex:
+            self.expires[key] = self.clock() + ex
+        else:
+            self.expires.pop(key, None)
+        return True
+
+    async def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            live = self._live(key)
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+            live = (self.hashes.pop(key, None) is not None) or (self.sorted_sets.pop(key, None) is not None) or live
+            removed += int(live)
+        return removed
+
+    async def incrby(self, key, amount):
+        value = int(self.values.get(key, b"0")) + amount
+        self.values[key] = str(value).encode()
+        return value
+
+    async def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    async def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = str(value).encode()
+        return 1
+
+    async def hdel(self, key, *fields):
+        table = self.hashes.get(key, {})
+        return sum(table.pop(field, None) is not None for field in fields)
+
+    async def zadd(self, key, mapping):
+        self.sorted_sets.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+    async def zincrby(self, key, amount, member):
+        members = self.sorted_sets.setdefault(key, {})
+        members[member] = members.get(member, 0) + amount
+        return members[member]
+
+    async def zpopmin(self, key, count=1):
+        members = self.sorted_sets.get(key, {})
+        popped = sorted(members.items(), key=lambda item: item[1])[:count]
+        for member, _ in popped:
+            del members[member]
+        return [(member.encode(), score) for member, score in popped]
+
+    async def publish(self, channel, message):
+        subscribers = self.channels.get(channel, [])
+        for queue in subscribers:
+            queue.put_nowait({"type": "message", "channel": channel.encode(), "data": str(message).encode()})
+        return len(subscribers)
+
+    def pubsub(self):
+        return MemoryPubSub(self)
+
+    async def aclose(self):
+        pass
+
+
+class MemoryPubSub:
+    """The part of redis.asyncio's PubSub that TieredCache listens with."""
+
+    def __init__(self, store):
+        self.store = store
+        self.queue = asyncio.Queue()
+        self.subscribed = []
+
+    async def subscribe(self, *channels):
+        for channel in channels:
+            self.store.channels.setdefault(channel, []).append(self.queue)
+            self.subscribed.append(channel)
+            self.queue.put_nowait({"type": "subscribe", "channel": channel.encode(), "data": 1})
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def aclose(self):
+        for channel in self.subscribed:
+            self.store.channels[channel].remove(self.queue)
+        self.subscribed = []
+
+
+class PromptCache(BaseCache):
+    """
+    LiteLLM cache backend on top of a Redis-like `store`.
+
+    Entry sizes live in the `<namespace>:sizes` hash, their eviction scores
+    (use count for lfu, last access for lru) in the `<namespace>:index`
+    sorted set and the running total in `<namespace>:bytes`. Entries that
+    expire by TTL keep counting until eviction pops them, so the budget errs
+    on the side of evicting early.
+    """
+
+    def __init__(self, store, namespace="prompt_cache", default_ttl=600, model_ttls=None, max_bytes=256 * 1024 * 1024,
+                 policy="lfu", compress_min_bytes=512, ignore_patterns=(), clock=time.time):
+        if policy not in ("lfu", "lru"):
+            raise ValueError(f"Unknown eviction policy '{policy}' (expected lfu or lru)")
+        self.store = store
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+        self.model_ttls = model_ttls or {}
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.compress_min_bytes = compress_min_bytes
+        self.ignore_patterns = [re.compile(pattern) for pattern in ignore_patterns]
+        self.clock = clock
+        self.index_key = f"{namespace}:index"
+        self.sizes_key = f"{namespace}:sizes"
+        self.bytes_key = f"{namespace}:bytes"
+        self.stats = {"hits": 0, "misses": 0, "sets": 0, "evictions": 0, "skipped_too_large": 0,
+                      "raw_bytes": 0, "stored_bytes": 0, "served_bytes": 0}
+
+    def cache_key(self, kwargs):
+        payload = canonical_payload(kwargs, self.ignore_patterns)
+        digest = hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+        return f"{self.namespace}:{payload.get('model', '')}:{digest[:40]}"
+
+    def model_of(self, key):
+        return key[len(self.namespace) + 1:].rsplit(":", 1)[0]
+
+    def ttl_for(self, key, requested=None):
+        """Per-model TTL, else the TTL LiteLLM asked for, else the default."""
+        model = self.model_of(key)
+        if model in self.model_ttls:
+            return self.model_ttls[model]
+        return int(requested) if requested else self.default_ttl
+
+    def encode(self, value):
+        raw = json.dumps(value, separators=(",", ":")).encode()
+        if len(raw) >= self.compress_min_bytes:
+            return raw, COMPRESSED + zlib.compress(raw, 6)
+        return raw, RAW + raw
+
+    @staticmethod
+    def decode_raw(blob):
+        """Stored blob -> the JSON bytes it was encoded from."""
+        if blob[:1] == COMPRESSED:
+            return zlib.decompress(blob[1:])
+        return blob[1:]
+
+    @classmethod
+    def decode(cls, blob):
+        return json.loads(cls.decode_raw(blob))
+
+    def _score(self):
+        return self.clock() if self.policy == "lru" else 1
+
+    def _count(self, key, result, served=0):
+        self.stats["hits" if result == "hit" else "misses"] += 1
+        self.stats["served_bytes"] += served
+        if Counter is not None:
+            REQUESTS.labels(model=self.model_of(key), result=result).inc()
+            if served:
+                BYTES.labels(direction="served").inc(served)
+
+    async def async_set_cache(self, key, value, **kwargs):
+        raw, blob = self.encode(value)
+        if len(blob) > self.max_bytes:
+            self.stats["skipped_too_large"] += 1
+            return
+        previous = await self.store.hget(self.sizes_key, key)
+        await self.store.set(key, blob, ex=self.ttl_for(key, kwargs.get("ttl")))
+        await self.store.hset(self.sizes_key, key, len(blob))
+        await self.store.zadd(self.index_key, {key: self._score()})
+        await self.store.incrby(self.bytes_key, len(blob) - int(previous or 0))
+        self.stats["sets"] += 1
+        self.stats["raw_bytes"] += len(raw)
+        self.stats["stored_bytes"] += len(blob)
+        if Counter is not None:
+            BYTES.labels(direction="raw").inc(len(raw))
+            BYTES.labels(direction="stored").inc(len(blob))
+        await self.enforce_budget()
+
+    async def async_set_cache_pipeline(self, cache_list, **kwargs):
+        for key, value in cache_list:
+            await self.async_set_cache(key, value, **kwargs)
+
+    async def enforce_budget(self):
+        total = int(await self.store.get(self.bytes_key) or 0)
+        while total > self.max_bytes:
+            popped = await self.store.zpopmin(self.index_key, 16)
+            if not popped:
+                break
+            for member, _ in popped:
+                key = _text(member)
+                size = int(await self.store.hget(self.sizes_key, key) or 0)
+                await self.store.hdel(self.sizes_key, key)
+                await self.store.delete(key)
+                total = await self.store.incrby(self.bytes_key, -size)
+                self.stats["evictions"] += 1
+                if Counter is not None:
+                    EVICTIONS.inc()
+                if total <= self.max_bytes:
+                    break
+
+    async def get_raw(self, key):
+        """JSON bytes of the entry (use is recorded for eviction), or None."""
+        blob = await self.store.get(key)
+        if blob is None:
+            self._count(key, "miss")
+            return None
+        if self.policy == "lfu":
+            await self.store.zincrby(self.index_key, 1, key)
+        else:
+            await self.store.zadd(self.index_key, {key: self.clock()})
+        self._count(key, "hit", len(blob))
+        return self.decode_raw(blob)
+
+    async def async_get_cache(self, key, **kwargs):
+        raw = await self.get_raw(key)
+        return None if raw is None else json.loads(raw)
+
+    async def async_batch_get_cache(self, keys, **kwargs):
+        return [await self.async_get_cache(key, **kwargs) for key in keys]
+
+    async def async_delete_cache(self, key):
+        size = int(await self.store.hget(self.sizes_key, key) or 0)
+        await self.store.delete(key)
+        await self.store.hdel(self.sizes_key, key)
+        await self.store.incrby(self.bytes_key, -size)
+
+    # The proxy only uses the async interface; sync SDK calls see a miss.
+    def set_cache(self, key, value, **kwargs):
+        pass
+
+    def get_cache(self, key, **kwargs):
+        return None
+
+    def flush_cache(self):
+        pass
+
+    async def disconnect(self):
+        await self.store.aclose()
+
+
+NEGATIVE = object()
+TIER_STATS = {"hit": "hits", "miss": "misses", "negative_hit": "negative_hits"}
+
+
+class LocalCache:
+    """
+    In-process LRU of JSON bytes with a byte budget and per-entry expiry.
+    A NEGATIVE entry remembers that the key was missing.
+    """
+
+    def __init__(self, max_bytes, clock=time.time):
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """The entry (raw bytes or NEGATIVE), or None when absent or expired."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        value, size, expires = entry
+        if expires <= self.clock():
+            self.discard(key)
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value, ttl):
+        size = len(key) + (64 if value is NEGATIVE else len(value))
+        self.discard(key)
+        # one response must not flush the whole tier
+        if ttl <= 0 or size > self.max_bytes // 8:
+            return
+        self.entries[key] = (value, size, self.clock() + ttl)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted, _) = self.entries.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+        return entry is not None
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+
+class TieredCache(BaseCache):
+    """
+    LocalCache (L1) in front of a PromptCache (L2, the shared Redis).
+
+    L1 holds entries for at most `l1_ttl` seconds (never longer than L2
+    would) and misses for `negative_ttl`, so a burst of identical new
+    prompts costs one Redis read. Every write and delete is published on
+    `<namespace>:invalidate`; each replica drops its own copy of keys other
+    replicas published, which also ends their negative entries as soon as
+    the first response is stored. While the subscription is down L1 is
+    bypassed, and it is cleared on every (re)subscribe.
+
+    L1 hits do not touch L2's eviction scores; a hot key refreshes them
+    each time its L1 copy expires.
+    """
+
+    def __init__(self, l2, l1_max_bytes=64 * 1024 * 1024, l1_ttl=30, negative_ttl=2.0, node_id=None):
+        self.l2 = l2
+        self.l1 = LocalCache(l1_max_bytes, l2.clock)
+        self.l1_ttl = l1_ttl
+        self.negative_ttl = negative_ttl
+        self.node_id = node_id or uuid.uuid4().hex[:12]
+        self.channel = f"{l2.namespace}:invalidate"
+        self.subscribed = asyncio.Event()
+        self.listener = None
+        self.stats = {"l1_hits": 0, "l1_negative_hits": 0, "l1_misses": 0, "l2_hits": 0, "l2_misses": 0,
+                      "invalidations": 0, "resubscribes": 0}
+
+    def cache_key(self, kwargs):
+        return self.l2.cache_key(kwargs)
+
+    def _start_listener(self):
+        # started lazily: the subscription belongs to the proxy's event loop
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def _listen(self):
+        while True:
+            pubsub = self.l2.store.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                self.l1.clear()
+                self.subscribed.set()
+                self.stats["resubscribes"] += 1
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    origin, _, key = _text(message["data"]).partition(" ")
+                    if origin != self.node_id and self.l1.discard(key):
+                        self.stats["invalidations"] += 1
+                        if Counter is not None:
+                            INVALIDATIONS.inc()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("Prompt cache invalidation channel lost (%s); L1 bypassed until resubscribed", e)
+            finally:
+                self.subscribed.clear()
+                with contextlib.suppress(Exception):
+                    await (getattr(pubsub, "aclose", None) or pubsub.close)()
+            await asyncio.sleep(1)
+
+    def _observe(self, tier, result, started):
+        """Counts a lookup result; latency is recorded for the tier that answered."""
+        self.stats[f"{tier}_{TIER_STATS[result]}"] += 1
+        if Counter is not None:
+            TIER_REQUESTS.labels(tier=tier, result=result).inc()
+        if Histogram is not None and (tier == "l2" or result != "miss"):
+            LOOKUP_SECONDS.labels(tier=tier).observe(time.perf_counter() - started)
+
+    async def async_get_cache(self, key, **kwargs):
+        started = time.perf_counter()
+        self._start_listener()
+        use_l1 = self.subscribed.is_set()
+        if use_l1:
+            value = self.l1.get(key)
+            if value is NEGATIVE:
+                self._observe("l1", "negative_hit", started)
+                return None
+            if value is not None:
+                self._observe("l1", "hit", started)
+                return json.loads(value)
+            self._observe("l1", "miss", started)
+        raw = await self.l2.get_raw(key)
+        if raw is None:
+            if use_l1:
+                self.l1.put(key, NEGATIVE, self.negative_ttl)
+            self._observe("l2", "miss", started)
+            return None
+        if use_l1:
+            self.l1.put(key, raw, min(self.l1_ttl, self.l2.ttl_for(key)))
+        self._observe("l2", "hit", started)
+        return json.loads(raw)
+
+    async def async_batch_get_cache(self, keys, **kwargs):
+        return [await self.async_get_cache(key, **kwargs) for key in keys]
+
+    async def _invalidate(self, key):
+        try:
+            await self.l2.store.publish(self.channel, f"{self.node_id} {key}")
+        except Exception as e:
+            # other replicas could serve a stale entry; stop trusting L1 until resubscribed
+            log.warning("Prompt cache invalidation for %s not published: %s", key, e)
+            self.l1.discard(key)
+
+    async def async_set_cache(self, key, value, **kwargs):
+        self._start_listener()
+        await self.l2.async_set_cache(key, value, **kwargs)
+        if self.subscribed.is_set():
+            raw = json.dumps(value, separators=(",", ":")).encode()
+            self.l1.put(key, raw, min(self.l1_ttl, self.l2.ttl_for(key, kwargs.get("ttl"))))
+        else:
+            self.l1.discard(key)
+        await self._invalidate(key)
+
+    async def async_set_cache_pipeline(self, cache_list, **kwargs):
+        for key, value in cache_list:
+            await self.async_set_cache(key, value, **kwargs)
+
+    async def async_delete_cache(self, key):
+        self.l1.discard(key)
+        await self.l2.async_delete_cache(key)
+        await self._invalidate(key)
+
+    def set_cache(self, key, value, **kwargs):
+        pass
+
+    def get_cache(self, key, **kwargs):
+        return None
+
+    def flush_cache(self):
+        self.l1.clear()
+
+    async def disconnect(self):
+        if self.listener is not None:
+            self.listener.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.listener
+        await self.l2.disconnect()
+
+
+def settings_from_env(env=os.environ):
+    patterns = [pattern for pattern in env.get("PROMPT_CACHE_IGNORE_PATTERNS", "").split(";;") if pattern]
+    return {
+        "namespace": env.get("PROMPT_CACHE_NAMESPACE", "prompt_cache"),
+        "default_ttl": int(env.get("PROMPT_CACHE_TTL", "600")),
+        "model_ttls": parse_model_ttls(env.get("PROMPT_CACHE_MODEL_TTLS", "")),
+        "max_bytes": int(float(env.get("PROMPT_CACHE_MAX_MB", "256")) * 1024 * 1024),
+        "policy": env.get("PROMPT_CACHE_POLICY", "lfu"),
+        "compress_min_bytes": int(env.get("PROMPT_CACHE_COMPRESS_MIN_BYTES", "512")),
+        "ignore_patterns": patterns,
+    }
+
+
+def tier_settings_from_env(env=os.environ):
+    """TieredCache options, or None when PROMPT_CACHE_L1_MB is 0."""
+    l1_mb = float(env.get("PROMPT_CACHE_L1_MB", "64"))
+    if l1_mb <= 0:
+        return None
+    return {
+        "l1_max_bytes": int(l1_mb * 1024 * 1024),
+        "l1_ttl": float(env.get("PROMPT_CACHE_L1_TTL", "30")),
+        "negative_ttl": float(env.get("PROMPT_CACHE_NEGATIVE_TTL", "2")),
+    }
+
+
+def install():
+    """
+    Swaps LiteLLM's cache backend and key function for PromptCache.
+    Idempotent; a no-op outside the LiteLLM container.
+    """
+    if litellm is None or isinstance(getattr(litellm.cache, "cache", None), (PromptCache, TieredCache)):
+        return
+    if os.getenv("PROMPT_CACHE_BACKEND", "redis") == "memory":
+        store = MemoryStore()
+    else:
+        import redis.asyncio as aioredis
+
+        store = aioredis.Redis(host=os.getenv("REDIS_HOST", "litellm-redis"), port=int(os.getenv("REDIS_PORT", "6379")))
+    cache = PromptCache(store, **settings_from_env())
+    tiers = tier_settings_from_env()
+    if tiers:
+        cache = TieredCache(cache, **tiers)
+    if litellm.cache is None:
+        litellm.cache = Cache(type="local")
+    litellm.cache.cache = cache
+    litellm.cache.get_cache_key = lambda *args, **kwargs: cache.cache_key(kwargs)
+    l2 = cache.l2 if tiers else cache
+    log.info("Prompt cache installed (policy=%s, budget=%d bytes, L1=%s)", l2.policy, l2.max_bytes,
+             f"{tiers['l1_max_bytes']} bytes" if tiers else "off")
+
+
+class PromptCacheHandler(CustomLogger):
+    """
+    Proxy callback that makes sure the cache is installed even when the
+    `cache` settings are applied after callbacks are loaded.
+    """
+
+    async def async_pre_call_hook(self, user_api_key_dict, cache, data, call_type):
+        install()
+        return data
+
+
+if litellm is not None:
+    install()
+    proxy_handler_instance = PromptCacheHandler()
@@ -0,0 +1,277 @@
+"""
+Sampled, batched request log for LiteLLM.
+
+Replaces DEBUG logging of every raw request/response with a callback
+(`callbacks: request_log.proxy_handler_instance` in config.yaml) that:
+
+- keeps a deterministic head sample of requests (REQUEST_LOG_SAMPLE_RATE,
+  decided from the call id so every worker agrees)
+- always keeps failures and requests slower than REQUEST_LOG_SLOW_MS (tail)
+- truncates message/response payloads above REQUEST_LOG_MAX_FIELD_BYTES
+- puts records on a bounded in-memory queue; when it is full the record is
+  dropped and counted instead of slowing down the request
+- flushes batches from a background task to a size-rotated JSON-lines file
+  or to Postgres (REQUEST_LOG_SINK=file|postgres)
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from logging.handlers import RotatingFileHandler
+
+try:
+    from litellm.integrations.custom_logger import CustomLogger
+except ImportError:  # offline tests and benchmarks import the pipeline without LiteLLM
+    CustomLogger = object
+
+try:
+    from prometheus_client import Counter
+except ImportError:
+    Counter = None
+
+log = logging.getLogger("request_log")
+
+if Counter is not None:
+    RECORDS = Counter("litellm_request_log_records", "Request log records by outcome", ["outcome"])
+
+STOP = object()
+
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS request_log (
+    id TEXT,
+    logged_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    record JSONB NOT NULL
+)
+"""
+
+
+def head_sampled(call_id, rate):
+    """
+    Deterministic sampling decision for `call_id` at `rate` (0..1).
+    """
+    if rate >= 1:
+        return True
+    if rate <= 0 or not call_id:
+        return False
+    bucket = int.from_bytes(hashlib.blake2b(str(call_id).encode(), digest_size=8).digest(), "big")
+    return bucket / 2**64 < rate
+
+
+def truncate(value, max_bytes):
+    """
+    `value` unchanged if its JSON encoding fits in `max_bytes`, otherwise a
+    string prefix of that encoding with the number of bytes cut.
+    """
+    if value is None:
+        return None, False
+    encoded = value if isinstance(value, str) else json.dumps(value, default=str)
+    if len(encoded.encode()) <= max_bytes:
+        return value, False
+    cut = encoded.encode()[:max_bytes].decode(errors="ignore")
+    return f"{cut}...[truncated {len(encoded.encode()) - len(cut.encode())} bytes]", True
+
+
+def build_record(kwargs, response_obj, start_time, end_time, failed):
+    """
+    Flat record from LiteLLM's standard logging payload (falls back to the
+    raw kwargs for older versions).
+    """
+    payload = kwargs.get("standard_logging_object") or {}
+    latency = (end_time - start_time).total_seconds() if hasattr(end_time, "__sub__") and start_time else 0.0
+    return {
+        "id": payload.get("id") or kwargs.get("litellm_call_id"),
+        "ts": time.time(),
+        "model": payload.get("model") or kwargs.get("model"),
+        "status": "failure" if failed else "success",
+        "latency_ms": round(latency * 1000, 1),
+        "prompt_tokens": payload.get("prompt_tokens"),
+        "completion_tokens": payload.get("completion_tokens"),
+        "user": (payload.get("metadata") or {}).get("user_api_key_user_id") or kwargs.get("user"),
+        "cache_hit": payload.get("cache_hit"),
+        "error": payload.get("error_str") or (str(kwargs.get("exception")) if failed and kwargs.get("exception") else None),
+        "messages": payload.get("messages", kwargs.get("messages")),
+        "response": payload.get("response") if "response" in payload else (
+            response_obj.model_dump() if hasattr(response_obj, "model_dump") else response_obj
+        ),
+    }
+
+
+class FileSink:
+    """JSON lines in a size-rotated file."""
+
+    def __init__(self, path, max_bytes=50 * 1024 * 1024, backups=5):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        self.handler.setFormatter(logging.Formatter("%(message)s"))
+
+    def _write(self, records):
+        for record in records:
+            self.handler.emit(logging.makeLogRecord({"msg": json.dumps(record, default=str), "args": None}))
+        self.handler.flush()
+
+    async def write(self, records):
+        await asyncio.to_thread(self._write, records)
+
+    async def close(self):
+        self.handler.close()
+
+
+class PostgresSink:
+    """Rows of (id, record jsonb) in the request_log table."""
+
+    def __init__(self, dsn):
+        self.dsn = dsn
+        self.pool = None
+
+    async def write(self, records):
+        if self.pool is None:
+            import asyncpg
+
+            self.pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=2)
+            async with self.pool.acquire() as connection:
+                await connection.execute(CREATE_TABLE)
+        async with self.pool.acquire() as connection:
+            await connection.executemany(
+                "INSERT INTO request_log (id, record) VALUES ($1, $2::jsonb)",
+                [(record["id"], json.dumps(record, default=str)) for record in records],
+            )
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+
+
+class RequestLog:
+    def __init__(self, sink, sample_rate=0.05, slow_ms=5000, max_field_bytes=4096, queue_size=10000,
+                 batch_size=200, flush_interval=2.0):
+        self.sink = sink
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.max_field_bytes = max_field_bytes
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.flusher = None
+        self.stats = {"seen": 0, "sampled_out": 0, "kept_tail": 0, "queued": 0, "dropped": 0, "truncated": 0,
+                      "written": 0, "batches": 0, "write_errors": 0}
+
+    def _count(self, outcome, amount=1):
+        self.stats[outcome] += amount
+        if Counter is not None:
+            RECORDS.labels(outcome=outcome).inc(amount)
+
+    def offer(self, record):
+        """
+        Hot path: sample, truncate and enqueue without blocking.
+        """
+        self.stats["seen"] += 1
+        tail = record["status"] == "failure" or (record["latency_ms"] or 0) >= self.slow_ms
+        if not tail and not head_sampled(record["id"], self.sample_rate):
+            self._count("sampled_out")
+            return False
+        if tail:
+            self._count("kept_tail")
+        for field in ("messages", "response", "error"):
+            record[field], cut = truncate(record.get(field), self.max_field_bytes)
+            if cut:
+                self._count("truncated")
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self._count("dropped")
+            return False
+        self._count("queued")
+        self._ensure_flusher()
+        return True
+
+    def _ensure_flusher(self):
+        if self.flusher is None or self.flusher.done():
+            self.flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        stopping = False
+        while not stopping:
+            batch = [await self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not STOP:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            if batch[-1] is STOP:
+                batch.pop()
+                stopping = True
+            if batch:
+                await self._write(batch)
+
+    async def _write(self, batch):
+        try:
+            await self.sink.write(batch)
+            self._count("written", len(batch))
+            self.stats["batches"] += 1
+        except Exception as e:  # never let the log sink take down the gateway
+            self._count("write_errors", len(batch))
+            log.warning("Request log flush of %d records failed: %s", len(batch), e)
+
+    async def drain(self):
+        """
+        Writes everything still queued and stops the background task.
+        """
+        if self.flusher is None or self.flusher.done():
+            self.flusher = None
+            if not self.queue.empty():
+                self._ensure_flusher()
+            else:
+                return
+        await self.queue.put(STOP)
+        await self.flusher
+        self.flusher = None
+
+
+def sink_from_env(env=os.environ):
+    if env.get("REQUEST_LOG_SINK", "file") == "postgres":
+        return PostgresSink(env.get("REQUEST_LOG_DATABASE_URL") or env["DATABASE_URL"])
+    return FileSink(
+        env.get("REQUEST_LOG_PATH", "/var/log/litellm/requests.jsonl"),
+        max_bytes=int(float(env.get("REQUEST_LOG_ROTATE_MB", "50")) * 1024 * 1024),
+        backups=int(env.get("REQUEST_LOG_BACKUPS", "5")),
+    )
+
+
+def pipeline_from_env(env=os.environ):
+    return RequestLog(
+        sink_from_env(env),
+        sample_rate=float(env.get("REQUEST_LOG_SAMPLE_RATE", "0.05")),
+        slow_ms=float(env.get("REQUEST_LOG_SLOW_MS", "5000")),
+        max_field_bytes=int(env.get("REQUEST_LOG_MAX_FIELD_BYTES", "4096")),
+        queue_size=int(env.get("REQUEST_LOG_QUEUE_SIZE", "10000")),
+        batch_size=int(env.get("REQUEST_LOG_BATCH_SIZE", "200")),
+        flush_interval=float(env.get("REQUEST_LOG_FLUSH_INTERVAL", "2")),
+    )
+
+
+class RequestLogHandler(CustomLogger):
+    def __init__(self, pipeline=None):
+        super().__init__()
+        self.pipeline = pipeline
+
+    def _pipeline(self):
+        # created lazily: asyncio.Queue must be made inside the proxy's loop
+        if self.pipeline is None:
+            self.pipeline = pipeline_from_env()
+        return self.pipeline
+
+    async def async_log_success_event(self, kwargs, response_obj, start_time, end_time):
+        self._pipeline().offer(build_record(kwargs, response_obj, start_time, end_time, failed=False))
+
+    async def async_log_failure_event(self, kwargs, response_obj, start_time, end_time):
+        self._pipeline().offer(build_record(kwargs, response_obj, start_time, end_time, failed=True))
+
+
+if CustomLogger is not object:
+    proxy_handler_instance = RequestLogHandler()
@@ -0,0 +1,627 @@
+"""
+Latency- and cost-aware routing for LiteLLM.
+
+Models are managed through the UI, and one model alias is often backed by
+several deployments (providers, regions, self-hosted replicas). The
+default shuffle spreads requests by static weights and never notices
+that one of them has become slow. Loaded as `routing.proxy_handler_instance`
+from config.yaml, this callback installs a custom routing strategy on the
+proxy's router when ROUTING_ENABLED=true (off by default, since it takes
+over LiteLLM's routing and cooldowns and wraps the router's private
+_acompletion):
+
+- every finished request adds its time to first token (the whole latency
+  when not streaming) and its outcome to a rolling window per deployment,
+  ROUTING_WINDOW seconds in ROUTING_BUCKETS buckets, newer buckets
+  weighing more (ROUTING_DECAY). The windows live in
+  the router_settings Redis, so every worker and replica routes on the
+  same numbers
+- each request picks a deployment at random, weighted by a score: latency
+  relative to the fastest deployment times cost per token relative to the
+  cheapest, each raised to its weight (ROUTING_LATENCY_WEIGHT,
+  ROUTING_COST_WEIGHT), inflated by the error rate. ROUTING_SHARPNESS sets
+  how strongly the best one is preferred; slower deployments keep a small
+  share so their windows stay current. Deployments with fewer than
+  ROUTING_MIN_SAMPLES samples in the window get the best share until they
+  have enough. Requests still waiting for an answer count too, so a
+  slowdown shows before the first slow answers come back
+- a deployment with ROUTING_COOLDOWN_ERRORS failures and an error rate of
+  at least ROUTING_COOLDOWN_ERROR_RATE in its window is skipped for
+  ROUTING_COOLDOWN seconds. This replaces LiteLLM's own cooldown list,
+  which only the built-in strategies consult
+- a request without an answer after ROUTING_HEDGE_FACTOR times its
+  deployment's expected latency (at least ROUTING_HEDGE_MIN_MS) is sent to
+  a second deployment too; the first answer wins and the other call is
+  cancelled. ROUTING_HEDGE_BUDGET caps hedges at a fraction of requests;
+  it defaults to 0, as every hedge is a second paid request. For streams
+  the hedge covers the time until the upstream starts to answer
+- decisions, hedges, cooldowns and each deployment's window are exported
+  as Prometheus metrics and by `LatencyCostRouter.stats()`
+"""
+import asyncio
+import logging
+import os
+import random
+import statistics
+import time
+import uuid
+from collections import deque
+
+try:
+    from litellm.integrations.custom_logger import CustomLogger
+    from litellm.types.router import CustomRoutingStrategyBase
+except ImportError:  # offline tests and benchmarks import the strategy without LiteLLM
+    CustomLogger = CustomRoutingStrategyBase = object
+
+try:
+    from prometheus_client import Counter, Gauge
+except ImportError:
+    Counter = Gauge = None
+
+log = logging.getLogger("routing")
+
+if Counter is not None:
+    DECISIONS = Counter("litellm_routing_decisions", "Deployments picked per model group and reason",
+                        ["model_group", "deployment", "reason"])
+    HEDGES = Counter("litellm_routing_hedges", "Requests sent to a second deployment, by which answered first",
+                     ["model_group", "winner"])
+    COOLDOWNS = Counter("litellm_routing_cooldowns", "Deployments put on cooldown", ["model_group", "deployment"])
+    WINDOW_TTFT = Gauge("litellm_routing_window_ttft_ms", "Mean time to first token in the rolling window",
+                        ["model_group", "deployment"], multiprocess_mode="max")
+    WINDOW_ERROR_RATE = Gauge("litellm_routing_window_error_rate", "Failed share of requests in the rolling window",
+                              ["model_group", "deployment"], multiprocess_mode="max")
+    WINDOW_WEIGHT = Gauge("litellm_routing_weight", "Share of new requests each deployment gets",
+                          ["model_group", "deployment"], multiprocess_mode="max")
+
+
+def deployment_id(deployment):
+    model_info = deployment.get("model_info") or {}
+    if model_info.get("id"):
+        return str(model_info["id"])
+    params = deployment.get("litellm_params") or {}
+    return f"{params.get('model')}@{params.get('api_base') or ''}"
+
+
+def deployment_cost(deployment):
+    """Input plus output cost per token, from the deployment or LiteLLM's price list; None if unknown."""
+    for source in (deployment.get("litellm_params") or {}, deployment.get("model_info") or {}):
+        if source.get("input_cost_per_token") is not None or source.get("output_cost_per_token") is not None:
+            return float(source.get("input_cost_per_token") or 0) + float(source.get("output_cost_per_token") or 0)
+    try:
+        import litellm
+
+        prices = litellm.model_cost.get((deployment.get("litellm_params") or {}).get("model", ""))
+    except ImportError:
+        prices = None
+    if prices:
+        return float(prices.get("input_cost_per_token") or 0) + float(prices.get("output_cost_per_token") or 0)
+    return None
+
+
+def summarize_buckets(buckets, decay=0.5):
+    """
+    [(count, errors, ttft_ms_sum)], oldest first -> the window of one
+    deployment. Each bucket's latency counts `decay` times as much as the
+    next newer one, so a deployment that slows down is noticed within a
+    bucket or two rather than a whole window.
+    """
+    count = sum(bucket[0] for bucket in buckets)
+    errors = sum(bucket[1] for bucket in buckets)
+    weighted_ttft = weighted_ok = 0.0
+    for age, bucket in enumerate(reversed(buckets)):
+        weight = decay ** age
+        weighted_ttft += weight * bucket[2]
+        weighted_ok += weight * (bucket[0] - bucket[1])
+    return {
+        "count": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "ttft_ms": round(weighted_ttft / weighted_ok, 2) if weighted_ok else None,
+        "samples": count - errors,
+        "cooling": False,
+    }
+
+
+class LocalWindows:
+    """In-process version of RedisWindows, for a single worker, tests and benchmarks."""
+
+    def __init__(self, window=60.0, buckets=6, decay=0.5, clock=time.time):
+        self.width = window / buckets
+        self.buckets = buckets
+        self.decay = decay
+        self.clock = clock
+        self.data = {}  # (group, deployment) -> {bucket index: [count, errors, ttft_ms_sum]}
+        self.cooldowns = {}  # (group, deployment) -> until
+
+    def _current(self):
+        return int(self.clock() // self.width)
+
+    async def record(self, group, deployment, ttft_ms, ok):
+        buckets = self.data.setdefault((group, deployment), {})
+        current = self._current()
+        for index in [index for index in buckets if index <= current - self.buckets]:
+            del buckets[index]
+        bucket = buckets.setdefault(current, [0, 0, 0.0])
+        bucket[0] += 1
+        if ok:
+            bucket[2] += ttft_ms
+        else:
+            bucket[1] += 1
+
+    async def read(self, group, deployments):
+        current = self._current()
+        now = self.clock()
+        result = {}
+        for deployment in deployments:
+            buckets = self.data.get((group, deployment), {})
+            stats = summarize_buckets([buckets.get(index, (0, 0, 0.0))
+                                       for index in range(current - self.buckets + 1, current + 1)], self.decay)
+            stats["cooling"] = self.cooldowns.get((group, deployment), 0) > now
+            result[deployment] = stats
+        return result
+
+    async def cool(self, group, deployment, seconds):
+        self.cooldowns[(group, deployment)] = self.clock() + seconds
+
+
+class RedisWindows:
+    """
+    Windows shared through Redis: one hash per deployment and time bucket,
+    `<namespace>:<group>:<deployment>:<bucket>` (count, errors, ttft sum in
+    ms), expiring with the window, and `<namespace>:<group>:<deployment>:cooldown`.
+    Buckets follow each worker's wall clock.
+    """
+
+    def __init__(self, redis, namespace="routing", window=60.0, buckets=6, decay=0.5, clock=time.time):
+        self.redis = redis
+        self.namespace = namespace
+        self.width = window / buckets
+        self.buckets = buckets
+        self.decay = decay
+        self.clock = clock
+        self.ttl = int(window + self.width) + 1
+
+    def _key(self, group, deployment, suffix):
+        return f"{self.namespace}:{group}:{deployment}:{suffix}"
+
+    async def record(self, group, deployment, ttft_ms, ok):
+        key = self._key(group, deployment, int(self.clock() // self.width))
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hincrby(key, "count", 1)
+        if ok:
+            pipe.hincrbyfloat(key, "ttft", ttft_ms)
+        else:
+            pipe.hincrby(key, "errors", 1)
+        pipe.expire(key, self.ttl)
+        await pipe.execute()
+
+    async def read(self, group, deployments):
+        current = int(self.clock() // self.width)
+        pipe = self.redis.pipeline(transaction=False)
+        for deployment in deployments:
+            for index in range(current - self.buckets + 1, current + 1):
+                pipe.hmget(self._key(group, deployment, index), "count", "errors", "ttft")
+            pipe.exists(self._key(group, deployment, "cooldown"))
+        values = await pipe.execute()
+        result = {}
+        step = self.buckets + 1
+        for position, deployment in enumerate(deployments):
+            chunk = values[position * step:(position + 1) * step]
+            buckets = [(int(count or 0), int(errors or 0), float(ttft or 0)) for count, errors, ttft in chunk[:-1]]
+            stats = summarize_buckets(buckets, self.decay)
+            stats["cooling"] = bool(chunk[-1])
+            result[deployment] = stats
+        return result
+
+    async def cool(self, group, deployment, seconds):
+        await self.redis.set(self._key(group, deployment, "cooldown"), 1, px=max(1, int(seconds * 1000)))
+
+
+def score_deployments(candidates, stats, costs, latency_weight=1.0, cost_weight=0.2, error_penalty=4.0,
+                      min_samples=5, default_ttft_ms=1000.0, in_flight=None):
+    """
+    {deployment: (score, expected ttft ms, explored)}; 1.0 is the best
+    possible score. The score multiplies latency relative to the fastest
+    and cost relative to the cheapest deployment, each raised to its weight:
+    with cost_weight 0.2, twice the price weighs like 15% more latency.
+    Deployments without enough samples count as the median known one and
+    are marked as explored while fewer than min_samples have been sent.
+    `in_flight` holds, per deployment, the ages in ms of the requests sent
+    recently and of those still unanswered. When most requests sent between
+    two and four expected latencies ago (at least two) have no answer yet,
+    the deployment counts as slow as its oldest unanswered request; a few stuck
+    requests among many answered ones are not taken for a slowdown.
+    """
+    known = {name: stats[name]["ttft_ms"] for name in candidates
+             if stats[name]["samples"] >= min_samples and stats[name]["ttft_ms"] is not None}
+    typical = statistics.median(known.values()) if known else default_ttft_ms
+    fastest = max(1.0, min(list(known.values()) + [typical]))
+    priced = {name: costs[name] for name in candidates if costs.get(name) is not None}
+    cheapest = min(priced.values()) if priced else 0.0
+    cost_terms = {name: (cost / cheapest if cheapest > 0 else (1.0 if cost == 0 else 2.0)) for name, cost in priced.items()}
+    typical_cost = statistics.median(cost_terms.values()) if cost_terms else 1.0
+
+    scores = {}
+    in_flight = in_flight or {}
+    for name in candidates:
+        expected = known.get(name, typical)
+        sent, waiting = in_flight.get(name, ((), ()))
+        sent_then = sum(1 for age in sent if 2 * expected < age <= 4 * expected)
+        late = [age for age in waiting if 2 * expected < age <= 4 * expected]
+        slowed = len(late) >= 2 and len(late) * 2 > sent_then
+        if slowed:
+            expected = max(waiting)
+        # probed with the best share until answers plus requests in flight reach min_samples
+        explored = name not in known and not slowed and stats[name]["samples"] + len(waiting) < min_samples
+        score = (max(1.0, expected / fastest) ** latency_weight) * (cost_terms.get(name, typical_cost) ** cost_weight)
+        scores[name] = (score * (1 + error_penalty * stats[name]["error_rate"]), expected, explored)
+    return scores
+
+
+async def hedged(primary, backup, wait, cancelled=None):
+    """
+    Awaits primary(). If it has not finished when wait() returns,
+    backup() is started as well (unless it returns None) and the first
+    successful result wins; the slower call is cancelled after
+    cancelled("primary" | "backup") is told which. Returns (result, winner).
+    A failure is raised only when no call succeeds.
+    """
+    first = asyncio.ensure_future(primary())
+    timer = asyncio.ensure_future(wait())
+    pending = {first, timer}
+    error = None
+    try:
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        timer.cancel()
+        pending = {first}
+        if first in done:
+            return first.result(), "primary"
+        second = backup()
+        if second is None:
+            return await first, "primary"
+        tasks = {first: "primary", asyncio.ensure_future(second): "backup"}
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        if cancelled is not None:
+                            cancelled(tasks[other])
+                        other.cancel()
+                    return task.result(), tasks[task]
+                if tasks[task] == "primary" or error is None:
+                    error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class LatencyCostRouter(CustomRoutingStrategyBase):
+    """
+    The routing strategy: picks deployments from the windows, records
+    outcomes, puts failing deployments on cooldown and decides when to
+    hedge. `install(router)` hands it to a LiteLLM Router.
+    """
+
+    def __init__(self, windows, latency_weight=1.0, cost_weight=0.2, sharpness=4.0, min_samples=5,
+                 default_ttft_ms=1000.0, error_penalty=4.0, cooldown=30.0, cooldown_errors=3,
+                 cooldown_error_rate=0.5, hedge_factor=2.0, hedge_min_ms=500.0, hedge_budget=0.0,
+                 refresh=0.5, request_timeout=600.0, rng=None, clock=time.monotonic):
+        self.windows = windows
+        self.latency_weight = latency_weight
+        self.cost_weight = cost_weight
+        self.sharpness = sharpness
+        self.min_samples = min_samples
+        self.default_ttft_ms = default_ttft_ms
+        self.error_penalty = error_penalty
+        self.cooldown = cooldown
+        self.cooldown_errors = cooldown_errors
+        self.cooldown_error_rate = cooldown_error_rate
+        self.hedge_factor = hedge_factor
+        self.hedge_min_ms = hedge_min_ms
+        self.hedge_budget = hedge_budget
+        self.refresh = refresh
+        self.request_timeout = request_timeout
+        self.rng = rng or random.Random()
+        self.clock = clock
+        self.router = None
+        self.cache = {}  # group -> (read at, {deployment: window})
+        self.requests = 0
+        self.hedges = 0
+        self.counts = {}  # group -> {deployment: {reason: picks}}
+        self.waiting = {}  # (group, deployment) -> {request: sent at}, requests of this process without an answer
+        self.sent = {}  # (group, deployment) -> send times of the last minute
+        self.picked = {}  # request -> event set once its first deployment is chosen
+
+    def _sent(self, group, deployment, state):
+        if state is not None:
+            now = self.clock()
+            self.waiting.setdefault((group, deployment), {})[state["request"]] = now
+            sent = self.sent.setdefault((group, deployment), deque())
+            sent.append(now)
+            while sent[0] < now - 60:
+                sent.popleft()
+
+    def _answered(self, group, deployment, state):
+        if state is not None:
+            self.waiting.get((group, deployment), {}).pop(state["request"], None)
+
+    def in_flight(self, group, deployment):
+        """Ages in ms of the requests sent to `deployment` in the last minute, and of those without an answer."""
+        requests = self.waiting.get((group, deployment)) or {}
+        now = self.clock()
+        for request, started in list(requests.items()):
+            if now - started > self.request_timeout:  # its outcome was never logged
+                del requests[request]
+        return ([(now - sent) * 1000 for sent in self.sent.get((group, deployment), ())],
+                [(now - started) * 1000 for started in requests.values()])
+
+    async def window(self, group, names):
+        """Windows of `names`, read from the store at most every `refresh` seconds per group."""
+        cached = self.cache.get(group)
+        now = self.clock()
+        if cached is not None and now - cached[0] < self.refresh and all(name in cached[1] for name in names):
+            return cached[1]
+        stats = await self.windows.read(group, names)
+        self.cache[group] = (now, stats)
+        if Gauge is not None:
+            for name, window in stats.items():
+                if window["ttft_ms"] is not None:
+                    WINDOW_TTFT.labels(group, name).set(window["ttft_ms"])
+                WINDOW_ERROR_RATE.labels(group, name).set(window["error_rate"])
+        return stats
+
+    def _empty(self, names):
+        return {name: summarize_buckets([]) for name in names}
+
+    def pick(self, group, deployments, stats, exclude=()):
+        """(deployment, expected ttft ms, reason) or None when every deployment is excluded."""
+        named = {deployment_id(deployment): deployment for deployment in deployments}
+        candidates = [name for name in named if name not in exclude]
+        if not candidates:
+            return None
+        healthy = [name for name in candidates if not stats[name]["cooling"]]
+        reason = "score" if healthy else "all_cooling"
+        candidates = healthy or candidates
+        scores = score_deployments(candidates, stats, {name: deployment_cost(named[name]) for name in candidates},
+                                   self.latency_weight, self.cost_weight, self.error_penalty, self.min_samples,
+                                   self.default_ttft_ms, {name: self.in_flight(group, name) for name in candidates})
+        weights = [scores[name][0] ** -self.sharpness for name in candidates]
+        # deployments still short of samples get the best share until they have enough,
+        # so a slow start or an expired window does not starve them
+        best = max((weight for name, weight in zip(candidates, weights) if not scores[name][2]), default=None)
+        if best is not None:
+            weights = [best if scores[name][2] else weight for name, weight in zip(candidates, weights)]
+        name = self.rng.choices(candidates, weights)[0]
+        if reason == "score" and scores[name][2]:
+            reason = "explore"
+        if exclude:
+            reason = "hedge"
+
+        picks = self.counts.setdefault(group, {}).setdefault(name, {})
+        picks[reason] = picks.get(reason, 0) + 1
+        if Counter is not None:
+            DECISIONS.labels(group, name, reason).inc()
+            total = sum(weights)
+            for candidate, weight in zip(candidates, weights):
+                WINDOW_WEIGHT.labels(group, candidate).set(weight / total)
+        return named[name], scores[name][1], reason
+
+    async def choose(self, group, deployments, exclude=()):
+        stats = await self.window(group, [deployment_id(deployment) for deployment in deployments])
+        return self.pick(group, deployments, stats, exclude)
+
+    async def record(self, group, deployment, ttft_seconds, ok, state=None):
+        """Adds one outcome to the deployment's window; enough failures start a cooldown."""
+        self._answered(group, deployment, state)
+        await self.windows.record(group, deployment, ttft_seconds * 1000, ok)
+        if ok:
+            return
+        stats = (await self.windows.read(group, [deployment]))[deployment]
+        if (not stats["cooling"] and stats["errors"] >= self.cooldown_errors
+                and stats["error_rate"] >= self.cooldown_error_rate):
+            await self.windows.cool(group, deployment, self.cooldown)
+            self.cache.pop(group, None)
+            log.warning("Routing: %s/%s on cooldown for %.0fs (%d of %d requests failed)", group, deployment,
+                        self.cooldown, stats["errors"], stats["count"])
+            if Counter is not None:
+                COOLDOWNS.labels(group, deployment).inc()
+
+    def hedge_delay(self, expected_ms):
+        return max(self.hedge_min_ms, self.hedge_factor * (expected_ms or self.default_ttft_ms)) / 1000
+
+    def allow_hedge(self, group, deployments, tried):
+        """A hedge needs an untried deployment that is not cooling down, and room in the budget."""
+        if self.hedges + 1 > self.hedge_budget * self.requests:
+            return False
+        stats = (self.cache.get(group) or (0, {}))[1]
+        return any(deployment_id(deployment) not in tried and not stats.get(deployment_id(deployment), {}).get("cooling")
+                   for deployment in deployments)
+
+    def hedge_done(self, group, winner):
+        if Counter is not None:
+            HEDGES.labels(group, winner).inc()
+
+    # LiteLLM Router interface
+
+    def _deployments(self, model, specific_deployment):
+        deployments = self.router.get_model_list(model_name=model) or []
+        if not deployments and specific_deployment:
+            deployments = [deployment for deployment in self.router.get_model_list() or []
+                           if deployment_id(deployment) == model
+                           or (deployment.get("litellm_params") or {}).get("model") == model]
+        if not deployments:
+            raise ValueError(f"No deployments available for model {model}")
+        return deployments
+
+    def _select(self, model, deployments, stats, request_kwargs):
+        state = ((request_kwargs or {}).get("metadata") or {}).get("routing_hedge")
+        picked = self.pick(model, deployments, stats, state["tried"] if state else ())
+        if picked is None:
+            raise ValueError(f"No untried deployment left for model {model}")
+        deployment, expected, _ = picked
+        if state is not None:
+            state["tried"].append(deployment_id(deployment))
+            self._sent(model, deployment_id(deployment), state)
+            state["expected_ms"] = state["expected_ms"] or expected
+            if state["request"] in self.picked:
+                self.picked[state["request"]].set()
+        return deployment
+
+    async def async_get_available_deployment(self, model, messages=None, input=None, specific_deployment=False,
+                                             request_kwargs=None):
+        deployments = self._deployments(model, specific_deployment)
+        stats = await self.window(model, [deployment_id(deployment) for deployment in deployments])
+        return self._select(model, deployments, stats, request_kwargs)
+
+    def get_available_deployment(self, model, messages=None, input=None, specific_deployment=False,
+                                 request_kwargs=None):
+        # synchronous callers route on the last windows read, without a Redis round trip
+        deployments = self._deployments(model, specific_deployment)
+        names = [deployment_id(deployment) for deployment in deployments]
+        stats = {**self._empty(names), **(self.cache.get(model) or (0, {}))[1]}
+        return self._select(model, deployments, stats, request_kwargs)
+
+    def install(self, router):
+        """Routes `router` through this strategy and hedges its async completions. Idempotent."""
+        if getattr(router, "_latency_cost_routing", None) is self:
+            return
+        router.set_custom_routing_strategy(self)
+        original = router._acompletion
+
+        async def _acompletion(model, messages, **kwargs):
+            self.requests += 1
+            state = {"request": uuid.uuid4().hex, "tried": [], "expected_ms": None, "cancelled": []}
+            metadata = kwargs.pop("metadata", None) or {}
+
+            def call():
+                # the router writes the chosen deployment into metadata, so each call gets its own copy
+                return original(model, messages, metadata={**metadata, "routing_hedge": state}, **kwargs)
+
+            def backup():
+                if not self.allow_hedge(model, router.get_model_list(model_name=model) or [], state["tried"]):
+                    return None
+                self.hedges += 1
+                return call()
+
+            async def wait():
+                # the hedge delay follows the expected TTFT of the primary's deployment
+                await picked.wait()
+                await asyncio.sleep(self.hedge_delay(state["expected_ms"]))
+
+            def cancelled(which):
+                index = 0 if which == "primary" else 1
+                if len(state["tried"]) > index:
+                    state["cancelled"].append(state["tried"][index])
+                    self._answered(model, state["tried"][index], state)
+
+            picked = self.picked[state["request"]] = asyncio.Event()
+            try:
+                result, winner = await hedged(call, backup, wait, cancelled)
+            finally:
+                del self.picked[state["request"]]
+            if len(state["tried"]) > 1:
+                self.hedge_done(model, winner)
+            return result
+
+        router._acompletion = _acompletion
+        router._latency_cost_routing = self
+        self.router = router
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "picks": self.counts,
+            "windows": {group: stats for group, (_, stats) in self.cache.items()},
+        }
+
+
+def router_from_env(env=os.environ, redis=None):
+    window = float(env.get("ROUTING_WINDOW", "60"))
+    buckets = int(env.get("ROUTING_BUCKETS", "6"))
+    decay = float(env.get("ROUTING_DECAY", "0.5"))
+    if redis is None and env.get("ROUTING_BACKEND", "redis") == "redis":
+        import redis.asyncio as aioredis
+
+        redis = aioredis.Redis(host=env.get("REDIS_HOST", "litellm-redis"), port=int(env.get("REDIS_PORT", "6379")))
+    if redis is not None:
+        windows = RedisWindows(redis, env.get("ROUTING_NAMESPACE", "routing"), window, buckets, decay)
+    else:
+        windows = LocalWindows(window, buckets, decay)
+    return LatencyCostRouter(
+        windows,
+        latency_weight=float(env.get("ROUTING_LATENCY_WEIGHT", "1.0")),
+        cost_weight=float(env.get("ROUTING_COST_WEIGHT", "0.2")),
+        sharpness=float(env.get("ROUTING_SHARPNESS", "4")),
+        min_samples=int(env.get("ROUTING_MIN_SAMPLES", "5")),
+        cooldown=float(env.get("ROUTING_COOLDOWN", "30")),
+        cooldown_errors=int(env.get("ROUTING_COOLDOWN_ERRORS", "3")),
+        cooldown_error_rate=float(env.get("ROUTING_COOLDOWN_ERROR_RATE", "0.5")),
+        hedge_factor=float(env.get("ROUTING_HEDGE_FACTOR", "2.0")),
+        hedge_min_ms=float(env.get("ROUTING_HEDGE_MIN_MS", "500")),
+        hedge_budget=float(env.get("ROUTING_HEDGE_BUDGET", "0")),
+        refresh=float(env.get("ROUTING_REFRESH", "0.5")),
+    )
+
+
+def callback_outcome(kwargs, start_time, end_time):
+    """(model group, deployment, seconds to first token) of a logged request, or None."""
+    params = kwargs.get("litellm_params") or {}
+    metadata = params.get("metadata") or {}
+    group = metadata.get("model_group")
+    model_info = params.get("model_info") or {}
+    if not group or not model_info.get("id"):
+        return None
+    if str(model_info["id"]) in ((metadata.get("routing_hedge") or {}).get("cancelled") or []):
+        return None  # cancelled by a faster hedge, not a failure of the deployment
+    first = kwargs.get("completion_start_time") or end_time
+    try:
+        seconds = (first - start_time).total_seconds()
+    except (TypeError, AttributeError):
+        seconds = 0.0
+    return group, str(model_info["id"]), max(0.0, seconds)
+
+
+class RoutingHandler(CustomLogger):
+    def __init__(self, router=None, enabled=True):
+        super().__init__()
+        self.router = router
+        self.enabled = enabled
+
+    def _router(self):
+        # created lazily: the Redis client belongs to the proxy's loop
+        if self.router is None:
+            self.router = router_from_env()
+        return self.router
+
+    async def async_pre_call_hook(self, user_api_key_dict, cache, data, call_type):
+        if self.enabled:
+            from litellm.proxy import proxy_server
+
+            # the proxy rebuilds its router when the model list changes, so check every request
+            if proxy_server.llm_router is not None:
+                self._router().install(proxy_server.llm_router)
+        return data
+
+    async def _record(self, kwargs, start_time, end_time, ok):
+        outcome = callback_outcome(kwargs, start_time, end_time)
+        if outcome is None or not self.enabled:
+            return
+        try:
+            state = ((kwargs.get("litellm_params") or {}).get("metadata") or {}).get("routing_hedge")
+            await self._router().record(*outcome, ok, state)
+        except Exception as e:  # routing falls back to older windows
+            log.warning("Recording routing window failed: %s", e)
+
+    async def async_log_success_event(self, kwargs, response_obj, start_time, end_time):
+        await self._record(kwargs, start_time, end_time, True)
+
+    async def async_log_failure_event(self, kwargs, response_obj, start_time, end_time):
+        await self._record(kwargs, start_time, end_time, False)
+
+
+if CustomLogger is not object:
+    proxy_handler_instance = RoutingHandler(enabled=os.getenv("ROUTING_ENABLED", "false").lower() == "true")
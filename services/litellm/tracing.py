@@ -0,0 +1,185 @@
+"""
+OpenTelemetry spans for LiteLLM requests, parented to the caller's trace.
+
+Loaded as `tracing.proxy_handler_instance` from config.yaml and inert unless
+TRACING_ENABLED=true. For every request that arrives with a sampled W3C
+`traceparent` header (set by Traefik and OpenWebUI when tracing is on) it
+exports, from the timestamps LiteLLM already records:
+
+- `litellm.request`  server span for the whole request, with a `first_byte`
+  event when the first token went out
+- `litellm.pre_call` auth, routing and cache lookup before the model call
+- `upstream` / `cache` the model call (client span, peer.service=upstream)
+  with a `first_token` event, or the cache hit that replaced it
+
+so `scripts/trace_report.py` can split time-to-first-byte between the
+router and the model. Requests without a traceparent are traced at
+TRACING_UNPARENTED_RATE (default 0).
+"""
+import hashlib
+import logging
+import os
+import re
+import secrets
+from datetime import datetime
+
+try:
+    from litellm.integrations.custom_logger import CustomLogger
+except ImportError:  # offline tests import the span helpers without LiteLLM
+    CustomLogger = object
+
+log = logging.getLogger("tracing")
+
+TRACEPARENT = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+def parse_traceparent(value):
+    """
+    (trace_id, parent_span_id, sampled) from a W3C traceparent header, or
+    None if it is missing or malformed.
+    """
+    match = TRACEPARENT.match((value or "").strip().lower())
+    if not match or match.group(2) == "0" * 32 or match.group(3) == "0" * 16:
+        return None
+    return match.group(2), match.group(3), bool(int(match.group(4), 16) & 1)
+
+
+def request_headers(kwargs):
+    litellm_params = kwargs.get("litellm_params") or {}
+    for headers in (
+        (litellm_params.get("metadata") or {}).get("headers"),
+        (litellm_params.get("proxy_server_request") or {}).get("headers"),
+        (kwargs.get("proxy_server_request") or {}).get("headers"),
+    ):
+        if headers:
+            return {key.lower(): value for key, value in headers.items()}
+    return {}
+
+
+def to_ns(value):
+    """datetime or epoch seconds -> epoch nanoseconds."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        value = value.timestamp()
+    return int(float(value) * 1e9)
+
+
+def unparented_sampled(call_id, rate):
+    if rate >= 1:
+        return True
+    if rate <= 0 or not call_id:
+        return False
+    return int.from_bytes(hashlib.blake2b(str(call_id).encode(), digest_size=8).digest(), "big") / 2**64 < rate
+
+
+def request_spans(kwargs, start_time, end_time, failed):
+    """
+    Span descriptions (name, kind, start/end ns, attributes, events) for one
+    request, from the standard logging payload with raw-kwargs fallbacks.
+    """
+    payload = kwargs.get("standard_logging_object") or {}
+    start = to_ns(payload.get("startTime")) or to_ns(start_time)
+    end = to_ns(payload.get("endTime")) or to_ns(end_time)
+    first_token = to_ns(payload.get("completionStartTime")) or to_ns(kwargs.get("completion_start_time"))
+    api_start = to_ns(kwargs.get("api_call_start_time"))
+    cache_hit = bool(payload.get("cache_hit") if "cache_hit" in payload else kwargs.get("cache_hit"))
+    model = payload.get("model") or kwargs.get("model")
+    attributes = {
+        "gen_ai.request.model": model or "",
+        "litellm.call_id": payload.get("id") or kwargs.get("litellm_call_id") or "",
+        "litellm.cache_hit": cache_hit,
+        "litellm.stream": bool(kwargs.get("stream")),
+        "error": failed,
+    }
+    if payload.get("api_base"):
+        attributes["server.address"] = payload["api_base"]
+    first_byte = [("first_byte", first_token)] if first_token and not failed else []
+    spans = [{"name": "litellm.request", "kind": "server", "start": start, "end": end,
+              "attributes": attributes, "events": first_byte}]
+    if api_start and start <= api_start <= end:
+        spans.append({"name": "litellm.pre_call", "kind": "internal", "start": start, "end": api_start,
+                      "attributes": {"litellm.cache_hit": cache_hit}, "events": []})
+        spans.append({
+            "name": "cache" if cache_hit else "upstream",
+            "kind": "internal" if cache_hit else "client",
+            "start": api_start,
+            "end": end,
+            "attributes": {} if cache_hit else {"peer.service": "upstream", "gen_ai.request.model": model or ""},
+            "events": [("first_token", first_token)] if first_token and not failed else [],
+        })
+    return spans
+
+
+def tracer_from_env(env=os.environ):
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    endpoint = env.get("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT") or \
+        env.get("OTEL_EXPORTER_OTLP_ENDPOINT", "http://otel-collector:4318").rstrip("/") + "/v1/traces"
+    provider = TracerProvider(resource=Resource.create({"service.name": env.get("OTEL_SERVICE_NAME", "litellm")}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint)))
+    return provider.get_tracer("apukone.litellm")
+
+
+class TracingHandler(CustomLogger):
+    def __init__(self, tracer=None, unparented_rate=0.0):
+        super().__init__()
+        self.tracer = tracer
+        self.unparented_rate = unparented_rate
+
+    def export(self, kwargs, start_time, end_time, failed):
+        from opentelemetry import trace
+        from opentelemetry.trace import NonRecordingSpan, SpanContext, SpanKind, TraceFlags
+
+        parent = parse_traceparent(request_headers(kwargs).get("traceparent"))
+        if parent is None:
+            if not unparented_sampled(kwargs.get("litellm_call_id"), self.unparented_rate):
+                return
+            parent = (secrets.token_hex(16), secrets.token_hex(8), True)
+        trace_id, span_id, sampled = parent
+        if not sampled:
+            return
+        context = trace.set_span_in_context(NonRecordingSpan(SpanContext(
+            int(trace_id, 16), int(span_id, 16), is_remote=True, trace_flags=TraceFlags(TraceFlags.SAMPLED))))
+        kinds = {"server": SpanKind.SERVER, "client": SpanKind.CLIENT, "internal": SpanKind.INTERNAL}
+
+        spans = request_spans(kwargs, start_time, end_time, failed)
+        root = None
+        for description in spans:
+            span = self.tracer.start_span(description["name"], context=context, kind=kinds[description["kind"]],
+                                          attributes=description["attributes"], start_time=description["start"])
+            for name, timestamp in description["events"]:
+                span.add_event(name, timestamp=timestamp)
+            if description["attributes"].get("error"):
+                span.set_status(trace.Status(trace.StatusCode.ERROR))
+            span.end(end_time=description["end"])
+            if root is None:
+                root = span
+                context = trace.set_span_in_context(root)
+
+    async def async_log_success_event(self, kwargs, response_obj, start_time, end_time):
+        self._safe_export(kwargs, start_time, end_time, failed=False)
+
+    async def async_log_failure_event(self, kwargs, response_obj, start_time, end_time):
+        self._safe_export(kwargs, start_time, end_time, failed=True)
+
+    def _safe_export(self, kwargs, start_time, end_time, failed):
+        if self.tracer is None:
+            return
+        try:
+            self.export(kwargs, start_time, end_time, failed)
+        except Exception as e:  # tracing must never fail a request
+            log.warning("Exporting request spans failed: %s", e)
+
+
+def handler_from_env(env=os.environ):
+    if env.get("TRACING_ENABLED", "false").lower() != "true":
+        return TracingHandler()
+    return TracingHandler(tracer_from_env(env), float(env.get("TRACING_UNPARENTED_RATE", "0")))
+
+
+if CustomLogger is not object:
+    proxy_handler_instance = handler_from_env()
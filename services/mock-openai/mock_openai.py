@@ -0,0 +1,245 @@
+"""
+Deterministic OpenAI-compatible mock upstream for benchmarks.
+
+Serves /v1/chat/completions (plain and SSE streaming), /v1/embeddings and
+/v1/models. Output is derived from a hash of the request, so the same prompt
+always yields the same tokens and vectors. Streaming pace, first-token
+latency, embedding latency and an injected error rate are configurable, which
+makes the gateway the only variable when comparing LiteLLM settings.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import struct
+import time
+
+from aiohttp import web
+
+WORDS = (
+    "the quick brown fox jumps over a lazy dog while seven wizards quietly "
+    "box jumping frogs and zealous pilots mix vivid juice in glass jars"
+).split()
+
+
+def _digest(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).digest()
+
+
+def completion_tokens(messages, count):
+    """
+    Deterministic list of `count` tokens for a conversation.
+    """
+    rng = random.Random(_digest(messages))
+    return [rng.choice(WORDS) + " " for _ in range(count)]
+
+
+def embedding_vector(text, dim):
+    """
+    Deterministic unit-length vector for `text`.
+    """
+    seed = _digest(text)
+    values = []
+    counter = 0
+    while len(values) < dim:
+        block = hashlib.sha256(seed + counter.to_bytes(4, "little")).digest()
+        values.extend(v / 2**31 for v in struct.unpack("<8i", block))
+        counter += 1
+    values = values[:dim]
+    norm = sum(v * v for v in values) ** 0.5 or 1.0
+    return [round(v / norm, 6) for v in values]
+
+
+def _count_prompt_tokens(messages):
+    return sum(len(str(message.get("content", "")).split()) for message in messages)
+
+
+class MockOpenAI:
+    def __init__(self, token_rate=50.0, first_token_ms=100.0, completion_tokens=64, embedding_dim=256,
+                 embedding_ms=20.0, error_rate=0.0, seed=0, name="mock", embedding_input_ms=0.0,
+                 embedding_concurrency=0):
+        self.token_rate = token_rate
+        self.first_token_ms = first_token_ms
+        self.completion_tokens = completion_tokens
+        self.embedding_dim = embedding_dim
+        self.embedding_ms = embedding_ms
+        self.embedding_input_ms = embedding_input_ms
+        # 0: unlimited; otherwise requests beyond this many queue like at a provider
+        self.embedding_slots = asyncio.Semaphore(embedding_concurrency) if embedding_concurrency else None
+        self.error_rate = error_rate
+        self.name = name
+        self.random = random.Random(seed)
+        self.stats = {"chat": 0, "embeddings": 0, "embedding_inputs": 0, "errors": 0}
+        self.base_url = None
+        self._runner = None
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.chat)
+        app.router.add_post("/chat/completions", self.chat)
+        app.router.add_post("/v1/embeddings", self.embeddings)
+        app.router.add_post("/embeddings", self.embeddings)
+        app.router.add_get("/v1/models", self.models)
+        app.router.add_get("/health", self.health)
+        return app
+
+    async def start(self, host="127.0.0.1", port=0):
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    def _maybe_fail(self):
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.stats["errors"] += 1
+            status = self.random.choice((429, 500, 503))
+            headers = {"Retry-After": "1"} if status == 429 else {}
+            return web.json_response(
+                {"error": {"message": f"mock upstream error {status}", "type": "mock_error", "code": status}},
+                status=status, headers=headers,
+            )
+        return None
+
+    async def health(self, request):
+        return web.json_response({"status": "ok", "name": self.name, **self.stats})
+
+    async def models(self, request):
+        return web.json_response({
+            "object": "list",
+            "data": [
+                {"id": "mock-gpt", "object": "model", "owned_by": self.name},
+                {"id": "mock-embedding", "object": "model", "owned_by": self.name},
+            ],
+        })
+
+    async def chat(self, request):
+        body = await request.json()
+        self.stats["chat"] += 1
+        failure = self._maybe_fail()
+        if failure is not None:
+            return failure
+
+        messages = body.get("messages", [])
+        count = int(body.get("max_tokens") or body.get("max_completion_tokens") or self.completion_tokens)
+        tokens = completion_tokens(messages, min(count, self.completion_tokens))
+        model = body.get("model", "mock-gpt")
+        completion_id = "chatcmpl-" + _digest(messages, model).hex()[:24]
+        created = int(time.time())
+        usage = {
+            "prompt_tokens": _count_prompt_tokens(messages),
+            "completion_tokens": len(tokens),
+            "total_tokens": _count_prompt_tokens(messages) + len(tokens),
+        }
+
+        if not body.get("stream"):
+            await asyncio.sleep(self.first_token_ms / 1000 + max(len(tokens) - 1, 0) / self.token_rate)
+            return web.json_response({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+
+        def chunk(delta, finish_reason=None):
+            return {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+
+        started = time.perf_counter()
+        for index, token in enumerate(tokens):
+            # Absolute schedule so the stream rate does not drift under load
+            due = started + self.first_token_ms / 1000 + index / self.token_rate
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            delta = {"role": "assistant", "content": token} if index == 0 else {"content": token}
+            await response.write(f"data: {json.dumps(chunk(delta))}\n\n".encode())
+
+        final = chunk({}, "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            final["usage"] = usage
+        await response.write(f"data: {json.dumps(final)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def embeddings(self, request):
+        body = await request.json()
+        inputs = body.get("input", [])
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        self.stats["embeddings"] += 1
+        self.stats["embedding_inputs"] += len(inputs)
+        failure = self._maybe_fail()
+        if failure is not None:
+            return failure
+
+        if self.embedding_slots is not None:
+            async with self.embedding_slots:
+                await asyncio.sleep((self.embedding_ms + self.embedding_input_ms * len(inputs)) / 1000)
+        else:
+            await asyncio.sleep((self.embedding_ms + self.embedding_input_ms * len(inputs)) / 1000)
+        dim = int(body.get("dimensions") or self.embedding_dim)
+        prompt_tokens = sum(len(str(text).split()) for text in inputs)
+        return web.json_response({
+            "object": "list",
+            "model": body.get("model", "mock-embedding"),
+            "data": [
+                {"object": "embedding", "index": index, "embedding": embedding_vector(text, dim)}
+                for index, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic OpenAI-compatible mock upstream.")
+    parser.add_argument("--host", default=os.getenv("MOCK_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("MOCK_PORT", "8000")))
+    parser.add_argument("--token-rate", type=float, default=float(os.getenv("MOCK_TOKEN_RATE", "50")),
+                        help="streamed tokens per second")
+    parser.add_argument("--first-token-ms", type=float, default=float(os.getenv("MOCK_FIRST_TOKEN_MS", "100")))
+    parser.add_argument("--completion-tokens", type=int, default=int(os.getenv("MOCK_COMPLETION_TOKENS", "64")))
+    parser.add_argument("--embedding-dim", type=int, default=int(os.getenv("MOCK_EMBEDDING_DIM", "256")))
+    parser.add_argument("--embedding-ms", type=float, default=float(os.getenv("MOCK_EMBEDDING_MS", "20")))
+    parser.add_argument("--embedding-input-ms", type=float, default=float(os.getenv("MOCK_EMBEDDING_INPUT_MS", "0")),
+                        help="extra latency per input of an embeddings request")
+    parser.add_argument("--embedding-concurrency", type=int, default=int(os.getenv("MOCK_EMBEDDING_CONCURRENCY", "0")),
+                        help="embeddings requests served at once; 0 for unlimited")
+    parser.add_argument("--error-rate", type=float, default=float(os.getenv("MOCK_ERROR_RATE", "0")))
+    parser.add_argument("--seed", type=int, default=int(os.getenv("MOCK_SEED", "0")))
+    parser.add_argument("--name", default=os.getenv("MOCK_NAME", "mock"))
+    args = parser.parse_args()
+
+    mock = MockOpenAI(args.token_rate, args.first_token_ms, args.completion_tokens, args.embedding_dim,
+                      args.embedding_ms, args.error_rate, args.seed, args.name, args.embedding_input_ms,
+                      args.embedding_concurrency)
+    print(f"Mock OpenAI upstream '{args.name}' on {args.host}:{args.port} "
+          f"({args.token_rate} tok/s, first token {args.first_token_ms}ms)", flush=True)
+    web.run_app(mock.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
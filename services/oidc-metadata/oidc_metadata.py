@@ -0,0 +1,288 @@
+"""
+OIDC metadata and JWKS cache for the Apukone stack.
+
+Replaces the static nginx config-server. Serves per-provider discovery
+documents derived from the rendered OpenWebUI template and proxies
+/application/o/<slug>/jwks/ to Authentik with a TTL cache:
+
+- concurrent misses for the same key set share one upstream fetch
+- entries are refreshed in the background before they expire
+- upstream ETag / Cache-Control are honoured (If-None-Match revalidation)
+- if Authentik is unavailable the last good key set keeps being served
+
+so token validation in OpenWebUI, LiteLLM and Windmill does not depend on
+Authentik answering every key fetch during a login burst.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+
+import aiohttp
+from aiohttp import web
+
+log = logging.getLogger("oidc-metadata")
+
+DEFAULT_UPSTREAM = "http://apukone-authentik-server:9000"
+DEFAULT_PROVIDERS = "openwebui,litellm,windmill"
+TEMPLATE_SLUG = "openwebui"
+
+
+def _etag(body):
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def parse_max_age(cache_control):
+    """
+    max-age from a Cache-Control header; 0 for no-store/no-cache, None if absent.
+    """
+    if not cache_control:
+        return None
+    directives = [part.strip().lower() for part in cache_control.split(",")]
+    if "no-store" in directives or "no-cache" in directives:
+        return 0
+    for directive in directives:
+        match = re.match(r"max-age=(\d+)", directive)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+class JwksCache:
+    """
+    TTL cache of upstream JWKS documents keyed by provider slug.
+    """
+
+    def __init__(self, session, upstream, default_ttl=300, min_ttl=30, max_ttl=3600, refresh_ahead=0.2,
+                 stale_while_revalidate=60, stale_if_error=86400, error_retry=10, clock=time.monotonic):
+        self.session = session
+        self.upstream = upstream.rstrip("/")
+        self.default_ttl = default_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.refresh_ahead = refresh_ahead
+        self.stale_while_revalidate = stale_while_revalidate
+        self.stale_if_error = stale_if_error
+        self.error_retry = error_retry
+        self.clock = clock
+        self.entries = {}
+        self.inflight = {}
+        self.stats = {"hits": 0, "misses": 0, "stale_served": 0, "fetches": 0, "revalidated": 0, "upstream_errors": 0}
+
+    def url(self, slug):
+        return f"{self.upstream}/application/o/{slug}/jwks/"
+
+    def _ttl(self, cache_control):
+        max_age = parse_max_age(cache_control)
+        ttl = self.default_ttl if max_age is None else max_age
+        return max(self.min_ttl, min(self.max_ttl, ttl))
+
+    async def _fetch(self, slug):
+        entry = self.entries.get(slug)
+        headers = {"Accept": "application/json"}
+        if entry and entry.get("upstream_etag"):
+            headers["If-None-Match"] = entry["upstream_etag"]
+        self.stats["fetches"] += 1
+        try:
+            async with self.session.get(self.url(slug), headers=headers) as resp:
+                now = self.clock()
+                if resp.status == 304 and entry:
+                    self.stats["revalidated"] += 1
+                    entry["expires_at"] = now + self._ttl(resp.headers.get("Cache-Control"))
+                    entry["fetched_at"] = now
+                    entry.pop("stale_since", None)
+                    return entry
+                if resp.status != 200:
+                    raise aiohttp.ClientResponseError(resp.request_info, resp.history, status=resp.status)
+                body = await resp.read()
+                json.loads(body)  # refuse to cache a broken key set
+                entry = {
+                    "body": body,
+                    "etag": _etag(body),
+                    "upstream_etag": resp.headers.get("ETag"),
+                    "fetched_at": now,
+                    "expires_at": now + self._ttl(resp.headers.get("Cache-Control")),
+                }
+                self.entries[slug] = entry
+                return entry
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            self.stats["upstream_errors"] += 1
+            now = self.clock()
+            stale_since = entry.get("stale_since", entry["expires_at"]) if entry else None
+            if entry and now - stale_since < self.stale_if_error:
+                log.warning("JWKS refresh for %s failed (%s), serving stale key set", slug, e)
+                self.stats["stale_served"] += 1
+                # callers get the stale set at once until the retry; stale_if_error still counts from the first expiry
+                entry["stale_since"] = stale_since
+                entry["expires_at"] = now + self.error_retry
+                return entry
+            raise
+
+    def _refresh(self, slug):
+        """
+        Starts (or joins) the single upstream fetch for `slug`.
+        """
+        task = self.inflight.get(slug)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(slug))
+            self.inflight[slug] = task
+
+            def done(finished):
+                self.inflight.pop(slug, None)
+                if not finished.cancelled() and finished.exception():
+                    log.debug("JWKS fetch for %s failed: %s", slug, finished.exception())
+
+            task.add_done_callback(done)
+        return task
+
+    async def get(self, slug):
+        entry = self.entries.get(slug)
+        now = self.clock()
+        if entry and now < entry["expires_at"]:
+            self.stats["hits"] += 1
+            return entry
+        if entry and now < entry["expires_at"] + self.stale_while_revalidate:
+            # Just expired: answer from cache and revalidate in the background
+            self.stats["stale_served"] += 1
+            self._refresh(slug)
+            return entry
+        self.stats["misses"] += 1
+        return await asyncio.shield(self._refresh(slug))
+
+    async def refresh_due(self):
+        """
+        Refreshes entries that are within `refresh_ahead` of their TTL so
+        clients rarely wait on a miss.
+        """
+        now = self.clock()
+        due = []
+        for slug, entry in self.entries.items():
+            ttl = entry["expires_at"] - entry["fetched_at"]
+            if entry["expires_at"] - now <= ttl * self.refresh_ahead:
+                due.append(self._refresh(slug))
+        for result in await asyncio.gather(*due, return_exceptions=True):
+            if isinstance(result, Exception):
+                log.warning("Background JWKS refresh failed: %s", result)
+        return len(due)
+
+
+def load_discovery(config_dir, base_domain):
+    """
+    The rendered OpenWebUI discovery document, or the template rendered on the
+    fly if scripts/configure.py has not produced it yet.
+    """
+    rendered = os.path.join(config_dir, "openid-configuration.json")
+    if os.path.exists(rendered):
+        with open(rendered, encoding="utf-8") as f:
+            return f.read()
+    with open(rendered + ".template", encoding="utf-8") as f:
+        return f.read().replace("{{BASE_DOMAIN}}", base_domain)
+
+
+def provider_discovery(discovery_text, slug, public_url):
+    """
+    Discovery document for `slug`, with jwks_uri pointing at this cache.
+    """
+    document = json.loads(discovery_text.replace(f"/application/o/{TEMPLATE_SLUG}/", f"/application/o/{slug}/"))
+    document["jwks_uri"] = f"{public_url.rstrip('/')}/application/o/{slug}/jwks/"
+    return document
+
+
+class MetadataServer:
+    def __init__(self, discovery_text, providers, upstream, public_url, refresh_interval=15, **cache_options):
+        self.discovery_text = discovery_text
+        self.providers = providers
+        self.upstream = upstream
+        self.public_url = public_url
+        self.refresh_interval = refresh_interval
+        self.cache_options = cache_options
+        self.cache = None
+        self.documents = {
+            slug: json.dumps(provider_discovery(discovery_text, slug, public_url), indent=2).encode()
+            for slug in providers
+        }
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/openid-configuration.json", self.legacy_discovery)
+        app.router.add_get("/application/o/{slug}/.well-known/openid-configuration", self.discovery)
+        app.router.add_get("/application/o/{slug}/jwks/", self.jwks)
+        app.router.add_get("/health", self.health)
+        app.cleanup_ctx.append(self._lifecycle)
+        return app
+
+    async def _lifecycle(self, app):
+        session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5))
+        self.cache = JwksCache(session, self.upstream, **self.cache_options)
+        refresher = asyncio.create_task(self._refresh_loop())
+        yield
+        refresher.cancel()
+        await session.close()
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.cache.refresh_due()
+
+    def _respond(self, request, body, etag, max_age):
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={max(int(max_age), 0)}"}
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=body, content_type="application/json", headers=headers)
+
+    def _slug(self, request):
+        slug = request.match_info["slug"]
+        if slug not in self.providers:
+            raise web.HTTPNotFound(text=f"unknown provider '{slug}'")
+        return slug
+
+    async def legacy_discovery(self, request):
+        body = self.documents[TEMPLATE_SLUG] if TEMPLATE_SLUG in self.documents else next(iter(self.documents.values()))
+        return self._respond(request, body, _etag(body), 300)
+
+    async def discovery(self, request):
+        body = self.documents[self._slug(request)]
+        return self._respond(request, body, _etag(body), 300)
+
+    async def jwks(self, request):
+        slug = self._slug(request)
+        try:
+            entry = await self.cache.get(slug)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            raise web.HTTPBadGateway(text=f"JWKS upstream unavailable: {e}")
+        return self._respond(request, entry["body"], entry["etag"], entry["expires_at"] - self.cache.clock())
+
+    async def health(self, request):
+        cached = {
+            slug: round(entry["expires_at"] - self.cache.clock(), 1) for slug, entry in self.cache.entries.items()
+        }
+        return web.json_response({"status": "ok", "stats": self.cache.stats, "ttl_remaining": cached})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OIDC discovery and JWKS cache.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "80")))
+    parser.add_argument("--config-dir", default=os.getenv("OIDC_CONFIG_DIR", "/config"))
+    parser.add_argument("--upstream", default=os.getenv("AUTHENTIK_INTERNAL_URL", DEFAULT_UPSTREAM))
+    parser.add_argument("--public-url", default=os.getenv("PUBLIC_URL", "http://config-server"))
+    parser.add_argument("--providers", default=os.getenv("OIDC_PROVIDERS", DEFAULT_PROVIDERS))
+    parser.add_argument("--ttl", type=int, default=int(os.getenv("JWKS_TTL", "300")))
+    parser.add_argument("--stale-if-error", type=int, default=int(os.getenv("JWKS_STALE_IF_ERROR", "86400")))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    discovery = load_discovery(args.config_dir, os.getenv("BASE_DOMAIN", "localhost"))
+    server = MetadataServer(
+        discovery, [slug.strip() for slug in args.providers.split(",") if slug.strip()], args.upstream,
+        args.public_url, default_ttl=args.ttl, stale_if_error=args.stale_if_error,
+    )
+    web.run_app(server.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+#!/bin/sh
+# Runs once, when the shared-db volume is initialized: one login role and
+# one database per service, with the passwords the services already use.
+set -eu
+
+create_database() {
+    psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname postgres \
+        -v role="$1" -v password="$2" <<'EOSQL'
+CREATE ROLE :"role" LOGIN PASSWORD :'password';
+CREATE DATABASE :"role" OWNER :"role";
+EOSQL
+}
+
+create_database authentik "$AUTHENTIK_POSTGRES_PASSWORD"
+create_database litellm "$LITELLM_POSTGRES_PASSWORD"
+create_database windmill "$WINDMILL_POSTGRES_PASSWORD"
+
+# Windmill switches to these roles for row-level security; on a dedicated
+# instance its migrations create them as superuser
+psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname postgres <<'EOSQL'
+CREATE ROLE windmill_user;
+CREATE ROLE windmill_admin WITH BYPASSRLS;
+GRANT windmill_user TO windmill_admin;
+GRANT windmill_admin, windmill_user TO windmill WITH ADMIN OPTION;
+EOSQL
@@ -0,0 +1,45 @@
+#!/bin/sh
+# Renders pgbouncer.ini and the auth file from the environment, then starts
+# PgBouncer in the foreground. Plain-text passwords in the auth file let
+# PgBouncer run SCRAM against both the clients and shared-db.
+set -eu
+CONFIG_DIR=/tmp/pgbouncer
+mkdir -p "$CONFIG_DIR"
+
+cat > "$CONFIG_DIR/userlist.txt" <<EOT
+"authentik" "$AUTHENTIK_POSTGRES_PASSWORD"
+"litellm" "$LITELLM_POSTGRES_PASSWORD"
+"windmill" "$WINDMILL_POSTGRES_PASSWORD"
+"pgbouncer" "$SHARED_POSTGRES_PASSWORD"
+EOT
+chmod 600 "$CONFIG_DIR/userlist.txt"
+
+cat > "$CONFIG_DIR/pgbouncer.ini" <<EOT
+[databases]
+authentik = host=shared-db dbname=authentik
+litellm = host=shared-db dbname=litellm pool_mode=${PGBOUNCER_LITELLM_POOL_MODE}
+windmill = host=shared-db dbname=windmill pool_mode=${PGBOUNCER_WINDMILL_POOL_MODE}
+
+[pgbouncer]
+listen_addr = 0.0.0.0
+listen_port = 6432
+unix_socket_dir =
+auth_type = scram-sha-256
+auth_file = $CONFIG_DIR/userlist.txt
+admin_users = pgbouncer
+stats_users = pgbouncer
+pool_mode = ${PGBOUNCER_POOL_MODE}
+default_pool_size = ${PGBOUNCER_DEFAULT_POOL_SIZE}
+reserve_pool_size = 5
+reserve_pool_timeout = 2
+max_db_connections = ${PGBOUNCER_MAX_DB_CONNECTIONS}
+max_client_conn = ${PGBOUNCER_MAX_CLIENT_CONN}
+; protocol-level prepared statements survive transaction pooling (Prisma, sqlx)
+max_prepared_statements = 200
+server_idle_timeout = 300
+ignore_startup_parameters = extra_float_digits,options
+log_connections = 0
+log_disconnections = 0
+EOT
+
+exec pgbouncer "$CONFIG_DIR/pgbouncer.ini"
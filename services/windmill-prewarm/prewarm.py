@@ -0,0 +1,355 @@
+"""
+Dependency-cache prewarm for the Windmill workers.
+
+The first Python or TypeScript job on a fresh `windmill_worker_dependency_cache`
+installs its dependencies before it runs. This tool moves that work out of
+the first job:
+
+- `warm` collects the lockfiles of every script and inline flow step in the
+  workspaces (and of a `wmill sync` directory), merges the Python
+  requirements into `--parallel` groups and runs one no-op preview job per
+  group, so the workers install everything into the shared cache at once.
+  Workers resolve packages from PIP_INDEX_URL / NPM_CONFIG_REGISTRY, which
+  may point at a local mirror; `--index-url` is checked before any job is
+  queued
+- `snapshot` packs the cache into a tarball (with a JSON manifest) and
+  skips the work when nothing changed since the last one
+- `restore` unpacks the tarball into an empty cache before the workers
+  start, e.g. on a new host or after the volume was recreated
+
+Usage:
+  python prewarm.py restore --cache /cache --snapshot /snapshot/windmill-cache.tar.gz
+  python prewarm.py warm --base-url http://windmill_server:8000 --workspace admins [--parallel 4]
+  python prewarm.py snapshot --cache /cache --snapshot /snapshot/windmill-cache.tar.gz
+  python prewarm.py start   # warm, then snapshot if WINDMILL_CACHE_SNAPSHOT=true (compose)
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import tarfile
+import time
+
+import aiohttp
+
+CONTENT = {
+    "python3": "{requirements}\ndef main():\n    return \"prewarm\"\n",
+    "bun": "export async function main() {\n  return \"prewarm\";\n}\n",
+    "deno": "export async function main() {\n  return \"prewarm\";\n}\n",
+}
+EXTENSIONS = [(".deno.ts", "deno"), (".bun.ts", "bun"), (".ts", "bun"), (".py", "python3")]
+LOCK_LINE = re.compile(r"^lock:\s*(.*)$", re.MULTILINE)
+
+
+def python_lock(lock):
+    """Windmill Python lockfile -> (header comment lines, requirement lines)."""
+    header, requirements = [], []
+    for line in lock.splitlines():
+        line = line.strip()
+        if line.startswith("#"):
+            header.append(line)
+        elif line:
+            requirements.append(line)
+    return tuple(header), requirements
+
+
+def rawscript_locks(value):
+    """(language, lock) of every inline script step, wherever it is nested in a flow."""
+    found = []
+    if isinstance(value, dict):
+        if value.get("type") == "rawscript" and value.get("lock"):
+            found.append((value.get("language"), value["lock"]))
+        for item in value.values():
+            found.extend(rawscript_locks(item))
+    elif isinstance(value, list):
+        for item in value:
+            found.extend(rawscript_locks(item))
+    return found
+
+
+def directory_locks(root):
+    """
+    Locks of a `wmill sync` directory: `lock:` in <name>.script.yaml, inline
+    or as `!inline <path>`, with the language taken from the code file.
+    """
+    found = []
+    for folder, _, files in os.walk(root):
+        for name in sorted(files):
+            if not name.endswith(".script.yaml"):
+                continue
+            stem = name[:-len(".script.yaml")]
+            language = next((lang for ext, lang in EXTENSIONS if stem + ext in files), None)
+            with open(os.path.join(folder, name), encoding="utf-8") as f:
+                match = LOCK_LINE.search(f.read())
+            lock = match.group(1).strip().strip("'\"") if match else ""
+            if lock.startswith("!inline "):
+                with open(os.path.join(root, lock.split(" ", 1)[1]), encoding="utf-8") as f:
+                    lock = f.read()
+            if language and lock.strip():
+                found.append((language, lock))
+    return found
+
+
+def plan_jobs(locks, parallel):
+    """
+    Preview jobs that together install every lock. Windmill caches Python
+    packages one by one, so requirements of all scripts with the same
+    header (Python version) are merged and split into `parallel` jobs;
+    other languages get one job per distinct lock.
+    """
+    python_groups = {}
+    others = {}
+    for language, lock in locks:
+        if language == "python3":
+            header, requirements = python_lock(lock)
+            python_groups.setdefault(header, set()).update(requirements)
+        elif language in CONTENT:
+            others[(language, lock)] = None
+
+    jobs = []
+    for header, requirements in sorted(python_groups.items()):
+        ordered = sorted(requirements, key=str.lower)
+        count = max(1, min(parallel, len(ordered)))
+        for index in range(count):
+            part = ordered[index::count]
+            if not part:
+                continue
+            # the inline block pins the same packages if the preview lock is not used
+            pinned = "#requirements:\n" + "".join(f"#{line}\n" for line in part)
+            jobs.append({
+                "language": "python3",
+                "lock": "\n".join(list(header) + part) + "\n",
+                "content": CONTENT["python3"].format(requirements=pinned),
+                "packages": len(part),
+            })
+    for language, lock in others:
+        jobs.append({"language": language, "lock": lock, "content": CONTENT[language], "packages": None})
+    return jobs
+
+
+class WindmillAPI:
+    def __init__(self, session, base_url, token):
+        self.session = session
+        self.base = f"{base_url.rstrip('/')}/api"
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    async def get(self, path, **params):
+        async with self.session.get(f"{self.base}{path}", params=params, headers=self.headers) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"GET {path}: HTTP {resp.status} {await resp.text()}")
+            return await resp.json()
+
+    async def wait_ready(self, timeout, interval=2.0):
+        """The server answers /api/version once its migrations have run."""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                async with self.session.get(f"{self.base}/version") as resp:
+                    if resp.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Windmill at {self.base} not ready after {timeout:.0f}s")
+            await asyncio.sleep(interval)
+
+    async def workspace_locks(self, workspace):
+        locks = []
+        page = 1
+        while True:
+            scripts = await self.get(f"/w/{workspace}/scripts/list", per_page=100, page=page)
+            for script in scripts:
+                full = await self.get(f"/w/{workspace}/scripts/get/h/{script['hash']}")
+                if full.get("lock"):
+                    locks.append((full.get("language"), full["lock"]))
+            if len(scripts) < 100:
+                break
+            page += 1
+        for flow in await self.get(f"/w/{workspace}/flows/list", per_page=1000):
+            full = await self.get(f"/w/{workspace}/flows/get/{flow['path']}")
+            locks.extend(rawscript_locks(full.get("value")))
+        return locks
+
+    async def preview(self, workspace, job, tag=None):
+        payload = {"content": job["content"], "language": job["language"], "lock": job["lock"], "args": {}}
+        if tag:
+            payload["tag"] = tag
+        async with self.session.post(f"{self.base}/w/{workspace}/jobs/run/preview", json=payload,
+                                     headers=self.headers) as resp:
+            if resp.status >= 300:
+                raise RuntimeError(f"submitting a prewarm job failed: HTTP {resp.status} {await resp.text()}")
+            return (await resp.text()).strip().strip('"')
+
+    async def wait(self, workspace, job_id, timeout, interval=1.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            job = await self.get(f"/w/{workspace}/jobs_u/get/{job_id}")
+            if job.get("type") == "CompletedJob":
+                return job
+            await asyncio.sleep(interval)
+        return None
+
+
+async def check_index(session, url):
+    """The package index the workers use must answer before jobs are queued."""
+    try:
+        async with session.head(url.rstrip("/") + "/", allow_redirects=True) as resp:
+            if resp.status >= 400:
+                raise RuntimeError(f"package index {url} answered HTTP {resp.status}")
+    except aiohttp.ClientError as e:
+        raise RuntimeError(f"package index {url} is unreachable: {e}")
+
+
+async def warm(args):
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        for url in filter(None, [args.index_url, args.npm_registry]):
+            await check_index(session, url)
+        api = WindmillAPI(session, args.base_url, args.token)
+        await api.wait_ready(args.ready_timeout)
+        started = time.monotonic()
+        report = {"workspaces": {}, "jobs": []}
+        for workspace in args.workspace:
+            locks = await api.workspace_locks(workspace)
+            if args.workspace_dir:
+                locks.extend(directory_locks(args.workspace_dir))
+            jobs = plan_jobs(locks, args.parallel)
+            report["workspaces"][workspace] = {"locks": len(locks), "jobs": len(jobs)}
+            print(f"{workspace}: {len(locks)} lockfiles -> {len(jobs)} prewarm jobs")
+
+            async def run(job):
+                submitted = time.monotonic()
+                job_id = await api.preview(workspace, job, args.tag)
+                done = await api.wait(workspace, job_id, args.job_timeout)
+                result = {"workspace": workspace, "language": job["language"], "packages": job["packages"],
+                          "id": job_id, "seconds": round(time.monotonic() - submitted, 2),
+                          "success": bool(done and done.get("success")),
+                          "duration_ms": done.get("duration_ms") if done else None}
+                print(f"  {job['language']} ({job['packages'] or 'lock'}): "
+                      f"{'ok' if result['success'] else 'FAILED'} in {result['seconds']}s")
+                return result
+
+            report["jobs"].extend(await asyncio.gather(*(run(job) for job in jobs)))
+        report["seconds"] = round(time.monotonic() - started, 2)
+    failed = [job for job in report["jobs"] if not job["success"]]
+    print(f"Prewarm finished in {report['seconds']}s, {len(report['jobs']) - len(failed)} jobs ok, {len(failed)} failed")
+    return report, not failed
+
+
+def fingerprint(cache):
+    """(files, bytes, newest mtime) of the cache; equal fingerprints mean an unchanged cache."""
+    files = size = newest = 0
+    for folder, _, names in os.walk(cache):
+        for name in names:
+            try:
+                stat = os.lstat(os.path.join(folder, name))
+            except OSError:
+                continue
+            files += 1
+            size += stat.st_size
+            newest = max(newest, int(stat.st_mtime))
+    return [files, size, newest]
+
+
+def manifest_path(snapshot):
+    return snapshot + ".json"
+
+
+def snapshot(cache, output):
+    current = fingerprint(cache)
+    try:
+        with open(manifest_path(output), encoding="utf-8") as f:
+            previous = json.load(f)
+        if previous.get("fingerprint") == current and os.path.exists(output):
+            print(f"Cache unchanged since {previous['created_at']}, keeping {output}")
+            return previous
+    except (OSError, ValueError):
+        pass
+    started = time.monotonic()
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    partial = output + ".partial"
+    with tarfile.open(partial, "w:gz" if output.endswith(".gz") else "w") as tar:
+        for entry in sorted(os.listdir(cache)):
+            tar.add(os.path.join(cache, entry), arcname=entry)
+    os.replace(partial, output)
+    manifest = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "fingerprint": current,
+        "entries": sorted(os.listdir(cache)),
+        "bytes": os.path.getsize(output),
+        "seconds": round(time.monotonic() - started, 2),
+    }
+    with open(manifest_path(output), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Snapshot of {current[0]} files ({current[1] / 1024 / 1024:.1f} MiB) -> {output} "
+          f"({manifest['bytes'] / 1024 / 1024:.1f} MiB) in {manifest['seconds']}s")
+    return manifest
+
+
+def restore(cache, source, force=False):
+    """Unpacks the snapshot into an empty cache; returns seconds taken, or None when skipped."""
+    if not os.path.exists(source):
+        print(f"No snapshot at {source}, workers start with the cache as it is")
+        return None
+    if os.listdir(cache) and not force:
+        print(f"{cache} already has {len(os.listdir(cache))} entries, snapshot not restored")
+        return None
+    started = time.monotonic()
+    with tarfile.open(source) as tar:
+        if hasattr(tarfile, "data_filter"):
+            tar.extractall(cache, filter="data")
+        else:
+            tar.extractall(cache)
+    seconds = round(time.monotonic() - started, 2)
+    print(f"Restored {source} into {cache} in {seconds}s")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prewarm, snapshot and restore the Windmill dependency cache.")
+    parser.add_argument("command", choices=["warm", "snapshot", "restore", "start"])
+    parser.add_argument("--base-url", default=os.getenv("WINDMILL_URL", "http://windmill_server:8000"))
+    parser.add_argument("--token", default=os.getenv("WINDMILL_TOKEN", ""))
+    parser.add_argument("--workspace", nargs="+", default=os.getenv("WINDMILL_PREWARM_WORKSPACES", "admins").split(","))
+    parser.add_argument("--workspace-dir", default=os.getenv("WINDMILL_PREWARM_DIR"),
+                        help="wmill sync directory whose lockfiles are warmed as well")
+    parser.add_argument("--parallel", type=int, default=int(os.getenv("WINDMILL_PREWARM_PARALLEL", "4")),
+                        help="Python install jobs run at once (one per free worker)")
+    parser.add_argument("--tag", default=os.getenv("WINDMILL_PREWARM_TAG") or None,
+                        help="worker tag of the prewarm jobs (default: the language's default tag)")
+    parser.add_argument("--job-timeout", type=float, default=900.0)
+    parser.add_argument("--ready-timeout", type=float, default=300.0, help="seconds to wait for the Windmill server")
+    parser.add_argument("--index-url", default=os.getenv("PIP_INDEX_URL"), help="checked before warming")
+    parser.add_argument("--npm-registry", default=os.getenv("NPM_CONFIG_REGISTRY"), help="checked before warming")
+    parser.add_argument("--cache", default=os.getenv("WINDMILL_CACHE_DIR", "/cache"))
+    parser.add_argument("--snapshot", default=os.getenv("WINDMILL_CACHE_SNAPSHOT_FILE", "/snapshot/windmill-cache.tar.gz"))
+    parser.add_argument("--force", action="store_true", help="restore even into a non-empty cache")
+    parser.add_argument("--report", help="write the warm report as JSON")
+    args = parser.parse_args()
+
+    if args.command == "restore":
+        restore(args.cache, args.snapshot, args.force)
+        return 0
+    if args.command == "snapshot":
+        snapshot(args.cache, args.snapshot)
+        return 0
+    if not args.token:
+        print("WINDMILL_TOKEN is not set, skipping the prewarm (create a token in Windmill's user settings)")
+        return 0 if args.command == "start" else 1
+    try:
+        report, ok = asyncio.run(warm(args))
+    except (RuntimeError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"Prewarm failed: {e}")
+        return 1
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.command == "start" and ok and os.getenv("WINDMILL_CACHE_SNAPSHOT", "false").lower() == "true":
+        snapshot(args.cache, args.snapshot)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
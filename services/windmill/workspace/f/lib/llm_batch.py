@@ -0,0 +1,239 @@
+# Batch LLM fan-out over LiteLLM for Windmill jobs.
+#
+# Reads JSON-lines records from `input_path` one at a time, renders each into
+# a chat request and sends them over a pooled keep-alive session with bounded
+# concurrency. 429/5xx responses halve the concurrency limit and back off
+# (honouring Retry-After); successes grow it again by one slot per window.
+# Every result is appended to `output_path` as soon as it arrives, and the
+# output file doubles as the checkpoint: a restarted job skips records whose
+# id is already there. A malformed record (invalid JSON, a field missing for
+# the template) or response is written as an error and does not stop the
+# job. Requests carry `X-Priority: batch` so the gateway's
+# admission control (services/litellm/admission.py) queues them behind chat.
+#
+# Usable as a Windmill script (`main`) or imported by other scripts:
+#   from f.lib.llm_batch import run_batch
+import asyncio
+import json
+import os
+import random
+import time
+
+import aiohttp
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit: halves on backpressure, +1 after `limit`
+    consecutive successes, between `minimum` and `maximum`.
+    """
+
+    def __init__(self, maximum, minimum=1):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = maximum
+        self.in_flight = 0
+        self.successes = 0
+        self.condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self, backpressure=False):
+        async with self.condition:
+            self.in_flight -= 1
+            if backpressure:
+                self.limit = max(self.minimum, self.limit // 2)
+                self.successes = 0
+            else:
+                self.successes += 1
+                if self.successes >= self.limit and self.limit < self.maximum:
+                    self.limit += 1
+                    self.successes = 0
+            self.condition.notify_all()
+
+
+def read_records(path, id_field, done):
+    """
+    Yields (record_id, record, error) from a JSON-lines file, skipping ids in
+    `done`. Records without `id_field` (or that are not objects) are numbered
+    by line; a line that is not JSON comes with an error instead of a record.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                record, error = None, f"invalid JSON: {e}"
+            else:
+                error = None
+            record_id = str(record.get(id_field, line_number) if isinstance(record, dict) else line_number)
+            if record_id not in done:
+                yield record_id, record, error
+
+
+def completed_ids(output_path):
+    """
+    Ids already answered in `output_path` (the checkpoint). Records that
+    failed and a torn last line from a killed job are redone.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if "id" in result and "error" not in result:
+                done.add(str(result["id"]))
+    return done
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def render_messages(record, prompt_template, system_prompt):
+    messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+    content = prompt_template.format(**record) if isinstance(record, dict) else prompt_template.format(text=record)
+    messages.append({"role": "user", "content": content})
+    return messages
+
+
+async def complete(session, url, headers, payload, limiter, stats, max_retries, backoff, max_backoff):
+    """
+    One chat completion with retries. Returns (response body, None) or
+    (None, error string) once retries are exhausted.
+    """
+    error = None
+    for attempt in range(max_retries + 1):
+        await limiter.acquire()
+        backpressure = False
+        retry_after = None
+        try:
+            async with session.post(url, json=payload, headers=headers) as resp:
+                if resp.status == 200:
+                    return await resp.json(content_type=None), None
+                await resp.read()
+                error = f"HTTP {resp.status}"
+                if resp.status not in RETRY_STATUSES:
+                    return None, error
+                backpressure = True
+                stats["throttled" if resp.status == 429 else "server_errors"] += 1
+                retry_after = resp.headers.get("Retry-After")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = type(e).__name__
+            backpressure = True
+            stats["connection_errors"] += 1
+        finally:
+            await limiter.release(backpressure)
+        if attempt < max_retries:
+            stats["retries"] += 1
+            delay = float(retry_after) if retry_after and retry_after.replace(".", "", 1).isdigit() else backoff * 2**attempt
+            await asyncio.sleep(min(max_backoff, delay) * random.uniform(0.8, 1.2))
+    return None, error
+
+
+async def run_batch(input_path, output_path, prompt_template="{text}", model="mock-gpt",
+                    base_url="http://litellm:4000/v1", api_key="", system_prompt="", max_tokens=256, temperature=0.0,
+                    concurrency=16, min_concurrency=1, max_retries=6, backoff=0.5, max_backoff=30.0,
+                    id_field="id", request_timeout=300.0, limit=0, progress_every=10.0, priority="batch"):
+    done = completed_ids(output_path)
+    stats = {"skipped": len(done), "ok": 0, "failed": 0, "retries": 0, "throttled": 0, "server_errors": 0,
+             "connection_errors": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    limiter = AdaptiveLimiter(concurrency, min_concurrency)
+    url = f"{base_url.rstrip('/')}/chat/completions"
+    headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+    if priority:
+        headers["X-Priority"] = priority
+    records = read_records(input_path, id_field, done)
+    if limit:
+        records = (item for _, item in zip(range(limit), records))
+
+    started = time.monotonic()
+    last_progress = started
+    out = open(output_path, "a", encoding="utf-8")
+    if out.tell() and not _ends_with_newline(output_path):
+        out.write("\n")  # terminate a torn line so the next result starts clean
+
+    def write(result):
+        nonlocal last_progress
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+        now = time.monotonic()
+        if progress_every and now - last_progress >= progress_every:
+            last_progress = now
+            elapsed = now - started
+            print(f"{stats['ok'] + stats['failed']} records, {stats['ok'] / elapsed:.1f} records/s, "
+                  f"{stats['completion_tokens'] / elapsed:.1f} tokens/s, concurrency limit {limiter.limit}")
+
+    def fail(record_id, error):
+        stats["failed"] += 1
+        write({"id": record_id, "error": error})
+
+    async def worker():
+        for record_id, record, error in records:
+            if error is not None:
+                fail(record_id, error)
+                continue
+            try:
+                messages = render_messages(record, prompt_template, system_prompt)
+            except (KeyError, IndexError, ValueError) as e:
+                fail(record_id, f"cannot render prompt: {type(e).__name__}: {e}")
+                continue
+            payload = {"model": model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature}
+            body, error = await complete(session, url, headers, payload, limiter, stats, max_retries, backoff, max_backoff)
+            if body is None:
+                fail(record_id, error)
+                continue
+            try:
+                output = body["choices"][0]["message"]["content"]
+            except (KeyError, IndexError, TypeError):
+                fail(record_id, "malformed response: no choices[0].message.content")
+                continue
+            usage = body.get("usage") or {}
+            stats["ok"] += 1
+            stats["prompt_tokens"] += usage.get("prompt_tokens", 0)
+            stats["completion_tokens"] += usage.get("completion_tokens", 0)
+            write({"id": record_id, "output": output, "usage": usage})
+
+    connector = aiohttp.TCPConnector(limit=concurrency, keepalive_timeout=60, ssl=False)
+    try:
+        async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=request_timeout)) as session:
+            # Workers pull from the shared generator, so input is read lazily
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finally:
+        out.close()
+
+    elapsed = time.monotonic() - started
+    stats.update({
+        "elapsed_s": round(elapsed, 3),
+        "records_per_s": round(stats["ok"] / elapsed, 2) if elapsed else 0.0,
+        "tokens_per_s": round(stats["completion_tokens"] / elapsed, 2) if elapsed else 0.0,
+        "final_concurrency": limiter.limit,
+        "output_path": output_path,
+    })
+    return stats
+
+
+def main(input_path: str, output_path: str, prompt_template: str = "{text}", model: str = "mock-gpt",
+         base_url: str = "http://litellm:4000/v1", api_key: str = "", system_prompt: str = "",
+         max_tokens: int = 256, temperature: float = 0.0, concurrency: int = 16, max_retries: int = 6,
+         id_field: str = "id", limit: int = 0, priority: str = "batch"):
+    return asyncio.run(run_batch(
+        input_path, output_path, prompt_template=prompt_template, model=model, base_url=base_url,
+        api_key=api_key or os.getenv("LITELLM_API_KEY", ""), system_prompt=system_prompt, max_tokens=max_tokens,
+        temperature=temperature, concurrency=concurrency, max_retries=max_retries, id_field=id_field, limit=limit,
+        priority=priority,
+    ))
@@ -1,66 +1,34 @@
-import time
-import os
+from step_timer import StepTimer
 
-def perform_authentik_login(page, email, password):
+def perform_authentik_login(page, email, password, timer=None):
     """
     Robustly handles Authentik login flow by looping until redirect.
     Handles UID, password, and consent stages dynamically.
     Uses direct active-element targeting for reliability.
+
+    Every wait, fill and sleep is recorded on `timer` (a StepTimer); page
+    states go to its ring buffer instead of a screenshot per iteration.
     """
-    print(f"Handling Authentik login for {email}...")
-    page.wait_for_load_state("networkidle")
-    
-    # Ensure debug directory exists
-    os.makedirs("tests/debug", exist_ok=True)
+    if timer is None:
+        timer = StepTimer("authentik_login")
+    timer.mark("authentik login start", email=email)
+    timer.call("wait networkidle (login start)", page.wait_for_load_state, "networkidle")
     
     # Max attempts to prevent infinite loop
     for attempt in range(1, 21):
         url = page.url
-        print(f"Auth loop attempt {attempt}. Current URL: {url}")
-        
-        # Capture debug screenshot
-        try:
-            page.screenshot(path=f"tests/debug/auth_attempt_{attempt}.png")
-        except:
-            pass
+        timer.log(f"Auth loop attempt {attempt}. Current URL: {url}")
+        timer.snapshot(page, f"attempt {attempt}")
             
         if "authentik" not in url.lower() and "/if/flow" not in url.lower() and attempt > 1:
-            print("Redirected away from Authentik. Login sequence finished.")
+            timer.mark("redirected away from Authentik", url=url, attempts=attempt)
             return True
             
         # 1. Use JS to find the TRULY visible and active input
-        active_input_info = page.evaluate("""() => {
-            function findRecursive(root) {
-                const inputs = root.querySelectorAll('input');
-                for (const i of inputs) {
-                    // Check if actually visible and not hidden
-                    const style = window.getComputedStyle(i);
-                    if (style.display !== 'none' && 
-                        style.visibility !== 'hidden' && 
-                        i.offsetParent !== null && 
-                        !i.disabled) {
-                        return {
-                            name: i.name,
-                            type: i.type,
-                            placeholder: i.placeholder,
-                            value: i.value
-                        };
-                    }
-                }
-                const all = root.querySelectorAll('*');
-                for (const node of all) {
-                    if (node.shadowRoot) {
-                        const found = findRecursive(node.shadowRoot);
-                        if (found) return found;
-                    }
-                }
-                return null;
-            }
-            return findRecursive(document);
-        }""")
+        with timer.step("find active input"):
+            active_input_info = page.evaluate(ACTIVE_INPUT_JS)
 
         if active_input_info:
-            print(f"Active input found: {active_input_info}")
             name = active_input_info.get('name', '')
             itype = active_input_info.get('type', '')
             val = active_input_info.get('value', '')
@@ -68,32 +36,34 @@ def perform_authentik_login(page, email, password):
             if not val:
                 # Decide what to fill
                 if name == "uid" or "username" in itype or "Email" in active_input_info.get('placeholder', ''):
-                    print(f"Filling Identity: {email}")
-                    page.locator('input[name="uid"], input[autocomplete="username"]').first.fill(email)
-                    time.sleep(1)
+                    timer.mark("identification stage", attempt=attempt)
+                    timer.call("fill identifier", page.locator('input[name="uid"], input[autocomplete="username"]').first.fill, email)
+                    timer.sleep(1, "after identifier fill")
                     page.keyboard.press("Enter")
-                    time.sleep(3)
+                    timer.sleep(3, "after identifier submit")
                     continue
                 elif name == "password" or itype == "password":
-                    print("Filling Password...")
-                    page.locator('input[name="password"], input[autocomplete="current-password"]').first.fill(password)
-                    time.sleep(1)
+                    timer.mark("password stage", attempt=attempt)
+                    timer.call("fill password", page.locator('input[name="password"], input[autocomplete="current-password"]').first.fill, password)
+                    timer.sleep(1, "after password fill")
                     page.keyboard.press("Enter")
-                    time.sleep(3)
+                    timer.sleep(3, "after password submit")
                     continue
 
         # 2. Handle Buttons if no empty input was found or filling didn't advance
         button_clicked = False
         for btn_text in ['Log in', 'Continue', 'Authorize', 'Next']:
             btn = page.locator(f"button:has-text('{btn_text}')").first
-            if btn.count() > 0 and btn.is_visible() and btn.is_enabled():
+            with timer.step(f"probe button '{btn_text}'"):
+                clickable = btn.count() > 0 and btn.is_visible() and btn.is_enabled()
+            if clickable:
                 # Double check: if we see an input that is visible and empty, don't click button yet
                 if active_input_info and not active_input_info.get('value'):
                     continue
                 
-                print(f"Clicking button: {btn_text}")
-                btn.click()
-                time.sleep(4)
+                timer.mark(f"click '{btn_text}'", attempt=attempt)
+                timer.call(f"click '{btn_text}'", btn.click)
+                timer.sleep(4, f"after '{btn_text}' click")
                 button_clicked = True
                 break
         
@@ -105,22 +75,56 @@ def perform_authentik_login(page, email, password):
         if bubbles.count() > 0:
             bubble = bubbles.first
             if bubble.is_visible():
-                print("Account bubble detected. Clicking...")
+                timer.mark("account bubble", attempt=attempt)
                 bubble.click()
-                time.sleep(2)
+                timer.sleep(2, "after account bubble click")
                 continue
 
         # 4. Recovery
-        if "Invalid password" in page.content() or "denied" in page.content():
-            print("Detected denial/error. Attempting recovery...")
+        content = timer.call("page.content()", page.content)
+        if "Invalid password" in content or "denied" in content:
+            timer.mark("denial/error detected", attempt=attempt)
             not_you = page.locator("text='Not you?'").first
             if not_you.count() > 0 and not_you.is_visible():
                 not_you.click()
-                time.sleep(3)
+                timer.sleep(3, "after 'Not you?'")
                 continue
 
-        print("No definitive action. Waiting...")
-        time.sleep(3)
+        timer.log("No definitive action. Waiting...")
+        timer.sleep(3, "no action")
         
+    timer.mark("authentik login stuck", url=page.url)
     print("FAIL: Authentik login sequence timed out or got stuck.")
     return False
+
+
+# Finds the first truly visible, enabled input, descending into shadow roots
+ACTIVE_INPUT_JS = """() => {
+    function findRecursive(root) {
+        const inputs = root.querySelectorAll('input');
+        for (const i of inputs) {
+            // Check if actually visible and not hidden
+            const style = window.getComputedStyle(i);
+            if (style.display !== 'none' && 
+                style.visibility !== 'hidden' && 
+                i.offsetParent !== null && 
+                !i.disabled) {
+                return {
+                    name: i.name,
+                    type: i.type,
+                    placeholder: i.placeholder,
+                    value: i.value
+                };
+            }
+        }
+        const all = root.querySelectorAll('*');
+        for (const node of all) {
+            if (node.shadowRoot) {
+                const found = findRecursive(node.shadowRoot);
+                if (found) return found;
+            }
+        }
+        return null;
+    }
+    return findRecursive(document);
+}"""
@@ -0,0 +1,174 @@
+import argparse
+import asyncio
+import sys
+import time
+from collections import Counter
+
+import aiohttp
+
+from bench_litellm import chat_request
+from benchlib import open_loop, print_table, ramp_schedule, save_results, summarize, use_service
+
+use_service("litellm")
+use_service("mock-openai")
+from admission import AdmissionController, LocalLimiter, Rejected, parse_classes  # noqa: E402
+from mock_openai import MockOpenAI  # noqa: E402
+
+
+class Gateway:
+    """
+    The part of the LiteLLM proxy this benchmark is about: optional
+    admission control in front of an upstream that serves `slots` requests
+    at a time (like a self-hosted model server) and queues the rest FIFO.
+    """
+
+    def __init__(self, session, url, slots, controller=None):
+        self.session = session
+        self.url = url
+        self.slots = asyncio.Semaphore(slots)
+        self.controller = controller
+
+    async def call(self, priority, prompt, max_tokens):
+        started = time.perf_counter()
+        lease = None
+        if self.controller is not None:
+            try:
+                lease = await self.controller.admit(priority)
+            except Rejected as e:
+                return {"ok": False, "error": "HTTP 429", "retry_after": e.retry_after}
+        try:
+            async with self.slots:
+                queued = time.perf_counter() - started
+                result = await chat_request(self.session, self.url, {}, "mock-gpt", prompt, max_tokens, True)
+        finally:
+            if lease is not None:
+                await self.controller.release(lease)
+        # time to first token as the client sees it: admission and upstream queueing included
+        result["latency"] += queued
+        if result.get("ttft") is not None:
+            result["ttft"] += queued
+        return result
+
+
+async def interactive_load(gateway, args):
+    offsets = ramp_schedule(args.interactive_rate, args.interactive_rate, args.duration)
+
+    async def one(index, offset):
+        return await gateway.call("interactive", f"chat message {index}", args.max_tokens)
+
+    return await open_loop(offsets, one)
+
+
+async def batch_load(gateway, args, deadline):
+    """`batch_concurrency` workers sending back to back, backing off by Retry-After on 429 like llm_batch."""
+    results = []
+
+    async def worker(worker_index):
+        index = 0
+        while time.perf_counter() < deadline:
+            result = await gateway.call("batch", f"batch record {worker_index}-{index}", args.max_tokens)
+            results.append(result)
+            index += 1
+            if result.get("retry_after"):
+                await asyncio.sleep(min(result["retry_after"], max(0.0, deadline - time.perf_counter())))
+
+    await asyncio.gather(*(worker(index) for index in range(args.batch_concurrency)))
+    return results
+
+
+def controller_for(args):
+    classes = parse_classes(args.classes or (
+        f"interactive:max_queue=200,max_wait=10;"
+        f"batch:max_concurrency={max(1, args.upstream_slots * 3 // 4)},max_queue={args.upstream_slots},max_wait=5"
+    ))
+    return AdmissionController(classes, LocalLimiter(), max_concurrency=args.upstream_slots,
+                               poll_interval=args.poll_interval)
+
+
+def class_summary(results, wall):
+    ok = [result for result in results if result["ok"]]
+    return {
+        "requests": len(results),
+        "completed_per_s": round(len(ok) / wall, 2) if wall else 0.0,
+        "errors": dict(Counter(result["error"] for result in results if not result["ok"])),
+        "ttft": summarize([result["ttft"] for result in ok if result.get("ttft") is not None]),
+        "latency": summarize([result["latency"] for result in ok]),
+    }
+
+
+async def run_phase(label, base_url, args, batch, admission):
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=600)) as session:
+        controller = controller_for(args) if admission else None
+        gateway = Gateway(session, f"{base_url}/v1/chat/completions", args.upstream_slots, controller)
+        started = time.perf_counter()
+        loads = [interactive_load(gateway, args)]
+        if batch:
+            loads.append(batch_load(gateway, args, started + args.duration))
+        results = await asyncio.gather(*loads)
+        wall = time.perf_counter() - started
+    summary = {"interactive": class_summary(results[0], wall)}
+    if batch:
+        summary["batch"] = class_summary(results[1], wall)
+    if controller is not None:
+        summary["admission"] = controller.stats()
+    ttft = summary["interactive"]["ttft"]
+    print(f"{label}: interactive TTFT p50 {ttft.get('p50')} ms, p95 {ttft.get('p95')} ms"
+          + (f", batch {summary['batch']['completed_per_s']} req/s" if batch else ""))
+    return summary
+
+
+async def run(args):
+    mock = MockOpenAI(token_rate=args.mock_token_rate, first_token_ms=args.mock_first_token_ms,
+                      completion_tokens=args.max_tokens)
+    base_url = await mock.start()
+    try:
+        return {
+            "interactive only": await run_phase("interactive only", base_url, args, batch=False, admission=True),
+            "mixed, no admission": await run_phase("mixed, no admission", base_url, args, batch=True, admission=False),
+            "mixed, admission": await run_phase("mixed, admission", base_url, args, batch=True, admission=True),
+        }
+    finally:
+        await mock.stop()
+
+
+def report(summary):
+    rows = []
+    for label, result in summary.items():
+        interactive = result["interactive"]
+        batch = result.get("batch", {})
+        rows.append([
+            label, interactive["ttft"].get("p50", "-"), interactive["ttft"].get("p95", "-"),
+            interactive["ttft"].get("p99", "-"), interactive["errors"].get("HTTP 429", 0),
+            batch.get("completed_per_s", "-"), batch.get("ttft", {}).get("p95", "-"),
+            batch["errors"].get("HTTP 429", 0) if batch else "-",
+        ])
+    print()
+    print_table(["phase", "chat TTFT p50 ms", "chat p95 ms", "chat p99 ms", "chat 429", "batch req/s",
+                 "batch TTFT p95 ms", "batch 429"], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Interactive TTFT while batch traffic saturates the upstream, with and without admission control.")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per phase")
+    parser.add_argument("--interactive-rate", type=float, default=4.0, help="chat requests per second (open loop)")
+    parser.add_argument("--batch-concurrency", type=int, default=64, help="batch workers sending back to back")
+    parser.add_argument("--upstream-slots", type=int, default=16, help="requests the upstream serves at once")
+    parser.add_argument("--classes", help="ADMISSION_CLASSES for the admission phases "
+                                          "(default: batch capped at 3/4 of the slots)")
+    parser.add_argument("--poll-interval", type=float, default=0.1)
+    parser.add_argument("--max-tokens", type=int, default=32)
+    parser.add_argument("--mock-token-rate", type=float, default=200.0)
+    parser.add_argument("--mock-first-token-ms", type=float, default=150.0)
+    parser.add_argument("--output", help="results JSON path (default: bench-results/admission-<timestamp>.json)")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args))
+    report(summary)
+    print(f"\nResults saved to {save_results('admission', vars(args), summary, args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
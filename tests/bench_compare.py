@@ -0,0 +1,56 @@
+import argparse
+import json
+import sys
+
+from benchlib import print_table
+
+
+def flatten(value, prefix=""):
+    """
+    Flattens nested summary dicts into {"a.b.c": number} pairs.
+    """
+    items = {}
+    if isinstance(value, dict):
+        for key, child in value.items():
+            items.update(flatten(child, f"{prefix}.{key}" if prefix else str(key)))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        items[prefix] = value
+    return items
+
+
+def compare(baseline, candidate):
+    """
+    Rows of (metric, baseline, candidate, change %) for every numeric summary
+    value present in both runs.
+    """
+    a = flatten(baseline["summary"])
+    b = flatten(candidate["summary"])
+    rows = []
+    for key in a:
+        if key not in b:
+            continue
+        change = "-" if a[key] == 0 else f"{(b[key] - a[key]) / abs(a[key]) * 100:+.1f}%"
+        rows.append([key, a[key], b[key], change])
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files (A/B).")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--filter", default="", help="only show metrics containing this text, e.g. p95")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    labels = [run["config"].get("label", run["benchmark"]) for run in (baseline, candidate)]
+    rows = [row for row in compare(baseline, candidate) if args.filter in row[0]]
+    print_table(["metric", f"A ({labels[0]})", f"B ({labels[1]})", "change"], rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
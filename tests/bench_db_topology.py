@@ -0,0 +1,192 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+import threading
+
+from benchlib import print_table, save_results
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from configure import parse_env  # noqa: E402
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+PROJECT = "apukone"
+PGBENCH_IMAGE = "postgres:16-alpine"
+
+# topology: containers whose memory is counted, and one connection target per service database
+# (database, host, port, user, password variable, network)
+TOPOLOGIES = {
+    "separate": {
+        "containers": ["apukone-authentik-db", "apukone-litellm-db", "apukone-windmill-db"],
+        "targets": [
+            ("authentik", "authentik-db", 5432, "authentik", "AUTHENTIK_POSTGRES_PASSWORD", "authentik-internal"),
+            ("litellm", "litellm-db", 5432, "litellm", "LITELLM_POSTGRES_PASSWORD", "litellm-internal"),
+            ("windmill", "windmill_db", 5432, "postgres", "WINDMILL_POSTGRES_PASSWORD", "windmill-internal"),
+        ],
+    },
+    "shared-direct": {
+        "containers": ["apukone-shared-db"],
+        "targets": [
+            ("authentik", "shared-db", 5432, "authentik", "AUTHENTIK_POSTGRES_PASSWORD", "shared-db-internal"),
+            ("litellm", "shared-db", 5432, "litellm", "LITELLM_POSTGRES_PASSWORD", "shared-db-internal"),
+            ("windmill", "shared-db", 5432, "windmill", "WINDMILL_POSTGRES_PASSWORD", "shared-db-internal"),
+        ],
+    },
+    "shared-pgbouncer": {
+        "containers": ["apukone-shared-db", "apukone-pgbouncer"],
+        "targets": [
+            ("authentik", "pgbouncer", 6432, "authentik", "AUTHENTIK_POSTGRES_PASSWORD", "authentik-internal"),
+            ("litellm", "pgbouncer", 6432, "litellm", "LITELLM_POSTGRES_PASSWORD", "litellm-internal"),
+            ("windmill", "pgbouncer", 6432, "windmill", "WINDMILL_POSTGRES_PASSWORD", "windmill-internal"),
+        ],
+    },
+}
+
+PGBENCH_PATTERNS = {
+    "transactions": r"number of transactions actually processed: (\d+)",
+    "failed": r"number of failed transactions: (\d+)",
+    "latency_avg_ms": r"latency average = ([\d.]+) ms",
+    "latency_stddev_ms": r"latency stddev = ([\d.]+) ms",
+    "connection_ms": r"average connection time = ([\d.]+) ms",
+    "tps": r"tps = ([\d.]+)",
+}
+
+MEMORY_UNITS = {"B": 1, "KiB": 1024, "MiB": 1024 ** 2, "GiB": 1024 ** 3, "kB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3}
+
+
+def parse_pgbench(text):
+    """pgbench's report (stdout + stderr) -> numbers, plus clients that aborted."""
+    result = {}
+    for name, pattern in PGBENCH_PATTERNS.items():
+        match = re.search(pattern, text)
+        if match:
+            result[name] = float(match.group(1)) if "." in match.group(1) else int(match.group(1))
+    result["aborted_clients"] = len(re.findall(r"client \d+ aborted", text))
+    return result
+
+
+def parse_memory(text):
+    """`docker stats --format '{{.Name}}|{{.MemUsage}}'` lines -> {container: bytes}."""
+    usage = {}
+    for line in text.splitlines():
+        name, _, mem = line.partition("|")
+        match = re.match(r"\s*([\d.]+)\s*([A-Za-z]+)", mem)
+        if match and match.group(2) in MEMORY_UNITS:
+            usage[name.strip()] = int(float(match.group(1)) * MEMORY_UNITS[match.group(2)])
+    return usage
+
+
+def memory(containers):
+    result = subprocess.run(["docker", "stats", "--no-stream", "--format", "{{.Name}}|{{.MemUsage}}"] + containers,
+                            capture_output=True, text=True)
+    return parse_memory(result.stdout)
+
+
+class MemorySampler(threading.Thread):
+    """Polls docker stats while the load runs and keeps each container's peak."""
+
+    def __init__(self, containers):
+        super().__init__(daemon=True)
+        self.containers = containers
+        self.peak = {}
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.is_set():
+            for name, used in memory(self.containers).items():
+                self.peak[name] = max(self.peak.get(name, 0), used)
+
+
+def running(containers):
+    result = subprocess.run(["docker", "ps", "--format", "{{.Names}}"], capture_output=True, text=True)
+    names = set(result.stdout.split())
+    return [name for name in containers if name in names]
+
+
+def pgbench(target, env, args, reconnect):
+    database, host, port, user, password_key, network = target
+    command = [
+        "docker", "run", "--rm", "--network", f"{PROJECT}_{network}", "-e", f"PGPASSWORD={env.get(password_key, '')}",
+        "-e", f"BENCH_SQL={args.query}", PGBENCH_IMAGE, "sh", "-c",
+        f'echo "$BENCH_SQL" > /tmp/bench.sql && exec pgbench -n {"-C " if reconnect else ""}'
+        f"-c {args.clients} -j {args.threads} -T {args.duration} -f /tmp/bench.sql -h {host} -p {port} -U {user} {database}",
+    ]
+    result = subprocess.run(command, capture_output=True, text=True)
+    parsed = parse_pgbench(result.stdout + result.stderr)
+    parsed["exit_code"] = result.returncode
+    return parsed
+
+
+def run_topology(name, env, args):
+    """All service databases loaded at once, first with a new connection per transaction, then with persistent ones."""
+    spec = TOPOLOGIES[name]
+    containers = running(spec["containers"])
+    if len(containers) != len(spec["containers"]):
+        print(f"{name}: skipped, not running: {', '.join(sorted(set(spec['containers']) - set(containers)))}")
+        return None
+    summary = {"idle_memory": memory(containers)}
+    sampler = MemorySampler(containers)
+    sampler.start()
+    for workload, reconnect in (("reconnect", True), ("persistent", False)):
+        results = {}
+        threads = [
+            threading.Thread(target=lambda target=target: results.setdefault(target[0], pgbench(target, env, args, reconnect)))
+            for target in spec["targets"]
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        summary[workload] = results
+        print(f"{name} {workload}: " + ", ".join(
+            f"{database} {result.get('tps', 0):.0f} tps, {result['aborted_clients']} aborted"
+            for database, result in results.items()))
+    sampler.done.set()
+    sampler.join()
+    summary["peak_memory"] = sampler.peak
+    return summary
+
+
+def report(summary):
+    rows = []
+    for name, result in summary.items():
+        if result is None:
+            continue
+        for workload in ("reconnect", "persistent"):
+            per_db = result[workload].values()
+            rows.append([
+                name, workload,
+                round(sum(item.get("tps", 0) for item in per_db)),
+                round(max(item.get("latency_avg_ms", 0) for item in per_db), 2),
+                round(max(item.get("connection_ms", 0) for item in per_db), 2) if workload == "reconnect" else "-",
+                sum(item["aborted_clients"] for item in per_db),
+                round(sum(result["idle_memory"].values()) / 1024 ** 2),
+                round(sum(result["peak_memory"].values()) / 1024 ** 2),
+            ])
+    print()
+    print_table(["topology", "connections", "total tps", "worst avg latency ms", "worst connect ms", "aborted clients",
+                 "idle MiB", "peak MiB"], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Memory and connection latency of the per-service Postgres containers vs. shared-db (+ PgBouncer).")
+    parser.add_argument("--topology", nargs="+", choices=sorted(TOPOLOGIES), default=sorted(TOPOLOGIES))
+    parser.add_argument("--clients", type=int, default=150, help="concurrent clients per service database (a login burst)")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--duration", type=int, default=20, help="seconds per workload")
+    parser.add_argument("--query", default="SELECT 1;", help="SQL per transaction")
+    parser.add_argument("--output", help="results JSON path (default: bench-results/db-topology-<timestamp>.json)")
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, ".env"), encoding="utf-8") as f:
+        env = parse_env(f.read())
+    summary = {name: run_topology(name, env, args) for name in args.topology}
+    report(summary)
+    print(f"\nResults saved to {save_results('db-topology', vars(args), summary, args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
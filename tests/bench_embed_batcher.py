@@ -0,0 +1,155 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+import aiohttp
+from aiohttp import web
+
+from benchlib import open_loop, print_table, save_results, summarize, use_service
+
+use_service("mock-openai")
+use_service("embed-batcher")
+from embed_batcher import Sidecar  # noqa: E402
+from mock_openai import MockOpenAI  # noqa: E402
+
+
+def build_chunks(args):
+    """
+    Document chunks in arrival order; `--duplicate-ratio` of them repeat an
+    earlier chunk (boilerplate headers, re-uploads).
+    """
+    rng = random.Random(args.seed)
+    chunks = []
+    for index in range(int(args.rate * args.duration)):
+        if chunks and rng.random() < args.duplicate_ratio:
+            chunks.append(rng.choice(chunks[-200:]))
+        else:
+            chunks.append(f"chunk {index}: " + " ".join(f"w{rng.randrange(5000)}" for _ in range(args.chunk_words)))
+    return chunks
+
+
+async def embed(session, url, headers, model, text):
+    started = time.perf_counter()
+    try:
+        async with session.post(url, json={"model": model, "input": text}, headers=headers) as resp:
+            body = await resp.json(content_type=None)
+            if resp.status != 200:
+                return {"ok": False, "error": f"HTTP {resp.status}", "latency": time.perf_counter() - started}
+            ok = len(body["data"]) == 1 and body["data"][0]["embedding"]
+            return {"ok": bool(ok), "error": None if ok else "bad response", "latency": time.perf_counter() - started}
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        return {"ok": False, "error": type(e).__name__, "latency": time.perf_counter() - started}
+
+
+async def start_sidecar(upstream, args, max_wait_ms):
+    sidecar = Sidecar(upstream, args.max_batch_size, max_wait_ms, args.batch_concurrency)
+    runner = web.AppRunner(sidecar.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return sidecar, runner, f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/v1"
+
+
+async def run_mode(label, url, args, chunks, mock):
+    """
+    Single-input requests at a fixed open-loop arrival rate, as OpenWebUI
+    sends them while ingesting an upload.
+    """
+    headers = {"Authorization": f"Bearer {args.api_key}"} if args.api_key else {}
+    before = dict(mock.stats) if mock else {}
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=args.timeout)) as session:
+        url = f"{url}/embeddings"
+        offsets = [index / args.rate for index in range(len(chunks))]
+        started = time.perf_counter()
+        results = await open_loop(offsets, lambda index, offset: embed(session, url, headers, args.model, chunks[index]))
+        wall = time.perf_counter() - started
+    ok = [result for result in results if result["ok"]]
+    summary = {
+        "requests": len(results),
+        "errors": dict(Counter(result["error"] for result in results if not result["ok"])),
+        "wall_time": round(wall, 3),
+        "requests_per_s": round(len(ok) / wall, 2) if wall else 0.0,
+        "latency": summarize([result["latency"] for result in ok]),
+    }
+    if mock:
+        summary["upstream_calls"] = mock.stats["embeddings"] - before.get("embeddings", 0)
+        summary["upstream_inputs"] = mock.stats["embedding_inputs"] - before.get("embedding_inputs", 0)
+    print(f"{label}: {summary['requests_per_s']} req/s, p95 {summary['latency'].get('p95')} ms")
+    return summary
+
+
+async def run(args):
+    mock = None
+    upstream = args.upstream
+    if not upstream:
+        mock = MockOpenAI(embedding_ms=args.mock_embedding_ms, embedding_input_ms=args.mock_input_ms,
+                          embedding_concurrency=args.mock_concurrency)
+        upstream = f"{await mock.start()}/v1"
+        print(f"Mock embedding upstream on {upstream}: {args.mock_embedding_ms} ms/call + {args.mock_input_ms} ms/input, "
+              f"{args.mock_concurrency or 'unlimited'} calls at once")
+    chunks = build_chunks(args)
+    summary = {}
+    try:
+        summary["unbatched"] = await run_mode("unbatched", upstream, args, chunks, mock)
+        for max_wait_ms in args.max_wait_ms:
+            sidecar, runner, url = await start_sidecar(upstream, args, max_wait_ms)
+            try:
+                label = f"batched wait={max_wait_ms:g}ms"
+                summary[label] = await run_mode(label, url, args, chunks, mock)
+                summary[label]["batcher"] = dict(sidecar.batcher.stats)
+            finally:
+                await runner.cleanup()
+    finally:
+        if mock:
+            await mock.stop()
+    return summary
+
+
+def report(summary):
+    rows = []
+    for label, result in summary.items():
+        stats = result.get("batcher", {})
+        rows.append([
+            label, result["requests_per_s"], result["latency"].get("p50", "-"), result["latency"].get("p95", "-"),
+            result["latency"].get("p99", "-"), result.get("upstream_calls", "-"),
+            round(stats["batched_inputs"] / stats["batches"], 1) if stats.get("batches") else "-",
+            stats.get("deduplicated", "-"), sum(result["errors"].values()),
+        ])
+    print()
+    print_table(["mode", "req/s", "p50 ms", "p95 ms", "p99 ms", "upstream calls", "mean batch", "deduplicated", "errors"], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding throughput and tail latency with and without micro-batching.")
+    parser.add_argument("--upstream", help="OpenAI-compatible base URL (e.g. http://litellm:4000/v1); default: in-process mock")
+    parser.add_argument("--api-key", default=os.getenv("LITELLM_MASTER_KEY", ""))
+    parser.add_argument("--model", default="mock-embedding")
+    parser.add_argument("--rate", type=float, default=400.0, help="single-input requests per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of arrivals")
+    parser.add_argument("--chunk-words", type=int, default=120)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, nargs="+", default=[5.0, 20.0])
+    parser.add_argument("--batch-concurrency", type=int, default=8, help="batches in flight at once")
+    parser.add_argument("--mock-embedding-ms", type=float, default=30.0, help="mock latency per call")
+    parser.add_argument("--mock-input-ms", type=float, default=0.2, help="mock latency per input")
+    parser.add_argument("--mock-concurrency", type=int, default=8, help="mock calls served at once (provider capacity)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="results JSON path (default: bench-results/embed-batcher-<timestamp>.json)")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args))
+    report(summary)
+    config = {key: value for key, value in vars(args).items() if key != "api_key"}
+    print(f"\nResults saved to {save_results('embed-batcher', config, summary, args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+import aiohttp
+
+from benchlib import closed_loop, print_table, save_results, summarize, use_service
+
+use_service("mock-openai")
+from mock_openai import MockOpenAI  # noqa: E402
+
+MOCK_API_BASE = "http://mock-openai:8000/v1"
+
+
+def build_prompt(index, args):
+    """
+    Prompt for request `index`. Unique prompts defeat the response cache,
+    repeated ones measure the cache hit path.
+    """
+    filler = " ".join(["lorem"] * args.prompt_words)
+    suffix = f" request {index}" if args.prompt_mode == "unique" else ""
+    if args.prompt_mode == "whitespace":
+        # Same prompt with varying formatting: only a normalizing cache hits
+        return f"Summarize the following text.{' ' * (index % 4 + 1)}{filler}" + "\n" * (index % 2)
+    return f"Summarize the following text.{suffix} {filler}"
+
+
+async def chat_request(session, url, headers, model, prompt, max_tokens, stream):
+    """
+    One chat completion. For streams, records time to first token and the
+    gaps between content chunks (inter-token latency).
+    """
+    payload = {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+        "stream": stream,
+    }
+    if stream:
+        payload["stream_options"] = {"include_usage": True}
+
+    started = time.perf_counter()
+    try:
+        async with session.post(url, json=payload, headers=headers) as resp:
+            if resp.status != 200:
+                await resp.read()
+                return {"ok": False, "error": f"HTTP {resp.status}", "latency": time.perf_counter() - started}
+            if not stream:
+                body = await resp.json(content_type=None)
+                latency = time.perf_counter() - started
+                tokens = (body.get("usage") or {}).get("completion_tokens", 0)
+                return {"ok": True, "latency": latency, "ttft": latency, "itl": [], "tokens": tokens}
+
+            ttft = None
+            last = None
+            gaps = []
+            tokens = 0
+            async for raw in resp.content:
+                line = raw.strip()
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                chunk = json.loads(data)
+                choices = chunk.get("choices") or []
+                if not choices or not choices[0].get("delta", {}).get("content"):
+                    continue
+                now = time.perf_counter()
+                if ttft is None:
+                    ttft = now - started
+                else:
+                    gaps.append(now - last)
+                last = now
+                tokens += 1
+            return {"ok": True, "latency": time.perf_counter() - started, "ttft": ttft, "itl": gaps, "tokens": tokens}
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        return {"ok": False, "error": type(e).__name__, "latency": time.perf_counter() - started}
+
+
+async def embedding_request(session, url, headers, model, inputs):
+    started = time.perf_counter()
+    try:
+        async with session.post(url, json={"model": model, "input": inputs}, headers=headers) as resp:
+            body = await resp.read()
+            latency = time.perf_counter() - started
+            if resp.status != 200:
+                return {"ok": False, "error": f"HTTP {resp.status}", "latency": latency}
+            usage = json.loads(body).get("usage") or {}
+            return {"ok": True, "latency": latency, "ttft": latency, "itl": [], "tokens": usage.get("prompt_tokens", 0)}
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        return {"ok": False, "error": type(e).__name__, "latency": time.perf_counter() - started}
+
+
+async def register_mock_models(session, base_url, headers, api_base):
+    """
+    Registers the mock upstream as `mock-gpt` and `mock-embedding` in LiteLLM
+    (models are otherwise managed through the UI, see config.yaml).
+    """
+    for name, model in (("mock-gpt", "openai/mock-gpt"), ("mock-embedding", "openai/mock-embedding")):
+        payload = {
+            "model_name": name,
+            "litellm_params": {"model": model, "api_base": api_base, "api_key": "mock"},
+            "model_info": {"mode": "embedding" if "embedding" in name else "chat"},
+        }
+        async with session.post(f"{base_url}/model/new", json=payload, headers=headers) as resp:
+            print(f"Registered {name} -> {api_base}: HTTP {resp.status}")
+
+
+async def run(args):
+    mock = None
+    base_url = args.base_url
+    if args.mock:
+        mock = MockOpenAI(token_rate=args.mock_token_rate, first_token_ms=args.mock_first_token_ms)
+        base_url = await mock.start()
+        print(f"Mock upstream listening on {base_url} (direct, no gateway)")
+
+    headers = {"Authorization": f"Bearer {args.api_key}"} if args.api_key else {}
+    connector = aiohttp.TCPConnector(ssl=False, limit=args.concurrency)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+
+    try:
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            if args.register_models:
+                await register_mock_models(session, base_url, headers, args.mock_api_base)
+
+            if args.endpoint == "chat":
+                url = f"{base_url}/v1/chat/completions"
+
+                async def request(index):
+                    return await chat_request(
+                        session, url, headers, args.model, build_prompt(index, args), args.max_tokens, args.stream
+                    )
+            else:
+                url = f"{base_url}/v1/embeddings"
+
+                async def request(index):
+                    inputs = [build_prompt(index * args.batch + i, args) for i in range(args.batch)]
+                    return await embedding_request(session, url, headers, args.model, inputs)
+
+            if args.warmup:
+                await closed_loop(args.warmup, args.concurrency, request)
+
+            started = time.perf_counter()
+            results = await closed_loop(args.requests, args.concurrency, request)
+            wall = time.perf_counter() - started
+    finally:
+        if mock:
+            await mock.stop()
+
+    ok = [result for result in results if result["ok"]]
+    errors = Counter(result["error"] for result in results if not result["ok"])
+    tokens = sum(result["tokens"] for result in ok)
+    return {
+        "requests": len(results),
+        "errors": dict(errors),
+        "error_rate": round(sum(errors.values()) / len(results), 4) if results else 0.0,
+        "wall_time": round(wall, 3),
+        "requests_per_s": round(len(ok) / wall, 2) if wall else 0.0,
+        "tokens_per_s": round(tokens / wall, 2) if wall else 0.0,
+        "latency": summarize([result["latency"] for result in ok]),
+        "ttft": summarize([result["ttft"] for result in ok if result["ttft"] is not None]),
+        "itl": summarize([gap for result in ok for gap in result["itl"]]),
+    }
+
+
+def report(summary, args):
+    mode = "stream" if args.stream and args.endpoint == "chat" else "plain"
+    print(f"\n{args.label}: {args.endpoint} ({mode}) x{summary['requests']} at concurrency {args.concurrency} "
+          f"in {summary['wall_time']:.1f}s")
+    print(f"{summary['requests_per_s']} req/s, {summary['tokens_per_s']} tokens/s, "
+          f"error rate {summary['error_rate'] * 100:.2f}% {summary['errors'] or ''}")
+    rows = [
+        [metric, stats.get("count", 0), stats.get("p50", "-"), stats.get("p95", "-"), stats.get("p99", "-"), stats.get("max", "-")]
+        for metric, stats in (("latency", summary["latency"]), ("ttft", summary["ttft"]), ("itl", summary["itl"]))
+    ]
+    print_table(["metric (ms)", "n", "p50", "p95", "p99", "max"], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LiteLLM gateway throughput and streaming benchmark.")
+    parser.add_argument("--base-url", default=os.getenv("LITELLM_BENCH_URL", f"https://llm.{os.getenv('BASE_DOMAIN', 'localhost')}"),
+                        help="gateway URL, e.g. http://litellm:4000 (direct) or https://llm.<domain> (via Traefik)")
+    parser.add_argument("--api-key", default=os.getenv("LITELLM_MASTER_KEY", ""))
+    parser.add_argument("--endpoint", choices=["chat", "embeddings"], default="chat")
+    parser.add_argument("--model", help="model alias (default: mock-gpt / mock-embedding)")
+    parser.add_argument("--stream", action="store_true", help="use SSE streaming for chat completions")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20, help="requests sent before measuring")
+    parser.add_argument("--max-tokens", type=int, default=64)
+    parser.add_argument("--batch", type=int, default=1, help="inputs per embeddings request")
+    parser.add_argument("--prompt-words", type=int, default=50)
+    parser.add_argument("--prompt-mode", choices=["unique", "repeat", "whitespace"], default="unique",
+                        help="unique prompts miss the response cache, repeated prompts hit it, "
+                             "whitespace repeats one prompt with varying formatting")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--register-models", action="store_true", help="register the mock upstream models in LiteLLM first")
+    parser.add_argument("--mock-api-base", default=MOCK_API_BASE, help="mock upstream URL as seen from LiteLLM")
+    parser.add_argument("--mock", action="store_true", help="benchmark an in-process mock upstream directly (harness check / baseline)")
+    parser.add_argument("--mock-token-rate", type=float, default=200.0)
+    parser.add_argument("--mock-first-token-ms", type=float, default=20.0)
+    parser.add_argument("--label", default="run", help="name for this configuration in A/B comparisons")
+    parser.add_argument("--output", help="results JSON path (default: bench-results/litellm-<timestamp>.json)")
+    args = parser.parse_args()
+    args.model = args.model or ("mock-gpt" if args.endpoint == "chat" else "mock-embedding")
+
+    summary = asyncio.run(run(args))
+    report(summary, args)
+    config = {key: value for key, value in vars(args).items() if key != "api_key"}
+    print(f"\nResults saved to {save_results('litellm', config, summary, args.output)}")
+    return 0 if not summary["errors"] else 1
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    sys.exit(main())
@@ -0,0 +1,195 @@
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+
+from benchlib import closed_loop, print_table, save_results, summarize, use_service
+
+use_service("litellm")
+from prompt_cache import MemoryStore, PromptCache, TieredCache  # noqa: E402
+
+
+class LatencyStore:
+    """MemoryStore with a simulated network round trip on every command."""
+
+    def __init__(self, store, rtt_ms):
+        self.store = store
+        self.rtt = rtt_ms / 1000
+        self.calls = 0
+
+    def pubsub(self):
+        return self.store.pubsub()
+
+    def __getattr__(self, name):
+        method = getattr(self.store, name)
+
+        async def call(*args, **kwargs):
+            self.calls += 1
+            await asyncio.sleep(self.rtt)
+            return await method(*args, **kwargs)
+
+        return call
+
+
+class CountingRedis:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = 0
+
+    def pubsub(self):
+        return self.redis.pubsub()
+
+    def __getattr__(self, name):
+        method = getattr(self.redis, name)
+
+        async def call(*args, **kwargs):
+            self.calls += 1
+            return await method(*args, **kwargs)
+
+        return call
+
+
+def build_workload(args):
+    """Prompt indices with Zipf popularity, plus which requests rewrite their entry."""
+    rng = random.Random(args.seed)
+    weights = [1 / (rank + 1) ** args.zipf for rank in range(args.prompts)]
+    prompts = rng.choices(range(args.prompts), weights=weights, k=args.requests)
+    rewrites = [rng.random() < args.rewrite_ratio for _ in range(args.requests)]
+    return prompts, rewrites
+
+
+def open_store(args):
+    if args.redis_url:
+        import redis.asyncio as aioredis
+
+        return CountingRedis(aioredis.from_url(args.redis_url))
+    return LatencyStore(MemoryStore(), args.rtt_ms)
+
+
+async def run_mode(label, args, replicas, tiered, workload):
+    """
+    Closed-loop lookups spread round-robin over `replicas` LiteLLM
+    processes sharing one store. A miss stores a response (as LiteLLM does
+    after the upstream call); a rewrite replaces an entry with a new
+    version, and a lookup that returns an older version than the newest one
+    stored before it started counts as stale.
+    """
+    store = open_store(args)
+    namespace = f"bench_tiers:{uuid.uuid4().hex[:8]}"
+    caches = []
+    for index in range(replicas):
+        cache = PromptCache(store, namespace=namespace, default_ttl=args.ttl, max_bytes=args.max_mb * 1024 * 1024)
+        if tiered:
+            cache = TieredCache(cache, l1_max_bytes=args.l1_mb * 1024 * 1024, l1_ttl=args.l1_ttl,
+                                negative_ttl=args.negative_ttl, node_id=f"replica-{index}")
+            await cache.async_get_cache(f"{namespace}:warmup")
+            await asyncio.wait_for(cache.subscribed.wait(), 5)
+        caches.append(cache)
+    prompts, rewrites = workload
+    keys = [caches[0].cache_key({"model": "mock-gpt", "messages": [{"role": "user", "content": f"prompt {index}"}]})
+            for index in range(args.prompts)]
+    padding = "x" * args.response_bytes
+    latest = {}
+    stale = 0
+    calls_before = store.calls
+
+    def response(prompt, version):
+        return {"timestamp": 1, "version": version, "response": {"choices": [{"message": {"content": padding}}]}}
+
+    async def one(index):
+        nonlocal stale
+        cache = caches[index % replicas]
+        prompt = prompts[index]
+        newest = latest.get(prompt, 0)
+        started = time.perf_counter()
+        value = await cache.async_get_cache(keys[prompt])
+        latency = time.perf_counter() - started
+        if value is not None and value["version"] < newest:
+            stale += 1
+        if value is None or rewrites[index]:
+            version = newest + 1
+            await cache.async_set_cache(keys[prompt], response(prompt, version))
+            latest[prompt] = max(latest.get(prompt, 0), version)
+        return {"hit": value is not None, "latency": latency}
+
+    started = time.perf_counter()
+    results = await closed_loop(args.requests, args.concurrency, one)
+    wall = time.perf_counter() - started
+    summary = {
+        "replicas": replicas,
+        "tiered": tiered,
+        "lookups_per_s": round(len(results) / wall, 1),
+        "hit_ratio": round(sum(result["hit"] for result in results) / len(results), 4),
+        "stale_reads": stale,
+        "store_calls": store.calls - calls_before,
+        "latency": summarize([result["latency"] for result in results]),
+    }
+    if tiered:
+        totals = {}
+        for cache in caches:
+            for name, value in cache.stats.items():
+                totals[name] = totals.get(name, 0) + value
+        summary["tiers"] = totals
+        summary["l1_hit_ratio"] = round((totals["l1_hits"] + totals["l1_negative_hits"]) / len(results), 4)
+    if tiered:
+        for cache in caches:
+            cache.listener.cancel()
+    if args.redis_url:
+        await store.redis.aclose()
+    print(f"{label}: {summary['lookups_per_s']} lookups/s, p95 {summary['latency'].get('p95')} ms, "
+          f"{summary['store_calls']} store calls")
+    return summary
+
+
+async def run(args):
+    workload = build_workload(args)
+    summary = {}
+    for replicas in args.replicas:
+        summary[f"redis only x{replicas}"] = await run_mode(f"redis only x{replicas}", args, replicas, False, workload)
+        summary[f"L1+redis x{replicas}"] = await run_mode(f"L1+redis x{replicas}", args, replicas, True, workload)
+    return summary
+
+
+def report(summary):
+    rows = []
+    for label, result in summary.items():
+        rows.append([
+            label, result["lookups_per_s"], result["hit_ratio"], result.get("l1_hit_ratio", "-"),
+            result["latency"].get("p50"), result["latency"].get("p95"), result["latency"].get("p99"),
+            result["store_calls"], result.get("tiers", {}).get("invalidations", "-"), result["stale_reads"],
+        ])
+    print()
+    print_table(["mode", "lookups/s", "hit ratio", "L1 ratio", "p50 ms", "p95 ms", "p99 ms", "store calls",
+                 "invalidations", "stale"], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt cache lookups with and without the in-process L1, per replica count.")
+    parser.add_argument("--redis-url", help="real Redis (e.g. redis://litellm-redis:6379/0); default: in-process store")
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="simulated Redis round trip of the in-process store")
+    parser.add_argument("--replicas", type=int, nargs="+", default=[1, 3])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--prompts", type=int, default=2000, help="distinct prompts")
+    parser.add_argument("--zipf", type=float, default=1.1, help="popularity skew of the prompts")
+    parser.add_argument("--rewrite-ratio", type=float, default=0.01, help="requests that store a new version")
+    parser.add_argument("--response-bytes", type=int, default=2000)
+    parser.add_argument("--ttl", type=int, default=600)
+    parser.add_argument("--max-mb", type=int, default=256)
+    parser.add_argument("--l1-mb", type=int, default=64)
+    parser.add_argument("--l1-ttl", type=float, default=30.0)
+    parser.add_argument("--negative-ttl", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="results JSON path (default: bench-results/prompt-cache-tiers-<timestamp>.json)")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args))
+    report(summary)
+    print(f"\nResults saved to {save_results('prompt-cache-tiers', vars(args), summary, args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
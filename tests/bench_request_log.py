@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchlib import print_table, save_results, summarize, use_service
+
+use_service("litellm")
+from request_log import FileSink, RequestLog  # noqa: E402
+
+
+def make_record(index, args):
+    """
+    A request as the gateway sees it: a prompt, a streamed completion and
+    the per-chunk payloads DEBUG logging writes out.
+    """
+    slow = args.slow_every and index % args.slow_every == 0
+    failed = args.error_every and index % args.error_every == 0
+    return {
+        "id": f"call-{index}",
+        "ts": time.time(),
+        "model": "mock-gpt",
+        "status": "failure" if failed else "success",
+        "latency_ms": 9000.0 if slow else 350.0,
+        "prompt_tokens": args.prompt_bytes // 4,
+        "completion_tokens": args.chunks,
+        "user": "bench@example.org",
+        "cache_hit": False,
+        "error": "RateLimitError" if failed else None,
+        "messages": [{"role": "user", "content": "x" * args.prompt_bytes}],
+        "response": {"choices": [{"message": {"content": "tok " * args.chunks}}]},
+    }
+
+
+def bench_debug(args, path):
+    """
+    Current settings: a synchronous JSON line per streamed chunk plus the raw
+    request/response, written straight from the request path.
+    """
+    hot = []
+    started = time.perf_counter()
+    with open(path, "w", encoding="utf-8", buffering=1) as out:
+        for index in range(args.requests):
+            record = make_record(index, args)
+            t = time.perf_counter()
+            for chunk in range(args.chunks):
+                out.write(json.dumps({"level": "DEBUG", "id": record["id"], "chunk": chunk, "delta": "tok "}) + "\n")
+            out.write(json.dumps(record) + "\n")
+            hot.append(time.perf_counter() - t)
+    return hot, time.perf_counter() - started, os.path.getsize(path)
+
+
+async def bench_pipeline(args, path):
+    pipeline = RequestLog(
+        FileSink(path), sample_rate=args.sample_rate, slow_ms=5000, max_field_bytes=args.max_field_bytes,
+        queue_size=args.queue_size, batch_size=args.batch_size, flush_interval=0.5,
+    )
+    hot = []
+    started = time.perf_counter()
+    for index in range(args.requests):
+        record = make_record(index, args)
+        t = time.perf_counter()
+        pipeline.offer(record)
+        hot.append(time.perf_counter() - t)
+        if index % 100 == 0:
+            await asyncio.sleep(0)  # let the flusher run as it would between requests
+    hot_wall = time.perf_counter() - started
+    await pipeline.drain()
+    await pipeline.sink.close()
+    size = sum(os.path.getsize(os.path.join(os.path.dirname(path), name)) for name in os.listdir(os.path.dirname(path))
+               if name.startswith(os.path.basename(path)))
+    return hot, hot_wall, size, pipeline.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request-path cost of DEBUG logging vs. the sampled request log.")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--chunks", type=int, default=64, help="streamed chunks per request (one DEBUG line each)")
+    parser.add_argument("--prompt-bytes", type=int, default=2000)
+    parser.add_argument("--sample-rate", type=float, default=0.05)
+    parser.add_argument("--max-field-bytes", type=int, default=4096)
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--slow-every", type=int, default=100, help="every Nth request is slow (always kept)")
+    parser.add_argument("--error-every", type=int, default=200, help="every Nth request fails (always kept)")
+    parser.add_argument("--output", help="results JSON path (default: bench-results/request-log-<timestamp>.json)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        debug_hot, debug_wall, debug_bytes = bench_debug(args, os.path.join(tmp, "debug.log"))
+        os.makedirs(os.path.join(tmp, "pipeline"))
+        pipe_hot, pipe_wall, pipe_bytes, stats = asyncio.run(bench_pipeline(args, os.path.join(tmp, "pipeline", "requests.jsonl")))
+
+    summary = {
+        "debug": {"hot_path": summarize(debug_hot), "wall_time": round(debug_wall, 3), "bytes_written": debug_bytes},
+        "pipeline": {"hot_path": summarize(pipe_hot), "wall_time": round(pipe_wall, 3), "bytes_written": pipe_bytes, "stats": stats},
+    }
+    rows = [
+        [name, result["hot_path"]["mean"], result["hot_path"]["p99"], result["wall_time"], round(result["bytes_written"] / 1e6, 2)]
+        for name, result in summary.items()
+    ]
+    print(f"{args.requests} requests, {args.chunks} chunks each")
+    print_table(["logging", "mean ms/request", "p99 ms", "wall s", "MB written"], rows)
+    print(f"pipeline: {stats['queued']} kept ({stats['kept_tail']} errors/slow), {stats['sampled_out']} sampled out, "
+          f"{stats['dropped']} dropped, {stats['truncated']} fields truncated")
+    print(f"\nResults saved to {save_results('request-log', vars(args), summary, args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+from collections import Counter
+
+import aiohttp
+
+from bench_litellm import chat_request
+from benchlib import open_loop, print_table, ramp_schedule, save_results, summarize, use_service
+
+use_service("litellm")
+use_service("mock-openai")
+from mock_openai import MockOpenAI  # noqa: E402
+from routing import LatencyCostRouter, LocalWindows, deployment_id  # noqa: E402
+
+GROUP = "mock-gpt"
+
+
+class UpstreamError(Exception):
+    pass
+
+
+class Upstream:
+    """
+    One deployment: a mock server that serves `slots` requests at a time and
+    now and then stalls while holding a slot (GC pause, preemption, a long
+    prompt ahead in the batch).
+    """
+
+    def __init__(self, name, mock, slots, stall_rate, stall_ms, cost, rng):
+        self.name = name
+        self.mock = mock
+        self.slots = asyncio.Semaphore(slots)
+        self.stall_rate = stall_rate
+        self.stall_ms = stall_ms
+        self.cost = cost
+        self.rng = rng
+
+    def deployment(self):
+        return {
+            "model_name": GROUP,
+            "litellm_params": {"model": "openai/mock-gpt", "api_base": f"{self.mock.base_url}/v1",
+                               "input_cost_per_token": self.cost, "output_cost_per_token": self.cost},
+            "model_info": {"id": self.name},
+        }
+
+    async def call(self, session, prompt, max_tokens):
+        started = time.perf_counter()
+        async with self.slots:
+            queued = time.perf_counter() - started
+            if self.rng.random() < self.stall_rate:
+                await asyncio.sleep(self.stall_ms / 1000)
+                queued = time.perf_counter() - started
+            result = await chat_request(session, f"{self.mock.base_url}/v1/chat/completions", {}, "mock-gpt", prompt,
+                                        max_tokens, True)
+        result["latency"] += queued
+        if result.get("ttft") is not None:
+            result["ttft"] += queued
+        return result
+
+
+class SimRouter:
+    """
+    The litellm.Router surface the strategy plugs into. Without a strategy
+    it picks like simple-shuffle (uniform, equal weights); with one, the
+    outcome of every call is recorded the way the logging callbacks do.
+    """
+
+    def __init__(self, session, upstreams, seed):
+        self.session = session
+        self.upstreams = {upstream.name: upstream for upstream in upstreams}
+        self.rng = random.Random(seed)
+        self.strategy = None
+
+    def get_model_list(self, model_name=None):
+        return [upstream.deployment() for upstream in self.upstreams.values()]
+
+    async def async_get_available_deployment(self, model, messages=None, input=None, specific_deployment=False,
+                                             request_kwargs=None):
+        return self.rng.choice(self.get_model_list(model))
+
+    def set_custom_routing_strategy(self, strategy):
+        self.strategy = strategy
+        self.async_get_available_deployment = strategy.async_get_available_deployment
+
+    async def _acompletion(self, model, messages, **kwargs):
+        deployment = await self.async_get_available_deployment(model=model, messages=messages, request_kwargs=kwargs)
+        upstream = self.upstreams[deployment_id(deployment)]
+        started = time.perf_counter()
+        result = await upstream.call(self.session, messages[0]["content"], kwargs.get("max_tokens", 16))
+        if self.strategy is not None:
+            await self.strategy.record(model, upstream.name, result.get("ttft") or result["latency"], result["ok"],
+                                       kwargs["metadata"]["routing_hedge"])
+        if not result["ok"]:
+            raise UpstreamError(result.get("error"))
+        return {**result, "deployment": upstream.name, "started": started}
+
+
+async def run_phase(label, upstreams, args, strategy):
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=600)) as session:
+        router = SimRouter(session, upstreams, args.seed)
+        if strategy is not None:
+            strategy.install(router)
+        for upstream in upstreams:
+            upstream.mock.first_token_ms = upstream.base_first_token_ms
+        offsets = ramp_schedule(args.rate, args.rate, args.duration)
+
+        async def degrade():
+            # the fastest deployment slows down halfway through, e.g. a noisy neighbour
+            await asyncio.sleep(args.duration * args.degrade_at)
+            upstreams[0].mock.first_token_ms = upstreams[0].base_first_token_ms * args.degrade_factor
+
+        async def one(index, offset):
+            started = time.perf_counter()
+            try:
+                result = await router._acompletion(GROUP, [{"role": "user", "content": f"chat message {index}"}],
+                                                   max_tokens=args.max_tokens)
+            except UpstreamError as e:
+                return {"ok": False, "error": str(e)}
+            # client view: from the request to the first token of the answer that won
+            result["client_ttft"] = result["started"] - started + result["ttft"]
+            return result
+
+        degrading = asyncio.ensure_future(degrade())
+        results = await open_loop(offsets, one)
+        degrading.cancel()
+
+    ok = [result for result in results if result.get("ok")]
+    costs = {upstream.name: upstream.cost for upstream in upstreams}
+    summary = {
+        "requests": len(results),
+        "errors": dict(Counter(result["error"] for result in results if not result.get("ok"))),
+        "ttft": summarize([result["client_ttft"] for result in ok]),
+        "share": {name: round(count / len(ok), 3) for name, count in sorted(Counter(r["deployment"] for r in ok).items())},
+        "cost_per_1k_tokens": round(sum(costs[result["deployment"]] * 2000 for result in ok) / len(ok), 6) if ok else None,
+    }
+    if strategy is not None:
+        summary["hedges"] = strategy.hedges
+    print(f"{label}: TTFT p50 {summary['ttft'].get('p50')} ms, p95 {summary['ttft'].get('p95')} ms, "
+          f"share {summary['share']}")
+    return summary
+
+
+def strategy_for(args, hedge):
+    return LatencyCostRouter(
+        LocalWindows(window=args.window, buckets=6), cost_weight=args.cost_weight, sharpness=args.sharpness,
+        hedge_factor=args.hedge_factor, hedge_min_ms=args.hedge_min_ms,
+        hedge_budget=args.hedge_budget if hedge else 0.0, rng=random.Random(args.seed),
+    )
+
+
+async def run(args):
+    upstreams = []
+    for index, (first_token_ms, cost) in enumerate(zip(args.first_token_ms, args.costs)):
+        mock = MockOpenAI(token_rate=args.token_rate, first_token_ms=first_token_ms, completion_tokens=args.max_tokens,
+                          name=f"deployment-{index}")
+        await mock.start()
+        # stalls are drawn per deployment, so they do not depend on how the router spreads requests
+        upstream = Upstream(f"deployment-{index}", mock, args.slots, args.stall_rate, args.stall_ms, cost,
+                            random.Random(args.seed + index))
+        upstream.base_first_token_ms = first_token_ms
+        upstreams.append(upstream)
+    try:
+        return {
+            "shuffle": await run_phase("shuffle", upstreams, args, None),
+            "latency-cost": await run_phase("latency-cost", upstreams, args, strategy_for(args, hedge=False)),
+            "latency-cost + hedging": await run_phase("latency-cost + hedging", upstreams, args,
+                                                      strategy_for(args, hedge=True)),
+        }
+    finally:
+        for upstream in upstreams:
+            await upstream.mock.stop()
+
+
+def report(summary):
+    rows = []
+    for label, result in summary.items():
+        rows.append([label, result["ttft"].get("mean", "-"), result["ttft"].get("p50", "-"), result["ttft"].get("p95", "-"),
+                     result["ttft"].get("p99", "-"), sum(result["errors"].values()), result.get("hedges", "-"),
+                     result["cost_per_1k_tokens"], " ".join(f"{share:.0%}" for share in result["share"].values())])
+    print()
+    print_table(["router", "TTFT mean ms", "TTFT p50 ms", "TTFT p95 ms", "TTFT p99 ms", "errors", "hedges", "cost/1k tok",
+                 "share per deployment"], rows)
+    baseline = summary["shuffle"]["ttft"]
+    for label in ("latency-cost", "latency-cost + hedging"):
+        ttft = summary[label]["ttft"]
+        if baseline.get("mean") and ttft.get("mean"):
+            print(f"{label}: TTFT mean {round(baseline['mean'] / ttft['mean'], 2)}x, "
+                  f"p95 {round(baseline['p95'] / ttft['p95'], 2)}x better than shuffle")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Simulated deployments at different speeds: TTFT with shuffle vs. latency/cost routing and hedging.")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per router")
+    parser.add_argument("--rate", type=float, default=20.0, help="requests per second (open loop)")
+    parser.add_argument("--first-token-ms", type=float, nargs="+", default=[80.0, 200.0, 600.0],
+                        help="time to first token of each deployment")
+    parser.add_argument("--costs", type=float, nargs="+", default=[3e-6, 1e-6, 0.5e-6],
+                        help="cost per input/output token of each deployment")
+    parser.add_argument("--slots", type=int, default=8, help="requests each deployment serves at once")
+    parser.add_argument("--stall-rate", type=float, default=0.03, help="share of requests that stall upstream")
+    parser.add_argument("--stall-ms", type=float, default=2000.0)
+    parser.add_argument("--degrade-at", type=float, default=0.5, help="fraction of the run after which deployment 0 slows down")
+    parser.add_argument("--degrade-factor", type=float, default=8.0)
+    parser.add_argument("--window", type=float, default=10.0, help="ROUTING_WINDOW")
+    parser.add_argument("--cost-weight", type=float, default=0.2, help="ROUTING_COST_WEIGHT")
+    parser.add_argument("--sharpness", type=float, default=4.0, help="ROUTING_SHARPNESS")
+    parser.add_argument("--hedge-factor", type=float, default=2.0, help="ROUTING_HEDGE_FACTOR")
+    parser.add_argument("--hedge-min-ms", type=float, default=300.0, help="ROUTING_HEDGE_MIN_MS")
+    parser.add_argument("--hedge-budget", type=float, default=0.1, help="ROUTING_HEDGE_BUDGET")
+    parser.add_argument("--max-tokens", type=int, default=16)
+    parser.add_argument("--token-rate", type=float, default=400.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="results JSON path (default: bench-results/routing-<timestamp>.json)")
+    args = parser.parse_args()
+    if len(args.costs) != len(args.first_token_ms):
+        parser.error("--costs needs one value per --first-token-ms")
+
+    # mock servers complain when a hedge cancels the stream they are writing
+    logging.getLogger("aiohttp.server").setLevel(logging.CRITICAL)
+    summary = asyncio.run(run(args))
+    report(summary)
+    print(f"\nResults saved to {save_results('routing', vars(args), summary, args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
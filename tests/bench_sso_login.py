@@ -0,0 +1,174 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+
+import aiohttp
+
+from benchlib import current_rate, open_loop, print_table, ramp_schedule, save_results, summarize
+from mock_idp import MockIdP, clients_for
+from oidc_client import PROVIDERS, AuthentikClient, LoginError, provider_settings
+
+
+async def one_login(connector, sso_url, email, password, settings, timeout):
+    """
+    A complete cold login (fresh session) for one provider. Returns the
+    per-stage timings or the error that ended it.
+    """
+    started = time.perf_counter()
+    try:
+        async with AuthentikClient(sso_url, email, password, timeout=timeout, connector=connector) as client:
+            result = await client.login(
+                settings["slug"], settings["client_id"], settings["client_secret"], settings["redirect_uri"]
+            )
+        return {"ok": True, "total": time.perf_counter() - started, "timings": result["timings"]}
+    except (LoginError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+        return {"ok": False, "total": time.perf_counter() - started, "error": type(e).__name__, "detail": str(e)}
+
+
+def aggregate(results, steps, args):
+    """
+    Folds raw login results into overall and per-ramp-step latency summaries.
+    """
+    def fold(items):
+        stages = defaultdict(list)
+        errors = Counter()
+        attempts = 0
+        for item in items:
+            attempts += 1
+            if item.get("skipped"):
+                errors["skipped"] += 1
+            elif not item["ok"]:
+                errors[item["error"]] += 1
+            else:
+                stages["total"].append(item["total"])
+                for stage, seconds in item["timings"]:
+                    stages[stage].append(seconds)
+        failed = sum(errors.values())
+        return {
+            "attempts": attempts,
+            "errors": dict(errors),
+            "error_rate": round(failed / attempts, 4) if attempts else 0.0,
+            "stages": {stage: summarize(values) for stage, values in stages.items()},
+        }
+
+    by_provider = defaultdict(list)
+    by_step = defaultdict(list)
+    step_length = args.duration / steps
+    for item in results:
+        by_provider[item["provider"]].append(item)
+        by_step[min(int(item["offset"] / step_length), steps - 1)].append(item)
+
+    return {
+        "overall": fold(results),
+        "providers": {name: fold(items) for name, items in by_provider.items()},
+        "steps": [
+            {
+                "target_rate": round(current_rate(args.rate_start, args.rate_end, args.duration, (step + 0.5) * step_length), 2),
+                **fold(by_step[step]),
+            }
+            for step in range(steps)
+        ],
+    }
+
+
+async def run(args):
+    email, password = args.email, args.password
+    env = os.environ
+    idp = None
+    if args.mock:
+        env = {spec[key]: f"mock-{name}-{key}" for name, spec in PROVIDERS.items() for key in ("client_id_env", "client_secret_env")}
+        idp = MockIdP(email, password, clients_for([provider_settings(name, args.domain, env) for name in PROVIDERS], args.domain),
+                      base_domain=args.domain, stage_delay=args.mock_stage_delay / 1000)
+        sso_url = await idp.start()
+        print(f"Mock IdP listening on {sso_url}")
+    else:
+        sso_url = args.sso_url or f"https://sso.{args.domain}"
+
+    providers = [provider_settings(name, args.domain, env) for name in args.providers]
+    offsets = ramp_schedule(args.rate_start, args.rate_end, args.duration)
+    print(f"Ramping {args.rate_start} -> {args.rate_end} logins/s over {args.duration}s "
+          f"({len(offsets)} logins across {', '.join(args.providers)})")
+
+    connector = aiohttp.TCPConnector(ssl=False, limit=args.max_in_flight or 0)
+
+    async def arrival(index, offset):
+        settings = providers[index % len(providers)]
+        result = await one_login(connector, sso_url, email, password, settings, args.timeout)
+        result.update(provider=settings["slug"], offset=offset)
+        return result
+
+    try:
+        started = time.perf_counter()
+        results = await open_loop(offsets, arrival, args.max_in_flight)
+        wall = time.perf_counter() - started
+    finally:
+        await connector.close()
+        if idp:
+            await idp.stop()
+
+    for index, item in enumerate(results):
+        if item.get("skipped"):
+            item["provider"] = providers[index % len(providers)]["slug"]
+    summary = aggregate(results, args.steps, args)
+    summary["wall_time"] = round(wall, 3)
+    summary["achieved_rate"] = round(len(results) / wall, 2) if wall else 0.0
+    return summary
+
+
+def report(summary):
+    overall = summary["overall"]
+    print(f"\n{overall['attempts']} logins in {summary['wall_time']:.1f}s "
+          f"({summary['achieved_rate']}/s), error rate {overall['error_rate'] * 100:.2f}%")
+    if overall["errors"]:
+        print("Errors: " + ", ".join(f"{name}={count}" for name, count in overall["errors"].items()))
+
+    print("\nPer-stage latency (ms):")
+    rows = [
+        [stage, stats["count"], stats["p50"], stats["p95"], stats["p99"], stats["max"]]
+        for stage, stats in overall["stages"].items()
+    ]
+    print_table(["stage", "n", "p50", "p95", "p99", "max"], rows)
+
+    print("\nRamp steps:")
+    rows = [
+        [step["target_rate"], step["attempts"], f"{step['error_rate'] * 100:.1f}%",
+         step["stages"].get("total", {}).get("p50", "-"), step["stages"].get("total", {}).get("p95", "-"),
+         step["stages"].get("total", {}).get("p99", "-")]
+        for step in summary["steps"]
+    ]
+    print_table(["rate/s", "n", "errors", "p50", "p95", "p99"], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop Authentik authorization-code login benchmark.")
+    parser.add_argument("--providers", nargs="+", default=list(PROVIDERS), choices=list(PROVIDERS))
+    parser.add_argument("--rate-start", type=float, default=1.0, help="arrival rate at the start (logins/s)")
+    parser.add_argument("--rate-end", type=float, default=20.0, help="arrival rate at the end (logins/s)")
+    parser.add_argument("--duration", type=float, default=60.0, help="ramp duration in seconds")
+    parser.add_argument("--steps", type=int, default=6, help="number of ramp windows to report")
+    parser.add_argument("--max-in-flight", type=int, default=500, help="skip arrivals beyond this many open logins (0 = unlimited)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-login timeout in seconds")
+    parser.add_argument("--domain", default=os.getenv("BASE_DOMAIN", "localhost"))
+    parser.add_argument("--sso-url", help="Authentik base URL (default: https://sso.<domain>)")
+    parser.add_argument("--email", default=os.getenv("ADMIN_EMAIL", "admin@example.com"))
+    parser.add_argument("--password", default=os.getenv("ADMIN_PASSWORD", "password123"))
+    parser.add_argument("--mock", action="store_true", help="run against a built-in mock IdP instead of Authentik")
+    parser.add_argument("--mock-stage-delay", type=float, default=0.0, help="latency the mock adds per stage (ms)")
+    parser.add_argument("--output", help="results JSON path (default: bench-results/sso-login-<timestamp>.json)")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args))
+    report(summary)
+    config = {key: value for key, value in vars(args).items() if key != "password"}
+    print(f"\nResults saved to {save_results('sso-login', config, summary, args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    sys.exit(main())
@@ -0,0 +1,262 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+
+import aiohttp
+
+from benchlib import open_loop, print_table, save_results, summarize
+
+SCRIPT_PREFIX = "f/bench"
+
+FAST_SCRIPT = '''def main(i: int):
+    return {"i": i, "square": i * i}
+'''
+
+# Runs inside a Windmill worker; standard library only so it has no
+# dependency install on first run.
+LLM_SCRIPT = '''import json
+import urllib.request
+
+
+def main(prompt: str, base_url: str = "http://litellm:4000/v1", model: str = "mock-gpt", max_tokens: int = 64,
+         api_key: str = "mock"):
+    request = urllib.request.Request(
+        f"{base_url}/chat/completions",
+        data=json.dumps({"model": model, "messages": [{"role": "user", "content": prompt}],
+                         "max_tokens": max_tokens}).encode(),
+        headers={"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"},
+    )
+    with urllib.request.urlopen(request, timeout=600) as response:
+        return json.load(response).get("usage")
+'''
+
+
+def parse_time(value):
+    """Windmill timestamp (ISO 8601, Z suffix) -> epoch seconds."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+class WindmillClient:
+    def __init__(self, session, base_url, workspace, token):
+        self.session = session
+        self.base = f"{base_url.rstrip('/')}/api/w/{workspace}"
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    async def ensure_script(self, path, content, tag=None):
+        """
+        Creates or updates the script at `path`; unchanged scripts are left
+        alone so repeated runs do not create new versions.
+        """
+        parent_hash = None
+        async with self.session.get(f"{self.base}/scripts/get/p/{path}", headers=self.headers) as resp:
+            if resp.status == 200:
+                current = await resp.json()
+                if current.get("content") == content and current.get("tag") == tag:
+                    return current["hash"]
+                parent_hash = current["hash"]
+        payload = {
+            "path": path,
+            "summary": "benchmark",
+            "description": "Created by tests/bench_windmill.py",
+            "content": content,
+            "language": "python3",
+            "tag": tag,
+            "parent_hash": parent_hash,
+        }
+        async with self.session.post(f"{self.base}/scripts/create", json=payload, headers=self.headers) as resp:
+            if resp.status >= 300:
+                raise RuntimeError(f"Creating {path} failed: HTTP {resp.status} {await resp.text()}")
+            return await resp.text()
+
+    async def run(self, path, args, tag=None):
+        params = {"tag": tag} if tag else {}
+        async with self.session.post(f"{self.base}/jobs/run/p/{path}", json=args, params=params, headers=self.headers) as resp:
+            if resp.status >= 300:
+                raise RuntimeError(f"HTTP {resp.status}")
+            return (await resp.text()).strip().strip('"')
+
+    async def get(self, job_id):
+        async with self.session.get(f"{self.base}/jobs_u/get/{job_id}", headers=self.headers) as resp:
+            if resp.status != 200:
+                return None
+            return await resp.json()
+
+
+async def wait_for_jobs(client, submitted, timeout, concurrency=32, interval=1.0):
+    """
+    Polls every submitted job until it completes (or `timeout` passes) and
+    returns their server-side timings.
+    """
+    pending = {record["id"]: record for record in submitted if record.get("id")}
+    semaphore = asyncio.Semaphore(concurrency)
+    deadline = time.monotonic() + timeout
+
+    async def poll(job_id):
+        async with semaphore:
+            job = await client.get(job_id)
+        if job and job.get("type") == "CompletedJob":
+            record = pending.pop(job_id)
+            record.update({
+                "created_at": parse_time(job.get("created_at")),
+                "started_at": parse_time(job.get("started_at")),
+                "duration_ms": job.get("duration_ms"),
+                "success": job.get("success"),
+                "worker": job.get("worker"),
+                "server_tag": job.get("tag"),
+            })
+
+    while pending and time.monotonic() < deadline:
+        await asyncio.gather(*(poll(job_id) for job_id in list(pending)))
+        if pending:
+            print(f"  {len(pending)} jobs still queued or running")
+            await asyncio.sleep(interval)
+    for record in pending.values():
+        record["timed_out"] = True
+    return submitted
+
+
+def aggregate(records):
+    """
+    Per phase and job kind: queue wait (created -> started), execution time,
+    errors and completed jobs per second.
+    """
+    groups = {}
+    for record in records:
+        groups.setdefault(record["phase"], {}).setdefault(record["kind"], []).append(record)
+
+    summary = {}
+    for phase, kinds in groups.items():
+        summary[phase] = {}
+        for kind, jobs in kinds.items():
+            done = [job for job in jobs if job.get("started_at") is not None and job.get("duration_ms") is not None]
+            errors = Counter(
+                job.get("error") or ("timeout" if job.get("timed_out") else "failed")
+                for job in jobs if job.get("error") or job.get("timed_out") or job.get("success") is False
+            )
+            window = None
+            if done:
+                first = min(job["created_at"] for job in done)
+                last = max(job["started_at"] + job["duration_ms"] / 1000 for job in done)
+                window = last - first
+            summary[phase][kind] = {
+                "submitted": len(jobs),
+                "completed": len(done),
+                "errors": dict(errors),
+                "queue_wait": summarize([job["started_at"] - job["created_at"] for job in done]),
+                "execution": summarize([job["duration_ms"] / 1000 for job in done]),
+                "jobs_per_s": round(len(done) / window, 2) if window else 0.0,
+                "tags": dict(Counter(job.get("server_tag") for job in done)),
+            }
+    return summary
+
+
+def fast_latency_ratio(summary):
+    """p95 queue wait of fast jobs under LLM load relative to the baseline."""
+    try:
+        baseline = summary["baseline"]["fast"]["queue_wait"]["p95"]
+        loaded = summary["loaded"]["fast"]["queue_wait"]["p95"]
+    except KeyError:
+        return None
+    return round(loaded / baseline, 2) if baseline else None
+
+
+async def run_phase(client, phase, args, with_llm):
+    """
+    Fast jobs at a steady open-loop rate; in the loaded phase a burst of LLM
+    jobs is submitted first so the llm-batch pool is saturated throughout.
+    """
+    records = []
+
+    async def submit(kind, path, job_args, tag):
+        record = {"phase": phase, "kind": kind, "submitted": time.time()}
+        try:
+            record["id"] = await client.run(path, job_args, tag)
+        except (aiohttp.ClientError, asyncio.TimeoutError, RuntimeError) as e:
+            record["error"] = str(e)
+        records.append(record)
+        return record
+
+    if with_llm:
+        llm_args = {"base_url": args.llm_base_url, "model": args.llm_model, "max_tokens": args.llm_max_tokens,
+                    "api_key": args.llm_api_key}
+        await asyncio.gather(*(
+            submit("llm", f"{SCRIPT_PREFIX}/llm", {**llm_args, "prompt": f"Summarize ticket {index}"}, args.llm_tag)
+            for index in range(args.llm_jobs)
+        ))
+
+    offsets = [index / args.fast_rate for index in range(int(args.fast_rate * args.duration))]
+    await open_loop(offsets, lambda index, offset: submit("fast", f"{SCRIPT_PREFIX}/fast", {"i": index}, args.fast_tag))
+    print(f"{phase}: submitted {len(records)} jobs, waiting for completion...")
+    return await wait_for_jobs(client, records, args.timeout)
+
+
+async def run(args):
+    connector = aiohttp.TCPConnector(ssl=False, limit=64)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=60)) as session:
+        client = WindmillClient(session, args.base_url, args.workspace, args.token)
+        await client.ensure_script(f"{SCRIPT_PREFIX}/fast", FAST_SCRIPT)
+        await client.ensure_script(f"{SCRIPT_PREFIX}/llm", LLM_SCRIPT, tag=args.llm_tag)
+        records = []
+        if not args.skip_baseline:
+            records += await run_phase(client, "baseline", args, with_llm=False)
+        records += await run_phase(client, "loaded", args, with_llm=True)
+    return aggregate(records)
+
+
+def report(summary):
+    rows = []
+    for phase, kinds in summary.items():
+        for kind, stats in sorted(kinds.items()):
+            rows.append([
+                phase, kind, f"{stats['completed']}/{stats['submitted']}", stats["jobs_per_s"],
+                stats["queue_wait"].get("p50", "-"), stats["queue_wait"].get("p95", "-"),
+                stats["execution"].get("p50", "-"), stats["execution"].get("p95", "-"),
+                sum(stats["errors"].values()),
+            ])
+    print()
+    print_table(["phase", "jobs", "done", "jobs/s", "wait p50 ms", "wait p95 ms", "exec p50 ms", "exec p95 ms", "errors"], rows)
+    ratio = fast_latency_ratio(summary)
+    if ratio is not None:
+        print(f"\nFast-job p95 queue wait under LLM load: {ratio}x baseline")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Windmill job throughput per worker group.")
+    parser.add_argument("--base-url", default=os.getenv("WINDMILL_BENCH_URL", f"https://windmill.{os.getenv('BASE_DOMAIN', 'localhost')}"),
+                        help="e.g. http://windmill_server:8000 from the loadgen container")
+    parser.add_argument("--token", default=os.getenv("WINDMILL_TOKEN"), help="Windmill API token (user settings > tokens)")
+    parser.add_argument("--workspace", default="admins")
+    parser.add_argument("--fast-rate", type=float, default=20.0, help="fast jobs submitted per second")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of fast-job arrivals per phase")
+    parser.add_argument("--llm-jobs", type=int, default=500, help="LLM jobs submitted at the start of the loaded phase")
+    parser.add_argument("--llm-tag", default="llm-batch", help="worker tag for LLM jobs; use 'python3' to reproduce a shared pool")
+    parser.add_argument("--fast-tag", help="override the worker tag for fast jobs")
+    parser.add_argument("--llm-base-url", default="http://litellm:4000/v1", help="OpenAI-compatible URL as seen from the workers")
+    parser.add_argument("--llm-model", default="mock-gpt")
+    parser.add_argument("--llm-api-key", default=os.getenv("LITELLM_MASTER_KEY", "mock"))
+    parser.add_argument("--llm-max-tokens", type=int, default=64)
+    parser.add_argument("--skip-baseline", action="store_true")
+    parser.add_argument("--timeout", type=float, default=1800.0, help="seconds to wait for jobs of a phase to finish")
+    parser.add_argument("--output", help="results JSON path (default: bench-results/windmill-<timestamp>.json)")
+    args = parser.parse_args()
+    if not args.token:
+        parser.error("--token or WINDMILL_TOKEN is required")
+
+    summary = asyncio.run(run(args))
+    report(summary)
+    config = {key: value for key, value in vars(args).items() if key not in ("token", "llm_api_key")}
+    print(f"\nResults saved to {save_results('windmill', config, summary, args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    sys.exit(main())
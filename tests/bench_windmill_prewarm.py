@@ -0,0 +1,182 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+from bench_windmill import WindmillClient
+from benchlib import print_table, save_results, summarize, use_service
+
+use_service("windmill-prewarm")
+import prewarm  # noqa: E402
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+SCRIPT_PREFIX = "f/bench"
+WORKERS = ["windmill_worker", "windmill_worker_llm"]
+
+READY_SCRIPT = '''def main():
+    return "ready"
+'''
+
+# Imports the packages so the first run pays for their install.
+DEPS_SCRIPT = '''#requirements:
+{requirements}
+import importlib
+
+
+def main(modules: list = {modules!r}):
+    return [importlib.import_module(name).__name__ for name in modules]
+'''
+
+
+def compose(*args, check=True):
+    return subprocess.run(["docker", "compose", *args], cwd=ROOT, check=check, capture_output=True, text=True)
+
+
+def reset_workers(restore_snapshot):
+    """
+    Stops the workers, empties the dependency cache and starts them again,
+    optionally restoring the cache snapshot first.
+    """
+    compose("stop", *WORKERS)
+    compose("run", "--rm", "--no-deps", "--entrypoint", "sh", "windmill_cache_restore",
+            "-c", "rm -rf /cache/* /cache/.[!.]*")
+    restore_seconds = None
+    if restore_snapshot:
+        started = time.monotonic()
+        compose("run", "--rm", "--no-deps", "windmill_cache_restore")
+        restore_seconds = time.monotonic() - started
+    compose("up", "-d", "--no-deps", *WORKERS)
+    return restore_seconds
+
+
+async def run_job(client, path, args, timeout):
+    """Submit-to-completion wall time of one job plus its server-side duration."""
+    started = time.monotonic()
+    job_id = await client.run(path, args)
+    deadline = started + timeout
+    while time.monotonic() < deadline:
+        job = await client.get(job_id)
+        if job and job.get("type") == "CompletedJob":
+            return {"seconds": time.monotonic() - started, "duration_ms": job.get("duration_ms"),
+                    "success": job.get("success")}
+        await asyncio.sleep(0.25)
+    return {"seconds": None, "duration_ms": None, "success": False}
+
+
+async def wait_for_lock(client, path, timeout=600):
+    """Windmill resolves the lock of a new script version in a dependency job."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        async with client.session.get(f"{client.base}/scripts/get/p/{path}", headers=client.headers) as resp:
+            if resp.status == 200 and (await resp.json()).get("lock"):
+                return
+        await asyncio.sleep(1)
+    raise RuntimeError(f"{path} has no lockfile after {timeout}s")
+
+
+async def run_phase(client, phase, args):
+    """`runs` times: reset the workers' cache for `phase`, then time the first and a repeated job."""
+    first, repeat, prepare = [], [], []
+    for _ in range(args.runs):
+        restore_seconds = reset_workers(restore_snapshot=phase == "snapshot")
+        # a dependency-free job shows the workers are polling before the clock starts
+        await run_job(client, f"{SCRIPT_PREFIX}/ready", {}, args.timeout)
+        if phase == "prewarm":
+            warm_args = argparse.Namespace(base_url=args.base_url, token=args.token, workspace=[args.workspace],
+                                           workspace_dir=None, parallel=args.parallel, tag=None,
+                                           job_timeout=args.timeout, ready_timeout=60, index_url=args.index_url,
+                                           npm_registry=None)
+            started = time.monotonic()
+            await prewarm.warm(warm_args)
+            prepare.append(time.monotonic() - started)
+        elif restore_seconds is not None:
+            prepare.append(restore_seconds)
+        first.append(await run_job(client, f"{SCRIPT_PREFIX}/deps", {}, args.timeout))
+        repeat.append(await run_job(client, f"{SCRIPT_PREFIX}/deps", {}, args.timeout))
+    summary = {
+        "first_job": summarize([job["seconds"] for job in first if job["seconds"] is not None]),
+        "first_job_execution": summarize([job["duration_ms"] / 1000 for job in first if job["duration_ms"]]),
+        "repeat_job": summarize([job["seconds"] for job in repeat if job["seconds"] is not None]),
+        "failed": sum(1 for job in first + repeat if not job["success"]),
+        # prewarm run or snapshot restore before the first job
+        "prepare": summarize(prepare),
+    }
+    print(f"{phase}: first job p50 {summary['first_job'].get('p50')} ms, "
+          f"repeat p50 {summary['repeat_job'].get('p50')} ms")
+    return summary
+
+
+async def run(args):
+    requirements = "".join(f"#{package}\n" for package in args.packages)
+    content = DEPS_SCRIPT.format(requirements=requirements.rstrip("\n"), modules=args.modules)
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False),
+                                     timeout=aiohttp.ClientTimeout(total=60)) as session:
+        client = WindmillClient(session, args.base_url, args.workspace, args.token)
+        await client.ensure_script(f"{SCRIPT_PREFIX}/ready", READY_SCRIPT)
+        await client.ensure_script(f"{SCRIPT_PREFIX}/deps", content)
+        await wait_for_lock(client, f"{SCRIPT_PREFIX}/deps")
+        summary = {}
+        for phase in args.phases:
+            if phase == "snapshot" and "prewarm" not in summary:
+                # the snapshot phase restores what a prewarmed cache looks like
+                reset_workers(restore_snapshot=False)
+                await run_job(client, f"{SCRIPT_PREFIX}/ready", {}, args.timeout)
+                await run_job(client, f"{SCRIPT_PREFIX}/deps", {}, args.timeout)
+            if phase == "snapshot":
+                compose("run", "--rm", "--no-deps", "windmill_prewarm", "snapshot")
+            summary[phase] = await run_phase(client, phase, args)
+    compose("up", "-d", *WORKERS)
+    return summary
+
+
+def report(summary):
+    rows = []
+    for phase, stats in summary.items():
+        rows.append([phase, stats["first_job"].get("p50", "-"), stats["first_job"].get("max", "-"),
+                     stats["first_job_execution"].get("p50", "-"), stats["repeat_job"].get("p50", "-"),
+                     stats["prepare"].get("p50", "-"), stats["failed"]])
+    print()
+    print_table(["cache", "first p50 ms", "first max ms", "first exec p50 ms", "repeat p50 ms",
+                 "prepare p50 ms", "failed"], rows)
+    cold = summary.get("cold", {}).get("first_job", {}).get("p50")
+    for phase in ("prewarm", "snapshot"):
+        warm = summary.get(phase, {}).get("first_job", {}).get("p50")
+        if cold and warm:
+            print(f"First job after {phase}: {round(cold / warm, 1)}x faster than on a cold cache")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="First-job latency of a script with dependencies on a cold, prewarmed and snapshot-restored cache.")
+    parser.add_argument("--base-url", default=os.getenv("WINDMILL_BENCH_URL", f"https://windmill.{os.getenv('BASE_DOMAIN', 'localhost')}"))
+    parser.add_argument("--token", default=os.getenv("WINDMILL_TOKEN"), help="Windmill API token (user settings > tokens)")
+    parser.add_argument("--workspace", default="admins")
+    parser.add_argument("--phases", nargs="+", choices=["cold", "prewarm", "snapshot"], default=["cold", "prewarm", "snapshot"])
+    parser.add_argument("--packages", nargs="+", default=["pandas==2.2.2", "httpx==0.27.0", "pydantic==2.8.2"],
+                        help="requirements of the benchmark script")
+    parser.add_argument("--modules", nargs="+", default=["pandas", "httpx", "pydantic"], help="modules it imports")
+    parser.add_argument("--parallel", type=int, default=4, help="prewarm jobs run at once")
+    parser.add_argument("--index-url", default=os.getenv("WINDMILL_PIP_INDEX_URL"), help="mirror checked before prewarming")
+    parser.add_argument("--runs", type=int, default=1, help="cache resets per phase")
+    parser.add_argument("--timeout", type=float, default=900.0, help="seconds to wait for one job")
+    parser.add_argument("--output", help="results JSON path (default: bench-results/windmill-prewarm-<timestamp>.json)")
+    args = parser.parse_args()
+    if not args.token:
+        parser.error("--token or WINDMILL_TOKEN is required")
+
+    summary = asyncio.run(run(args))
+    report(summary)
+    config = {key: value for key, value in vars(args).items() if key != "token"}
+    print(f"\nResults saved to {save_results('windmill-prewarm', config, summary, args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    sys.exit(main())
@@ -0,0 +1,162 @@
+import asyncio
+import json
+import math
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+SERVICES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "services")
+
+
+def use_service(name):
+    """
+    Makes the Python modules shipped with services/<name> importable, e.g.
+    the mock upstream or LiteLLM plugins the benchmarks run in-process.
+    """
+    path = os.path.normpath(os.path.join(SERVICES_DIR, name))
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+class Clock:
+    """Fake clock for the services' `clock=` parameters; tests move `now` by hand."""
+
+    def __init__(self, start=1000.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+def percentile(values, pct):
+    """
+    Linear-interpolated percentile of `values` (0 <= pct <= 100).
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    if low == high:
+        return ordered[low]
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(seconds):
+    """
+    Summarizes a list of durations in seconds as milliseconds.
+    """
+    if not seconds:
+        return {"count": 0}
+    ms = [value * 1000 for value in seconds]
+    return {
+        "count": len(ms),
+        "mean": round(sum(ms) / len(ms), 3),
+        "p50": round(percentile(ms, 50), 3),
+        "p95": round(percentile(ms, 95), 3),
+        "p99": round(percentile(ms, 99), 3),
+        "max": round(max(ms), 3),
+    }
+
+
+def ramp_schedule(rate_start, rate_end, duration):
+    """
+    Arrival offsets (seconds from start) for an open-loop load whose rate
+    ramps linearly from `rate_start` to `rate_end` per second over `duration`.
+    """
+    offsets = []
+    t = 0.0
+    while t < duration:
+        offsets.append(t)
+        rate = rate_start + (rate_end - rate_start) * t / duration
+        t += 1.0 / max(rate, 1e-6)
+    return offsets
+
+
+def current_rate(rate_start, rate_end, duration, offset):
+    return rate_start + (rate_end - rate_start) * min(offset, duration) / duration
+
+
+async def open_loop(offsets, fn, max_in_flight=None):
+    """
+    Starts `fn(index, offset)` at each offset regardless of how many earlier
+    calls are still running (open loop), so a slow server shows up as growing
+    latency instead of a lower arrival rate. Arrivals beyond `max_in_flight`
+    are not started and come back as {"skipped": True}.
+
+    Returns the results in arrival order.
+    """
+    results = [None] * len(offsets)
+    in_flight = 0
+    tasks = []
+
+    async def run(index, offset):
+        nonlocal in_flight
+        try:
+            results[index] = await fn(index, offset)
+        finally:
+            in_flight -= 1
+
+    started = time.perf_counter()
+    for index, offset in enumerate(offsets):
+        delay = started + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if max_in_flight and in_flight >= max_in_flight:
+            results[index] = {"skipped": True, "offset": offset}
+            continue
+        in_flight += 1
+        tasks.append(asyncio.create_task(run(index, offset)))
+    if tasks:
+        await asyncio.gather(*tasks)
+    return results
+
+
+async def closed_loop(count, concurrency, fn):
+    """
+    Runs `fn(index)` `count` times with at most `concurrency` calls in flight.
+    Returns the results in index order.
+    """
+    results = [None] * count
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index
+        while next_index < count:
+            index = next_index
+            next_index += 1
+            results[index] = await fn(index)
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, count))))
+    return results
+
+
+def save_results(name, config, summary, output=None):
+    """
+    Writes a benchmark run to JSON so runs can be compared later. Defaults to
+    bench-results/<name>-<UTC timestamp>.json and returns the path.
+    """
+    now = datetime.now(timezone.utc)
+    if output is None:
+        output = os.path.join("bench-results", f"{name}-{now.strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "benchmark": name,
+            "started_at": now.isoformat(),
+            "host": platform.node(),
+            "python": platform.python_version(),
+            "config": config,
+            "summary": summary,
+        }, f, indent=2)
+    return output
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(cell)) for cell in column) for column in zip(headers, *rows)]
+    print("  ".join(str(cell).ljust(width) for cell, width in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(str(cell).ljust(width) for cell, width in zip(row, widths)))
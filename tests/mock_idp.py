@@ -0,0 +1,246 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from urllib.parse import parse_qs, quote, urlencode
+
+from aiohttp import web
+
+TEMPLATE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..", "services", "openwebui", "config", "oidc", "openid-configuration.json.template",
+)
+
+AUTHENTICATION_FLOW = "default-authentication-flow"
+AUTHORIZATION_FLOW = "default-provider-authorization-explicit-consent"
+
+
+def render_discovery(base_url, slug, base_domain="localhost"):
+    """
+    Renders the OpenWebUI discovery template for `slug`, pointing every
+    endpoint at `base_url` instead of the Authentik container.
+    """
+    with open(TEMPLATE_PATH, encoding="utf-8") as f:
+        text = f.read()
+    text = text.replace("{{BASE_DOMAIN}}", base_domain)
+    text = text.replace(f"https://sso.{base_domain}", base_url)
+    text = text.replace("http://apukone-authentik-server:9000", base_url)
+    text = text.replace("/application/o/openwebui/", f"/application/o/{slug}/")
+    return json.loads(text)
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+class MockIdP:
+    """
+    Small stand-in for Authentik used by offline tests and benchmarks.
+
+    Serves the discovery document from the OpenWebUI template and implements
+    just enough of the flow executor API (identification, password and consent
+    stages), the authorize redirect chain and the token endpoint for
+    tests/oidc_client.py to log in. `stage_delay` adds latency per stage to
+    imitate a loaded server.
+    """
+
+    def __init__(self, email, password, clients, base_domain="localhost", stage_delay=0.0):
+        self.email = email
+        self.password = password
+        # client_id -> {"secret", "slug", "redirect_uris"}
+        self.clients = clients
+        self.base_domain = base_domain
+        self.stage_delay = stage_delay
+        self.sessions = {}
+        self.codes = {}
+        self.jwks = {"keys": [{"kty": "RSA", "kid": "mock", "use": "sig", "alg": "RS256", "n": _b64(b"mock"), "e": "AQAB"}]}
+        self.base_url = None
+        self._runner = None
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/application/o/{slug}/.well-known/openid-configuration", self.discovery)
+        app.router.add_get("/application/o/{slug}/jwks/", self.jwks_view)
+        app.router.add_get("/application/o/authorize/", self.authorize)
+        app.router.add_post("/application/o/token/", self.token)
+        app.router.add_get("/application/o/userinfo/", self.userinfo)
+        app.router.add_get("/flows/-/default/authentication/", self.default_authentication)
+        app.router.add_get("/if/flow/{slug}/", self.flow_page)
+        app.router.add_route("*", "/api/v3/flows/executor/{slug}/", self.executor)
+        return app
+
+    async def start(self, host="127.0.0.1", port=0):
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    def _session(self, request, response=None):
+        sid = request.cookies.get("authentik_session")
+        if sid not in self.sessions:
+            sid = secrets.token_hex(16)
+            self.sessions[sid] = {"user": None, "stage": {}, "csrf": secrets.token_hex(16)}
+        session = self.sessions[sid]
+        if response is not None:
+            response.set_cookie("authentik_session", sid, path="/")
+            response.set_cookie("authentik_csrf", session["csrf"], path="/")
+        return session
+
+    async def discovery(self, request):
+        return web.json_response(render_discovery(self.base_url, request.match_info["slug"], self.base_domain))
+
+    async def jwks_view(self, request):
+        return web.json_response(self.jwks)
+
+    async def default_authentication(self, request):
+        raise web.HTTPFound(f"/if/flow/{AUTHENTICATION_FLOW}/?next={quote(request.query.get('next', '/'), safe='')}")
+
+    async def flow_page(self, request):
+        response = web.Response(text="<ak-flow-executor></ak-flow-executor>", content_type="text/html")
+        self._session(request, response)
+        return response
+
+    async def authorize(self, request):
+        client = self.clients.get(request.query.get("client_id"))
+        if client is None or request.query.get("redirect_uri") not in client["redirect_uris"]:
+            raise web.HTTPBadRequest(text="invalid client_id or redirect_uri")
+        response = web.HTTPFound("/")
+        if self._session(request, response)["user"] is None:
+            location = f"/flows/-/default/authentication/?next={quote(request.path_qs, safe='')}"
+        else:
+            location = f"/if/flow/{AUTHORIZATION_FLOW}/?{request.query_string}"
+        response.headers["Location"] = location
+        raise response
+
+    def _challenge(self, session, slug, query):
+        step = session["stage"].get(slug, 0)
+        if slug == AUTHENTICATION_FLOW:
+            if step == 0:
+                return {"component": "ak-stage-identification", "user_fields": ["email", "username"], "password_fields": False}
+            if step == 1:
+                return {"component": "ak-stage-password"}
+            return {"component": "xak-flow-redirect", "to": query.get("next", ["/"])[0]}
+        if slug == AUTHORIZATION_FLOW:
+            if session["user"] is None:
+                return {"component": "ak-stage-access-denied", "error_message": "Not authenticated"}
+            if step == 0:
+                return {"component": "ak-stage-consent", "token": session["csrf"], "permissions": []}
+            return {"component": "xak-flow-redirect", "to": session.pop("callback")}
+        return {"component": "ak-stage-access-denied", "error_message": f"Unknown flow {slug}"}
+
+    async def executor(self, request):
+        if self.stage_delay:
+            await asyncio.sleep(self.stage_delay)
+        slug = request.match_info["slug"]
+        session = self._session(request)
+        query = parse_qs(request.query.get("query", ""))
+
+        if request.method == "POST":
+            if request.headers.get("X-authentik-CSRF") != session["csrf"]:
+                raise web.HTTPForbidden(text="CSRF token missing or incorrect")
+            payload = await request.json()
+            challenge = self._challenge(session, slug, query)
+            if payload.get("component") != challenge["component"]:
+                raise web.HTTPBadRequest(text="component mismatch")
+            errors = self._submit(session, slug, query, payload)
+            if errors:
+                challenge["response_errors"] = errors
+                return web.json_response(challenge)
+            session["stage"][slug] = session["stage"].get(slug, 0) + 1
+            # Authentik answers a successful stage with a redirect back to the executor
+            raise web.HTTPFound(request.path_qs)
+
+        challenge = self._challenge(session, slug, query)
+        if challenge["component"] == "xak-flow-redirect":
+            session["stage"].pop(slug, None)
+        response = web.json_response(challenge)
+        self._session(request, response)
+        return response
+
+    def _submit(self, session, slug, query, payload):
+        component = payload["component"]
+        if component == "ak-stage-identification":
+            if payload.get("uid_field") != self.email:
+                return {"uid_field": [{"string": "Failed to authenticate.", "code": "invalid"}]}
+        elif component == "ak-stage-password":
+            if payload.get("password") != self.password:
+                session["stage"][slug] = 0
+                return {"password": [{"string": "Invalid password", "code": "invalid"}]}
+            session["user"] = self.email
+        elif component == "ak-stage-consent":
+            if payload.get("token") != session["csrf"]:
+                return {"token": [{"string": "Invalid consent token", "code": "invalid"}]}
+            code = secrets.token_hex(16)
+            params = {key: values[0] for key, values in query.items()}
+            self.codes[code] = {"params": params, "user": session["user"]}
+            callback = {"code": code}
+            if "state" in params:
+                callback["state"] = params["state"]
+            session["callback"] = f"{params['redirect_uri']}?{urlencode(callback)}"
+        return None
+
+    async def token(self, request):
+        if self.stage_delay:
+            await asyncio.sleep(self.stage_delay)
+        form = await request.post()
+        grant = self.codes.pop(form.get("code", ""), None)
+        client = self.clients.get(form.get("client_id"))
+        if (
+            grant is None
+            or client is None
+            or not hmac.compare_digest(client["secret"], form.get("client_secret", ""))
+            or grant["params"]["client_id"] != form.get("client_id")
+            or grant["params"]["redirect_uri"] != form.get("redirect_uri")
+        ):
+            return web.json_response({"error": "invalid_grant"}, status=400)
+
+        now = int(time.time())
+        claims = {
+            "iss": f"{self.base_url}/application/o/{client['slug']}/",
+            "sub": grant["user"],
+            "aud": form["client_id"],
+            "iat": now,
+            "exp": now + 3600,
+            "email": grant["user"],
+            "groups": ["Admins"],
+        }
+        signing_input = f"{_b64(json.dumps({'alg': 'HS256', 'typ': 'JWT'}).encode())}.{_b64(json.dumps(claims).encode())}"
+        signature = hmac.new(client["secret"].encode(), signing_input.encode(), hashlib.sha256).digest()
+        access_token = secrets.token_hex(24)
+        return web.json_response({
+            "access_token": access_token,
+            "token_type": "Bearer",
+            "expires_in": 3600,
+            "id_token": f"{signing_input}.{_b64(signature)}",
+            "scope": grant["params"].get("scope", ""),
+        })
+
+    async def userinfo(self, request):
+        return web.json_response({"sub": self.email, "email": self.email, "groups": ["Admins"]})
+
+
+def clients_for(providers, base_domain="localhost"):
+    """
+    Builds a MockIdP client table from oidc_client.provider_settings() dicts,
+    accepting both the https and http callback as the blueprint does.
+    """
+    clients = {}
+    for settings in providers:
+        https_uri = settings["redirect_uri"]
+        clients[settings["client_id"]] = {
+            "secret": settings["client_secret"],
+            "slug": settings["slug"],
+            "redirect_uris": [https_uri, https_uri.replace("https://", "http://", 1)],
+        }
+    return clients
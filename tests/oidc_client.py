@@ -0,0 +1,264 @@
+import asyncio
+import os
+import sys
+import time
+from urllib.parse import parse_qs, quote, urlencode, urljoin, urlsplit
+
+import aiohttp
+
+# Provider settings mirror services/authentik/setup-blueprint.yaml
+PROVIDERS = {
+    "openwebui": {
+        "slug": "openwebui",
+        "client_id_env": "OPENWEBUI_OIDC_CLIENT_ID",
+        "client_secret_env": "OPENWEBUI_OIDC_CLIENT_SECRET",
+        "redirect_uri": "https://chat.{domain}/oauth/oidc/callback",
+    },
+    "litellm": {
+        "slug": "litellm",
+        "client_id_env": "LITELLM_OIDC_CLIENT_ID",
+        "client_secret_env": "LITELLM_OIDC_CLIENT_SECRET",
+        "redirect_uri": "https://llm.{domain}/sso/callback",
+    },
+    "windmill": {
+        "slug": "windmill",
+        "client_id_env": "WINDMILL_OIDC_CLIENT_ID",
+        "client_secret_env": "WINDMILL_OIDC_CLIENT_SECRET",
+        "redirect_uri": "https://windmill.{domain}/user/login_callback/Authentik",
+    },
+}
+
+SCOPES = "openid email profile groups"
+AUTHENTICATION_FLOW = "default-authentication-flow"
+MAX_REDIRECTS = 10
+MAX_STAGES = 10
+
+
+class LoginError(Exception):
+    pass
+
+
+def provider_settings(name, base_domain, env=None):
+    """
+    Resolves client credentials and redirect URI for a provider from the
+    environment (the same keys generate-secrets.sh writes to .env).
+    """
+    env = os.environ if env is None else env
+    spec = PROVIDERS[name]
+    return {
+        "slug": spec["slug"],
+        "client_id": env.get(spec["client_id_env"], ""),
+        "client_secret": env.get(spec["client_secret_env"], ""),
+        "redirect_uri": spec["redirect_uri"].format(domain=base_domain),
+    }
+
+
+class AuthentikClient:
+    """
+    Browserless Authentik login client.
+
+    Talks to the flow executor API (/api/v3/flows/executor/<slug>/) instead of
+    rendering the login UI, answering the identification, password and consent
+    stages with JSON, then completes the authorization-code exchange for a
+    provider. The session cookie is kept, so later logins in the same client
+    only pass through the consent stage.
+    """
+
+    def __init__(self, sso_url, email, password, verify_ssl=False, timeout=10, connector=None):
+        self.sso_url = sso_url.rstrip("/")
+        self.email = email
+        self.password = password
+        self.verify_ssl = verify_ssl
+        self.timeout = timeout
+        self.connector = connector
+        self.session = None
+        self._discovery = {}
+
+    async def __aenter__(self):
+        connector = self.connector or aiohttp.TCPConnector(ssl=None if self.verify_ssl else False)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            connector_owner=self.connector is None,
+            cookie_jar=aiohttp.CookieJar(unsafe=True),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    def _csrf_headers(self):
+        for cookie in self.session.cookie_jar:
+            if cookie.key == "authentik_csrf":
+                return {"X-authentik-CSRF": cookie.value}
+        return {}
+
+    async def discover(self, slug):
+        if slug not in self._discovery:
+            url = f"{self.sso_url}/application/o/{slug}/.well-known/openid-configuration"
+            async with self.session.get(url) as resp:
+                if resp.status != 200:
+                    raise LoginError(f"Discovery for '{slug}' failed with HTTP {resp.status}")
+                self._discovery[slug] = await resp.json(content_type=None)
+        return self._discovery[slug]
+
+    async def _executor(self, method, url, payload=None):
+        headers = {"Accept": "application/json", **self._csrf_headers()}
+        async with self.session.request(method, url, json=payload, headers=headers) as resp:
+            if resp.status >= 400:
+                raise LoginError(f"Flow executor returned HTTP {resp.status} for {url}")
+            return await resp.json(content_type=None)
+
+    async def run_flow(self, flow_url, timings):
+        """
+        Executes the flow behind an /if/flow/<slug>/ URL and returns the URL
+        the flow finally redirects to.
+        """
+        parts = urlsplit(flow_url)
+        slug = parts.path.rstrip("/").rsplit("/", 1)[-1]
+        executor = f"{self.sso_url}/api/v3/flows/executor/{slug}/?query={quote(parts.query, safe='')}"
+
+        started = time.perf_counter()
+        challenge = await self._executor("GET", executor)
+        timings.append(("flow_start", time.perf_counter() - started))
+
+        for _ in range(MAX_STAGES):
+            component = challenge.get("component", "")
+            if component == "xak-flow-redirect":
+                return urljoin(self.sso_url + "/", challenge["to"])
+            if challenge.get("response_errors"):
+                raise LoginError(f"Stage {component} rejected input: {challenge['response_errors']}")
+
+            if component == "ak-stage-identification":
+                payload = {"uid_field": self.email}
+                if challenge.get("password_fields"):
+                    payload["password"] = self.password
+            elif component == "ak-stage-password":
+                payload = {"password": self.password}
+            elif component == "ak-stage-consent":
+                payload = {"token": challenge.get("token", "")}
+            elif component == "ak-stage-access-denied":
+                raise LoginError(f"Access denied: {challenge.get('error_message', '')}")
+            else:
+                raise LoginError(f"Unsupported flow stage: {component or challenge}")
+
+            payload["component"] = component
+            started = time.perf_counter()
+            challenge = await self._executor("POST", executor, payload)
+            timings.append((component.removeprefix("ak-stage-"), time.perf_counter() - started))
+
+        raise LoginError(f"Flow '{slug}' did not finish within {MAX_STAGES} stages")
+
+    async def _follow(self, url, redirect_uri, timings):
+        """
+        Follows redirects from `url`, running any Authentik flow on the way,
+        until the browser would be sent to `redirect_uri`.
+        """
+        for _ in range(MAX_REDIRECTS):
+            if url.startswith(redirect_uri):
+                return url
+            if "/if/flow/" in urlsplit(url).path:
+                url = await self.run_flow(url, timings)
+                continue
+            started = time.perf_counter()
+            async with self.session.get(url, allow_redirects=False) as resp:
+                location = resp.headers.get("Location")
+                if resp.status not in (301, 302, 303, 307) or not location:
+                    raise LoginError(f"Unexpected HTTP {resp.status} at {url}")
+            timings.append(("redirect", time.perf_counter() - started))
+            url = urljoin(url, location)
+        raise LoginError(f"Too many redirects while authorizing {redirect_uri}")
+
+    async def authenticate(self):
+        """
+        Runs the default authentication flow so the session is logged in to
+        Authentik itself, without authorizing any provider.
+        """
+        timings = []
+        flow_url = f"{self.sso_url}/if/flow/{AUTHENTICATION_FLOW}/"
+        await self.run_flow(flow_url, timings)
+        return timings
+
+    async def login(self, slug, client_id, client_secret, redirect_uri, scope=SCOPES):
+        """
+        Performs a full authorization-code login for one provider.
+
+        Returns a dict with the token response and a list of (stage, seconds)
+        timings.
+        """
+        timings = []
+        started = time.perf_counter()
+        discovery = await self.discover(slug)
+        timings.append(("discovery", time.perf_counter() - started))
+
+        state = os.urandom(8).hex()
+        query = urlencode({
+            "client_id": client_id,
+            "redirect_uri": redirect_uri,
+            "response_type": "code",
+            "scope": scope,
+            "state": state,
+        })
+        callback = await self._follow(f"{discovery['authorization_endpoint']}?{query}", redirect_uri, timings)
+
+        params = parse_qs(urlsplit(callback).query)
+        if params.get("state", [""])[0] != state:
+            raise LoginError("State mismatch in authorization callback")
+        if "code" not in params:
+            raise LoginError(f"No authorization code in callback: {callback}")
+
+        started = time.perf_counter()
+        async with self.session.post(discovery["token_endpoint"], data={
+            "grant_type": "authorization_code",
+            "code": params["code"][0],
+            "redirect_uri": redirect_uri,
+            "client_id": client_id,
+            "client_secret": client_secret,
+        }) as resp:
+            tokens = await resp.json(content_type=None)
+            if resp.status != 200:
+                raise LoginError(f"Token exchange failed with HTTP {resp.status}: {tokens}")
+        timings.append(("token", time.perf_counter() - started))
+
+        return {"tokens": tokens, "timings": timings}
+
+
+async def smoke_login(sso_url, email, password, providers, base_domain, env=None):
+    """
+    Logs into each provider in turn with one client and returns per-provider
+    results including wall time.
+    """
+    results = {}
+    async with AuthentikClient(sso_url, email, password) as client:
+        for name in providers:
+            settings = provider_settings(name, base_domain, env)
+            started = time.perf_counter()
+            result = await client.login(
+                settings["slug"], settings["client_id"], settings["client_secret"], settings["redirect_uri"]
+            )
+            result["elapsed"] = time.perf_counter() - started
+            results[name] = result
+    return results
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    BASE_DOMAIN = os.getenv("BASE_DOMAIN", "localhost")
+    ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "admin@example.com")
+    ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "password123")
+
+    names = sys.argv[1:] or list(PROVIDERS)
+    try:
+        results = asyncio.run(
+            smoke_login(f"https://sso.{BASE_DOMAIN}", ADMIN_EMAIL, ADMIN_PASSWORD, names, BASE_DOMAIN)
+        )
+    except LoginError as e:
+        print(f"FAIL: {e}")
+        sys.exit(1)
+
+    for name, result in results.items():
+        stages = ", ".join(f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in result["timings"])
+        print(f"PASS: {name} login in {result['elapsed'] * 1000:.0f}ms ({stages})")
@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import contextlib
+import importlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+from dotenv import load_dotenv
+from playwright.sync_api import sync_playwright
+
+from auth_helper import perform_authentik_login
+from step_timer import instrumented
+
+load_dotenv()
+
+BASE_DOMAIN = os.getenv("BASE_DOMAIN", "localhost")
+ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "admin@example.com")
+ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "password123")
+
+DEFAULT_STATE = "tests/.auth/storage_state.json"
+
+# name -> (module, check function taking a logged-in page)
+CHECKS = {
+    "auth_resources": ("test_auth_resources", "check_auth_resources"),
+    "openwebui": ("test_openwebui_oidc", "check_openwebui"),
+    "litellm": ("test_litellm_oidc", "check_litellm"),
+    "windmill": ("test_windmill_oidc", "check_windmill"),
+}
+
+
+def browser_login(state_path):
+    """
+    Logs into Authentik once in Chromium and saves cookies and local storage
+    as a Playwright storage state file.
+    """
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        context = browser.new_context(ignore_https_errors=True)
+        page = context.new_page()
+        page.set_default_timeout(30000)
+        try:
+            with instrumented("shared_login", page) as timer:
+                timer.call("goto authentication flow", page.goto, f"https://sso.{BASE_DOMAIN}/if/flow/default-authentication-flow/")
+                if not perform_authentik_login(page, ADMIN_EMAIL, ADMIN_PASSWORD, timer):
+                    raise Exception("Authentik login failed")
+            context.storage_state(path=state_path)
+        finally:
+            browser.close()
+
+
+def http_login(state_path):
+    """
+    Logs into Authentik through the flow executor API and writes the session
+    cookies in Playwright storage state format (no local storage).
+    """
+    from oidc_client import AuthentikClient
+
+    sso_url = f"https://sso.{BASE_DOMAIN}"
+
+    async def login():
+        async with AuthentikClient(sso_url, ADMIN_EMAIL, ADMIN_PASSWORD) as client:
+            await client.authenticate()
+            return [
+                {
+                    "name": cookie.key,
+                    "value": cookie.value,
+                    "domain": cookie["domain"] or urlsplit(sso_url).hostname,
+                    "path": cookie["path"] or "/",
+                    "expires": -1,
+                    "httpOnly": bool(cookie["httponly"]),
+                    "secure": bool(cookie["secure"]),
+                    "sameSite": "Lax",
+                }
+                for cookie in client.session.cookie_jar
+            ]
+
+    cookies = asyncio.run(login())
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump({"cookies": cookies, "origins": []}, f, indent=2)
+
+
+def run_check(name, state_path):
+    """
+    Runs one service check in its own browser seeded with the shared storage
+    state. Output goes to tests/debug/<name>.log so parallel runs stay readable.
+    """
+    module_name, func_name = CHECKS[name]
+    os.makedirs("tests/debug", exist_ok=True)
+    log_path = f"tests/debug/{name}.log"
+    error = None
+
+    started = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log, contextlib.redirect_stdout(log):
+        check = getattr(importlib.import_module(module_name), func_name)
+        with sync_playwright() as p:
+            browser = p.chromium.launch(headless=True)
+            context = browser.new_context(ignore_https_errors=True, storage_state=state_path)
+            page = context.new_page()
+            page.set_default_timeout(30000)
+            try:
+                with instrumented(name, page) as timer:
+                    check(page, timer)
+            except Exception as e:
+                error = str(e)
+                print(f"Test failed: {e}")
+            finally:
+                browser.close()
+
+    return {"name": name, "passed": error is None, "elapsed": time.perf_counter() - started, "error": error, "log": log_path,
+            "trace": f"tests/debug/{name}.trace.json"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the end-to-end checks in parallel with one shared Authentik login.")
+    parser.add_argument("checks", nargs="*", help=f"checks to run (default: all of {', '.join(CHECKS)})")
+    parser.add_argument("--state", default=DEFAULT_STATE, help="storage state file to write/reuse")
+    parser.add_argument("--reuse-state", action="store_true", help="skip the login if the state file already exists")
+    parser.add_argument("--http-login", action="store_true", help="log in via the flow executor API instead of Chromium")
+    parser.add_argument("--json", help="write per-check results to this file")
+    args = parser.parse_args()
+    names = args.checks or list(CHECKS)
+    unknown = [name for name in names if name not in CHECKS]
+    if unknown:
+        parser.error(f"unknown checks: {', '.join(unknown)}")
+
+    total_started = time.perf_counter()
+    os.makedirs(os.path.dirname(args.state) or ".", exist_ok=True)
+    if args.reuse_state and os.path.exists(args.state):
+        print(f"Reusing storage state from {args.state}")
+        login_elapsed = 0.0
+    else:
+        print("Logging into Authentik once for all checks...")
+        started = time.perf_counter()
+        (http_login if args.http_login else browser_login)(args.state)
+        login_elapsed = time.perf_counter() - started
+        print(f"Shared login took {login_elapsed:.1f}s, state saved to {args.state}")
+
+    results = []
+    with ProcessPoolExecutor(max_workers=len(names)) as pool:
+        futures = [pool.submit(run_check, name, args.state) for name in names]
+        for future in as_completed(futures):
+            result = future.result()
+            status = "PASS" if result["passed"] else "FAIL"
+            print(f"{status}: {result['name']} in {result['elapsed']:.1f}s")
+            if not result["passed"]:
+                print(f"    {result['error']} (log: {result['log']})")
+            results.append(result)
+
+    total_elapsed = time.perf_counter() - total_started
+    print(f"\n{'check':<16}{'wall time':>10}")
+    for result in sorted(results, key=lambda r: r["elapsed"], reverse=True):
+        print(f"{result['name']:<16}{result['elapsed']:>9.1f}s")
+    print(f"{'login':<16}{login_elapsed:>9.1f}s")
+    print(f"{'total':<16}{total_elapsed:>9.1f}s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"login": login_elapsed, "total": total_elapsed, "checks": results}, f, indent=2)
+
+    return 0 if all(result["passed"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+import contextlib
+import json
+import os
+import time
+from collections import deque
+
+DEBUG_DIR = "tests/debug"
+
+
+class StepTimer:
+    """
+    Structured timeline of a browser test: steps (selector waits, clicks,
+    navigations), fixed sleeps, stage transitions and network requests, each
+    with its start offset and duration.
+
+    Instead of a screenshot per loop iteration, `snapshot()` keeps the last
+    `ring_size` page states in memory; they are written out only by
+    `dump_failure()`. Set E2E_RING_SCREENSHOTS=1 to include screenshots in the
+    ring (costs a capture per snapshot).
+    """
+
+    def __init__(self, name, ring_size=5, debug_dir=DEBUG_DIR, screenshots=None, clock=time.perf_counter):
+        self.name = name
+        self.debug_dir = debug_dir
+        self.clock = clock
+        self.started = clock()
+        self.events = []
+        self.ring = deque(maxlen=ring_size)
+        self.screenshots = os.getenv("E2E_RING_SCREENSHOTS") == "1" if screenshots is None else screenshots
+        self._requests = {}
+
+    def now(self):
+        return self.clock() - self.started
+
+    def log(self, message):
+        print(f"[{self.name} +{self.now():7.2f}s] {message}")
+
+    def record(self, name, cat, start, duration, **args):
+        self.events.append({"name": name, "cat": cat, "start": round(start, 6), "duration": round(duration, 6), "args": args})
+
+    @contextlib.contextmanager
+    def step(self, name, cat="step", **args):
+        start = self.now()
+        try:
+            yield
+        except Exception as e:
+            args["error"] = str(e)[:200]
+            raise
+        finally:
+            self.record(name, cat, start, self.now() - start, **args)
+
+    def call(self, name, fn, *args, cat="step", **kwargs):
+        """Runs `fn(*args, **kwargs)` as a timed step and returns its result."""
+        with self.step(name, cat):
+            return fn(*args, **kwargs)
+
+    def sleep(self, seconds, reason=""):
+        with self.step(f"sleep {seconds:g}s" + (f" ({reason})" if reason else ""), cat="sleep"):
+            time.sleep(seconds)
+
+    def mark(self, name, **args):
+        """Instant event, e.g. an auth stage transition."""
+        self.record(name, "stage", self.now(), 0.0, **args)
+        self.log(name + (f" {args}" if args else ""))
+
+    def attach(self, page):
+        """
+        Records main-frame navigations and every network request of `page`.
+        """
+        page.on("request", lambda request: self._requests.__setitem__(request, self.now()))
+        page.on("requestfinished", lambda request: self._finish_request(request, "ok"))
+        page.on("requestfailed", lambda request: self._finish_request(request, "failed"))
+        page.on("framenavigated", lambda frame: self._navigated(page, frame))
+        return self
+
+    def _navigated(self, page, frame):
+        if frame == page.main_frame:
+            self.record("navigate", "navigation", self.now(), 0.0, url=frame.url)
+
+    def _finish_request(self, request, outcome):
+        start = self._requests.pop(request, None)
+        if start is None:
+            return
+        self.record(f"{request.method} {request.url.split('?')[0][:120]}", "network", start, self.now() - start,
+                    outcome=outcome, resource=request.resource_type)
+
+    def snapshot(self, page, label, **state):
+        """Keeps the current page state in the ring buffer (cheap unless screenshots are on)."""
+        entry = {"label": label, "at": round(self.now(), 3), "url": page.url, **state}
+        if self.screenshots:
+            try:
+                entry["screenshot"] = page.screenshot()
+            except Exception:
+                pass
+        self.ring.append(entry)
+
+    def dump_failure(self, page=None, reason=""):
+        """
+        Writes the current screenshot and HTML plus the ring buffer of recent
+        states to the debug directory.
+        """
+        os.makedirs(self.debug_dir, exist_ok=True)
+        prefix = os.path.join(self.debug_dir, f"{self.name}_failure")
+        if page is not None:
+            with contextlib.suppress(Exception):
+                page.screenshot(path=f"{prefix}.png")
+            with contextlib.suppress(Exception):
+                with open(f"{prefix}.html", "w", encoding="utf-8") as f:
+                    f.write(page.content())
+        states = []
+        for index, entry in enumerate(self.ring):
+            entry = dict(entry)
+            screenshot = entry.pop("screenshot", None)
+            if screenshot:
+                entry["screenshot"] = f"{prefix}_ring{index}.png"
+                with open(entry["screenshot"], "wb") as f:
+                    f.write(screenshot)
+            states.append(entry)
+        with open(f"{prefix}_states.json", "w", encoding="utf-8") as f:
+            json.dump({"reason": reason, "states": states}, f, indent=2, default=str)
+        self.log(f"Failure artifacts written to {prefix}.*")
+
+    def summary(self, top=10):
+        """
+        Totals per category and the slowest named steps (network excluded
+        from the step ranking; it overlaps everything else).
+        """
+        totals = {}
+        by_name = {}
+        for event in self.events:
+            totals[event["cat"]] = totals.get(event["cat"], 0.0) + event["duration"]
+            if event["cat"] in ("network", "stage", "navigation"):
+                continue
+            entry = by_name.setdefault((event["cat"], event["name"]), {"count": 0, "total": 0.0, "max": 0.0})
+            entry["count"] += 1
+            entry["total"] += event["duration"]
+            entry["max"] = max(entry["max"], event["duration"])
+        slowest = sorted(by_name.items(), key=lambda item: item[1]["total"], reverse=True)[:top]
+        return {
+            "elapsed": round(self.now(), 3),
+            "totals": {cat: round(total, 3) for cat, total in totals.items()},
+            "slowest": [
+                {"cat": cat, "name": name, "count": entry["count"], "total": round(entry["total"], 3), "max": round(entry["max"], 3)}
+                for (cat, name), entry in slowest
+            ],
+        }
+
+    def print_summary(self, top=10):
+        summary = self.summary(top)
+        print(f"\n{self.name}: {summary['elapsed']:.1f}s total; "
+              + ", ".join(f"{cat} {total:.1f}s" for cat, total in sorted(summary["totals"].items())))
+        print(f"{'slowest steps':<60}{'n':>4}{'total':>9}{'max':>9}")
+        for entry in summary["slowest"]:
+            label = f"[{entry['cat']}] {entry['name']}"[:59]
+            print(f"{label:<60}{entry['count']:>4}{entry['total']:>8.2f}s{entry['max']:>8.2f}s")
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"name": self.name, "summary": self.summary(), "events": self.events}, f, indent=2, default=str)
+        return path
+
+    def write_chrome_trace(self, path):
+        """
+        Chrome trace event format (chrome://tracing, ui.perfetto.dev). Network
+        requests overlap each other and the steps, so they are async events.
+        """
+        trace = []
+        for index, event in enumerate(self.events):
+            if event["cat"] == "network":
+                common = {"name": event["name"], "cat": "network", "id": index, "pid": 1, "tid": 2}
+                trace.append({**common, "ph": "b", "ts": int(event["start"] * 1e6), "args": event["args"]})
+                trace.append({**common, "ph": "e", "ts": int((event["start"] + event["duration"]) * 1e6)})
+                continue
+            trace.append({
+                "name": event["name"],
+                "cat": event["cat"],
+                "ph": "X" if event["duration"] else "i",
+                "ts": int(event["start"] * 1e6),
+                "dur": int(event["duration"] * 1e6),
+                "pid": 1,
+                "tid": 1,
+                "args": event["args"],
+                **({} if event["duration"] else {"s": "t"}),
+            })
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f, default=str)
+        return path
+
+
+@contextlib.contextmanager
+def instrumented(name, page, debug_dir=DEBUG_DIR):
+    """
+    Attaches a StepTimer to `page` for the duration of a check. On failure
+    the failure artifacts are dumped; the timeline is always written to
+    <debug_dir>/<name>.timeline.json and <name>.trace.json and summarized.
+    """
+    timer = StepTimer(name, debug_dir=debug_dir).attach(page)
+    try:
+        yield timer
+    except Exception as e:
+        timer.dump_failure(page, str(e))
+        raise
+    finally:
+        os.makedirs(debug_dir, exist_ok=True)
+        timer.write_json(os.path.join(debug_dir, f"{name}.timeline.json"))
+        timer.write_chrome_trace(os.path.join(debug_dir, f"{name}.trace.json"))
+        timer.print_summary()
@@ -0,0 +1,174 @@
+import asyncio
+import os
+import socket
+import uuid
+
+import pytest
+
+from benchlib import use_service
+
+use_service("litellm")
+from admission import (  # noqa: E402
+    AdmissionController, LocalLimiter, Rejected, RedisLimiter, classify, parse_classes, parse_rules,
+)
+
+REDIS_HOST = os.getenv("REDIS_HOST", "127.0.0.1")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+
+
+def redis_client():
+    """A client for the Redis at REDIS_HOST:REDIS_PORT; the test is skipped when there is none."""
+    aioredis = pytest.importorskip("redis.asyncio")
+    try:
+        socket.create_connection((REDIS_HOST, REDIS_PORT), timeout=0.5).close()
+    except OSError:
+        pytest.skip(f"no Redis at {REDIS_HOST}:{REDIS_PORT}")
+    return aioredis.Redis(host=REDIS_HOST, port=REDIS_PORT)
+
+
+async def drop_namespace(redis, namespace):
+    keys = [key async for key in redis.scan_iter(match=f"{namespace}:*")]
+    if keys:
+        await redis.delete(*keys)
+    await redis.aclose()
+
+
+def limiter_for(backend):
+    """(limiter, async cleanup) for the local limiter or the Lua script on a fresh namespace."""
+    if backend == "local":
+        async def nothing():
+            pass
+
+        return LocalLimiter(), nothing
+    redis = redis_client()
+    namespace = f"test-admission-{uuid.uuid4().hex}"
+    return RedisLimiter(redis, namespace), lambda: drop_namespace(redis, namespace)
+
+
+def test_rules_and_header_only_lower_the_priority():
+    classes = parse_classes("interactive:rate=50,burst=100;batch:rate=5,max_concurrency=16,max_queue=8,max_wait=30")
+    rules = parse_rules("key_alias=windmill-*:batch;team_alias=analytics:batch;tag=nightly:batch")
+
+    assert list(classes) == ["interactive", "batch"]
+    assert classes["batch"].rank == 1 and classes["batch"].burst == 5 and classes["batch"].max_queue == 8
+
+    def attributes(**values):
+        return {"key_alias": "", "team_alias": "", "team_id": "", "user_id": "", "tag": [], **values}
+
+    assert classify(classes, rules, "interactive", attributes(), {}) == "interactive"
+    assert classify(classes, rules, "interactive", attributes(key_alias="windmill-jobs"), {}) == "batch"
+    assert classify(classes, rules, "interactive", attributes(tag=["x", "nightly"]), {}) == "batch"
+    # the shared master key: Windmill marks its own traffic
+    assert classify(classes, rules, "interactive", attributes(), {"x-priority": "Batch"}) == "batch"
+    assert classify(classes, rules, "interactive", attributes(team_alias="analytics"),
+                    {"x-priority": "interactive"}) == "batch"
+
+
+@pytest.mark.parametrize("backend", ["local", "redis"])
+def test_higher_class_gets_released_slots_and_full_queues_are_shed(backend):
+    classes = parse_classes("interactive:max_queue=4,max_wait=5;batch:max_queue=1,max_wait=5")
+    limiter, cleanup = limiter_for(backend)
+    controller = AdmissionController(classes, limiter, max_concurrency=1, poll_interval=0.02)
+    order = []
+
+    async def scenario():
+        try:
+            return await admit_in_priority_order()
+        finally:
+            await cleanup()
+
+    async def admit_in_priority_order():
+        running = await controller.admit("batch")
+
+        async def request(name):
+            lease = await controller.admit(name)
+            order.append(name)
+            await asyncio.sleep(0.01)
+            await controller.release(lease)
+
+        queued_batch = asyncio.create_task(request("batch"))
+        await asyncio.sleep(0.01)
+        interactive = asyncio.create_task(request("interactive"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(Rejected) as rejected:
+            await controller.admit("batch")
+        assert controller.stats()["batch"]["queue_depth"] == 1
+        assert controller.stats()["interactive"]["queue_depth"] == 1
+
+        await controller.release(running)
+        await controller.release(running)  # reported twice: no effect
+        await asyncio.gather(queued_batch, interactive)
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert order == ["interactive", "batch"]
+    assert rejected.reason == "queue_full" and rejected.retry_after == 5
+    stats = controller.stats()
+    assert stats["batch"]["admitted"] == 2 and stats["batch"]["rejected"] == 1
+    assert stats["interactive"]["admitted"] == 1 and stats["interactive"]["mean_wait_ms"] > 0
+    assert all(item["in_flight"] == 0 and item["queue_depth"] == 0 for item in stats.values())
+
+
+@pytest.mark.parametrize("backend", ["local", "redis"])
+def test_empty_bucket_rejects_with_retry_after_instead_of_waiting_past_max_wait(backend):
+    classes = parse_classes("batch:rate=0.1,burst=1,max_wait=2")
+    limiter, cleanup = limiter_for(backend)
+    controller = AdmissionController(classes, limiter)
+
+    async def scenario():
+        try:
+            await controller.admit("batch")
+            with pytest.raises(Rejected) as rejected:
+                await controller.admit("batch")
+            return rejected.value
+        finally:
+            await cleanup()
+
+    rejected = asyncio.run(scenario())
+    assert rejected.reason == "rate" and 9 <= rejected.retry_after <= 10
+    assert controller.stats()["batch"]["queued"] == 0
+
+
+def test_redis_script_keys_hold_lease_expiry_and_release():
+    redis = redis_client()
+    namespace = f"test-admission-{uuid.uuid4().hex}"
+    limiter = RedisLimiter(redis, namespace)
+    classes = parse_classes("interactive:rate=10,burst=2;batch:max_concurrency=1")
+    interactive, batch = classes["interactive"], classes["batch"]
+
+    async def scenario():
+        try:
+            assert await limiter.acquire(batch, 2, "b1", 0.5, 0.2) == (True, "", 0.0)
+            # one lease per class set and in the global set, scored by expiry
+            assert await redis.zrange(f"{namespace}:leases:batch", 0, -1) == [b"b1"]
+            assert await redis.zrange(f"{namespace}:leases:*", 0, -1) == [b"b1"]
+            assert (await limiter.acquire(batch, 2, "b2", 0.5, 0.2))[:2] == (False, "class_concurrency")
+
+            assert (await limiter.acquire(interactive, 2, "i1", 30, 0.2))[0]
+            assert float((await redis.hgetall(f"{namespace}:bucket:interactive"))[b"tokens"]) == pytest.approx(1, abs=0.1)
+            # global cap reached: interactive (rank 0) waits and holds lower classes back
+            admitted, reason, _ = await limiter.acquire(interactive, 2, "i2", 30, 0.2)
+            assert (admitted, reason) == (False, "global_concurrency")
+            assert await redis.get(f"{namespace}:hold") == b"0"
+            await limiter.release(batch, "b1")
+            assert await limiter.in_flight(batch) == 0
+            assert (await limiter.acquire(batch, 2, "b3", 0.5, 0.2))[:2] == (False, "priority")
+            assert (await limiter.acquire(interactive, 2, "i2", 30, 0.2))[0]
+
+            # the bucket is empty now; the wait is the time until the next token
+            admitted, reason, wait = await limiter.acquire(interactive, 0, "i3", 30, 0.2)
+            assert (admitted, reason) == (False, "rate") and 0 < wait <= 0.1
+
+            # leases of a dead worker expire on their own
+            await limiter.release(interactive, "i1")
+            await limiter.release(interactive, "i2")
+            await asyncio.sleep(0.25)  # hold expired
+            assert (await limiter.acquire(batch, 1, "b4", 0.2, 0.2))[0]
+            await asyncio.sleep(0.3)
+            # b4 was never released: the script prunes it once its lease has expired
+            assert (await limiter.acquire(batch, 1, "b5", 0.2, 0.2))[0]
+            assert await redis.zrange(f"{namespace}:leases:*", 0, -1) == [b"b5"]
+        finally:
+            await drop_namespace(redis, namespace)
+
+    asyncio.run(scenario())
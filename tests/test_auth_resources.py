@@ -12,8 +12,8 @@ ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "password123") # Default from env o
 
 from auth_helper import perform_authentik_login
 
-def login_wrapper(page):
-    return perform_authentik_login(page, ADMIN_EMAIL, ADMIN_PASSWORD)
+def login_wrapper(page, timer=None):
+    return perform_authentik_login(page, ADMIN_EMAIL, ADMIN_PASSWORD, timer)
 
 def verify_applications(page):
     print("Verifying Applications...")
@@ -64,6 +64,24 @@ def verify_providers(page):
         print("FAIL: Provider 'LiteLLM' NOT found.")
         raise Exception("Provider 'LiteLLM' missing")
 
+def check_auth_resources(page, timer=None):
+    """Opens the Authentik admin interface on `page` and verifies applications and providers."""
+    print(f"Accessing Admin Interface at https://sso.{BASE_DOMAIN}/if/admin/")
+    page.goto(f"https://sso.{BASE_DOMAIN}/if/admin/")
+
+    # Login if needed
+    if "if/admin" not in page.url or "flow/login" in page.url:
+         login_wrapper(page, timer)
+
+    # Ensure we are at dashboard
+    try:
+        expect(page).to_have_url(f"https://sso.{BASE_DOMAIN}/if/admin/**", timeout=15000)
+    except:
+        print("URL check failed. Current URL: " + page.url)
+
+    verify_applications(page)
+    verify_providers(page)
+
 if __name__ == "__main__":
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True) # Run headless for verification
@@ -71,21 +89,7 @@ if __name__ == "__main__":
         page = context.new_page()
         
         try:
-            print(f"Accessing Admin Interface at https://sso.{BASE_DOMAIN}/if/admin/")
-            page.goto(f"https://sso.{BASE_DOMAIN}/if/admin/")
-            
-            # Login if needed
-            if "if/admin" not in page.url or "flow/login" in page.url:
-                 login_wrapper(page)
-            
-            # Ensure we are at dashboard
-            try:
-                expect(page).to_have_url(f"https://sso.{BASE_DOMAIN}/if/admin/**", timeout=15000)
-            except:
-                print("URL check failed. Current URL: " + page.url)
-            
-            verify_applications(page)
-            verify_providers(page)
+            check_auth_resources(page)
             
             print("\nAll Resource Verifications PASSED")
             
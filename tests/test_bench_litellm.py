@@ -0,0 +1,65 @@
+import argparse
+import asyncio
+
+from bench_compare import compare
+from bench_litellm import run
+from benchlib import use_service
+
+use_service("mock-openai")
+from mock_openai import MockOpenAI, completion_tokens, embedding_vector  # noqa: E402
+
+
+def bench_args(**overrides):
+    args = dict(
+        base_url=None, api_key="", endpoint="chat", model="mock-gpt", stream=True, concurrency=8, requests=16,
+        warmup=0, max_tokens=8, batch=1, prompt_words=5, prompt_mode="unique", timeout=10.0,
+        register_models=False, mock_api_base="", mock=True, mock_token_rate=500.0, mock_first_token_ms=10.0,
+        label="test", output=None,
+    )
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+
+def test_mock_output_is_deterministic():
+    messages = [{"role": "user", "content": "hello"}]
+    assert completion_tokens(messages, 5) == completion_tokens(messages, 5)
+    vector = embedding_vector("hello", 16)
+    assert vector == embedding_vector("hello", 16)
+    assert abs(sum(v * v for v in vector) - 1.0) < 1e-3
+
+
+def test_streaming_reports_ttft_and_itl():
+    summary = asyncio.run(run(bench_args()))
+    assert summary["errors"] == {}
+    assert summary["ttft"]["count"] == 16
+    assert summary["itl"]["count"] == 16 * 7
+    assert summary["ttft"]["p50"] >= 10.0
+    assert summary["tokens_per_s"] > 0
+
+
+def test_embeddings_plain_requests():
+    summary = asyncio.run(run(bench_args(endpoint="embeddings", model="mock-embedding", stream=False, batch=4)))
+    assert summary["errors"] == {}
+    assert summary["latency"]["count"] == 16
+    assert summary["itl"] == {"count": 0}
+
+
+def test_mock_error_injection():
+    async def go():
+        import aiohttp
+
+        mock = MockOpenAI(error_rate=1.0)
+        base_url = await mock.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(f"{base_url}/v1/chat/completions", json={"messages": []}) as resp:
+                    return resp.status
+        finally:
+            await mock.stop()
+
+    assert asyncio.run(go()) in (429, 500, 503)
+
+
+def test_compare_reports_change():
+    rows = compare({"summary": {"latency": {"p95": 100.0}, "errors": {}}}, {"summary": {"latency": {"p95": 80.0}}})
+    assert rows == [["latency.p95", 100.0, 80.0, "-20.0%"]]
@@ -0,0 +1,36 @@
+import argparse
+import asyncio
+
+from bench_sso_login import run
+from benchlib import percentile, ramp_schedule
+
+
+def test_percentile_interpolates():
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile([5], 99) == 5
+    assert percentile([], 50) is None
+
+
+def test_ramp_schedule_increases_rate():
+    offsets = ramp_schedule(2, 20, 2.0)
+    gaps = [b - a for a, b in zip(offsets, offsets[1:])]
+    assert offsets[0] == 0.0 and offsets[-1] < 2.0
+    assert gaps[0] > gaps[-1]
+
+
+def test_mock_run_reports_stages():
+    args = argparse.Namespace(
+        providers=["openwebui", "litellm", "windmill"], rate_start=10.0, rate_end=30.0, duration=1.0, steps=2,
+        max_in_flight=100, timeout=5.0, domain="localhost", sso_url=None, email="admin@example.com",
+        password="password123", mock=True, mock_stage_delay=1.0, output=None,
+    )
+    summary = asyncio.run(run(args))
+
+    overall = summary["overall"]
+    assert overall["attempts"] > 10
+    assert overall["error_rate"] == 0.0
+    for stage in ("total", "discovery", "identification", "password", "consent", "token"):
+        assert overall["stages"][stage]["count"] > 0
+        assert overall["stages"][stage]["p50"] <= overall["stages"][stage]["p99"]
+    assert set(summary["providers"]) == {"openwebui", "litellm", "windmill"}
+    assert len(summary["steps"]) == 2
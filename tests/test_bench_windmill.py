@@ -0,0 +1,47 @@
+import asyncio
+
+import bench_windmill
+
+
+def job(phase, kind, created, wait, duration_ms, **extra):
+    return {"phase": phase, "kind": kind, "id": f"{phase}-{kind}-{created}", "created_at": created,
+            "started_at": created + wait, "duration_ms": duration_ms, "success": True, **extra}
+
+
+def test_parse_time():
+    assert bench_windmill.parse_time("1970-01-01T00:00:01.500Z") == 1.5
+    assert bench_windmill.parse_time(None) is None
+
+
+def test_aggregate_per_phase_and_kind():
+    records = [job("baseline", "fast", t, 0.05, 100) for t in range(10)]
+    records += [job("loaded", "fast", t, 0.10, 100) for t in range(10)]
+    records += [job("loaded", "llm", 0, t, 2000) for t in range(4)]
+    records.append({"phase": "loaded", "kind": "llm", "error": "HTTP 500"})
+    records.append({"phase": "loaded", "kind": "llm", "id": "x", "timed_out": True})
+
+    summary = bench_windmill.aggregate(records)
+    fast = summary["baseline"]["fast"]
+    assert fast["completed"] == 10 and fast["queue_wait"]["p50"] == 50.0 and fast["execution"]["p50"] == 100.0
+    # 10 jobs between the first creation (0s) and the last completion (9.05 + 0.1s)
+    assert fast["jobs_per_s"] == round(10 / 9.15, 2)
+    assert summary["loaded"]["llm"]["errors"] == {"HTTP 500": 1, "timeout": 1}
+    assert bench_windmill.fast_latency_ratio(summary) == 2.0
+
+
+def test_wait_for_jobs_collects_completed_timings():
+    class FakeClient:
+        def __init__(self):
+            self.calls = 0
+
+        async def get(self, job_id):
+            self.calls += 1
+            if job_id == "queued":
+                return {"type": "QueuedJob"}
+            return {"type": "CompletedJob", "created_at": "1970-01-01T00:00:01Z", "started_at": "1970-01-01T00:00:03Z",
+                    "duration_ms": 250, "success": True, "tag": "llm-batch", "worker": "wk-1"}
+
+    records = [{"id": "done", "phase": "loaded", "kind": "llm"}, {"id": "queued", "phase": "loaded", "kind": "llm"}]
+    result = asyncio.run(bench_windmill.wait_for_jobs(FakeClient(), records, timeout=0.05, interval=0.01))
+    assert result[0]["started_at"] - result[0]["created_at"] == 2 and result[0]["server_tag"] == "llm-batch"
+    assert result[1]["timed_out"]
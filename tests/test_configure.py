@@ -0,0 +1,81 @@
+import json
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+import configure  # noqa: E402
+
+REPO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def make_root(tmp_path):
+    for path in [configure.ROOT_COMPOSE_FILE, configure.OIDC_TEMPLATE] + configure.compose_files(REPO):
+        target = tmp_path / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(os.path.join(REPO, path), target)
+    (tmp_path / "mysettings.env").write_text("BASE_DOMAIN=example.org\nADMIN_EMAIL=admin@example.org\nADMIN_PASSWORD=pw\n")
+    return str(tmp_path)
+
+
+def run(root, monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["configure.py", "--root", root, *args])
+    return configure.main()
+
+
+def test_first_run_renders_everything(tmp_path, monkeypatch):
+    root = make_root(tmp_path)
+    assert run(root, monkeypatch) == 0
+
+    env = configure.parse_env((tmp_path / ".env").read_text())
+    assert env["BASE_DOMAIN"] == "example.org"
+    for key, _ in configure.SECRETS:
+        assert env[key]
+    assert len(env["LITELLM_OIDC_CLIENT_ID"]) == 20
+    assert len(env["LITELLM_MASTER_KEY"]) == 32
+
+    oauth = json.loads((tmp_path / "services/windmill/oauth.json").read_text())
+    assert oauth["Authentik"]["id"] == env["WINDMILL_OIDC_CLIENT_ID"]
+    discovery = json.loads((tmp_path / "services/openwebui/config/oidc/openid-configuration.json").read_text())
+    assert discovery["authorization_endpoint"] == "https://sso.example.org/application/o/authorize/"
+    blueprint = configure.parse_env((tmp_path / "services/authentik/blueprint.env").read_text())
+    assert blueprint["WINDMILL_OIDC_CLIENT_SECRET"] == env["WINDMILL_OIDC_CLIENT_SECRET"]
+
+
+def test_rerun_is_a_no_op(tmp_path, monkeypatch, capsys):
+    root = make_root(tmp_path)
+    run(root, monkeypatch)
+    mtimes = {path: os.stat(os.path.join(root, path)).st_mtime_ns for path in (".env", "services/windmill/oauth.json")}
+    capsys.readouterr()
+
+    assert run(root, monkeypatch) == 0
+    out = capsys.readouterr().out
+    assert "All generated files are up to date." in out
+    assert "Nothing to restart" in out
+    assert mtimes == {path: os.stat(os.path.join(root, path)).st_mtime_ns for path in mtimes}
+    assert run(root, monkeypatch, "--check") == 0
+
+
+def test_only_affected_services_change(tmp_path, monkeypatch):
+    root = make_root(tmp_path)
+    run(root, monkeypatch)
+    state = configure.load_state(root)
+
+    env_path = tmp_path / ".env"
+    env_path.write_text(env_path.read_text().replace("WINDMILL_OIDC_CLIENT_SECRET=", "WINDMILL_OIDC_CLIENT_SECRET=x"))
+    artifacts, hashes, _ = configure.compile_config(root)
+    written = configure.write_outputs(root, artifacts)
+    changed, mounted = configure.plan_restarts(state, artifacts, hashes, written)
+
+    assert "services/windmill/oauth.json" in written
+    assert "services/openwebui/config/oidc/openid-configuration.json" not in written
+    assert set(changed) == {"windmill_server", "authentik-server", "authentik-worker"}
+    assert mounted == ["windmill_server"]
+
+
+def test_compose_service_split():
+    text = "services:\n  a:\n    image: x ${FOO}\n  b:\n    command: $${NOT} ${BAR:-1}\nvolumes:\n  a:\n"
+    blocks = configure.compose_services(text)
+    assert set(blocks) == {"a", "b"}
+    assert configure.env_references(blocks["a"]) == ["FOO"]
+    assert configure.env_references(blocks["b"]) == ["BAR"]
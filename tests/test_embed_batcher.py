@@ -0,0 +1,95 @@
+import asyncio
+
+import aiohttp
+from aiohttp import web
+
+from benchlib import use_service
+
+use_service("mock-openai")
+use_service("embed-batcher")
+from embed_batcher import MicroBatcher, Sidecar, UpstreamError, split_usage  # noqa: E402
+from mock_openai import MockOpenAI, embedding_vector  # noqa: E402
+
+
+def test_batches_by_size_and_wait_and_propagates_errors():
+    async def scenario():
+        batches = []
+
+        async def send(key, inputs):
+            batches.append((key, list(inputs)))
+            if "bad" in inputs:
+                raise UpstreamError(400, b'{"error": {"message": "bad input"}}')
+            return [(f"vec:{item}", 1) for item in inputs]
+
+        batcher = MicroBatcher(send, max_batch_size=4, max_wait_ms=20)
+        results = await asyncio.gather(*(batcher.embed("k", [f"t{index}"]) for index in range(10)))
+        assert [result[0][0] for result in results] == [f"vec:t{index}" for index in range(10)]
+        assert [len(inputs) for _, inputs in batches] == [4, 4, 2]
+        assert batcher.stats["flush_full"] == 2 and batcher.stats["flush_timer"] == 1
+
+        # different keys never share a batch; one failing batch fails only its callers
+        batches.clear()
+        outcomes = await asyncio.gather(batcher.embed("k", ["ok"]), batcher.embed("other", ["bad"]),
+                                        return_exceptions=True)
+        assert outcomes[0] == [("vec:ok", 1)]
+        assert isinstance(outcomes[1], UpstreamError) and outcomes[1].status == 400
+        assert sorted(key for key, _ in batches) == ["k", "other"] and not batcher.in_flight
+
+        # a bad input in a shared batch is bisected out and fails only its own caller
+        batches.clear()
+        outcomes = await asyncio.gather(*(batcher.embed("k", [text]) for text in ["a", "b", "bad", "c"]),
+                                        return_exceptions=True)
+        assert outcomes[:2] == [[("vec:a", 1)], [("vec:b", 1)]] and outcomes[3] == [("vec:c", 1)]
+        assert isinstance(outcomes[2], UpstreamError) and outcomes[2].status == 400
+        assert [inputs for _, inputs in batches] == [["a", "b", "bad", "c"], ["a", "b"], ["bad", "c"], ["bad"], ["c"]]
+        assert batcher.stats["batch_splits"] == 2 and not batcher.in_flight
+
+        # errors that are not about the inputs fail the whole batch without retries
+        async def unavailable(key, inputs):
+            raise UpstreamError(503, b"")
+
+        down = MicroBatcher(unavailable, max_batch_size=2, max_wait_ms=20)
+        outcomes = await asyncio.gather(down.embed("k", ["a"]), down.embed("k", ["b"]), return_exceptions=True)
+        assert all(isinstance(outcome, UpstreamError) for outcome in outcomes) and down.stats["batch_splits"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_sidecar_coalesces_and_deduplicates_requests():
+    async def scenario():
+        mock = MockOpenAI(embedding_ms=10, embedding_dim=8)
+        upstream = await mock.start()
+        sidecar = Sidecar(f"{upstream}/v1", max_batch_size=64, max_wait_ms=25)
+        runner = web.AppRunner(sidecar.app())
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/v1/embeddings"
+        texts = [f"chunk {index % 30}" for index in range(40)]  # 10 repeats
+        try:
+            async with aiohttp.ClientSession() as session:
+                async def embed(payload):
+                    async with session.post(url, json=payload, headers={"Authorization": "Bearer sk-test"}) as resp:
+                        assert resp.status == 200
+                        return await resp.json()
+
+                single = await asyncio.gather(*(embed({"model": "mock-embedding", "input": text}) for text in texts))
+                several = await embed({"model": "mock-embedding", "input": ["b", "a", "b"]})
+        finally:
+            await runner.cleanup()
+            await mock.stop()
+
+        for text, body in zip(texts, single):
+            assert body["data"][0]["embedding"] == embedding_vector(text, 8)
+            assert body["usage"]["prompt_tokens"] >= 1
+        assert [item["embedding"] for item in several["data"]] == [embedding_vector(t, 8) for t in ("b", "a", "b")]
+        assert mock.stats["embeddings"] == 2  # one coalesced batch, then the multi-input request
+        assert mock.stats["embedding_inputs"] == 30 + 2
+        assert sidecar.batcher.stats["deduplicated"] == 10 + 1
+
+    asyncio.run(scenario())
+
+
+def test_split_usage_shares_tokens_by_length():
+    assert split_usage(["aaaa", "aaaaaaaaaaaa"], 16) == [4, 12]
+    assert split_usage([[1, 2, 3], [4]], 4) == [3, 1]
@@ -0,0 +1,90 @@
+import asyncio
+
+import aiohttp
+from aiohttp import web
+
+from benchlib import Clock, use_service
+
+use_service("health")
+from health import HealthAggregator, parse_targets  # noqa: E402
+
+
+def test_state_transitions_and_latency_summary():
+    clock = Clock()
+    aggregator = HealthAggregator({"litellm": "http://litellm:4000/health/liveliness"}, interval=15,
+                                  failure_threshold=3, clock=clock)
+    target = aggregator.targets["litellm"]
+    aggregator.record(target, False, 0.5, "Connection refused")
+    assert target.state == "starting" and not aggregator.is_ready(target)
+    clock.now += 40
+    for latency in (0.010, 0.020, 0.030):
+        aggregator.record(target, True, latency, 200)
+    assert aggregator.is_ready(target) and target.ready_after == 40
+    summary = aggregator.summary(target)
+    assert summary["latency_ms"]["p50_5m"] == 20.0 and summary["probes"] == {"ok": 3, "error": 1}
+
+    aggregator.record(target, False, 3.0, "timeout")
+    assert not aggregator.last_probe_ok(target)  # /ready drops at once
+    aggregator.record(target, False, 3.0, "timeout")
+    assert target.state == "ready"  # below the threshold
+    aggregator.record(target, False, 3.0, "timeout")
+    assert target.state == "failing" and not aggregator.is_ready(target)
+    aggregator.record(target, True, 0.01, 200)
+    assert aggregator.is_ready(target) and aggregator.last_probe_ok(target) and target.ready_after == 40
+
+    clock.now += 46  # no probe for more than three intervals: stale
+    assert not aggregator.is_ready(target) and not aggregator.last_probe_ok(target)
+    assert parse_targets("a=http://a/health; db=tcp://db:5432;") == {"a": "http://a/health", "db": "tcp://db:5432"}
+
+
+def test_probes_and_endpoints():
+    async def ok(request):
+        return web.Response(text="ok")
+
+    async def broken(request):
+        return web.Response(status=500)
+
+    async def scenario():
+        upstream = web.Application()
+        upstream.router.add_get("/health", ok)
+        upstream.router.add_get("/broken", broken)
+        runner = web.AppRunner(upstream)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        aggregator = HealthAggregator({
+            "up": f"http://127.0.0.1:{port}/health",
+            "broken": f"http://127.0.0.1:{port}/broken",
+            "tcp": f"tcp://127.0.0.1:{port}",
+        }, interval=60, fast_interval=0.05)
+        health = web.AppRunner(aggregator.app())
+        await health.setup()
+        health_site = web.TCPSite(health, "127.0.0.1", 0)
+        await health_site.start()
+        url = f"http://127.0.0.1:{health_site._server.sockets[0].getsockname()[1]}"
+        try:
+            await asyncio.sleep(0.3)
+            async with aiohttp.ClientSession() as session:
+                statuses = {}
+                for name in ("up", "broken", "tcp", "missing"):
+                    async with session.get(f"{url}/ready/{name}") as resp:
+                        statuses[name] = resp.status
+                async with session.get(f"{url}/status") as resp:
+                    status = await resp.json()
+                async with session.get(f"{url}/history/broken") as resp:
+                    history = await resp.json()
+                async with session.get(f"{url}/metrics") as resp:
+                    metrics = await resp.text()
+        finally:
+            await health.cleanup()
+            await runner.cleanup()
+
+        assert statuses == {"up": 200, "broken": 503, "tcp": 200, "missing": 404}
+        assert status["status"] == "degraded" and status["services"]["up"]["ready"]
+        assert status["services"]["up"]["probes"]["ok"] == 1  # ready services wait the full interval
+        assert len(history["samples"]) > 2 and not any(sample["ok"] for sample in history["samples"])
+        assert 'health_service_ready{service="up"} 1' in metrics
+
+    asyncio.run(scenario())
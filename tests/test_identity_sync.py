@@ -0,0 +1,204 @@
+import asyncio
+import math
+
+import aiohttp
+from aiohttp import web
+
+from benchlib import use_service
+
+use_service("identity-sync")
+from identity_sync import (  # noqa: E402
+    MANAGED_BY, ApiClient, AuthentikSource, LiteLLMTarget, current_state, desired_state, plan, sync_once, team_id,
+)
+
+
+class FakeAuthentik:
+    """Paged /core/users/ and /core/groups/ like the Authentik API."""
+
+    def __init__(self, users, groups):
+        self.users = users
+        self.groups = groups
+        self.requests = 0
+
+    def _paged(self, request, items):
+        self.requests += 1
+        page, size = int(request.query["page"]), int(request.query["page_size"])
+        return web.json_response({
+            "pagination": {"count": len(items), "total_pages": max(1, math.ceil(len(items) / size))},
+            "results": items[(page - 1) * size:page * size],
+        })
+
+    async def list_users(self, request):
+        return self._paged(request, self.users)
+
+    async def list_groups(self, request):
+        return self._paged(request, self.groups)
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/api/v3/core/users/", self.list_users)
+        app.router.add_get("/api/v3/core/groups/", self.list_groups)
+        return app
+
+
+class FakeLiteLLM:
+    """In-memory users and teams behind the LiteLLM management endpoints."""
+
+    def __init__(self, fail_first=()):
+        self.users = {}
+        self.teams = {}
+        self.calls = []
+        self.fail_first = set(fail_first)
+
+    async def handle(self, request):
+        path = request.path
+        self.calls.append(path)
+        if path in self.fail_first:
+            self.fail_first.discard(path)
+            return web.Response(status=503)
+        if request.method == "GET":
+            if path == "/team/list":
+                return web.json_response(list(self.teams.values()))
+            users = list(self.users.values())
+            page, size = int(request.query["page"]), int(request.query["page_size"])
+            return web.json_response({"users": users[(page - 1) * size:page * size],
+                                      "total_pages": max(1, math.ceil(len(users) / size))})
+        body = await request.json()
+        if path in ("/user/new", "/user/update"):
+            self.users.setdefault(body["user_id"], {"user_id": body["user_id"]}).update(body)
+        elif path == "/user/delete":
+            for user_id in body["user_ids"]:
+                self.users.pop(user_id, None)
+                for team in self.teams.values():
+                    team["members_with_roles"] = [m for m in team["members_with_roles"] if m["user_id"] != user_id]
+        elif path in ("/team/new", "/team/update"):
+            self.teams.setdefault(body["team_id"], {"members_with_roles": []}).update(body)
+        elif path == "/team/delete":
+            for tid in body["team_ids"]:
+                self.teams.pop(tid)
+        elif path == "/team/member_add":
+            self.teams[body["team_id"]]["members_with_roles"] += body["member"]
+        elif path == "/team/member_delete":
+            team = self.teams[body["team_id"]]
+            team["members_with_roles"] = [m for m in team["members_with_roles"] if m["user_id"] != body["user_id"]]
+        return web.json_response({})
+
+    def app(self):
+        app = web.Application()
+        app.router.add_route("*", "/{path:.*}", self.handle)
+        return app
+
+
+async def serve(app):
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+
+def directory(count):
+    groups = [
+        {"pk": "g-admins", "name": "Admins", "attributes": {}},
+        {"pk": "g-research", "name": "Research Team", "attributes": {"litellm_max_budget": 50,
+                                                                     "litellm_models": ["mock-gpt"]}},
+    ]
+    users = [{"pk": 1, "username": "akadmin", "email": "admin@example.com", "is_active": True,
+              "type": "internal", "groups": ["g-admins"]}]
+    users += [{"pk": index, "username": f"user{index}", "email": f"user{index}@example.com", "is_active": True,
+               "type": "internal", "groups": ["g-research"] if index % 2 else []}
+              for index in range(2, count + 1)]
+    users.append({"pk": count + 1, "username": "outpost", "email": "", "type": "internal_service_account"})
+    return users, groups
+
+
+def test_plan_adopts_unmanaged_and_deletes_only_managed():
+    users, groups = directory(4)
+    desired = desired_state(users, groups)
+    assert desired["users"]["admin@example.com"]["user_role"] == "proxy_admin"
+    assert desired["teams"][team_id("Research Team")]["members"] == ["user3@example.com"]
+
+    current = current_state(
+        [
+            {"user_id": "admin@example.com", "user_email": "admin@example.com", "user_role": "internal_user"},
+            {"user_id": "akadmin", "user_role": "proxy_admin"},
+            {"user_id": "gone@example.com", "metadata": {"managed_by": MANAGED_BY}},
+            {"user_id": "manual@example.com"},
+        ],
+        [{"team_id": "ak-old", "metadata": {"managed_by": MANAGED_BY},
+          "members_with_roles": [{"user_id": "gone@example.com"}]}],
+    )
+    ops = plan(desired, current, prune_user_ids=("akadmin",))
+    assert ops["users_update"] == ["admin@example.com"]
+    assert sorted(ops["users_create"]) == ["user2@example.com", "user3@example.com", "user4@example.com"]
+    assert ops["users_delete"] == ["akadmin", "gone@example.com"]
+    assert ops["teams_create"] == ["ak-admins", "ak-research-team"] and ops["teams_delete"] == ["ak-old"]
+    assert ops["members_add"]["ak-research-team"] == ["user3@example.com"]
+    assert ops["members_remove"] == []  # removed together with the team
+
+
+async def run_sync(authentik_url, litellm_url, state, **options):
+    async with aiohttp.ClientSession() as session:
+        source = AuthentikSource(ApiClient(session, authentik_url, "ak-token"), page_size=50)
+        target = LiteLLMTarget(ApiClient(session, litellm_url, "sk-master", backoff=0.01), page_size=50, batch_size=20)
+        return await sync_once(source, target, state, **options)
+
+
+def test_repeat_runs_are_noops_and_changes_apply_incrementally():
+    async def scenario():
+        users, groups = directory(230)
+        authentik, litellm = FakeAuthentik(users, groups), FakeLiteLLM(fail_first={"/team/member_add"})
+        (ak_runner, ak_url), (llm_runner, llm_url) = await serve(authentik.app()), await serve(litellm.app())
+        state = {}
+        try:
+            first = await run_sync(ak_url, llm_url, state)
+            assert first["result"] == "applied" and first["changes"]["users_create"] == 230
+            assert litellm.users["admin@example.com"]["user_role"] == "proxy_admin"
+            research = litellm.teams["ak-research-team"]
+            assert research["max_budget"] == 50 and len(research["members_with_roles"]) == 114
+            # 114 research members in batches of 20, one admin, one call retried after a 503
+            assert litellm.calls.count("/team/member_add") == 6 + 1 + 1
+            assert authentik.requests == 5 + 1
+
+            calls = len(litellm.calls)
+            second = await run_sync(ak_url, llm_url, state)
+            assert second["result"] == "unchanged" and len(litellm.calls) == calls
+
+            users[4]["groups"] = []  # user5 leaves Research Team
+            users[6]["is_active"] = False  # user7 is deactivated
+            third = await run_sync(ak_url, llm_url, state)
+            assert third["changes"]["members_remove"] == 1 and third["changes"]["users_delete"] == 1
+            assert third["changes"]["users_create"] == 0 and third["changes"]["users_update"] == 0
+            assert "user7@example.com" not in litellm.users
+            writes = [path for path in litellm.calls[calls:] if not path.endswith("/list")]
+            assert writes == ["/team/member_delete", "/user/delete"]
+
+            forced = await run_sync(ak_url, llm_url, state, force=True)
+            assert forced["result"] == "applied" and not any(forced["changes"].values())
+        finally:
+            await ak_runner.cleanup()
+            await llm_runner.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_failed_calls_keep_previous_digest():
+    async def scenario():
+        users, groups = directory(3)
+        litellm = FakeLiteLLM()
+        (ak_runner, ak_url), (llm_runner, llm_url) = await serve(FakeAuthentik(users, groups).app()), await serve(litellm.app())
+        try:
+            async with aiohttp.ClientSession() as session:
+                source = AuthentikSource(ApiClient(session, ak_url, "ak-token"))
+                target = LiteLLMTarget(ApiClient(session, llm_url, "sk-master", retries=0))
+                litellm.fail_first = {"/user/new"}
+                state = {}
+                metrics = await sync_once(source, target, state)
+            assert metrics["result"] == "partial" and "digest" not in state
+            retry = await run_sync(ak_url, llm_url, state)
+            assert retry["result"] == "applied" and retry["changes"]["users_create"] == 1 and state["digest"]
+        finally:
+            await ak_runner.cleanup()
+            await llm_runner.cleanup()
+
+    asyncio.run(scenario())
@@ -4,6 +4,7 @@ import re
 from playwright.sync_api import sync_playwright, expect
 from dotenv import load_dotenv
 from auth_helper import perform_authentik_login
+from step_timer import StepTimer, instrumented
 
 # Load environment variables
 load_dotenv()
@@ -12,6 +13,44 @@ BASE_DOMAIN = os.getenv("BASE_DOMAIN", "localhost")
 ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "admin@example.com")
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "password123")
 
+def check_litellm(page, timer=None):
+    """Logs into LiteLLM via Authentik on `page` and verifies admin access."""
+    timer = timer or StepTimer("litellm")
+    timer.log(f"Navigating to LiteLLM UI: https://llm.{BASE_DOMAIN}/ui/")
+    # Set up console log forwarding
+    page.on("console", lambda msg: print(f"BROWSER ({msg.type}): {msg.text}"))
+
+    timer.call("goto /ui/", page.goto, f"https://llm.{BASE_DOMAIN}/ui/")
+    timer.call("wait networkidle (ui)", page.wait_for_load_state, "networkidle")
+
+    # Handle automatic redirect or manual login click
+    if "flow/login" not in page.url:
+         login_btn = page.locator("text=Login")
+         if login_btn.is_visible():
+             login_btn.click()
+
+    # Authentik Login Page (using helper)
+    if not perform_authentik_login(page, ADMIN_EMAIL, ADMIN_PASSWORD, timer):
+         raise Exception("Authentik login failed")
+
+    # Wait for redirect back to LiteLLM
+    timer.log("Waiting for redirect back to LiteLLM...")
+    # Verify URL
+    with timer.step("wait redirect to llm"):
+        expect(page).to_have_url(re.compile(f".*llm\\.{BASE_DOMAIN}.*"), timeout=60000)
+
+    # Verify we are in the dashboard
+    timer.log("Waiting for Dashboard indicators...")
+    timer.call("wait 'Virtual Keys'", page.wait_for_selector, "text=Virtual Keys", timeout=60000)
+
+    # Verify Admin Access
+    timer.log("Verifying Admin Access...")
+    # 'Settings' usually indicates admin/configuration access in LiteLLM UI
+    timer.call("wait 'Settings'", page.wait_for_selector, "text=Settings", timeout=10000)
+
+    timer.mark("Successfully logged into LiteLLM via OIDC!")
+
+
 def test_litellm_oidc_login():
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
@@ -20,42 +59,10 @@ def test_litellm_oidc_login():
         page.set_default_timeout(30000)
 
         try:
-            print(f"Navigating to LiteLLM UI: https://llm.{BASE_DOMAIN}/ui/")
-            # Set up console log forwarding
-            page.on("console", lambda msg: print(f"BROWSER ({msg.type}): {msg.text}"))
-            
-            page.goto(f"https://llm.{BASE_DOMAIN}/ui/")
-            page.wait_for_load_state("networkidle")
-
-            # Handle automatic redirect or manual login click
-            if "flow/login" not in page.url:
-                 login_btn = page.locator("text=Login")
-                 if login_btn.is_visible():
-                     login_btn.click()
-
-            # Authentik Login Page (using helper)
-            if not perform_authentik_login(page, ADMIN_EMAIL, ADMIN_PASSWORD):
-                 raise Exception("Authentik login failed")
-
-            # Wait for redirect back to LiteLLM
-            print("Waiting for redirect back to LiteLLM...")
-            # Verify URL
-            expect(page).to_have_url(re.compile(f".*llm\\.{BASE_DOMAIN}.*"), timeout=60000)
-            
-            # Verify we are in the dashboard
-            print("Waiting for Dashboard indicators...")
-            page.wait_for_selector("text=Virtual Keys", timeout=60000)
-            
-            # Verify Admin Access
-            print("Verifying Admin Access...")
-            # 'Settings' usually indicates admin/configuration access in LiteLLM UI
-            page.wait_for_selector("text=Settings", timeout=10000)
-            
-            print("Successfully logged into LiteLLM via OIDC!")
-
+            with instrumented("litellm", page) as timer:
+                check_litellm(page, timer)
         except Exception as e:
             print(f"Test failed: {e}")
-            page.screenshot(path="tests/debug/litellm_login_failure.png")
             raise e
         finally:
             browser.close()
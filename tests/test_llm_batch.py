@@ -0,0 +1,129 @@
+import asyncio
+import json
+
+from aiohttp import web
+
+from benchlib import use_service
+
+use_service("mock-openai")
+use_service("windmill/workspace/f/lib")
+import llm_batch  # noqa: E402
+from mock_openai import MockOpenAI  # noqa: E402
+
+
+def write_input(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        for index in range(count):
+            f.write(json.dumps({"id": f"t{index}", "text": f"ticket number {index}"}) + "\n")
+
+
+def read_output(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def run(mock, input_path, output_path, **options):
+    async def scenario():
+        base_url = await mock.start()
+        try:
+            return await llm_batch.run_batch(
+                str(input_path), str(output_path), prompt_template="Classify: {text}", base_url=f"{base_url}/v1",
+                backoff=0.001, max_backoff=0.01, progress_every=0, **options,
+            )
+        finally:
+            await mock.stop()
+
+    return asyncio.run(scenario())
+
+
+def test_fan_out_with_backpressure_writes_every_record_once(tmp_path):
+    write_input(tmp_path / "in.jsonl", 60)
+    mock = MockOpenAI(token_rate=5000, first_token_ms=1, completion_tokens=8, error_rate=0.3, seed=3)
+    stats = run(mock, tmp_path / "in.jsonl", tmp_path / "out.jsonl", concurrency=8, max_retries=10)
+
+    results = read_output(tmp_path / "out.jsonl")
+    assert sorted(result["id"] for result in results) == sorted(f"t{index}" for index in range(60))
+    assert all("output" in result for result in results)
+    assert stats["ok"] == 60 and stats["retries"] == mock.stats["errors"] > 0
+    assert stats["throttled"] + stats["server_errors"] == mock.stats["errors"]
+    assert stats["completion_tokens"] == 60 * 8 and stats["tokens_per_s"] > 0
+
+
+def test_restarted_job_resumes_from_output(tmp_path):
+    write_input(tmp_path / "in.jsonl", 20)
+    first = run(MockOpenAI(token_rate=5000, first_token_ms=1, completion_tokens=4), tmp_path / "in.jsonl",
+                tmp_path / "out.jsonl", concurrency=4, limit=7)
+    # simulate a job killed mid-write
+    with open(tmp_path / "out.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"id": "t19", "outp')
+    mock = MockOpenAI(token_rate=5000, first_token_ms=1, completion_tokens=4)
+    second = run(mock, tmp_path / "in.jsonl", tmp_path / "out.jsonl", concurrency=4)
+
+    assert first["ok"] == 7
+    assert second["skipped"] == 7 and second["ok"] == 13 and mock.stats["chat"] == 13
+    ids = [result["id"] for result in read_output_lenient(tmp_path / "out.jsonl")]
+    assert sorted(ids) == sorted(f"t{index}" for index in range(20))
+
+
+def test_malformed_records_and_responses_fail_only_themselves(tmp_path):
+    with open(tmp_path / "in.jsonl", "w", encoding="utf-8") as f:
+        f.write('{"id": "ok", "text": "fine"}\n')
+        f.write('{"id": "no-text", "body": "missing the template field"}\n')
+        f.write('{"id": "torn", "te\n')
+        f.write('"just a string"\n')
+    mock = MockOpenAI(token_rate=5000, first_token_ms=1, completion_tokens=4)
+    stats = run(mock, tmp_path / "in.jsonl", tmp_path / "out.jsonl", concurrency=2)
+
+    results = {result["id"]: result for result in read_output(tmp_path / "out.jsonl")}
+    assert "output" in results["ok"] and "output" in results["3"]  # non-object lines render as {text}
+    assert results["no-text"]["error"].startswith("cannot render prompt: KeyError")
+    assert results["2"]["error"].startswith("invalid JSON")
+    assert stats["ok"] == 2 and stats["failed"] == 2 and mock.stats["chat"] == 2
+
+    # a 200 without choices is an error for that record, not for the job
+    async def empty(request):
+        return web.json_response({"object": "chat.completion"})
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", empty)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        try:
+            return await llm_batch.run_batch(
+                str(tmp_path / "in.jsonl"), str(tmp_path / "empty.jsonl"), prompt_template="Classify: {text}",
+                base_url=f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/v1", progress_every=0)
+        finally:
+            await runner.cleanup()
+
+    stats = asyncio.run(scenario())
+    assert stats["ok"] == 0 and stats["failed"] == 4
+    results = {result["id"]: result for result in read_output(tmp_path / "empty.jsonl")}
+    assert results["ok"]["error"].startswith("malformed response") and results["3"]["error"] == results["ok"]["error"]
+
+
+def read_output_lenient(path):
+    results = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                results.append(json.loads(line))
+            except ValueError:
+                continue
+    return results
+
+
+def test_adaptive_limiter_halves_and_regrows():
+    async def scenario():
+        limiter = llm_batch.AdaptiveLimiter(8, minimum=1)
+        await limiter.acquire()
+        await limiter.release(backpressure=True)
+        assert limiter.limit == 4
+        for _ in range(4):
+            await limiter.acquire()
+            await limiter.release()
+        assert limiter.limit == 5
+
+    asyncio.run(scenario())
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from mock_idp import MockIdP, clients_for
+from oidc_client import PROVIDERS, AuthentikClient, LoginError, provider_settings, smoke_login
+
+EMAIL = "admin@example.com"
+PASSWORD = "password123"
+ENV = {
+    "OPENWEBUI_OIDC_CLIENT_ID": "owui-client",
+    "OPENWEBUI_OIDC_CLIENT_SECRET": "owui-secret",
+    "LITELLM_OIDC_CLIENT_ID": "litellm-client",
+    "LITELLM_OIDC_CLIENT_SECRET": "litellm-secret",
+    "WINDMILL_OIDC_CLIENT_ID": "windmill-client",
+    "WINDMILL_OIDC_CLIENT_SECRET": "windmill-secret",
+}
+
+
+def mock_idp():
+    return MockIdP(EMAIL, PASSWORD, clients_for([provider_settings(name, "localhost", ENV) for name in PROVIDERS]))
+
+
+def test_login_all_providers():
+    async def run():
+        idp = mock_idp()
+        base_url = await idp.start()
+        try:
+            return await smoke_login(base_url, EMAIL, PASSWORD, list(PROVIDERS), "localhost", ENV)
+        finally:
+            await idp.stop()
+
+    results = asyncio.run(run())
+
+    assert set(results) == set(PROVIDERS)
+    for result in results.values():
+        assert result["tokens"]["token_type"] == "Bearer"
+        assert result["tokens"]["id_token"].count(".") == 2
+        assert result["elapsed"] < 1.0
+
+    # The first login authenticates, later ones only pass consent
+    first_stages = [stage for stage, _ in results["openwebui"]["timings"]]
+    later_stages = [stage for stage, _ in results["windmill"]["timings"]]
+    assert "identification" in first_stages and "password" in first_stages
+    assert "identification" not in later_stages and "consent" in later_stages
+
+
+def test_wrong_password_raises():
+    async def run():
+        idp = mock_idp()
+        base_url = await idp.start()
+        try:
+            settings = provider_settings("litellm", "localhost", ENV)
+            async with AuthentikClient(base_url, EMAIL, "wrong") as client:
+                await client.login(
+                    settings["slug"], settings["client_id"], settings["client_secret"], settings["redirect_uri"]
+                )
+        finally:
+            await idp.stop()
+
+    with pytest.raises(LoginError, match="password"):
+        asyncio.run(run())
+
+
+def test_authenticate_without_provider():
+    async def run():
+        idp = mock_idp()
+        base_url = await idp.start()
+        try:
+            async with AuthentikClient(base_url, EMAIL, PASSWORD) as client:
+                return await client.authenticate(), [cookie.key for cookie in client.session.cookie_jar]
+        finally:
+            await idp.stop()
+
+    timings, cookies = asyncio.run(run())
+    assert [stage for stage, _ in timings] == ["flow_start", "identification", "password"]
+    assert "authentik_session" in cookies
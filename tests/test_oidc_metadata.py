@@ -0,0 +1,182 @@
+import asyncio
+import json
+import os
+
+import aiohttp
+from aiohttp import web
+
+from benchlib import Clock, use_service
+
+use_service("oidc-metadata")
+from oidc_metadata import JwksCache, MetadataServer, load_discovery, parse_max_age  # noqa: E402
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "services", "openwebui", "config", "oidc")
+
+
+class FakeJwksUpstream:
+    """Counts key fetches and can be switched to failing or slow."""
+
+    def __init__(self, cache_control="max-age=60"):
+        self.cache_control = cache_control
+        self.requests = 0
+        self.status = 200
+        self.delay = 0.0
+        self.keys = {"keys": [{"kid": "k1", "kty": "RSA", "n": "abc", "e": "AQAB"}]}
+
+    async def jwks(self, request):
+        self.requests += 1
+        await asyncio.sleep(self.delay)
+        if self.status != 200:
+            return web.Response(status=self.status)
+        body = json.dumps(self.keys)
+        etag = f'"{len(body)}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"Cache-Control": self.cache_control})
+        return web.Response(text=body, content_type="application/json",
+                            headers={"ETag": etag, "Cache-Control": self.cache_control})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/application/o/{slug}/jwks/", self.jwks)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        return f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+
+async def with_cache(test, **options):
+    upstream = FakeJwksUpstream()
+    url = await upstream.start()
+    clock = Clock()
+    try:
+        async with aiohttp.ClientSession() as session:
+            cache = JwksCache(session, url, clock=clock, **options)
+            return await test(cache, upstream, clock)
+    finally:
+        await upstream.runner.cleanup()
+
+
+def test_parse_max_age():
+    assert parse_max_age("public, max-age=120") == 120
+    assert parse_max_age("no-store") == 0
+    assert parse_max_age(None) is None
+
+
+def test_concurrent_misses_share_one_fetch():
+    async def test(cache, upstream, clock):
+        upstream.delay = 0.05
+        entries = await asyncio.gather(*(cache.get("litellm") for _ in range(20)))
+        assert upstream.requests == 1
+        assert all(entry is entries[0] for entry in entries)
+        await cache.get("litellm")
+        assert upstream.requests == 1
+        assert cache.stats["hits"] == 1
+
+    asyncio.run(with_cache(test))
+
+
+def test_upstream_cache_control_sets_ttl_and_etag_revalidates():
+    async def test(cache, upstream, clock):
+        entry = await cache.get("openwebui")
+        assert entry["expires_at"] - clock() == 60
+        clock.now += 61 + cache.stale_while_revalidate
+        await cache.get("openwebui")
+        assert upstream.requests == 2
+        assert cache.stats["revalidated"] == 1
+
+    asyncio.run(with_cache(test))
+
+
+def test_background_refresh_before_expiry():
+    async def test(cache, upstream, clock):
+        await cache.get("windmill")
+        clock.now += 10
+        assert await cache.refresh_due() == 0
+        clock.now += 45
+        assert await cache.refresh_due() == 1
+        assert upstream.requests == 2
+
+    asyncio.run(with_cache(test))
+
+
+def test_stale_key_set_served_when_upstream_down():
+    async def test(cache, upstream, clock):
+        first = await cache.get("litellm")
+        upstream.status = 503
+        clock.now += 3600
+        again = await cache.get("litellm")
+        assert again["body"] == first["body"]
+        assert cache.stats["upstream_errors"] == 1
+        assert cache.stats["stale_served"] == 1
+
+    asyncio.run(with_cache(test))
+
+
+def test_server_discovery_and_jwks():
+    async def run():
+        upstream = FakeJwksUpstream()
+        upstream_url = await upstream.start()
+        server = MetadataServer(load_discovery(CONFIG_DIR, "example.org"), ["openwebui", "litellm"], upstream_url,
+                                "http://config-server")
+        runner = web.AppRunner(server.app())
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"{base}/application/o/litellm/.well-known/openid-configuration") as resp:
+                    discovery = await resp.json()
+                async with session.get(f"{base}/openid-configuration.json") as resp:
+                    legacy = await resp.json()
+                async with session.get(f"{base}/application/o/litellm/jwks/") as resp:
+                    etag = resp.headers["ETag"]
+                    keys = await resp.json()
+                async with session.get(f"{base}/application/o/litellm/jwks/", headers={"If-None-Match": etag}) as resp:
+                    not_modified = resp.status
+                async with session.get(f"{base}/application/o/unknown/jwks/") as resp:
+                    unknown = resp.status
+            return discovery, legacy, keys, not_modified, unknown, upstream.requests
+        finally:
+            await runner.cleanup()
+            await upstream.runner.cleanup()
+
+    discovery, legacy, keys, not_modified, unknown, requests = asyncio.run(run())
+    assert discovery["jwks_uri"] == "http://config-server/application/o/litellm/jwks/"
+    assert discovery["authorization_endpoint"] == "https://sso.example.org/application/o/authorize/"
+    assert "/application/o/litellm/" in discovery["end_session_endpoint"]
+    assert legacy["jwks_uri"] == "http://config-server/application/o/openwebui/jwks/"
+    assert keys["keys"][0]["kid"] == "k1"
+    assert not_modified == 304
+    assert unknown == 404
+    assert requests == 1
+
+
+def test_outage_backs_off_so_callers_do_not_wait_for_the_upstream():
+    async def test(cache, upstream, clock):
+        await cache.get("litellm")
+        upstream.status = 503
+        clock.now += 3600
+        await cache.get("litellm")  # waits for the failing fetch once
+        assert upstream.requests == 2
+        for _ in range(5):
+            await cache.get("litellm")
+        assert upstream.requests == 2 and cache.stats["hits"] == 5
+
+        # after the retry delay one background fetch runs; callers still get the stale set at once
+        clock.now += 11
+        assert (await cache.get("litellm"))["body"]
+        await asyncio.sleep(0.05)
+        assert upstream.requests == 3
+
+        # the stale_if_error limit counts from the first expiry, not from the last retry
+        clock.now += 86400
+        try:
+            await cache.get("litellm")
+        except aiohttp.ClientResponseError as e:
+            assert e.status == 503
+        else:
+            raise AssertionError("stale key set served past stale_if_error")
+
+    asyncio.run(with_cache(test, stale_while_revalidate=60, error_retry=10))
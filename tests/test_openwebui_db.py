@@ -0,0 +1,102 @@
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+import migrate_openwebui_db as migrate  # noqa: E402
+
+TARGET = migrate.parse_columns("\n".join([
+    "alembic_version|version_num|character varying|false",
+    "chat|id|character varying|false",
+    "chat|user_id|character varying|false",
+    "chat|chat|json|false",
+    "chat|archived|boolean|false",
+    "chat|updated_at|bigint|false",
+    "chat|folder_id|text|false",
+    "feedback|id|integer|true",
+    "feedback|score|double precision|false",
+    "feedback|data|bytea|false",
+]))
+
+
+def make_source(path):
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE alembic_version (version_num TEXT);
+        CREATE TABLE chat (id TEXT, user_id TEXT, chat JSON, archived INTEGER, updated_at INTEGER);
+        CREATE TABLE feedback (id INTEGER PRIMARY KEY, score REAL, data BLOB);
+    """)
+    conn.executemany("INSERT INTO chat VALUES (?, ?, ?, ?, ?)", [
+        (f"c{index}", "u1", '{"messages": [{"content": "line\\nbreak\\ttab \\\\ slash"}]}', index % 2, 1700000000 + index)
+        for index in range(25)
+    ] + [("c-null", None, None, None, None), ("c-text", "u2", '{"title": "tabs\tand\nnewlines \\\\N"}', 1, 5)])
+    conn.executemany("INSERT INTO feedback VALUES (?, ?, ?)", [(1, 3, b"\x00\x01"), (2, 0.1, None)])
+    conn.commit()
+    return conn
+
+
+def replay(chunks):
+    """What Postgres stores for COPY input, as COPY TO STDOUT would print it: {table: [fields]}."""
+    data = b"".join(chunks).decode()
+    tables, current = {}, None
+    for line in data.split("\n"):
+        if line.startswith("COPY "):
+            current = tables.setdefault(line.split('"')[1], [])
+        elif line == "\\.":
+            current = None
+        elif current is not None:
+            current.append(line.split("\t"))
+    return tables
+
+
+def test_plan_copies_shared_columns_and_rejects_data_postgres_cannot_hold(tmp_path):
+    conn = make_source(tmp_path / "webui.db")
+    plan, problems = migrate.plan_tables(migrate.source_columns(conn), TARGET)
+    assert problems == []
+    assert [table for table, _ in plan] == ["chat", "feedback"]
+    # target column order, without the column SQLite does not have
+    assert [column for column, _ in dict(plan)["chat"]] == ["id", "user_id", "chat", "archived", "updated_at"]
+    assert migrate.reset_sequences(TARGET, plan) == [
+        "SELECT setval(pg_get_serial_sequence('\"feedback\"', 'id'), coalesce(max(\"id\"), 0) + 1, false) FROM \"feedback\";\n"]
+
+    conn.execute("ALTER TABLE chat ADD COLUMN pinned INTEGER")
+    conn.execute("CREATE TABLE memory (id TEXT)")
+    _, problems = migrate.plan_tables(migrate.source_columns(conn), TARGET)
+    assert problems == ["'chat' has columns Postgres lacks: pinned", "table 'memory' does not exist in Postgres"]
+
+
+def test_streamed_chunks_round_trip_with_matching_counts_and_checksums(tmp_path):
+    conn = make_source(tmp_path / "webui.db")
+    plan, _ = migrate.plan_tables(migrate.source_columns(conn), TARGET)
+    sent = {}
+    stored = {}
+    for table, columns in plan:
+        sent[table] = migrate.TableSum()
+        chunks = list(migrate.copy_table(conn, table, columns, 10, sent[table]))
+        stored.update(replay(chunks))
+        if table == "chat":
+            assert len(chunks) == 5  # COPY line, 27 rows in chunks of 10, terminator
+
+    for table, columns in plan:
+        readback = migrate.TableSum()
+        for fields in stored[table]:
+            readback.add([migrate.copy_unescape(field) for field in fields], [pg_type for _, pg_type in columns])
+        assert readback == sent[table]
+    assert sent["chat"].rows == 27 and sent["feedback"].rows == 2
+
+    row = [migrate.copy_unescape(field) for field in stored["chat"][-1]]
+    assert row == ["c-text", "u2", '{"title": "tabs\tand\nnewlines \\\\N"}', "t", "5"]
+    assert stored["feedback"][0][1:] == ["3.0", "\\\\x0001"]
+
+
+def test_checksums_ignore_how_postgres_formats_values():
+    types = ["double precision", "jsonb", "timestamp with time zone", "boolean"]
+    written = migrate.TableSum()
+    written.add(["3.0", '{"b": 1, "a": [1, 2]}', "2024-05-01 12:00:00", "t"], types)
+    printed = migrate.TableSum()
+    printed.add(["3", '{"a": [1, 2], "b": 1}', "2024-05-01 12:00:00+00", "t"], types)
+    assert written == printed
+
+    changed = migrate.TableSum()
+    changed.add(["3", '{"a": [1, 2], "b": 2}', "2024-05-01 12:00:00+00", "t"], types)
+    assert changed != written
@@ -0,0 +1,159 @@
+import asyncio
+
+from benchlib import Clock, use_service
+
+use_service("litellm")
+import prompt_cache  # noqa: E402
+from prompt_cache import MemoryStore, PromptCache, TieredCache, tier_settings_from_env  # noqa: E402
+
+
+def request(content, **params):
+    return {"model": "mock-gpt", "messages": [{"role": "user", "content": content}], **params}
+
+
+def response(text):
+    return {"timestamp": 1, "response": {"choices": [{"message": {"role": "assistant", "content": text}}]}}
+
+
+def test_keys_ignore_formatting_ids_and_parameter_order():
+    cache = PromptCache(MemoryStore())
+    base = cache.cache_key({"model": "mock-gpt", "temperature": 0, "messages": [{"role": "user", "content": "Hello  world\n"}]})
+    reordered = cache.cache_key({
+        "messages": [{"content": " Hello world", "role": "user", "id": "msg-123"}],
+        "temperature": 0,
+        "model": "mock-gpt",
+        "stream": True,
+        "user": "alice",
+        "metadata": {"trace": "x"},
+    })
+    assert base == reordered
+    assert base.startswith("prompt_cache:mock-gpt:")
+    assert cache.cache_key(request("Hello world", temperature=1)) != base
+    assert cache.cache_key(request("Hello there", temperature=0)) != base
+
+    scrubbing = PromptCache(MemoryStore(), ignore_patterns=[r"run-\d+"])
+    assert scrubbing.cache_key(request("job run-1 done")) == scrubbing.cache_key(request("job run-22 done"))
+
+
+def test_roundtrip_compression_and_per_model_ttl():
+    async def scenario():
+        clock = Clock()
+        cache = PromptCache(MemoryStore(clock), model_ttls={"mock-gpt": 60}, default_ttl=600,
+                            compress_min_bytes=64, clock=clock)
+        key = cache.cache_key(request("a"))
+        value = response("lorem " * 500)
+        await cache.async_set_cache(key, value, ttl=600)
+        assert cache.stats["stored_bytes"] < cache.stats["raw_bytes"] / 5
+        assert await cache.async_get_cache(key) == value
+
+        other = cache.cache_key({"model": "other", "messages": [{"role": "user", "content": "a"}]})
+        await cache.async_set_cache(other, response("short"))
+        clock.now += 61
+        assert await cache.async_get_cache(key) is None  # mock-gpt TTL 60s
+        assert await cache.async_get_cache(other) == response("short")
+        assert cache.stats["hits"] == 2 and cache.stats["misses"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_memory_budget_evicts_least_frequently_used():
+    async def scenario():
+        cache = PromptCache(MemoryStore(), max_bytes=3000, compress_min_bytes=10**9)
+        keys = [cache.cache_key(request(f"prompt {index}")) for index in range(4)]
+        for key in keys[:3]:
+            await cache.async_set_cache(key, response("x" * 900))
+        for _ in range(3):
+            await cache.async_get_cache(keys[0])
+            await cache.async_get_cache(keys[2])
+        await cache.async_set_cache(keys[3], response("y" * 900))
+
+        assert cache.stats["evictions"] == 1
+        assert await cache.async_get_cache(keys[1]) is None
+        assert await cache.async_get_cache(keys[0]) is not None
+        assert int(await cache.store.get(cache.bytes_key)) <= 3000
+
+    asyncio.run(scenario())
+
+
+def test_lru_policy_and_settings_from_env():
+    async def scenario():
+        clock = Clock()
+        cache = PromptCache(MemoryStore(clock), max_bytes=2000, policy="lru", compress_min_bytes=10**9, clock=clock)
+        first, second, third = (cache.cache_key(request(f"p{index}")) for index in range(3))
+        await cache.async_set_cache(first, response("x" * 900))
+        clock.now += 1
+        await cache.async_set_cache(second, response("x" * 900))
+        clock.now += 1
+        await cache.async_get_cache(first)
+        clock.now += 1
+        await cache.async_set_cache(third, response("x" * 900))
+        assert await cache.async_get_cache(second) is None
+        assert await cache.async_get_cache(first) is not None
+
+    asyncio.run(scenario())
+
+    settings = prompt_cache.settings_from_env({"PROMPT_CACHE_MODEL_TTLS": "mock-gpt=3600, gpt-4o=60", "PROMPT_CACHE_MAX_MB": "0.5"})
+    assert settings["model_ttls"] == {"mock-gpt": 3600, "gpt-4o": 60}
+    assert settings["max_bytes"] == 512 * 1024
+
+
+def test_tiered_cache_serves_l1_and_caches_misses():
+    async def scenario():
+        clock = Clock()
+        store = MemoryStore(clock)
+        cache = TieredCache(PromptCache(store, clock=clock), l1_max_bytes=1024 * 1024, l1_ttl=30, negative_ttl=2)
+        key = cache.cache_key(request("hi"))
+        await cache.async_get_cache(key)  # starts the subscription
+        await asyncio.wait_for(cache.subscribed.wait(), 1)
+
+        assert await cache.async_get_cache(key) is None
+        assert await cache.async_get_cache(key) is None  # negative entry, Redis not asked again
+        assert cache.l2.stats["misses"] == 2 and cache.stats["l1_negative_hits"] == 1
+
+        await store.set(key, PromptCache.encode(cache.l2, response("hello"))[1])  # written behind L1's back
+        assert await cache.async_get_cache(key) is None
+        clock.now += 3
+        assert await cache.async_get_cache(key) == response("hello")
+        assert await cache.async_get_cache(key) == response("hello")
+        assert cache.stats["l1_hits"] == 1 and cache.l2.stats["hits"] == 1
+
+        clock.now += 31  # L1 copy expires before the 600 s L2 entry
+        assert await cache.async_get_cache(key) == response("hello")
+        assert cache.l2.stats["hits"] == 2
+        await cache.disconnect()
+
+    asyncio.run(scenario())
+
+
+def test_writes_invalidate_other_replicas():
+    async def scenario():
+        clock = Clock()
+        store = MemoryStore(clock)
+        a, b = (TieredCache(PromptCache(store, clock=clock), negative_ttl=60, node_id=name) for name in "ab")
+        key = a.cache_key(request("hi"))
+        for replica in (a, b):
+            await replica.async_get_cache(key)  # bypasses L1 until subscribed
+            await asyncio.wait_for(replica.subscribed.wait(), 1)
+            await replica.async_get_cache(key)
+        assert key in b.l1.entries  # negative entry for a minute
+
+        await a.async_set_cache(key, response("first"))
+        await asyncio.sleep(0)
+        assert key not in b.l1.entries and b.stats["invalidations"] == 1
+        assert await b.async_get_cache(key) == response("first")
+
+        await a.async_set_cache(key, response("second"))
+        await asyncio.sleep(0)
+        assert await b.async_get_cache(key) == response("second")
+        assert a.stats["invalidations"] == 0  # own messages are ignored
+
+        await b.async_delete_cache(key)
+        await asyncio.sleep(0)
+        assert await a.async_get_cache(key) is None
+        for replica in (a, b):
+            await replica.disconnect()
+
+    asyncio.run(scenario())
+    assert tier_settings_from_env({"PROMPT_CACHE_L1_MB": "0"}) is None
+    assert tier_settings_from_env({"PROMPT_CACHE_L1_MB": "1", "PROMPT_CACHE_NEGATIVE_TTL": "0.5"}) == {
+        "l1_max_bytes": 1024 * 1024, "l1_ttl": 30.0, "negative_ttl": 0.5}
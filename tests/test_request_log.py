@@ -0,0 +1,76 @@
+import asyncio
+import datetime
+import json
+
+from benchlib import use_service
+
+use_service("litellm")
+from request_log import FileSink, RequestLog, build_record, head_sampled, truncate  # noqa: E402
+
+
+class ListSink:
+    def __init__(self):
+        self.batches = []
+
+    async def write(self, records):
+        self.batches.append(list(records))
+
+
+def record(index, status="success", latency_ms=100.0, content="hi"):
+    return {"id": f"call-{index}", "status": status, "latency_ms": latency_ms,
+            "messages": [{"role": "user", "content": content}], "response": None, "error": None}
+
+
+def test_head_sampling_is_deterministic_and_close_to_rate():
+    kept = [index for index in range(20000) if head_sampled(f"call-{index}", 0.1)]
+    assert 1800 < len(kept) < 2200
+    assert kept == [index for index in range(20000) if head_sampled(f"call-{index}", 0.1)]
+    assert head_sampled("x", 1.0) and not head_sampled("x", 0.0)
+
+
+def test_truncate_and_build_record():
+    assert truncate("short", 10) == ("short", False)
+    cut, truncated = truncate({"text": "x" * 100}, 20)
+    assert truncated and cut.startswith('{"text": "xxxx') and "truncated" in cut
+
+    start = datetime.datetime(2024, 1, 1)
+    built = build_record(
+        {"standard_logging_object": {"id": "abc", "model": "mock-gpt", "messages": [], "response": {"ok": 1},
+                                     "completion_tokens": 3}},
+        None, start, start + datetime.timedelta(milliseconds=250), failed=False,
+    )
+    assert built["id"] == "abc" and built["latency_ms"] == 250.0 and built["completion_tokens"] == 3
+
+
+def test_errors_and_slow_requests_always_kept_and_batched():
+    async def scenario():
+        sink = ListSink()
+        pipeline = RequestLog(sink, sample_rate=0.0, slow_ms=1000, max_field_bytes=50, batch_size=2, flush_interval=0.01)
+        assert not pipeline.offer(record(1))
+        assert pipeline.offer(record(2, status="failure"))
+        assert pipeline.offer(record(3, latency_ms=2000.0, content="y" * 200))
+        assert pipeline.offer(record(4, status="failure"))
+        await pipeline.drain()
+        return pipeline, sink
+
+    pipeline, sink = asyncio.run(scenario())
+    written = [entry["id"] for batch in sink.batches for entry in batch]
+    assert written == ["call-2", "call-3", "call-4"]
+    assert all(len(batch) <= 2 for batch in sink.batches)
+    assert pipeline.stats["sampled_out"] == 1 and pipeline.stats["truncated"] == 1
+    assert pipeline.stats["written"] == 3
+
+
+def test_full_queue_drops_and_counts(tmp_path):
+    async def scenario():
+        pipeline = RequestLog(FileSink(str(tmp_path / "requests.jsonl")), sample_rate=1.0, queue_size=3, batch_size=100)
+        results = [pipeline.offer(record(index)) for index in range(5)]  # flusher has not run yet
+        await pipeline.drain()
+        await pipeline.sink.close()
+        return pipeline, results
+
+    pipeline, results = asyncio.run(scenario())
+    assert results == [True, True, True, False, False]
+    assert pipeline.stats["dropped"] == 2
+    lines = (tmp_path / "requests.jsonl").read_text().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == ["call-0", "call-1", "call-2"]
@@ -0,0 +1,127 @@
+import asyncio
+import random
+
+from benchlib import Clock, use_service
+
+use_service("litellm")
+from routing import LatencyCostRouter, LocalWindows, deployment_id, hedged  # noqa: E402
+
+
+def deployment(name, cost=None):
+    params = {"model": f"openai/{name}", "api_base": f"http://{name}:8000/v1"}
+    if cost is not None:
+        params.update({"input_cost_per_token": cost, "output_cost_per_token": cost})
+    return {"model_name": "chat", "litellm_params": params, "model_info": {"id": name}}
+
+
+class FakeRouter:
+    """The parts of litellm.Router the strategy uses; each deployment answers after a fixed delay."""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.deployments = [deployment(name) for name in delays]
+        self.calls = []
+
+    def get_model_list(self, model_name=None):
+        return [item for item in self.deployments if model_name in (None, item["model_name"])]
+
+    def set_custom_routing_strategy(self, strategy):
+        self.async_get_available_deployment = strategy.async_get_available_deployment
+
+    async def _acompletion(self, model, messages, **kwargs):
+        chosen = await self.async_get_available_deployment(model=model, messages=messages, request_kwargs=kwargs)
+        name = deployment_id(chosen)
+        self.calls.append(name)
+        try:
+            await asyncio.sleep(self.delays[name])
+        except asyncio.CancelledError:
+            self.calls.append(f"cancelled {name}")
+            raise
+        return name
+
+
+def test_picks_follow_latency_and_cost_in_the_rolling_window():
+    clock = Clock()
+    windows = LocalWindows(window=60, buckets=6, clock=clock)
+    router = LatencyCostRouter(windows, cost_weight=0.0, min_samples=3, refresh=0, rng=random.Random(1))
+    deployments = [deployment("fast"), deployment("slow"), deployment("new")]
+
+    async def scenario():
+        for _ in range(5):
+            await router.record("chat", "fast", 0.1, True)
+            await router.record("chat", "slow", 0.4, True)
+        picks = [deployment_id((await router.choose("chat", deployments))[0]) for _ in range(1000)]
+        assert picks.count("fast") > 10 * picks.count("slow") > 0
+        # without samples "new" gets the best deployment's share until it has enough
+        assert abs(picks.count("new") - picks.count("fast")) < 100
+        assert router.counts["chat"]["new"].keys() == {"explore"}
+
+        # cost only: the cheap deployment wins although it is slower
+        priced = [deployment("fast", cost=4e-6), deployment("slow", cost=1e-6)]
+        router.latency_weight, router.cost_weight = 0.0, 1.0
+        picks = [deployment_id((await router.choose("chat", priced))[0]) for _ in range(200)]
+        assert picks.count("slow") > 180
+
+        # samples leave the window after 60 seconds
+        clock.now += 61
+        stats = await windows.read("chat", ["fast", "slow"])
+        assert stats["fast"]["count"] == 0 and stats["fast"]["ttft_ms"] is None
+        await router.record("chat", "slow", 0.3, True)
+        assert (await windows.read("chat", ["slow"]))["slow"]["ttft_ms"] == 300.0
+
+    asyncio.run(scenario())
+
+
+def test_failing_deployment_cools_down_and_comes_back():
+    clock = Clock()
+    windows = LocalWindows(clock=clock)
+    router = LatencyCostRouter(windows, cooldown=30, cooldown_errors=3, cooldown_error_rate=0.5, refresh=0,
+                               rng=random.Random(2))
+    deployments = [deployment("a"), deployment("b")]
+
+    async def scenario():
+        await router.record("chat", "a", 0.1, True)
+        for _ in range(2):
+            await router.record("chat", "a", 0.0, False)
+        assert not (await windows.read("chat", ["a"]))["a"]["cooling"]
+        await router.record("chat", "a", 0.0, False)
+        assert (await windows.read("chat", ["a"]))["a"]["cooling"]
+
+        picks = {deployment_id((await router.choose("chat", deployments))[0]) for _ in range(50)}
+        assert picks == {"b"}
+        _, _, reason = await router.choose("chat", deployments[:1])
+        assert reason == "all_cooling"
+
+        clock.now += 31
+        assert not (await windows.read("chat", ["a"]))["a"]["cooling"]
+
+    asyncio.run(scenario())
+
+
+def test_slow_requests_are_hedged_to_another_deployment():
+    async def scenario():
+        fake = FakeRouter({"stuck": 5.0, "quick": 0.01})
+        strategy = LatencyCostRouter(LocalWindows(), hedge_min_ms=50, hedge_factor=1.0, hedge_budget=1.0,
+                                     default_ttft_ms=20, rng=random.Random(3))
+        strategy.install(fake)
+        strategy.install(fake)  # idempotent
+        results = [await fake._acompletion("chat", [{"role": "user", "content": "hi"}]) for _ in range(6)]
+        assert set(results) == {"quick"}
+        await asyncio.sleep(0)  # the losing call is cancelled, not awaited
+        assert fake.calls.count("cancelled stuck") == fake.calls.count("stuck") > 0
+        assert strategy.hedges == fake.calls.count("stuck")
+
+        # no second deployment to hedge to: the primary answer is awaited
+        async def slow():
+            await asyncio.sleep(0.05)
+            return "only"
+
+        assert await hedged(slow, lambda: None, lambda: asyncio.sleep(0.01)) == ("only", "primary")
+
+        # a failed hedge does not hide the primary's answer
+        async def failing():
+            raise RuntimeError("upstream 500")
+
+        assert await hedged(slow, failing, lambda: asyncio.sleep(0.01)) == ("only", "primary")
+
+    asyncio.run(scenario())
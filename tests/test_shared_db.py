@@ -0,0 +1,52 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from migrate_shared_db import compare_counts, parse_counts, rewrite_dump  # noqa: E402
+
+from bench_db_topology import parse_memory, parse_pgbench  # noqa: E402
+
+
+def test_rewrite_dump_retargets_default_privileges_outside_copy_data():
+    dump = [
+        b"SELECT pg_catalog.set_config('search_path', '', false);\n",
+        b'CREATE TABLE "public"."usr" ("email" "text");\n',
+        b'COPY "public"."usr" ("email") FROM stdin;\n',
+        b'ALTER DEFAULT PRIVILEGES FOR ROLE "postgres" IN SCHEMA "public" GRANT ALL ON TABLES TO "x";\n',
+        b"\\.\n",
+        b'ALTER DEFAULT PRIVILEGES FOR ROLE "postgres" IN SCHEMA "public" GRANT ALL ON TABLES TO "windmill_user";\n',
+        b'ALTER DEFAULT PRIVILEGES FOR ROLE "postgres_other" IN SCHEMA "public" GRANT ALL ON TABLES TO "x";\n',
+    ]
+    out = list(rewrite_dump(iter(dump), "postgres", "windmill"))
+    assert out[0] == b'SET ROLE "windmill";\n'
+    assert out[4] == dump[3]  # a data row, not SQL
+    assert out[6] == b'ALTER DEFAULT PRIVILEGES FOR ROLE "windmill" IN SCHEMA "public" GRANT ALL ON TABLES TO "windmill_user";\n'
+    assert out[7] == dump[6]
+
+
+def test_row_counts_are_compared_per_table():
+    source = parse_counts("public.usr|12\npublic.job|3400\n\n")
+    assert source == {"public.usr": 12, "public.job": 3400}
+    assert compare_counts(source, dict(source)) == []
+    assert compare_counts(source, {"public.usr": 12, "public.extra": 0}) == [
+        ("public.extra", None, 0), ("public.job", 3400, None)]
+
+
+def test_parse_pgbench_and_docker_stats():
+    report = """pgbench (16.4)
+transaction type: /tmp/bench.sql
+number of transactions actually processed: 5210
+number of failed transactions: 0 (0.000%)
+latency average = 57.512 ms
+average connection time = 55.901 ms
+tps = 1738.41 (including reconnection times)
+pgbench: error: connection to server failed: FATAL:  sorry, too many clients already
+pgbench: error: client 101 aborted while establishing connection
+pgbench: error: client 102 aborted while establishing connection
+"""
+    parsed = parse_pgbench(report)
+    assert parsed["transactions"] == 5210 and parsed["failed"] == 0
+    assert parsed["latency_avg_ms"] == 57.512 and parsed["connection_ms"] == 55.901 and parsed["tps"] == 1738.41
+    assert parsed["aborted_clients"] == 2
+    assert parse_memory("apukone-shared-db|301.2MiB / 7.6GiB\napukone-pgbouncer|4.1MiB / 7.6GiB\n") == {
+        "apukone-shared-db": int(301.2 * 1024 ** 2), "apukone-pgbouncer": int(4.1 * 1024 ** 2)}
@@ -0,0 +1,74 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+import startup_profile  # noqa: E402
+
+REPO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def event(service, action, at, **attributes):
+    attributes.update({"com.docker.compose.service": service, "name": f"apukone-{service}"})
+    return json.dumps({
+        "Type": "container",
+        "Action": action,
+        "Actor": {"ID": service, "Attributes": attributes},
+        "time": int(at),
+        "timeNano": int(at * 1e9),
+    })
+
+
+def test_parse_duration():
+    assert startup_profile.parse_duration("1m30s") == 90
+    assert startup_profile.parse_duration("500ms") == 0.5
+    assert startup_profile.parse_duration(None, 30.0) == 30.0
+
+
+def test_theoretical_critical_path_from_repo_compose_files():
+    services = startup_profile.load_services(REPO)
+    assert "mock-openai" not in services  # bench profile not enabled
+    graph = startup_profile.build_graph(services)
+
+    assert graph["authentik-server"]["deps"]["authentik-db"] == "service_healthy"
+    assert graph["windmill_init"]["sleep"] == 15
+    assert graph["identity-sync"]["deps"]["litellm"] == "service_healthy"
+    # identity-sync is a long-running loop with a restart policy; windmill_init runs once and exits
+    assert not graph["identity-sync"]["one_shot"] and graph["windmill_init"]["one_shot"]
+
+    floor = startup_profile.theoretical_times(graph, "floor")
+    ceiling = startup_profile.theoretical_times(graph, "ceiling")
+    path = startup_profile.critical_path(floor)
+    assert path == ["authentik-db", "authentik-server", "identity-sync"]
+    # 1s start + 5s db probe, 1s start + 30s server probe
+    assert floor["authentik-server"]["healthy"] == 37
+    assert all(ceiling[name]["healthy"] >= floor[name]["healthy"] for name in floor)
+
+
+def test_analyze_recorded_events_finds_dominating_edge_and_probe():
+    services = startup_profile.load_services(REPO)
+    graph = startup_profile.build_graph(services)
+    t0 = 1_700_000_000.0
+    lines = [
+        event("litellm-db", "create", t0),
+        event("litellm-db", "start", t0 + 0.5),
+        event("litellm-redis", "start", t0 + 0.5),
+        event("litellm-redis", "health_status: healthy", t0 + 5.5),
+        event("litellm-db", "health_status: healthy", t0 + 10.5),
+        event("litellm", "create", t0 + 0.2),
+        event("litellm", "start", t0 + 11.0),
+        event("litellm", "health_status: healthy", t0 + 41.0),
+        event("identity-sync", "create", t0 + 0.3),
+        event("identity-sync", "start", t0 + 41.5),
+        event("identity-sync", "die", t0 + 44.0, exitCode="0"),
+        json.dumps({"Type": "network", "Action": "connect", "time": int(t0)}),
+    ]
+    observed = startup_profile.parse_events(lines, services)
+    assert observed["litellm"]["started"] == 11.0
+    assert observed["identity-sync"]["exit_code"] == 0
+
+    report = startup_profile.analyze(graph, observed)
+    assert report["critical_path"] == ["litellm-db", "litellm", "identity-sync"]
+    assert report["edges"][0]["edge"] == "litellm -> identity-sync"
+    assert report["probes"][0]["service"] == "litellm"
+    assert report["probes"][0]["time_to_healthy"] == 30.0
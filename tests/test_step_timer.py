@@ -0,0 +1,75 @@
+import json
+
+from benchlib import Clock
+from step_timer import StepTimer
+
+
+class FakeRequest:
+    method = "GET"
+    resource_type = "document"
+
+    def __init__(self, url):
+        self.url = url
+
+
+class FakePage:
+    def __init__(self):
+        self.url = "https://sso.example.org/if/flow/default-authentication-flow/"
+        self.handlers = {}
+        self.main_frame = object()
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    def screenshot(self, path=None):
+        if path:
+            with open(path, "wb") as f:
+                f.write(b"png")
+        return b"png"
+
+    def content(self):
+        return "<html>stuck</html>"
+
+
+def test_timeline_summary_and_chrome_trace(tmp_path):
+    clock = Clock(start=0.0)
+    page = FakePage()
+    timer = StepTimer("demo", clock=clock, debug_dir=str(tmp_path)).attach(page)
+
+    request = FakeRequest("https://sso.example.org/api/v3/flows/executor/x/?query=")
+    page.handlers["request"](request)
+    with timer.step("wait selector"):
+        clock.now += 0.5
+    timer.mark("password stage")
+    with timer.step("sleep 3s (after submit)", cat="sleep"):
+        clock.now += 3.0
+    with timer.step("wait selector"):
+        clock.now += 0.25
+    page.handlers["requestfinished"](request)
+
+    summary = timer.summary()
+    assert summary["elapsed"] == 3.75
+    assert summary["totals"]["sleep"] == 3.0 and summary["totals"]["network"] == 3.75
+    assert summary["slowest"][0]["name"] == "sleep 3s (after submit)"
+    assert summary["slowest"][1] == {"cat": "step", "name": "wait selector", "count": 2, "total": 0.75, "max": 0.5}
+
+    trace = json.load(open(timer.write_chrome_trace(str(tmp_path / "demo.trace.json"))))["traceEvents"]
+    phases = sorted(event["ph"] for event in trace)
+    assert phases == ["X", "X", "X", "b", "e", "i"]
+    assert next(event for event in trace if event["ph"] == "b")["name"] == "GET https://sso.example.org/api/v3/flows/executor/x/"
+    assert json.load(open(timer.write_json(str(tmp_path / "demo.timeline.json"))))["summary"] == summary
+
+
+def test_ring_buffer_only_written_on_failure(tmp_path):
+    page = FakePage()
+    timer = StepTimer("demo", ring_size=3, debug_dir=str(tmp_path), screenshots=True)
+    for attempt in range(5):
+        timer.snapshot(page, f"attempt {attempt}")
+    assert list(tmp_path.iterdir()) == []
+    assert [entry["label"] for entry in timer.ring] == ["attempt 2", "attempt 3", "attempt 4"]
+
+    timer.dump_failure(page, "stuck")
+    states = json.load(open(tmp_path / "demo_failure_states.json"))
+    assert states["reason"] == "stuck" and len(states["states"]) == 3
+    assert (tmp_path / "demo_failure.png").exists() and (tmp_path / "demo_failure.html").exists()
+    assert (tmp_path / "demo_failure_ring2.png").read_bytes() == b"png"
@@ -0,0 +1,122 @@
+import json
+import os
+import sys
+import threading
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+import trace_report  # noqa: E402
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+MS = 1_000_000
+T0 = 1_700_000_000_000 * MS
+
+
+def span(span_id, parent, name, start_ms, end_ms, kind=1, attributes=None, events=()):
+    return {
+        "traceId": TRACE_ID,
+        "spanId": span_id,
+        "parentSpanId": parent,
+        "name": name,
+        "kind": kind,
+        "startTimeUnixNano": str(T0 + int(start_ms * MS)),
+        "endTimeUnixNano": str(T0 + int(end_ms * MS)),
+        "attributes": [{"key": key, "value": {"boolValue": value} if isinstance(value, bool) else {"stringValue": value}}
+                       for key, value in (attributes or {}).items()],
+        "events": [{"name": event, "timeUnixNano": str(T0 + int(at * MS))} for event, at in events],
+    }
+
+
+def export(service, spans):
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service}}]},
+        "scopeSpans": [{"scope": {"name": "test"}, "spans": spans}],
+    }]}
+
+
+def chat_trace(upstream_ttfb=300.0, gzip_tail=0.0):
+    """
+    One streamed chat request: Traefik -> OpenWebUI -> LiteLLM -> model.
+    """
+    return [
+        export("traefik", [
+            span("a000000000000001", "", "EntryPoint https", 0, 1250 + gzip_tail, kind=2),
+            span("a000000000000002", "a000000000000001", "ReverseProxy", 1, 1249 + gzip_tail, kind=3),
+        ]),
+        export("openwebui", [
+            span("b000000000000001", "a000000000000002", "POST /api/chat/completions", 5, 1245, kind=2,
+                 attributes={"http.route": "/api/chat/completions"}),
+            span("b000000000000002", "b000000000000001", "POST /api/chat/completions http send", 25 + upstream_ttfb,
+                 26 + upstream_ttfb, attributes={"asgi.event.type": "http.response.start"}),
+            span("b000000000000003", "b000000000000001", "POST /api/chat/completions http send", 40 + upstream_ttfb,
+                 41 + upstream_ttfb, attributes={"asgi.event.type": "http.response.body"}),
+            span("b000000000000004", "b000000000000001", "POST", 20, 1240, kind=3),
+        ]),
+        export("litellm", [
+            span("c000000000000001", "b000000000000004", "litellm.request", 22, 1238, kind=2,
+                 events=[("first_byte", 32 + upstream_ttfb)]),
+            span("c000000000000002", "c000000000000001", "litellm.pre_call", 22, 30),
+            span("c000000000000003", "c000000000000001", "upstream", 30, 1238, kind=3,
+                 attributes={"peer.service": "upstream"}, events=[("first_token", 30 + upstream_ttfb)]),
+        ]),
+    ]
+
+
+def post(url, document):
+    request = urllib.request.Request(url, data=json.dumps(document).encode(),
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return response.status
+
+
+def test_receiver_writes_exports_and_analysis_splits_ttfb_per_hop(tmp_path):
+    output = tmp_path / "traces.jsonl"
+    server = trace_report.Receiver(("127.0.0.1", 0), str(output))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/v1/traces"
+        assert all(post(url, document) == 200 for document in chat_trace(gzip_tail=180.0))
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert server.exports == 3
+
+    report = trace_report.analyze(trace_report.load_spans([str(output)]))
+    request = report["requests"][0]
+    assert request["name"] == "/api/chat/completions"
+    hops = {hop["hop"]: hop for hop in request["hops"]}
+    assert [hop["hop"] for hop in request["hops"]] == ["traefik", "openwebui", "litellm", "upstream"]
+
+    assert hops["upstream"]["ttfb_ms"] == 300.0
+    assert hops["litellm"]["ttfb_ms"] == 310.0 and hops["litellm"]["added_ms"] == 10.0
+    assert hops["openwebui"]["ttfb_ms"] == 335.0 and hops["openwebui"]["added_ms"] == 25.0
+    # Traefik records no first byte of its own: inherited lower bound
+    assert hops["traefik"]["estimated"] and hops["traefik"]["ttfb_ms"] == 340.0
+    # the compress middleware held the end of the stream back
+    assert hops["traefik"]["tail_ms"] == 185.0
+    assert report["hops"]["openwebui"]["added_p95"] == 25.0
+
+
+def test_baseline_comparison_flags_the_regressed_hop(tmp_path):
+    def write(path, traces):
+        with open(path, "w", encoding="utf-8") as f:
+            for index, documents in enumerate(traces):
+                for document in documents:
+                    for resource in document["resourceSpans"]:
+                        for scope in resource["scopeSpans"]:
+                            for item in scope["spans"]:
+                                item["traceId"] = f"{index:032x}"
+                    f.write(json.dumps(document) + "\n")
+            f.write('{"resourceSpans": [')  # torn last line is skipped
+
+    write(tmp_path / "before.jsonl", [chat_trace(upstream_ttfb=300.0) for _ in range(5)])
+    write(tmp_path / "after.jsonl", [chat_trace(upstream_ttfb=700.0) for _ in range(5)])
+    before = trace_report.analyze(trace_report.load_spans([str(tmp_path / "before.jsonl")]))
+    after = trace_report.analyze(trace_report.load_spans([str(tmp_path / "after.jsonl")]))
+    assert len(after["requests"]) == 5
+
+    rows = {(row["hop"], row["metric"]): row for row in trace_report.compare(after["hops"], before["hops"])}
+    assert rows[("upstream", "ttfb_p95")]["delta_ms"] == 400.0
+    assert rows[("litellm", "added_p95")]["delta_ms"] == 0.0
+    assert rows[("openwebui", "added_p95")]["delta_ms"] == 0.0
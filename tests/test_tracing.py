@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+
+from benchlib import use_service
+
+use_service("litellm")
+from tracing import parse_traceparent, request_headers, request_spans  # noqa: E402
+
+
+def test_parse_traceparent():
+    header = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    assert parse_traceparent(header) == ("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7", True)
+    assert parse_traceparent(header[:-1] + "0")[2] is False
+    assert parse_traceparent("00-" + "0" * 32 + "-00f067aa0ba902b7-01") is None
+    assert parse_traceparent("garbage") is None
+    kwargs = {"litellm_params": {"metadata": {"headers": {"Traceparent": header}}}}
+    assert request_headers(kwargs)["traceparent"] == header
+
+
+def test_request_spans_split_router_and_upstream():
+    start = datetime(2025, 1, 1, 12, 0, 0)
+    kwargs = {
+        "model": "mock-gpt",
+        "stream": True,
+        "api_call_start_time": start + timedelta(milliseconds=12),
+        "completion_start_time": start + timedelta(milliseconds=212),
+        "standard_logging_object": {"id": "call-1", "model": "mock-gpt", "cache_hit": False},
+    }
+    spans = {span["name"]: span for span in request_spans(kwargs, start, start + timedelta(seconds=2), failed=False)}
+    assert set(spans) == {"litellm.request", "litellm.pre_call", "upstream"}
+    request, pre_call, upstream = spans["litellm.request"], spans["litellm.pre_call"], spans["upstream"]
+    assert (pre_call["end"] - pre_call["start"]) // 1_000_000 == 12
+    assert upstream["attributes"]["peer.service"] == "upstream" and upstream["kind"] == "client"
+    assert (upstream["events"][0][1] - upstream["start"]) // 1_000_000 == 200
+    assert request["events"] == [("first_byte", upstream["events"][0][1])]
+
+    kwargs["standard_logging_object"]["cache_hit"] = True
+    names = [span["name"] for span in request_spans(kwargs, start, start + timedelta(milliseconds=20), failed=False)]
+    assert names == ["litellm.request", "litellm.pre_call", "cache"]
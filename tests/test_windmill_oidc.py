@@ -4,6 +4,7 @@ import re
 from playwright.sync_api import sync_playwright, expect
 from dotenv import load_dotenv
 from auth_helper import perform_authentik_login
+from step_timer import StepTimer, instrumented
 
 # Load environment variables
 load_dotenv()
@@ -12,75 +13,74 @@ BASE_DOMAIN = os.getenv("BASE_DOMAIN", "localhost")
 ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "admin@example.com")
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "password123")
 
-def test_windmill_oidc_login():
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(ignore_https_errors=True)
-        page = context.new_page()
-        page.set_default_timeout(30000)
+def check_windmill(page, timer=None):
+    """Logs into Windmill via Authentik on `page` and verifies workspace access."""
+    timer = timer or StepTimer("windmill")
+    # Set up console log forwarding
+    page.on("console", lambda msg: print(f"BROWSER ({msg.type}): {msg.text}"))
 
-        try:
-            # Set up console log forwarding
-            page.on("console", lambda msg: print(f"BROWSER ({msg.type}): {msg.text}"))
+    target_url = f"https://windmill.{BASE_DOMAIN}/"
+    timer.log(f"Navigating to Windmill: {target_url}")
+
+    timer.call("goto windmill", page.goto, target_url)
+    timer.call("wait networkidle (windmill)", page.wait_for_load_state, "networkidle")
 
-            target_url = f"https://windmill.{BASE_DOMAIN}/"
-            print(f"Navigating to Windmill: {target_url}")
+    # Windmill login page should show SSO options
+    # Click the Authentik SSO login button
+    timer.log("Looking for Authentik SSO login button...")
+    try:
+        # Windmill shows SSO buttons with the provider name
+        auth_btn = page.locator("button:has-text('Authentik'), a:has-text('Authentik')").first
+        timer.call("wait SSO button", auth_btn.wait_for, state="visible", timeout=15000)
+        timer.mark("Clicking Authentik SSO button")
+        auth_btn.click()
+    except Exception:
+        timer.log(f"Authentik SSO button not found. Current URL: {page.url}")
+        raise Exception("Authentik SSO button missing on Windmill login page")
 
-            page.goto(target_url)
-            page.wait_for_load_state("networkidle")
+    # Authentik Login Page (using shared helper)
+    timer.call("wait networkidle (sso)", page.wait_for_load_state, "networkidle")
+    if not perform_authentik_login(page, ADMIN_EMAIL, ADMIN_PASSWORD, timer):
+        raise Exception("Authentik login failed")
 
-            # Windmill login page should show SSO options
-            # Click the Authentik SSO login button
-            print("Looking for Authentik SSO login button...")
-            try:
-                # Windmill shows SSO buttons with the provider name
-                auth_btn = page.locator("button:has-text('Authentik'), a:has-text('Authentik')").first
-                auth_btn.wait_for(state="visible", timeout=15000)
-                print("Clicking Authentik SSO button...")
-                auth_btn.click()
-            except Exception:
-                print(f"Authentik SSO button not found. Current URL: {page.url}")
-                page.screenshot(path="tests/debug/windmill_no_sso_button.png")
-                with open("tests/debug/windmill_login_page.html", "w", encoding="utf-8") as f:
-                    f.write(page.content())
-                raise Exception("Authentik SSO button missing on Windmill login page")
+    # Wait for redirect back to Windmill
+    timer.log("Waiting for redirect back to Windmill...")
+    with timer.step("wait redirect to windmill"):
+        expect(page).to_have_url(re.compile(f".*windmill\\.{BASE_DOMAIN}.*"), timeout=60000)
+    timer.call("wait networkidle (workspace)", page.wait_for_load_state, "networkidle")
 
-            # Authentik Login Page (using shared helper)
-            page.wait_for_load_state("networkidle")
-            if not perform_authentik_login(page, ADMIN_EMAIL, ADMIN_PASSWORD):
-                raise Exception("Authentik login failed")
+    # Verify we landed in a Windmill workspace
+    timer.log("Verifying Windmill workspace access...")
+    # Windmill workspace shows navigation items like Runs, Scripts, Flows, Schedules
+    workspace_loaded = False
+    for indicator in ["Runs", "Scripts", "Flows", "Schedules", "Home"]:
+        try:
+            timer.call(f"wait '{indicator}'", page.wait_for_selector, f"text={indicator}", timeout=15000)
+            timer.log(f"Found workspace indicator: '{indicator}'")
+            workspace_loaded = True
+            break
+        except Exception:
+            continue
 
-            # Wait for redirect back to Windmill
-            print("Waiting for redirect back to Windmill...")
-            expect(page).to_have_url(re.compile(f".*windmill\\.{BASE_DOMAIN}.*"), timeout=60000)
-            page.wait_for_load_state("networkidle")
+    if not workspace_loaded:
+        timer.log(f"No workspace indicators found. Current URL: {page.url}")
+        raise Exception("Windmill workspace not loaded after login")
 
-            # Verify we landed in a Windmill workspace
-            print("Verifying Windmill workspace access...")
-            # Windmill workspace shows navigation items like Runs, Scripts, Flows, Schedules
-            workspace_loaded = False
-            for indicator in ["Runs", "Scripts", "Flows", "Schedules", "Home"]:
-                try:
-                    page.wait_for_selector(f"text={indicator}", timeout=15000)
-                    print(f"Found workspace indicator: '{indicator}'")
-                    workspace_loaded = True
-                    break
-                except Exception:
-                    continue
+    timer.mark("Successfully logged into Windmill via OIDC!")
 
-            if not workspace_loaded:
-                print(f"No workspace indicators found. Current URL: {page.url}")
-                page.screenshot(path="tests/debug/windmill_no_workspace.png")
-                with open("tests/debug/windmill_post_login.html", "w", encoding="utf-8") as f:
-                    f.write(page.content())
-                raise Exception("Windmill workspace not loaded after login")
 
-            print("Successfully logged into Windmill via OIDC!")
+def test_windmill_oidc_login():
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        context = browser.new_context(ignore_https_errors=True)
+        page = context.new_page()
+        page.set_default_timeout(30000)
 
+        try:
+            with instrumented("windmill", page) as timer:
+                check_windmill(page, timer)
         except Exception as e:
             print(f"Test failed: {e}")
-            os.makedirs("tests/debug", exist_ok=True)
-            page.screenshot(path="tests/debug/windmill_login_failure.png")
             raise e
         finally:
             browser.close()
@@ -0,0 +1,79 @@
+import os
+
+from benchlib import use_service
+
+use_service("windmill-prewarm")
+import prewarm  # noqa: E402
+
+PY311 = "# py: 3.11\n"
+
+
+def test_python_locks_are_merged_and_split_into_parallel_jobs():
+    locks = [
+        ("python3", PY311 + "httpx==0.27.0\nanyio==4.4.0\n"),
+        ("python3", PY311 + "httpx==0.27.0\npandas==2.2.2\nnumpy==2.0.0\n"),
+        ("python3", "# py: 3.12\nrequests==2.32.3\n"),
+        ("bun", '{"lockfileVersion": 0}'),
+        ("bun", '{"lockfileVersion": 0}'),
+        ("bash", "ignored"),
+    ]
+    jobs = prewarm.plan_jobs(locks, parallel=2)
+
+    python = [job for job in jobs if job["language"] == "python3"]
+    assert [job["packages"] for job in python] == [2, 2, 1]
+    # each package is installed once, by the job for its Python version
+    assert sorted(line for job in python[:2] for line in job["lock"].splitlines()[1:]) == [
+        "anyio==4.4.0", "httpx==0.27.0", "numpy==2.0.0", "pandas==2.2.2"]
+    assert all(job["lock"].startswith(PY311) for job in python[:2])
+    assert python[2]["lock"] == "# py: 3.12\nrequests==2.32.3\n"
+    assert "#requests==2.32.3\n" in python[2]["content"]
+    assert [job["language"] for job in jobs[3:]] == ["bun"]
+
+
+def test_locks_are_found_in_nested_flow_steps_and_sync_directories(tmp_path):
+    flow = {"modules": [
+        {"value": {"type": "rawscript", "language": "python3", "lock": "a==1"}},
+        {"value": {"type": "forloopflow", "modules": [
+            {"value": {"type": "branchone", "branches": [{"modules": [
+                {"value": {"type": "rawscript", "language": "deno", "lock": "{}"}}]}],
+                "default": [{"value": {"type": "rawscript", "language": "bun", "lock": None}}]}},
+        ]}},
+        {"value": {"type": "script", "path": "f/lib/other"}},
+    ]}
+    assert prewarm.rawscript_locks(flow) == [("python3", "a==1"), ("deno", "{}")]
+
+    folder = tmp_path / "f" / "lib"
+    folder.mkdir(parents=True)
+    (folder / "inline.py").write_text("def main(): pass\n")
+    (folder / "inline.script.yaml").write_text("summary: x\nlock: '!inline f/lib/inline.script.lock'\n")
+    (folder / "inline.script.lock").write_text(PY311 + "b==2\n")
+    (folder / "empty.py").write_text("def main(): pass\n")
+    (folder / "empty.script.yaml").write_text("lock: ''\n")
+    (folder / "tool.bun.ts").write_text("export async function main() {}\n")
+    (folder / "tool.script.yaml").write_text("lock: '{\"lockfileVersion\": 0}'\n")
+    assert sorted(prewarm.directory_locks(str(tmp_path))) == [
+        ("bun", '{"lockfileVersion": 0}'), ("python3", PY311 + "b==2\n")]
+
+
+def test_snapshot_is_reused_until_the_cache_changes_and_restores_only_into_an_empty_cache(tmp_path):
+    cache = tmp_path / "cache"
+    (cache / "pip" / "httpx==0.27.0").mkdir(parents=True)
+    (cache / "pip" / "httpx==0.27.0" / "httpx.py").write_text("VERSION = '0.27.0'\n")
+    output = str(tmp_path / "snapshot" / "windmill-cache.tar.gz")
+
+    first = prewarm.snapshot(str(cache), output)
+    assert first["entries"] == ["pip"] and first["fingerprint"][0] == 1
+    assert prewarm.snapshot(str(cache), output)["created_at"] == first["created_at"]
+    (cache / "bun").mkdir()
+    (cache / "bun" / "lock").write_text("{}")
+    assert prewarm.snapshot(str(cache), output)["fingerprint"][0] == 2
+
+    target = tmp_path / "new-cache"
+    target.mkdir()
+    assert prewarm.restore(str(target), output) is not None
+    assert (target / "pip" / "httpx==0.27.0" / "httpx.py").read_text() == "VERSION = '0.27.0'\n"
+    (target / "bun" / "lock").write_text("changed")
+    assert prewarm.restore(str(target), output) is None
+    assert (target / "bun" / "lock").read_text() == "changed"
+    assert prewarm.restore(str(target), str(tmp_path / "missing.tar.gz")) is None
+    assert not os.path.exists(output + ".partial")